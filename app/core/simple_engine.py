@@ -12,10 +12,15 @@
 """
 
 import asyncio
+import hashlib
 import json
+import re
 import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Union, Callable
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Union, Callable
 from loguru import logger
 
 from .base_plugin import BasePlugin
@@ -36,6 +41,106 @@ class StopExecution(Exception):
         self.wait_for = wait_for
         self.timestamp = datetime.now().isoformat()
 
+# === СКОМПИЛИРОВАННЫЕ СЦЕНАРИИ ===
+
+_PLACEHOLDER_RE = re.compile(r"\{([^{}]*)\}")
+
+# Поля шагов с переходами на другие шаги
+_TRANSITION_FIELDS = ("next_step",)
+_BRANCH_TRANSITION_FIELDS = ("true_step", "false_step")
+
+
+@lru_cache(maxsize=4096)
+def _compile_template(template: str) -> Tuple[Tuple[bool, str], ...]:
+    """Шаблон → токены (является_переменной, текст)"""
+    tokens = []
+    position = 0
+    for match in _PLACEHOLDER_RE.finditer(template):
+        if match.start() > position:
+            tokens.append((False, template[position:match.start()]))
+        tokens.append((True, match.group(1)))
+        position = match.end()
+    if position < len(template):
+        tokens.append((False, template[position:]))
+    return tuple(tokens)
+
+
+def _scenario_version(scenario: Dict[str, Any]) -> Optional[str]:
+    """Версия документа сценария (version или updated_at), если она есть"""
+    version = scenario.get("version", scenario.get("updated_at"))
+    return None if version is None else str(version)
+
+
+def _scenario_fingerprint(scenario: Dict[str, Any]) -> str:
+    """Отпечаток сценария: версия документа, без неё - хэш содержимого шагов"""
+    version = _scenario_version(scenario)
+    if version is not None:
+        return f"v:{version}"
+    content = json.dumps(scenario.get("steps", []), sort_keys=True, ensure_ascii=False, default=str)
+    return "h:" + hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass
+class CompiledScenario:
+    """
+    Сценарий, подготовленный к выполнению
+    
+    Шаги проиндексированы по id, переходы проверены при компиляции:
+    переход на несуществующий шаг завершает сценарий (как и раньше),
+    но предупреждение пишется один раз, а не на каждом сообщении.
+    """
+    scenario_id: str
+    version: Optional[str]
+    steps: List[Dict[str, Any]]
+    steps_by_id: Dict[str, Dict[str, Any]]
+    first_step: Optional[Dict[str, Any]]
+    source: Optional[Dict[str, Any]] = None
+    broken_transitions: List[Tuple[str, str]] = field(default_factory=list)
+    fingerprint: Optional[str] = None
+    loaded_at: float = field(default_factory=time.monotonic)
+    
+    @classmethod
+    def compile(cls, scenario: Dict[str, Any]) -> "CompiledScenario":
+        steps_data = scenario.get("steps", [])
+        
+        # Поддерживаем как объект, так и массив шагов
+        if isinstance(steps_data, dict):
+            steps = list(steps_data.values())
+        else:
+            steps = list(steps_data)
+        
+        # При повторяющихся id побеждает первый шаг (как при линейном поиске)
+        steps_by_id: Dict[str, Dict[str, Any]] = {}
+        for step in steps:
+            step_id = step.get("id")
+            if step_id is not None:
+                steps_by_id.setdefault(step_id, step)
+        
+        # Первый шаг: type="start", иначе первый в списке
+        first_step = next((step for step in steps if step.get("type") == "start"), steps[0] if steps else None)
+        
+        broken = []
+        for step in steps:
+            targets = [step.get(name) for name in _TRANSITION_FIELDS]
+            if step.get("type") == "branch":
+                params = step.get("params", {})
+                targets.extend(params.get(name) for name in _BRANCH_TRANSITION_FIELDS)
+            for target in targets:
+                # Шаблонные переходы разрешаются только при выполнении
+                if target and target not in steps_by_id and not _PLACEHOLDER_RE.search(target):
+                    broken.append((step.get("id", "unknown"), target))
+        
+        return cls(
+            scenario_id=scenario.get("scenario_id", "unknown"),
+            version=_scenario_version(scenario),
+            steps=steps,
+            steps_by_id=steps_by_id,
+            first_step=first_step,
+            source=scenario,
+            broken_transitions=broken,
+            fingerprint=_scenario_fingerprint(scenario)
+        )
+
 # === ОСНОВНОЙ ДВИЖОК ===
 
 class SimpleScenarioEngine:
@@ -48,13 +153,22 @@ class SimpleScenarioEngine:
     - Поддержка переключения сценариев
     - Human-in-the-loop через StopExecution
     - Сохранение состояния между вызовами
+    - Сценарии компилируются один раз (CompiledScenario) и хранятся в LRU кэше;
+      запись в коллекцию scenarios через mongo шаги сбрасывает кэш, а сценарий
+      по scenario_id перепроверяется в MongoDB раз в scenario_cache_ttl секунд
     """
     
-    def __init__(self):
+    def __init__(self, scenario_cache_size: int = 128, scenario_cache_ttl: Optional[float] = 30.0):
         self.step_handlers: Dict[str, Callable] = {}
         self.plugins: Dict[str, BasePlugin] = {}
         self.logger = logger.bind(component="SimpleScenarioEngine")
         
+        # Кэш скомпилированных сценариев: scenario_id → CompiledScenario
+        self.scenario_cache_size = scenario_cache_size
+        self.scenario_cache_ttl = scenario_cache_ttl
+        self._scenario_cache: "OrderedDict[str, CompiledScenario]" = OrderedDict()
+        self.scenario_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        
         # Регистрируем базовые обработчики
         self._register_core_handlers()
         
@@ -132,39 +246,13 @@ class SimpleScenarioEngine:
             Dict[str, Any]: Финальный контекст после выполнения
         """
         
-        # Если передан scenario_id как строка, загружаем сценарий из MongoDB
-        if isinstance(scenario, str):
-            scenario_id = scenario
-            # Загружаем сценарий через MongoDB плагин
-            get_scenario_step = {
-                "id": "load_scenario",
-                "type": "mongo_find_one_document",
-                "params": {
-                    "collection": "scenarios",
-                    "filter": {"scenario_id": scenario_id}
-                }
-            }
-            
-            temp_context = {}
-            await self.execute_step(get_scenario_step, temp_context)
-            
-            if not temp_context.get("document"):
-                raise ValueError(f"Сценарий {scenario_id} не найден в БД")
-            
-            scenario = temp_context["document"]
-        
-        scenario_id = scenario.get("scenario_id", "unknown")
-        steps_data = scenario.get("steps", [])
-        
-        # Поддерживаем как объект, так и массив шагов
-        if isinstance(steps_data, dict):
-            steps = list(steps_data.values())
-        else:
-            steps = steps_data
+        # Скомпилированный сценарий из кэша (по scenario_id - загрузка из MongoDB при промахе)
+        compiled = await self.get_compiled_scenario(scenario)
+        scenario_id = compiled.scenario_id
         
         self.logger.info(f"🎯 Начинаю выполнение сценария {scenario_id}",
                         scenario_id=scenario_id,
-                        steps_count=len(steps),
+                        steps_count=len(compiled.steps),
                         initial_context=context)
         
         # Инициализируем контекст выполнения
@@ -184,16 +272,16 @@ class SimpleScenarioEngine:
             if execution_context.get("current_step"):
                 # Продолжаем с указанного шага
                 target_step_id = execution_context["current_step"]
-                current_step = self._find_step_by_id(steps, target_step_id)
+                current_step = self._find_step_by_id(compiled, target_step_id)
                 
                 if not current_step:
                     self.logger.warning(f"⚠️ Шаг {target_step_id} не найден, начинаю с первого")
-                    current_step = self._find_first_step(steps)
+                    current_step = self._find_first_step(compiled)
                 else:
                     self.logger.info(f"📍 Продолжаю с шага: {target_step_id}")
             else:
                 # Ищем первый шаг (обычно type="start")
-                current_step = self._find_first_step(steps)
+                current_step = self._find_first_step(compiled)
             
             if not current_step:
                 raise ValueError(f"Не найден стартовый шаг в сценарии {scenario_id}")
@@ -226,7 +314,7 @@ class SimpleScenarioEngine:
                                 return execution_context
                     
                     # Находим следующий шаг
-                    current_step = self._find_next_step(steps, current_step, execution_context)
+                    current_step = self._find_next_step(compiled, current_step, execution_context)
                     
                 except StopExecution as e:
                     # НОРМАЛЬНАЯ остановка для ожидания ввода - НЕ ошибка!
@@ -286,6 +374,11 @@ class SimpleScenarioEngine:
             result = await handler(step, context)
             execution_time = int((time.time() - start_time) * 1000)
             
+            # Сценарии изменены в БД - скомпилированные копии устарели
+            if self._writes_scenarios(step):
+                scenario_filter = step.get("params", {}).get("filter") or {}
+                self.invalidate_scenario(scenario_filter.get("scenario_id"))
+            
             self.logger.debug(f"✅ Шаг {step_id} выполнен за {execution_time}мс")
             
             return result or {}
@@ -294,26 +387,118 @@ class SimpleScenarioEngine:
             self.logger.error(f"❌ Ошибка выполнения шага {step_id}: {e}")
             raise
     
-    # === ПОИСК ШАГОВ ===
+    # === КЭШ СЦЕНАРИЕВ ===
     
-    def _find_first_step(self, steps: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-        """Находит первый шаг сценария"""
-        # Ищем шаг с type="start"
-        for step in steps:
-            if step.get("type") == "start":
-                return step
+    async def get_compiled_scenario(self, scenario: Union[str, Dict[str, Any]]) -> CompiledScenario:
+        """
+        Скомпилированный сценарий из кэша
+        
+        Строка - scenario_id: при промахе сценарий загружается из MongoDB;
+        запись старше scenario_cache_ttl секунд загружается снова и
+        перекомпилируется, только если документ изменился (None - без перепроверки,
+        изменения видны после записи через mongo шаг или invalidate_scenario).
+        Объект - кэш используется, если совпадает отпечаток: версия (поле
+        version/updated_at), а без неё - хэш шагов, так что изменение того же
+        объекта на месте тоже даёт перекомпиляцию.
+        """
+        if isinstance(scenario, str):
+            compiled = self._cache_get(scenario)
+            if compiled is not None and not self._cache_expired(compiled):
+                return compiled
+            document = await self._load_scenario(scenario)
+            if compiled is not None:
+                if _scenario_fingerprint(document) == compiled.fingerprint:
+                    compiled.loaded_at = time.monotonic()
+                    return compiled
+                self.scenario_cache_stats["invalidations"] += 1
+                self.logger.debug(f"♻️ Сценарий {scenario} изменён в БД, перекомпилирую")
+            return self._cache_put(CompiledScenario.compile(document))
+        
+        scenario_id = scenario.get("scenario_id")
+        cached = self._scenario_cache.get(scenario_id) if scenario_id else None
+        if cached is not None and cached.fingerprint == _scenario_fingerprint(scenario):
+            return self._cache_get(scenario_id)
+        
+        compiled = CompiledScenario.compile(scenario)
+        if not scenario_id:
+            return compiled
+        self.scenario_cache_stats["misses"] += 1
+        return self._cache_put(compiled)
+    
+    def invalidate_scenario(self, scenario_id: Optional[str] = None):
+        """Сбросить скомпилированный сценарий (None - все сценарии)"""
+        if scenario_id is None:
+            count = len(self._scenario_cache)
+            self._scenario_cache.clear()
+        else:
+            count = 1 if self._scenario_cache.pop(scenario_id, None) is not None else 0
+        if count:
+            self.scenario_cache_stats["invalidations"] += count
+            self.logger.debug(f"♻️ Кэш сценариев сброшен: {scenario_id or 'все'}")
+    
+    async def _load_scenario(self, scenario_id: str) -> Dict[str, Any]:
+        """Загрузка сценария через MongoDB плагин"""
+        get_scenario_step = {
+            "id": "load_scenario",
+            "type": "mongo_find_one_document",
+            "params": {
+                "collection": "scenarios",
+                "filter": {"scenario_id": scenario_id}
+            }
+        }
         
-        # Если нет start, берём первый шаг
-        return steps[0] if steps else None
+        temp_context = {}
+        await self.execute_step(get_scenario_step, temp_context)
+        
+        if not temp_context.get("document"):
+            raise ValueError(f"Сценарий {scenario_id} не найден в БД")
+        
+        return temp_context["document"]
+    
+    def _cache_get(self, scenario_id: str) -> Optional[CompiledScenario]:
+        compiled = self._scenario_cache.get(scenario_id)
+        if compiled is None:
+            self.scenario_cache_stats["misses"] += 1
+            return None
+        self._scenario_cache.move_to_end(scenario_id)
+        self.scenario_cache_stats["hits"] += 1
+        return compiled
+    
+    def _cache_expired(self, compiled: CompiledScenario) -> bool:
+        ttl = self.scenario_cache_ttl
+        return ttl is not None and time.monotonic() - compiled.loaded_at >= ttl
+    
+    def _cache_put(self, compiled: CompiledScenario) -> CompiledScenario:
+        for step_id, target in compiled.broken_transitions:
+            self.logger.warning(f"⚠️ Сценарий {compiled.scenario_id}: шаг {step_id} ссылается на несуществующий шаг {target}")
+        
+        self._scenario_cache[compiled.scenario_id] = compiled
+        self._scenario_cache.move_to_end(compiled.scenario_id)
+        while len(self._scenario_cache) > self.scenario_cache_size:
+            self._scenario_cache.popitem(last=False)
+        return compiled
+    
+    @staticmethod
+    def _writes_scenarios(step: Dict[str, Any]) -> bool:
+        """Шаг записывает в коллекцию scenarios (mongo_* кроме чтения)"""
+        step_type = step.get("type", "")
+        return (
+            step_type.startswith("mongo_")
+            and "find" not in step_type
+            and step.get("params", {}).get("collection") == "scenarios"
+        )
     
-    def _find_step_by_id(self, steps: List[Dict[str, Any]], step_id: str) -> Optional[Dict[str, Any]]:
+    # === ПОИСК ШАГОВ ===
+    
+    def _find_first_step(self, scenario: CompiledScenario) -> Optional[Dict[str, Any]]:
+        """Находит первый шаг сценария (type="start", иначе первый в списке)"""
+        return scenario.first_step
+    
+    def _find_step_by_id(self, scenario: CompiledScenario, step_id: str) -> Optional[Dict[str, Any]]:
         """Находит шаг по ID"""
-        for step in steps:
-            if step.get("id") == step_id:
-                return step
-        return None
+        return scenario.steps_by_id.get(step_id)
     
-    def _find_next_step(self, steps: List[Dict[str, Any]], current_step: Dict[str, Any], context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def _find_next_step(self, scenario: CompiledScenario, current_step: Dict[str, Any], context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Находит следующий шаг для выполнения"""
         # Проверяем переопределение следующего шага (для условных переходов)
         next_step_id = context.get("next_step_override") or current_step.get("next_step")
@@ -325,22 +510,28 @@ class SimpleScenarioEngine:
         if not next_step_id:
             return None  # Сценарий завершён
         
-        return self._find_step_by_id(steps, next_step_id)
+        return self._find_step_by_id(scenario, next_step_id)
     
     # === УТИЛИТЫ ===
     
     def _resolve_template(self, template: str, context: Dict[str, Any]) -> str:
-        """Подстановка переменных {var} из контекста"""
+        """Подстановка переменных {var} из контекста (неизвестные остаются как есть)"""
         if not isinstance(template, str):
             return str(template)
         
-        result = template
-        for key, value in context.items():
-            placeholder = f"{{{key}}}"
-            if placeholder in result:
-                result = result.replace(placeholder, str(value))
+        tokens = _compile_template(template)
+        if not tokens:
+            return template
         
-        return result
+        parts = []
+        for is_variable, text in tokens:
+            if not is_variable:
+                parts.append(text)
+            elif text in context:
+                parts.append(str(context[text]))
+            else:
+                parts.append(f"{{{text}}}")
+        return "".join(parts)
     
     def get_registered_handlers(self) -> List[str]:
         """Возвращает список зарегистрированных обработчиков"""
@@ -13,6 +13,15 @@ import os
 from typing import Dict, Any, Optional, List
 from loguru import logger
 from app.core.base_plugin import BasePlugin
+from kittycore.core.task_classifier import (
+    KeywordAutomaton, LinearTaskModel, TaskClassifier, append_history, train_from_history
+)
+
+# Признаки задачи для агента (в отличие от обычного сообщения)
+TASK_INDICATORS = [
+    "создай", "найди", "проанализируй", "разработай", "напиши",
+    "рассчитай", "запусти", "исследуй", "протестируй", "изучи"
+]
 
 class SimpleLLMRouterPlugin(BasePlugin):
     """
@@ -22,11 +31,21 @@ class SimpleLLMRouterPlugin(BasePlugin):
     - llm_route_task: маршрутизация задачи к агенту
     - llm_get_routing_stats: статистика маршрутизации
     - llm_classify_request: классификация входящего запроса
+    
+    Задачи с уверенной классификацией по ключевым словам (и, если обучена,
+    линейной моделью) маршрутизируются без LLM. Решения LLM дописываются в
+    routing_history_path - по ним train_model_from_history() офлайн
+    обучает модель, и следующие похожие задачи обходятся без LLM.
     """
     
-    def __init__(self):
+    def __init__(self, classifier_model_path: Optional[str] = None,
+                 routing_history_path: Optional[str] = None,
+                 confidence_threshold: float = 0.5):
         super().__init__()
         self.plugin_name = "simple_llm_router"
+        self.classifier_model_path = classifier_model_path
+        self.routing_history_path = routing_history_path
+        self.confidence_threshold = confidence_threshold
         
         # Доступные агенты в системе
         self.available_agents = {
@@ -74,6 +93,14 @@ class SimpleLLMRouterPlugin(BasePlugin):
             }
         }
         
+        # Классификатор строится один раз из ключевых слов агентов
+        self.classifier = TaskClassifier(
+            {agent_id: info["keywords"] for agent_id, info in self.available_agents.items()},
+            default_label="sherlock",
+            model=LinearTaskModel.load(classifier_model_path) if classifier_model_path else None
+        )
+        self._task_indicators = KeywordAutomaton(TASK_INDICATORS)
+        
         # Статистика
         self.stats = {
             "total_routes": 0,
@@ -163,7 +190,12 @@ class SimpleLLMRouterPlugin(BasePlugin):
             
             # Если это задача для агента - маршрутизируем
             if request_type["is_task"]:
-                routing_result = await self._route_with_llm(user_message)
+                if self._should_use_llm(user_message, "normal"):
+                    routing_result = await self._route_with_llm(user_message)
+                    self.stats["llm_routes"] += 1
+                else:
+                    routing_result = self._route_with_heuristics(user_message)
+                    self.stats["heuristic_routes"] += 1
                 
                 context.update({
                     "request_type": "agent_task",
@@ -250,16 +282,8 @@ class SimpleLLMRouterPlugin(BasePlugin):
         if priority == "critical":
             return True
         
-        # Проверяем на очевидные паттерны
-        task_lower = task.lower()
-        
-        for agent_id, agent_info in self.available_agents.items():
-            keywords = agent_info["keywords"]
-            if any(keyword in task_lower for keyword in keywords):
-                return False  # Очевидная задача - эвристика
-        
-        # Неоднозначная задача - LLM
-        return True
+        # Уверенная классификация - эвристика, неоднозначная задача - LLM
+        return self.classifier.classify(task).confidence < self.confidence_threshold
     
     async def _route_with_llm(self, task: str) -> Dict[str, Any]:
         """Маршрутизация через LLM"""
@@ -312,6 +336,13 @@ class SimpleLLMRouterPlugin(BasePlugin):
                     content = data["choices"][0]["message"]["content"]
                     agent = self._extract_agent_name(content)
                     
+                    # Решение LLM - размеченный пример для офлайн обучения классификатора
+                    if self.routing_history_path:
+                        try:
+                            append_history(self.routing_history_path, task, agent)
+                        except OSError as e:
+                            logger.warning(f"⚠️ Не удалось записать историю маршрутизации: {e}")
+                    
                     return {
                         "agent": agent,
                         "confidence": 0.91,
@@ -325,19 +356,17 @@ class SimpleLLMRouterPlugin(BasePlugin):
     def _route_with_heuristics(self, task: str) -> Dict[str, Any]:
         """Эвристическая маршрутизация"""
         
-        task_lower = task.lower()
+        classification = self.classifier.classify(task)
         
-        # Проверяем по ключевым словам агентов
-        for agent_id, agent_info in self.available_agents.items():
-            keywords = agent_info["keywords"]
-            if any(keyword in task_lower for keyword in keywords):
-                return {
-                    "agent": agent_id,
-                    "confidence": 0.78,
-                    "method": "heuristic",
-                    "reasoning": f"Эвристика: совпадение ключевых слов",
-                    "response_time_ms": 1
-                }
+        if classification.method != "default":
+            matched = sorted({keyword for keywords in classification.matches.values() for keyword in keywords})
+            return {
+                "agent": classification.label,
+                "confidence": round(classification.confidence, 2),
+                "method": "heuristic",
+                "reasoning": f"Эвристика ({classification.method}): {', '.join(matched) or 'модель'}",
+                "response_time_ms": 1
+            }
         
         # По умолчанию - sherlock
         return {
@@ -351,22 +380,27 @@ class SimpleLLMRouterPlugin(BasePlugin):
     async def _classify_request_type(self, message: str) -> Dict[str, Any]:
         """Классификация типа запроса"""
         
-        message_lower = message.lower()
-        
         # Определяем является ли это задачей для агента
-        task_indicators = [
-            "создай", "найди", "проанализируй", "разработай", "напиши",
-            "рассчитай", "запусти", "исследуй", "протестируй", "изучи"
-        ]
-        
-        is_task = any(indicator in message_lower for indicator in task_indicators)
+        found = self._task_indicators.matched(message)
+        indicators_found = [indicator for indicator in TASK_INDICATORS if indicator in found]
+        is_task = bool(indicators_found)
         
         return {
             "is_task": is_task,
             "confidence": 0.8 if is_task else 0.9,
-            "indicators_found": [ind for ind in task_indicators if ind in message_lower]
+            "indicators_found": indicators_found
         }
     
+    def train_model_from_history(self) -> bool:
+        """Офлайн обучение модели классификатора на истории решений LLM"""
+        if not self.routing_history_path:
+            return False
+        model = train_from_history(self.classifier, self.routing_history_path, self.classifier_model_path)
+        if model is None:
+            return False
+        self.classifier.model = model
+        return True
+    
     def _extract_agent_name(self, response: str) -> str:
         """Извлечение имени агента из ответа"""
         
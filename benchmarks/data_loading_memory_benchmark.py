@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+📊 БЕНЧМАРК ПАМЯТИ ЗАГРУЗКИ ДАННЫХ
+Сравнение пикового потребления памяти режимов load_data в DataAnalysisTool:
+full (исходный загрузчик), optimized, optimized+pyarrow и chunked
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from kittycore.tools.data_analysis_tool import DataAnalysisTool, ARROW_AVAILABLE
+
+
+def generate_csv(path: Path, rows: int):
+    """Синтетический CSV: id, категории с малой кардинальностью, числа, уникальные строки"""
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        'id': np.arange(rows),
+        'region': rng.choice(['north', 'south', 'east', 'west'], rows),
+        'category': rng.choice([f'category_{i}' for i in range(50)], rows),
+        'price': rng.normal(100, 20, rows).round(2),
+        'quantity': rng.integers(1, 100, rows),
+        'rating': rng.uniform(1, 5, rows).round(1),
+        'comment': [f'comment_{i}' for i in range(rows)]
+    })
+    df.to_csv(path, index=False)
+
+
+def run_pipeline(tool: DataAnalysisTool, path: Path, name: str, mode: str, engine: str):
+    """load_data + analyze_basic + generate_report, возвращает результат загрузки"""
+    load = tool.execute("load_data", file_path=str(path), dataset_name=name, load_mode=mode, engine=engine)
+    tool.execute("analyze_basic", dataset_name=name)
+    tool.execute("generate_report", dataset_name=name, report_type="comprehensive")
+    # Освобождаем память перед следующим замером
+    tool._data_cache.pop(name, None)
+    return load
+
+
+def measure(tool: DataAnalysisTool, path: Path, mode: str, engine: str = 'pandas'):
+    """Время (без трассировки) и пиковая память (tracemalloc) полного прогона"""
+    name = f"{mode}_{engine}"
+
+    start = time.perf_counter()
+    run_pipeline(tool, path, name, mode, engine)
+    elapsed = time.perf_counter() - start
+
+    # tracemalloc заметно замедляет аллокации, поэтому память меряется отдельным прогоном
+    tracemalloc.start()
+    load = tool.execute("load_data", file_path=str(path), dataset_name=name, load_mode=mode, engine=engine)
+    load_peak = tracemalloc.get_traced_memory()[1]
+    tool._data_cache.pop(name, None)
+    tracemalloc.reset_peak()
+    run_pipeline(tool, path, name, mode, engine)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'mode': name,
+        'success': load.success,
+        'load_peak_mb': load_peak / 1024 / 1024,
+        'total_peak_mb': peak / 1024 / 1024,
+        'retained': load.data['data_info']['memory_usage'] if load.success else load.error,
+        'seconds': elapsed
+    }
+
+
+def run_benchmark(rows: int):
+    tool = DataAnalysisTool()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "benchmark.csv"
+        generate_csv(path, rows)
+        print(f"📁 Файл: {rows} строк, {path.stat().st_size / 1024 / 1024:.1f} MB\n")
+
+        cases = [('full', 'pandas'), ('optimized', 'pandas'), ('chunked', 'pandas')]
+        if ARROW_AVAILABLE:
+            cases.insert(2, ('optimized', 'pyarrow'))
+
+        results = [measure(tool, path, mode, engine) for mode, engine in cases]
+
+    baseline = results[0]['total_peak_mb']
+    print(f"{'Режим':<20}{'Пик load, MB':>14}{'Пик всего, MB':>15}{'vs full':>9}{'Время, с':>10}  В памяти")
+    for r in results:
+        ratio = r['total_peak_mb'] / baseline if baseline else 0
+        print(f"{r['mode']:<20}{r['load_peak_mb']:>14.1f}{r['total_peak_mb']:>15.1f}"
+              f"{ratio:>8.2f}x{r['seconds']:>10.2f}  {r['retained']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк памяти режимов загрузки DataAnalysisTool")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Количество строк синтетического CSV")
+    args = parser.parse_args()
+    run_benchmark(args.rows)
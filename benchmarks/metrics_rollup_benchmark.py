@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+📊 БЕНЧМАРК АНАЛИЗА МЕТРИК
+Сравнение прежнего анализа (все строки окна в Python) и анализа
+по агрегатам MetricsStorage на истории за 30 дней
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from kittycore.core.metrics_collector import MetricsStorage, MetricsAnalyzer, TaskMetrics
+
+
+def fill(storage: MetricsStorage, tasks: int, days: int):
+    """Заполняет хранилище задачами, равномерно распределёнными по days дням"""
+    rng = random.Random(42)
+    now = datetime.now()
+    started = time.perf_counter()
+    for i in range(tasks):
+        start = now - timedelta(seconds=rng.uniform(0, days * 86400))
+        storage.store_task_metrics(TaskMetrics(
+            task_id=f"task_{i}", task_type=rng.choice(["analysis", "code", "web", "report"]),
+            complexity_score=rng.random(), start_time=start,
+            end_time=start + timedelta(seconds=5) if i % 9 else None,
+            duration_seconds=rng.uniform(0.5, 60), quality_score=rng.random(),
+            agents_failed=int(i % 13 == 0), rework_required=i % 6 == 0
+        ))
+    storage.flush(timeout=None)
+    return time.perf_counter() - started
+
+
+def legacy_analysis(storage: MetricsStorage, hours: int):
+    """Прежняя схема: выборка всех строк окна и агрегация циклами Python"""
+    tasks = storage.get_recent_metrics(hours, limit=10 ** 9, include=("tasks",))['tasks']
+    completed = [t for t in tasks if t['end_time']]
+    durations = [t['duration_seconds'] for t in completed if t['duration_seconds']]
+    qualities = [t['quality_score'] for t in tasks if t['quality_score'] > 0]
+    return {
+        'total_tasks': len(tasks),
+        'duration_median': statistics.median(durations),
+        'quality_average': statistics.mean(qualities)
+    }
+
+
+def measure(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = MetricsStorage(os.path.join(tmp, "metrics.db"), batch_size=2000)
+        insert_time = fill(storage, args.tasks, args.days)
+        analyzer = MetricsAnalyzer(storage)
+        hours = args.days * 24
+
+        print(f"📥 Запись {args.tasks} задач (с обновлением агрегатов): {insert_time:.2f} с "
+              f"({args.tasks / insert_time:,.0f} задач/с)")
+
+        legacy = measure(lambda: legacy_analysis(storage, hours), args.repeat)
+        rollup = measure(lambda: analyzer.analyze_task_performance(hours, include_medians=False), args.repeat)
+        full = measure(lambda: analyzer.analyze_task_performance(hours), args.repeat)
+        dashboard = measure(lambda: analyzer.get_dashboard(hours), args.repeat)
+
+        print(f"🐢 Прежний анализ ({args.days} дн.):        {legacy * 1000:9.1f} мс")
+        print(f"⚡ Агрегаты без медиан:               {rollup * 1000:9.1f} мс")
+        print(f"⚡ Агрегаты + медианы в SQL:          {full * 1000:9.1f} мс")
+        print(f"📈 Дашборд (ряд по часам):            {dashboard * 1000:9.1f} мс")
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+🏁 БЕНЧМАРК ОРКЕСТРАТОРОВ БЕЗ СЕТИ
+Пропускная способность и задержки UnifiedOrchestrator.solve_task и
+OrchestratorAgent.solve_task на 1/10/100 одновременных задачах
+
+LLM заменён провайдером с внесением задержек: каждый вызов спит согласно
+распределению (fixed/uniform/lognormal, детерминированный seed) и отдаёт
+заранее подготовленный структурированный ответ по шаблону промпта.
+Задержка вносится через time.sleep, как у синхронного OpenRouterProvider,
+поэтому блокировки event loop видны в результатах так же, как в работе.
+
+Каждый случай (оркестратор x уровень параллельности) выполняется в отдельном
+процессе во временном каталоге - пик RSS и записанные байты относятся
+только к нему. Результаты сохраняются в JSON (по умолчанию
+benchmarks/results/orchestrator_<commit>.json), --compare сравнивает с
+прошлым прогоном.
+
+Пример:
+    python benchmarks/orchestrator_benchmark.py --concurrency 1 10 100
+    python benchmarks/orchestrator_benchmark.py --latency fixed:5 --compare old.json
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import random
+import re
+import resource
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+BENCHMARK_TASKS = [
+    "Создай python скрипт который считает числа фибоначчи",
+    "Проанализируй рынок CRM систем и подготовь отчёт",
+    "Сделай HTML страницу с расписанием занятий",
+    "Напиши план запуска мобильного приложения",
+]
+
+
+# === ЗАДЕРЖКИ LLM ===
+
+@dataclass
+class LatencyModel:
+    """Распределение задержки одного вызова LLM (миллисекунды)"""
+    distribution: str = "lognormal"  # zero | fixed | uniform | lognormal
+    a: float = 10.0  # fixed: значение, uniform: минимум, lognormal: медиана
+    b: float = 0.5   # uniform: максимум, lognormal: sigma
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Разбор строки вида zero, fixed:20, uniform:5:50, lognormal:20:0.5"""
+        name, *params = spec.split(":")
+        if name not in ("zero", "fixed", "uniform", "lognormal"):
+            raise ValueError(f"Неизвестное распределение задержки: {spec}")
+        values = [float(p) for p in params]
+        defaults = cls()
+        return cls(name, values[0] if values else defaults.a, values[1] if len(values) > 1 else defaults.b)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "zero":
+            return 0.0
+        if self.distribution == "fixed":
+            return self.a
+        if self.distribution == "uniform":
+            return rng.uniform(self.a, self.b)
+        return rng.lognormvariate(0.0, self.b) * self.a
+
+
+@dataclass
+class CannedResponse:
+    """Подготовленный ответ для промптов, совпадающих с шаблоном"""
+    name: str
+    pattern: str
+    response: str
+    latency: Optional[LatencyModel] = None  # None - задержка провайдера по умолчанию
+
+
+DEFAULT_RESPONSES = [
+    CannedResponse("complexity", r"Проанализируй сложность задачи", json.dumps({
+        "complexity": "medium", "estimated_agents": 2, "requires_planning": True,
+        "requires_coordination": False, "reasoning": "несколько связанных шагов", "estimated_time": 5
+    }, ensure_ascii=False)),
+    CannedResponse("expected_outcome", r"проджект-менеджер", json.dumps({
+        "result_type": "файлы с результатом", "description": "Готовые файлы по задаче",
+        "success_criteria": ["файл создан", "содержимое соответствует задаче"],
+        "validation_methods": ["проверка файла"], "specific_parameters": {}, "confidence": 0.9,
+        "clarification_question": ""
+    }, ensure_ascii=False)),
+    CannedResponse("decomposition", r"Разбей задачу на логические подзадачи", json.dumps([
+        {"id": "step1", "description": "Анализ требований", "type": "analysis"},
+        {"id": "step2", "description": "Основная реализация", "type": "execution"},
+        {"id": "step3", "description": "Проверка результата", "type": "verification"}
+    ], ensure_ascii=False)),
+    CannedResponse("agent_analysis", r"эксперт-аналитик задач", "\n".join([
+        "## Анализ задачи",
+        "",
+        "**Тип задачи**: creation",
+        "**Цель**: создать файл с результатом",
+        "**Выбранные инструменты**: file_manager",
+        "**Обоснование**: результат сохраняется в файл",
+        "**Ожидаемые результаты**: result.md",
+        "**Тип контента**: документы",
+    ])),
+    CannedResponse("agent_plan", r"план выполнения", "\n".join([
+        "## План выполнения",
+        "",
+        "### Шаг 1: Создать файл с результатом",
+        "- **Действие**: записать результат в файл",
+        "- **Инструмент**: file_manager",
+        "- **Файл**: result.md",
+        "- **Контент**: " + "Результат выполнения задачи. " * 20,
+    ])),
+]
+
+
+def load_responses(path: str) -> List[CannedResponse]:
+    """
+    Ответы из JSON файла: [{"name", "pattern", "response", "latency": "fixed:20"}]
+    Строки файла проверяются раньше ответов по умолчанию
+    """
+    items = json.loads(Path(path).read_text(encoding="utf-8"))
+    responses = []
+    for item in items:
+        response = item["response"]
+        responses.append(CannedResponse(
+            name=item.get("name", item["pattern"]),
+            pattern=item["pattern"],
+            response=response if isinstance(response, str) else json.dumps(response, ensure_ascii=False),
+            latency=LatencyModel.parse(item["latency"]) if item.get("latency") else None
+        ))
+    return responses + DEFAULT_RESPONSES
+
+
+# === LLM ПРОВАЙДЕР С ЗАДЕРЖКАМИ ===
+
+def _provider_base():
+    from kittycore.llm import LLMProvider, LLMConfig
+    return LLMProvider, LLMConfig
+
+
+def create_latency_provider(latency: LatencyModel, responses: List[CannedResponse], seed: int = 42):
+    """
+    Вариант MockLLMProvider с внесением задержек для активного API kittycore.llm
+
+    MockLLMProvider из kittycore/llm.py недоступен для импорта (его перекрывает
+    пакет kittycore/llm/), поэтому провайдер наследует LLMProvider пакета.
+    """
+    LLMProvider, LLMConfig = _provider_base()
+    from kittycore.core.metrics_registry import LLM_REQUEST_SECONDS, LLM_TOKENS
+    from kittycore.core.tracing import get_tracer
+
+    class LatencyMockLLMProvider(LLMProvider):
+        """Mock провайдер: задержка по распределению и ответ по шаблону промпта"""
+
+        def __init__(self, config: LLMConfig = None):
+            super().__init__(config or LLMConfig(provider="mock", model="mock"))
+            self.latency = latency
+            self.responses = [(re.compile(r.pattern), r) for r in responses]
+            self._rng = random.Random(seed)
+            self._lock = threading.Lock()
+            self.calls: Dict[str, int] = {}
+            self.delay_seconds = 0.0
+
+        def _match(self, prompt: str) -> CannedResponse:
+            for pattern, canned in self.responses:
+                if pattern.search(prompt):
+                    return canned
+            return CannedResponse("unmatched", "", '{"status": "ok"}')
+
+        def complete(self, prompt: str, **kwargs) -> str:
+            canned = self._match(prompt)
+            with self._lock:
+                delay = (canned.latency or self.latency).sample(self._rng) / 1000
+                self.calls[canned.name] = self.calls.get(canned.name, 0) + 1
+                self.delay_seconds += delay
+            with get_tracer().span("llm.complete", {"llm.model": self.config.model, "llm.canned": canned.name,
+                                                    "llm.prompt_chars": len(prompt)}):
+                time.sleep(delay)
+            LLM_REQUEST_SECONDS.labels(self.config.model, "success").observe(delay)
+            LLM_TOKENS.labels(self.config.model, "prompt").inc(len(prompt) // 4)
+            LLM_TOKENS.labels(self.config.model, "completion").inc(len(canned.response) // 4)
+            return canned.response
+
+        def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+            words = self.complete(prompt, **kwargs).split(" ")
+            for word in words:
+                yield word + " "
+
+    return LatencyMockLLMProvider()
+
+
+def install_provider(provider) -> None:
+    """
+    Подменяет get_llm_provider пакета kittycore.llm и уже импортированных модулей
+
+    Модули делают `from ..llm import get_llm_provider` и на уровне модуля, и внутри
+    функций - заменяем атрибут пакета и все ранее связанные имена.
+    """
+    import kittycore.llm as llm_package
+
+    original = llm_package.get_llm_provider
+
+    def get_llm_provider(model: str = None, config=None):
+        return provider
+
+    llm_package.get_llm_provider = get_llm_provider
+    llm_package.set_default_provider(provider)
+    for name, module in list(sys.modules.items()):
+        if name.startswith("kittycore") and getattr(module, "get_llm_provider", None) is original:
+            module.get_llm_provider = get_llm_provider
+
+
+# === ОДИН СЛУЧАЙ БЕНЧМАРКА (в отдельном процессе) ===
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(q: float) -> float:
+        return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+    return {
+        "mean": statistics.mean(values),
+        "p50": pick(50),
+        "p95": pick(95),
+        "p99": pick(99),
+        "max": values[-1]
+    }
+
+
+def _tree_bytes(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS - байты
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _create_orchestrator(kind: str, workdir: Path):
+    if kind == "unified":
+        from kittycore.core.unified_orchestrator import UnifiedOrchestrator, UnifiedConfig
+        vault = workdir / "vault"
+        return UnifiedOrchestrator(UnifiedConfig(
+            vault_path=str(vault),
+            enable_vector_memory=False,
+            enable_amem_memory=False,
+            enable_human_intervention=False,
+            vector_memory_path=str(vault / "system" / "vector_memory"),
+            amem_memory_path=str(vault / "system" / "amem_memory"),
+            metrics_storage_path=str(vault / "system" / "metrics"),
+            plan_cache_path=str(vault / "system" / "plan_cache.json"),
+            logs_path=str(vault / "system" / "logs")
+        )), vault
+    if kind == "agent":
+        from kittycore.core.orchestrator import OrchestratorAgent, OrchestratorConfig
+        vault = workdir / "obsidian_vault"
+        return OrchestratorAgent(OrchestratorConfig(
+            enable_obsidian=True,
+            obsidian_vault_path=str(vault),
+            enable_vector_memory=False,
+            enable_human_intervention=False,
+            vector_memory_path=str(workdir / "vector_memory"),
+            metrics_storage_path=str(workdir / "metrics_storage")
+        )), vault
+    raise ValueError(f"Неизвестный оркестратор: {kind}")
+
+
+async def _run_load(orchestrator, concurrency: int, tasks: int) -> Dict[str, Any]:
+    """Закрытая нагрузка: не больше concurrency задач одновременно"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def one(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await orchestrator.solve_task(BENCHMARK_TASKS[index % len(BENCHMARK_TASKS)])
+                status = str(result.get("status", "unknown"))
+            except Exception as e:
+                status = f"exception:{type(e).__name__}"
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(tasks)))
+    return {"wall_seconds": time.perf_counter() - started, "latencies": latencies, "statuses": statuses}
+
+
+def run_case(kind: str, concurrency: int, tasks: int, latency: Dict[str, Any],
+             responses_path: Optional[str], seed: int, quiet: bool) -> Dict[str, Any]:
+    """Один случай: свежий процесс, свой временный каталог, прогрев одной задачей"""
+    workdir = Path(tempfile.mkdtemp(prefix=f"kittycore_bench_{kind}_{concurrency}_"))
+    # Логи, outputs/ и прочие относительные пути пишутся в рабочий каталог
+    os.chdir(workdir)
+    if quiet:
+        sys.stdout = sys.stderr = open(os.devnull, "w")
+
+    from kittycore.core.tracing import get_tracer
+
+    responses = load_responses(responses_path) if responses_path else DEFAULT_RESPONSES
+    provider = create_latency_provider(LatencyModel(**latency), responses, seed)
+    install_provider(provider)
+    orchestrator, vault = _create_orchestrator(kind, workdir)
+    if quiet:
+        # kittycore добавляет свои обработчики loguru при импорте
+        from loguru import logger
+        logger.remove()
+
+    tracer = get_tracer()
+    tracer.configure(sample_rate=1.0, max_spans=max(10000, tasks * 200))
+    asyncio.run(_run_load(orchestrator, 1, 1))
+
+    tracer.clear()
+    provider.calls.clear()
+    provider.delay_seconds = 0.0
+    vault_before, total_before = _tree_bytes(vault), _tree_bytes(workdir)
+    load = asyncio.run(_run_load(orchestrator, concurrency, tasks))
+    vault_written = _tree_bytes(vault) - vault_before
+    total_written = _tree_bytes(workdir) - total_before
+
+    return {
+        "orchestrator": kind,
+        "concurrency": concurrency,
+        "tasks": tasks,
+        "statuses": load["statuses"],
+        "wall_seconds": load["wall_seconds"],
+        "tasks_per_second": tasks / load["wall_seconds"],
+        "latency_ms": _percentiles(load["latencies"]),
+        "stages_ms": tracer.stage_breakdown(),
+        "llm_calls": dict(sorted(provider.calls.items())),
+        "llm_delay_seconds": provider.delay_seconds,
+        "vault_bytes_written": vault_written,
+        "other_bytes_written": total_written - vault_written,
+        "peak_rss_mb": _peak_rss_mb()
+    }
+
+
+# === ЗАПУСК И СРАВНЕНИЕ ===
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]):
+    """Печатает изменения пропускной способности и задержек относительно прошлого прогона"""
+    old_cases = {(c["orchestrator"], c["concurrency"]): c for c in previous.get("cases", [])}
+    print(f"\n🔍 Сравнение с {previous.get('meta', {}).get('commit', '?')}:")
+    for case in current["cases"]:
+        old = old_cases.get((case["orchestrator"], case["concurrency"]))
+        if not old:
+            continue
+
+        def delta(new: float, was: float) -> str:
+            return f"{(new - was) / was * 100:+.1f}%" if was else "n/a"
+
+        print(f"   {case['orchestrator']:>8} x{case['concurrency']:<4} "
+              f"задач/с {delta(case['tasks_per_second'], old['tasks_per_second']):>8}  "
+              f"p95 {delta(case['latency_ms'].get('p95', 0), old['latency_ms'].get('p95', 0)):>8}  "
+              f"p99 {delta(case['latency_ms'].get('p99', 0), old['latency_ms'].get('p99', 0)):>8}  "
+              f"RSS {delta(case['peak_rss_mb'], old['peak_rss_mb']):>8}")
+
+
+def print_case(case: Dict[str, Any], top_stages: int):
+    latency = case["latency_ms"]
+    print(f"\n🧭 {case['orchestrator']} x{case['concurrency']}: {case['tasks']} задач {case['statuses']}")
+    print(f"   ⚡ {case['tasks_per_second']:.2f} задач/с за {case['wall_seconds']:.2f} с")
+    print(f"   ⏱️ p50 {latency['p50']:.1f} мс | p95 {latency['p95']:.1f} мс | p99 {latency['p99']:.1f} мс")
+    print(f"   💾 vault {case['vault_bytes_written'] / 1024:.1f} КБ, прочее "
+          f"{case['other_bytes_written'] / 1024:.1f} КБ | 🧠 пик RSS {case['peak_rss_mb']:.1f} МБ")
+    print(f"   🤖 LLM вызовы: {sum(case['llm_calls'].values())} (задержка {case['llm_delay_seconds']:.2f} с)")
+    for name, stage in list(case["stages_ms"].items())[:top_stages]:
+        print(f"      {name:<28} n={stage['count']:<5} всего {stage['total_ms']:9.1f} мс  "
+              f"p95 {stage['p95_ms']:8.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orchestrators", nargs="+", default=["unified", "agent"], choices=["unified", "agent"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 10, 100])
+    parser.add_argument("--tasks", type=int, default=0,
+                        help="задач на случай (по умолчанию max(20, 2 x concurrency))")
+    parser.add_argument("--latency", default="lognormal:10:0.5",
+                        help="задержка LLM: zero | fixed:MS | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--responses", help="JSON файл с дополнительными ответами LLM")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="путь JSON с результатами")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--top-stages", type=int, default=8)
+    parser.add_argument("--verbose", action="store_true", help="не глушить логи оркестратора")
+    args = parser.parse_args()
+
+    latency = LatencyModel.parse(args.latency)
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "latency": asdict(latency),
+            "responses": args.responses,
+            "seed": args.seed
+        },
+        "cases": []
+    }
+
+    print(f"🏁 Бенчмарк оркестраторов (commit {commit}, LLM {args.latency})")
+    context = multiprocessing.get_context("spawn")
+    for kind in args.orchestrators:
+        for concurrency in args.concurrency:
+            tasks = args.tasks or max(20, 2 * concurrency)
+            # Новый процесс на случай: пик RSS и синглтоны не переходят между случаями
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                case = pool.submit(run_case, kind, concurrency, tasks, asdict(latency),
+                                   args.responses, args.seed, not args.verbose).result()
+            report["cases"].append(case)
+            print_case(case, args.top_stages)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"orchestrator_{commit}.json")
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    Path(output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n💾 Результаты: {output}")
+
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+🔌 БЕНЧМАРК СКАНЕРА ПОРТОВ
+Сравнение прежней схемы (блокирующий scan_port батчами по 50)
+и нового сканера со скользящим окном на локальных слушающих сокетах
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import asyncio
+import socket
+import time
+
+from kittycore.tools.network_tool import NetworkTool
+
+
+def open_listeners(count: int):
+    """Открывает count слушающих сокетов на 127.0.0.1"""
+    listeners = []
+    for _ in range(count):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        listeners.append(sock)
+    return listeners
+
+
+def open_slow_ports(count: int):
+    """
+    "Медленные" порты: очередь accept переполнена, новые SYN отбрасываются
+    и соединение висит до таймаута - как у порта за файрволом
+    """
+    sockets = []
+    for _ in range(count):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(0)
+        filler = socket.create_connection(server.getsockname())
+        sockets.extend([server, filler])
+    return sockets, [sock.getsockname()[1] for sock in sockets[::2]]
+
+
+async def legacy_scan(tool: NetworkTool, host: str, ports: list, timeout: float):
+    """Прежний алгоритм: все корутины создаются заранее, gather батчами по 50"""
+    open_ports = []
+    tasks = [tool.scan_port(host, port, timeout) for port in ports]
+    for i in range(0, len(tasks), 50):
+        for result in await asyncio.gather(*tasks[i:i + 50], return_exceptions=True):
+            if not isinstance(result, Exception) and result.success and result.data["is_reachable"]:
+                open_ports.append(result.data["port"])
+    return open_ports
+
+
+async def run_benchmark(listeners_count: int, slow_count: int, legacy_ports: int, concurrency: int,
+                        timeout: float):
+    tool = NetworkTool()
+    listeners = open_listeners(listeners_count)
+    slow_sockets, slow_ports = open_slow_ports(slow_count)
+    expected = sorted(sock.getsockname()[1] for sock in listeners)
+    print(f"🔌 Открытых портов: {listeners_count}, медленных: {slow_count}, таймаут {timeout} с\n")
+
+    rows = []
+    try:
+        # Одинаковый набор портов для обеих схем: открытые, медленные и закрытые вперемешку
+        ports = sorted(set(range(1, legacy_ports + 1)) | set(expected) | set(slow_ports))
+
+        begin = time.perf_counter()
+        legacy_open = await legacy_scan(tool, "127.0.0.1", ports, timeout)
+        rows.append(("legacy (батчи по 50)", len(ports), time.perf_counter() - begin,
+                     len(set(legacy_open) & set(expected)), len(expected)))
+
+        begin = time.perf_counter()
+        found = {item.port async for item in tool.scan_ports_stream("127.0.0.1", ports, timeout, concurrency)
+                 if item.status == "open"}
+        rows.append((f"sliding window (окно {concurrency})", len(ports), time.perf_counter() - begin,
+                     len(found & set(expected)), len(expected)))
+
+        # Новый сканер на полном диапазоне
+        begin = time.perf_counter()
+        result = await tool.scan_ports_range("127.0.0.1", 1, 65535, timeout=timeout, concurrency=concurrency)
+        found = {item["port"] for item in result.data["open_ports"]}
+        rows.append((f"sliding window, 1-65535", result.data["total_scanned"], time.perf_counter() - begin,
+                     len(found & set(expected)), len(expected)))
+    finally:
+        for sock in listeners + slow_sockets:
+            sock.close()
+
+    print(f"{'Сканер':<34}{'Портов':>8}{'Время, с':>10}{'Порт/с':>10}  Найдено")
+    for name, ports, elapsed, found_count, expected_count in rows:
+        print(f"{name:<34}{ports:>8}{elapsed:>10.2f}{ports / elapsed:>10.0f}  {found_count}/{expected_count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк сканера портов NetworkTool")
+    parser.add_argument("--listeners", type=int, default=20, help="Количество слушающих сокетов")
+    parser.add_argument("--slow", type=int, default=10, help="Количество медленных (отбрасывающих SYN) портов")
+    parser.add_argument("--legacy-ports", type=int, default=2000, help="Число закрытых портов в наборе для сравнения схем")
+    parser.add_argument("--concurrency", type=int, default=500, help="Размер окна нового сканера")
+    parser.add_argument("--timeout", type=float, default=0.5, help="Таймаут соединения, сек")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.listeners, args.slow, args.legacy_ports, args.concurrency, args.timeout))
@@ -174,7 +174,7 @@ class IntellectualAgent:
         
         try:
             print(f"🤖 Отправляем запрос к LLM...")
-            response = self.llm.complete(prompt)
+            response = await asyncio.to_thread(self.llm.complete, prompt)
             print(f"📝 LLM ответ получен: {len(response)} символов")
             print(f"🔍 Первые 200 символов: {response[:200]}...")
             
@@ -464,7 +464,7 @@ class IntellectualAgent:
 
         try:
             print(f"🚀 Создаем многоэтапный план через LLM...")
-            response = self.llm.complete(prompt)
+            response = await asyncio.to_thread(self.llm.complete, prompt)
             print(f"📝 Получен многоэтапный план: {len(response)} символов")
             
             # Парсим план
@@ -528,7 +528,7 @@ class IntellectualAgent:
 
         try:
             print(f"🤖 Создаем простой план через LLM...")
-            response = self.llm.complete(prompt)
+            response = await asyncio.to_thread(self.llm.complete, prompt)
             print(f"📝 Получен план: {len(response)} символов")
             
             # Парсим план
@@ -7,6 +7,7 @@
 - "Результат который можно использовать немедленно"
 """
 
+import asyncio
 import json
 import logging
 import os
@@ -74,7 +75,7 @@ class SmartValidator:
             )
             
             # 4. Получаем оценку от LLM
-            llm_response = self.llm_provider.complete(validation_prompt)
+            llm_response = await asyncio.to_thread(self.llm_provider.complete, validation_prompt)
             
             # 5. Парсим ответ LLM
             validation_result = self._parse_llm_response(llm_response)
@@ -232,7 +233,7 @@ JSON ОТВЕТ:"""
 УГАДАННАЯ ЗАДАЧА:"""
 
             # Запрос к LLM
-            llm_response = self.llm_provider.complete(guess_prompt)
+            llm_response = await asyncio.to_thread(self.llm_provider.complete, guess_prompt)
             guessed_task = llm_response.strip().strip('"').lower()
             
             logger.info(f"🔮 Угадана задача: {guessed_task}")
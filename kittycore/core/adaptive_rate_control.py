@@ -17,12 +17,15 @@ import time
 import random
 import hashlib
 import json
+import weakref
 from typing import Dict, List, Any, Optional, Callable
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from enum import Enum
 import logging
 
+from .metrics_registry import QUEUE_DEPTH, record_cache_access
+
 logger = logging.getLogger(__name__)
 
 class CircuitState(Enum):
@@ -192,11 +195,13 @@ class ResponseCache:
             # Проверяем TTL
             if time.time() - entry['timestamp'] < self.ttl_seconds:
                 logger.debug(f"💾 Cache HIT для запроса: {cache_key[:8]}...")
+                record_cache_access("llm_response", True)
                 return entry['response']
             else:
                 # Удаляем устаревшую запись
                 del self.cache[cache_key]
         
+        record_cache_access("llm_response", False)
         return None
     
     def put(self, request_data: Dict[str, Any], response: Any):
@@ -239,6 +244,12 @@ class RequestQueue:
     def __init__(self):
         self.queue: List[PrioritizedRequest] = []
         self.processing = False
+        
+        # Глубина читается при выгрузке метрик - верна и после извлечения запросов
+        queue_ref = weakref.ref(self)
+        QUEUE_DEPTH.labels("llm_requests").set_function(
+            lambda: len(queue_ref().queue) if queue_ref() is not None else 0
+        )
     
     async def add_request(self, request_data: Dict[str, Any], 
                          priority: int = RequestPriority.MEDIUM,
@@ -12,11 +12,15 @@ Advanced Conditional Engine для KittyCore
 """
 
 from typing import Any, Dict, List, Optional, Union, Callable
+from collections import OrderedDict
 from dataclasses import dataclass
 from enum import Enum
-import re
+import ast
+import io
+import operator
 import json
 import logging
+import tokenize
 logger = logging.getLogger(__name__)
 
 
@@ -66,6 +70,306 @@ class ConditionResult:
         return self.value
 
 
+# === КОМПИЛЯЦИЯ ВЫРАЖЕНИЙ ===
+
+# Инфиксные операторы KittyCore переписываются в неиспользуемые бинарные операторы Python
+_INFIX_OPERATORS = {"contains": "@", "starts_with": "<<", "ends_with": ">>"}
+_UPPERCASE_KEYWORDS = {"AND": "and", "OR": "or", "NOT": "not"}
+# Строковые операции в стиле метода: name.contains('admin')
+_STRING_METHODS = {"contains", "starts_with", "ends_with", "startswith", "endswith"}
+_LITERAL_NAMES = {"true": True, "false": False, "null": None}
+
+
+def _contains(left: Any, right: Any) -> bool:
+    if isinstance(left, (list, tuple, set, dict)):
+        return right in left
+    return str(right) in str(left)
+
+
+def _starts_with(left: Any, right: Any) -> bool:
+    return str(left).startswith(str(right))
+
+
+def _ends_with(left: Any, right: Any) -> bool:
+    return str(left).endswith(str(right))
+
+
+_STRING_OPERATIONS = {
+    "contains": _contains,
+    "starts_with": _starts_with, "startswith": _starts_with,
+    "ends_with": _ends_with, "endswith": _ends_with,
+}
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+    ast.MatMult: _contains, ast.LShift: _starts_with, ast.RShift: _ends_with,
+}
+_COMPARE_OPERATORS = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge, ast.Is: operator.is_, ast.IsNot: operator.is_not,
+    ast.In: lambda left, right: left in right, ast.NotIn: lambda left, right: left not in right,
+}
+_UNARY_OPERATORS = {ast.Not: operator.not_, ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+# Вычислитель: (контекст, функции движка) → значение
+Evaluator = Callable[[Dict[str, Any], Dict[str, Callable]], Any]
+
+
+class ExpressionCompileError(ValueError):
+    """Выражение не разбирается или содержит недопустимые конструкции"""
+
+
+def _rewrite_source(expression: str) -> tuple:
+    """
+    Переписывает синтаксис KittyCore в Python: AND/OR/NOT, инфиксные
+    contains/starts_with/ends_with и {переменные} (становятся именами
+    __var<N>, их ключи контекста возвращаются отдельно)
+    """
+    source = " ".join(expression.splitlines())
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(source).readline))
+    except (tokenize.TokenError, IndentationError) as e:
+        raise ExpressionCompileError(f"не удалось разобрать выражение: {e}")
+    
+    rewritten = []
+    brace_vars: Dict[str, str] = {}
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        previous = rewritten[-1][1] if rewritten else None
+        
+        if token.type == tokenize.OP and token.string in ("@", "<<", ">>", "@=", "<<=", ">>="):
+            raise ExpressionCompileError(f"недопустимый оператор: {token.string}")
+        
+        if token.type == tokenize.OP and token.string == "{":
+            # {имя переменной} - ключ контекста берётся из исходного текста как есть
+            closing = next((i for i in range(index + 1, len(tokens)) if tokens[i].string == "}"), None)
+            if closing is None:
+                raise ExpressionCompileError("незакрытая фигурная скобка")
+            key = source[token.end[1]:tokens[closing].start[1]].strip()
+            name = f"__var{len(brace_vars)}"
+            brace_vars[name] = key
+            rewritten.append((tokenize.NAME, name))
+            index = closing + 1
+            continue
+        
+        if token.type == tokenize.NAME:
+            if token.string in _UPPERCASE_KEYWORDS:
+                rewritten.append((tokenize.NAME, _UPPERCASE_KEYWORDS[token.string]))
+                index += 1
+                continue
+            next_token = tokens[index + 1] if index + 1 < len(tokens) else None
+            is_call = next_token is not None and next_token.string == "("
+            if token.string in _INFIX_OPERATORS and previous != "." and not is_call:
+                rewritten.append((tokenize.OP, _INFIX_OPERATORS[token.string]))
+                index += 1
+                continue
+        
+        rewritten.append((token.type, token.string))
+        index += 1
+    
+    return tokenize.untokenize(rewritten), brace_vars
+
+
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    """kitten.mood → "kitten.mood" (None если это не цепочка имён)"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _lookup(context: Dict[str, Any], name: str) -> Any:
+    """Переменная контекста: ключ целиком, затем вложенные словари (user.name)"""
+    if name in context:
+        return context[name]
+    if name in _LITERAL_NAMES:
+        return _LITERAL_NAMES[name]
+    if "." in name:
+        value: Any = context
+        for part in name.split("."):
+            if not isinstance(value, dict) or part not in value:
+                return None
+            value = value[part]
+        return value
+    # Неизвестная переменная считается None
+    return None
+
+
+class _ConditionCompiler:
+    """Проверка AST и сборка замыканий; допускаются только перечисленные конструкции"""
+    
+    def __init__(self, brace_vars: Dict[str, str]):
+        self.brace_vars = brace_vars
+    
+    def compile(self, node: ast.AST) -> Evaluator:
+        method = getattr(self, f"_compile_{type(node).__name__}", None)
+        if method is None:
+            raise ExpressionCompileError(f"недопустимая конструкция: {type(node).__name__}")
+        return method(node)
+    
+    def _compile_Expression(self, node: ast.Expression) -> Evaluator:
+        return self.compile(node.body)
+    
+    def _compile_Constant(self, node: ast.Constant) -> Evaluator:
+        value = node.value
+        return lambda context, functions: value
+    
+    def _compile_Name(self, node: ast.Name) -> Evaluator:
+        name = self.brace_vars.get(node.id, node.id)
+        return lambda context, functions: _lookup(context, name)
+    
+    def _compile_Attribute(self, node: ast.Attribute) -> Evaluator:
+        name = _dotted_name(node)
+        if name is None:
+            raise ExpressionCompileError("атрибуты допускаются только у имён переменных")
+        return lambda context, functions: _lookup(context, name)
+    
+    def _compile_Subscript(self, node: ast.Subscript) -> Evaluator:
+        value = self.compile(node.value)
+        key = self.compile(node.slice)
+        
+        def subscript(context, functions):
+            container = value(context, functions)
+            try:
+                return container[key(context, functions)]
+            except (KeyError, IndexError, TypeError):
+                return None
+        return subscript
+    
+    def _compile_List(self, node: ast.List) -> Evaluator:
+        items = [self.compile(item) for item in node.elts]
+        return lambda context, functions: [item(context, functions) for item in items]
+    
+    def _compile_Tuple(self, node: ast.Tuple) -> Evaluator:
+        items = [self.compile(item) for item in node.elts]
+        return lambda context, functions: tuple(item(context, functions) for item in items)
+    
+    def _compile_Set(self, node: ast.Set) -> Evaluator:
+        items = [self.compile(item) for item in node.elts]
+        return lambda context, functions: {item(context, functions) for item in items}
+    
+    def _compile_BoolOp(self, node: ast.BoolOp) -> Evaluator:
+        values = [self.compile(value) for value in node.values]
+        if isinstance(node.op, ast.And):
+            def evaluate_and(context, functions):
+                result = True
+                for value in values:
+                    result = value(context, functions)
+                    if not result:
+                        return result
+                return result
+            return evaluate_and
+        
+        def evaluate_or(context, functions):
+            result = False
+            for value in values:
+                result = value(context, functions)
+                if result:
+                    return result
+            return result
+        return evaluate_or
+    
+    def _compile_UnaryOp(self, node: ast.UnaryOp) -> Evaluator:
+        op = _UNARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise ExpressionCompileError(f"недопустимый оператор: {type(node.op).__name__}")
+        operand = self.compile(node.operand)
+        return lambda context, functions: op(operand(context, functions))
+    
+    def _compile_BinOp(self, node: ast.BinOp) -> Evaluator:
+        op = _BINARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise ExpressionCompileError(f"недопустимый оператор: {type(node.op).__name__}")
+        left, right = self.compile(node.left), self.compile(node.right)
+        return lambda context, functions: op(left(context, functions), right(context, functions))
+    
+    def _compile_Compare(self, node: ast.Compare) -> Evaluator:
+        ops = []
+        for op_node in node.ops:
+            op = _COMPARE_OPERATORS.get(type(op_node))
+            if op is None:
+                raise ExpressionCompileError(f"недопустимый оператор: {type(op_node).__name__}")
+            ops.append(op)
+        left = self.compile(node.left)
+        comparators = [self.compile(comparator) for comparator in node.comparators]
+        
+        def compare(context, functions):
+            current = left(context, functions)
+            for op, comparator in zip(ops, comparators):
+                right = comparator(context, functions)
+                if not op(current, right):
+                    return False
+                current = right
+            return True
+        return compare
+    
+    def _compile_Call(self, node: ast.Call) -> Evaluator:
+        if node.keywords:
+            raise ExpressionCompileError("именованные аргументы не поддерживаются")
+        name = _dotted_name(node.func)
+        
+        # Строковая операция в стиле метода: name.contains('admin')
+        if isinstance(node.func, ast.Attribute) and node.func.attr in _STRING_OPERATIONS and len(node.args) == 1:
+            string_op = _STRING_OPERATIONS[node.func.attr]
+            receiver = self.compile(node.func.value)
+            argument = self.compile(node.args[0])
+            
+            def string_operation(context, functions):
+                # Зарегистрированная функция с таким именем имеет приоритет
+                if name in functions:
+                    return functions[name](context, argument(context, functions))
+                return string_op(receiver(context, functions), argument(context, functions))
+            return string_operation
+        
+        if name is None:
+            raise ExpressionCompileError("вызывать можно только функции по имени")
+        
+        # Голые имена в аргументах передаются строками: kitten.skill(Nova, analysis)
+        args = [
+            (lambda context, functions, value=arg.id: value) if isinstance(arg, ast.Name) else self.compile(arg)
+            for arg in node.args
+        ]
+        
+        if name == "len":
+            if len(args) != 1:
+                raise ExpressionCompileError("len() принимает один аргумент")
+            value = self.compile(node.args[0])
+            return lambda context, functions: len(value(context, functions))
+        
+        def call(context, functions):
+            function = functions.get(name)
+            if function is None:
+                logger.warning(f"⚠️ Неизвестная функция: {name}")
+                return None
+            return function(context, *(arg(context, functions) for arg in args))
+        return call
+
+
+@dataclass
+class CompiledCondition:
+    """Условие, разобранное в проверенный AST и собранное в замыкание"""
+    expression: str
+    evaluator: Evaluator
+    
+    @classmethod
+    def compile(cls, expression: str) -> "CompiledCondition":
+        source, brace_vars = _rewrite_source(expression)
+        try:
+            tree = ast.parse(source.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ExpressionCompileError(f"синтаксическая ошибка: {e.msg}")
+        return cls(expression, _ConditionCompiler(brace_vars).compile(tree))
+    
+    def evaluate(self, context: Dict[str, Any], functions: Dict[str, Callable]) -> Any:
+        return self.evaluator(context, functions)
+
+
 class ExpressionParser:
     """
     Умный парсер выражений - ПРЕВОСХОДИТ LANGRAPH!
@@ -73,13 +377,37 @@ class ExpressionParser:
     Поддерживает:
     - ✅ Вложенные скобки: ((a > 5) and (b < 10)) or (c == 'test')
     - ✅ Функции: kitten.mood() == 'enthusiastic'
-    - ✅ Строковые операции: name.contains('admin')
+    - ✅ Строковые операции: name.contains('admin'), name contains 'admin'
     - ✅ Котячьи выражения: kitten.skill('Nova', 'analysis') > 8
+    
+    Выражение компилируется один раз (CompiledCondition) и кэшируется по
+    тексту; значения контекста подставляются при вычислении, а не в текст.
     """
     
-    def __init__(self, condition_engine):
+    def __init__(self, condition_engine, cache_size: int = 1024):
         self.engine = condition_engine
         self.logger = logger
+        self.cache_size = cache_size
+        # Текст выражения → CompiledCondition или ошибка компиляции
+        self._compiled: "OrderedDict[str, Union[CompiledCondition, ExpressionCompileError]]" = OrderedDict()
+    
+    def compile(self, expression: str) -> CompiledCondition:
+        """Скомпилированное выражение из кэша (ExpressionCompileError - если не разбирается)"""
+        compiled = self._compiled.get(expression)
+        if compiled is None:
+            try:
+                compiled = CompiledCondition.compile(expression)
+            except ExpressionCompileError as e:
+                compiled = e
+            self._compiled[expression] = compiled
+            if len(self._compiled) > self.cache_size:
+                self._compiled.popitem(last=False)
+        else:
+            self._compiled.move_to_end(expression)
+        
+        if isinstance(compiled, ExpressionCompileError):
+            raise compiled
+        return compiled
     
     def parse_and_evaluate(self, expression: str, context: Dict[str, Any]) -> ConditionResult:
         """
@@ -93,23 +421,8 @@ class ExpressionParser:
             ConditionResult: Результат оценки
         """
         try:
-            self.logger.info(f"🔍 Оцениваю выражение: {expression}")
-            
-            # Препроцессинг: заменяем функции на значения
-            processed_expr = self._preprocess_functions(expression, context)
-            self.logger.debug(f"📝 После препроцессинга: {processed_expr}")
-            
-            # Безопасная оценка выражения
-            result = self._safe_eval(processed_expr, context)
-            
-            return ConditionResult(
-                success=True,
-                value=result,
-                message=f"Выражение '{expression}' = {result}",
-                context_updates={}
-            )
-            
-        except Exception as e:
+            compiled = self.compile(expression)
+        except ExpressionCompileError as e:
             self.logger.error(f"❌ Ошибка в выражении '{expression}': {e}")
             return ConditionResult(
                 success=False,
@@ -117,150 +430,21 @@ class ExpressionParser:
                 message=f"Ошибка: {str(e)}",
                 context_updates={}
             )
-    
-    def _preprocess_functions(self, expression: str, context: Dict[str, Any]) -> str:
-        """Заменяет вызовы функций на их значения"""
-        import re
-        
-        # Паттерн для функций: function.name(arg1, arg2)
-        function_pattern = r'([a-zA-Z_][a-zA-Z0-9_.]*)\(([^)]*)\)'
-        
-        def replace_function(match):
-            func_name = match.group(1)
-            args_str = match.group(2).strip()
-            
-            # Парсим аргументы
-            if args_str:
-                # Простой парсер аргументов (поддерживает строки и числа)
-                args = []
-                for arg in args_str.split(','):
-                    arg = arg.strip()
-                    if arg.startswith('"') and arg.endswith('"'):
-                        args.append(arg[1:-1])  # Убираем кавычки
-                    elif arg.startswith("'") and arg.endswith("'"):
-                        args.append(arg[1:-1])  # Убираем кавычки
-                    else:
-                        try:
-                            args.append(int(arg))
-                        except ValueError:
-                            try:
-                                args.append(float(arg))
-                            except ValueError:
-                                args.append(arg)
-            else:
-                args = []
-            
-            # Вызываем функцию
-            if func_name in self.engine.custom_functions:
-                try:
-                    result = self.engine.custom_functions[func_name](context, *args)
-                    # Возвращаем результат в правильном формате
-                    if isinstance(result, str):
-                        return f"'{result}'"
-                    else:
-                        return str(result)
-                except Exception as e:
-                    self.logger.error(f"❌ Ошибка функции {func_name}: {e}")
-                    return "None"
-            else:
-                self.logger.warning(f"⚠️ Неизвестная функция: {func_name}")
-                return "None"
-        
-        # Заменяем все функции
-        return re.sub(function_pattern, replace_function, expression)
-    
-    def _safe_eval(self, expression: str, context: Dict[str, Any]) -> bool:
-        """Безопасная оценка выражения"""
-        # Заменяем переменные из контекста
-        processed = self._replace_variables(expression, context)
-        
-        # Заменяем операторы на Python-совместимые
-        processed = self._replace_operators(processed)
-        
-        # Безопасные глобальные переменные для eval
-        safe_globals = {
-            "__builtins__": {},
-            "True": True,
-            "False": False,
-            "None": None,
-            "len": len,
-        }
         
-        # Безопасная оценка
         try:
-            result = eval(processed, safe_globals, {})
-            return bool(result)
+            result = bool(compiled.evaluate(context, self.engine.custom_functions))
         except Exception as e:
-            self.logger.error(f"❌ Ошибка eval: {e} в выражении: {processed}")
-            return False
-    
-    def _replace_variables(self, expression: str, context: Dict[str, Any]) -> str:
-        """Заменяет переменные из контекста"""
-        import re
-        
-        # Сначала заменяем {переменные} в фигурных скобках
-        brace_pattern = r'\{([^}]+)\}'
-        
-        def replace_brace_var(match):
-            var_name = match.group(1).strip()
-            if var_name in context:
-                value = context[var_name]
-                if isinstance(value, str):
-                    return f"'{value}'"
-                else:
-                    return str(value)
-            else:
-                return "None"
-        
-        expression = re.sub(brace_pattern, replace_brace_var, expression)
-        
-        # Затем заменяем обычные переменные
-        var_pattern = r'\b([a-zA-Z_][a-zA-Z0-9_]*)\b'
-        
-        def replace_var(match):
-            var_name = match.group(1)
-            
-            # Пропускаем ключевые слова Python
-            if var_name in ['and', 'or', 'not', 'True', 'False', 'None', 'in', 'len']:
-                return var_name
-            
-            # Заменяем на значение из контекста
-            if var_name in context:
-                value = context[var_name]
-                if isinstance(value, str):
-                    return f"'{value}'"
-                else:
-                    return str(value)
-            else:
-                # Неизвестная переменная считается None
-                return "None"
+            # Ошибка вычисления (сравнение с None и т.п.) - условие ложно
+            self.logger.error(f"❌ Ошибка вычисления '{expression}': {e}")
+            result = False
         
-        return re.sub(var_pattern, replace_var, expression)
-    
-    def _replace_operators(self, expression: str) -> str:
-        """Заменяет специальные операторы"""
-        import re
-        
-        # Сначала заменяем AND/OR на python операторы
-        expression = re.sub(r'\bAND\b', ' and ', expression)
-        expression = re.sub(r'\bOR\b', ' or ', expression)
-        expression = re.sub(r'\bNOT\b', ' not ', expression)
-        
-        # Убираем лишние None и пробелы
-        expression = re.sub(r'\bNone\b\s*', '', expression)
-        expression = re.sub(r'\s+', ' ', expression).strip()
-        
-        # Заменяем операторы на Python-совместимые
-        replacements = {
-            'contains': 'in',
-            'starts_with': '.startswith',
-            'ends_with': '.endswith',
-        }
-        
-        for old, new in replacements.items():
-            expression = expression.replace(old, new)
-        
-        return expression
+        self.logger.debug(f"🔍 Выражение '{expression}' = {result}")
+        return ConditionResult(
+            success=True,
+            value=result,
+            message=f"Выражение '{expression}' = {result}",
+            context_updates={}
+        )
 
 
 class AdvancedConditionEngine:
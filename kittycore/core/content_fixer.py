@@ -52,7 +52,7 @@ class ContentFixer:
             )
             
             # Получаем исправление от LLM
-            response = self.llm_provider.complete(fix_prompt)
+            response = await asyncio.to_thread(self.llm_provider.complete, fix_prompt)
             
             # Парсим ответ LLM
             fixed_result = self._parse_fix_response(response, original_task)
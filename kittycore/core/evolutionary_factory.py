@@ -13,6 +13,7 @@
 🌱 ЭВОЛЮЦИЯ: Постоянное улучшение популяции
 """
 
+import heapq
 import json
 import random
 import time
@@ -22,6 +23,15 @@ from dataclasses import dataclass, asdict
 from pathlib import Path
 from loguru import logger
 
+from .persistence import BatchedSaver, write_json_atomic
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
 # === ЧАСТЬ 1: БАЗОВЫЕ СТРУКТУРЫ ДАННЫХ ===
 
 @dataclass
@@ -142,11 +152,21 @@ class PopulationStats:
 class GeneticOperations:
     """🧬 Генетические операции для эволюции агентов"""
     
+    # Мутации числовых генов (как в mutate_agent): ген, вероятность, амплитуда, минимум, максимум
+    NUMERIC_MUTATIONS = (
+        ("success_rate", 0.7, 0.1, 0.0, 1.0),
+        ("speed_factor", 0.5, 0.2, 0.5, 2.0),
+        ("quality_factor", 0.5, 0.15, 0.5, 2.0),
+        ("collaboration_skill", 0.4, 0.1, 0.0, 1.0),
+    )
+    TOOLS_MUTATION_PROBABILITY = 0.3
+    
     def __init__(self, mutation_rate: float = 0.1, crossover_rate: float = 0.3):
         self.mutation_rate = mutation_rate
         self.crossover_rate = crossover_rate
         self.random = random.Random()
         self.random.seed(int(time.time()))
+        self.np_random = np.random.default_rng(int(time.time())) if NUMPY_AVAILABLE else None
     
     def create_initial_agent(self, agent_type: str = "general", specialization: List[str] = None) -> AgentDNA:
         """🌱 Создание начального агента (нулевое поколение)"""
@@ -341,6 +361,87 @@ class GeneticOperations:
         
         return max(0.0, min(1.0, fitness))
     
+    # === ВЕКТОРНЫЕ ОПЕРАЦИИ (NumPy) ===
+    
+    def mutate_population(self, arrays: "PopulationArrays", rows,
+                          mutation_strength: float = 1.0) -> Tuple[List[int], List[AgentDNA]]:
+        """🔄 Мутация строк rows разом; возвращает (строки мутировавших, их потомки)"""
+        rng = self.np_random
+        rows = np.asarray(rows, dtype=int)
+        
+        # Сопротивление мутациям - как в mutate_agent
+        resistance = arrays.genes["mutation_resistance"][rows]
+        rows = rows[rng.random(len(rows)) <= self.mutation_rate * mutation_strength / resistance]
+        count = len(rows)
+        
+        genes = {name: column[rows].copy() for name, column in arrays.genes.items()}
+        for name, probability, amplitude, low, high in self.NUMERIC_MUTATIONS:
+            mutated = np.clip(genes[name] + rng.uniform(-amplitude, amplitude, count), low, high)
+            genes[name] = np.where(rng.random(count) < probability, mutated, genes[name])
+        mutate_tools = rng.random(count) < self.TOOLS_MUTATION_PROBABILITY
+        
+        children = []
+        timestamp = int(time.time())
+        for i, row in enumerate(rows):
+            parent = arrays.agents[row]
+            child_genes = self._copy_genes(parent.genes)
+            for name, values in genes.items():
+                setattr(child_genes, name, float(values[i]))
+            if mutate_tools[i]:
+                self._mutate_tools(child_genes)
+            children.append(AgentDNA(
+                agent_id=f"mut_{parent.agent_id}_{timestamp}",
+                generation=parent.generation + 1,
+                parent_ids=[parent.agent_id],
+                genes=child_genes,
+                mutations_count=parent.mutations_count + 1
+            ))
+        return rows.tolist(), children
+    
+    def crossover_population(self, arrays: "PopulationArrays", rows1, rows2) -> List[AgentDNA]:
+        """🧬 Скрещивание пар строк (rows1[i], rows2[i]) разом - правила crossover_agents"""
+        rows1 = np.asarray(rows1, dtype=int)
+        rows2 = np.asarray(rows2, dtype=int)
+        first_better = arrays.total_success_rate[rows1] >= arrays.total_success_rate[rows2]
+        better_rows = np.where(first_better, rows1, rows2)
+        worse_rows = np.where(first_better, rows2, rows1)
+        better = {name: column[better_rows] for name, column in arrays.genes.items()}
+        worse = {name: column[worse_rows] for name, column in arrays.genes.items()}
+        
+        genes = {
+            "success_rate": better["success_rate"] * 0.7 + worse["success_rate"] * 0.3,
+            "speed_factor": better["speed_factor"] * 0.6 + worse["speed_factor"] * 0.4,
+            "quality_factor": better["quality_factor"] * 0.6 + worse["quality_factor"] * 0.4,
+            "learning_rate": (better["learning_rate"] + worse["learning_rate"]) / 2,
+            "mutation_resistance": (better["mutation_resistance"] + worse["mutation_resistance"]) / 2,
+            "collaboration_skill": np.maximum(better["collaboration_skill"], worse["collaboration_skill"]),
+            "leadership_tendency": (better["leadership_tendency"] + worse["leadership_tendency"]) / 2,
+        }
+        
+        children = []
+        timestamp = int(time.time())
+        for i in range(len(rows1)):
+            parent1, parent2 = arrays.agents[rows1[i]], arrays.agents[rows2[i]]
+            better_parent, worse_parent = arrays.agents[better_rows[i]], arrays.agents[worse_rows[i]]
+            child_genes = AgentGenes(
+                agent_type=better_parent.genes.agent_type,
+                specialization=list(set(better_parent.genes.specialization + worse_parent.genes.specialization)),
+                preferred_tools=self._merge_tools(better_parent.genes.preferred_tools,
+                                                  worse_parent.genes.preferred_tools),
+                tool_efficiency=self._merge_tool_efficiency(better_parent.genes.tool_efficiency,
+                                                            worse_parent.genes.tool_efficiency),
+                **{name: float(values[i]) for name, values in genes.items()}
+            )
+            children.append(AgentDNA(
+                # Префиксы ID родителей могут совпадать - номер пары делает ID уникальным
+                agent_id=f"cross_{parent1.agent_id[:8]}_{parent2.agent_id[:8]}_{timestamp}_{i}",
+                generation=max(parent1.generation, parent2.generation) + 1,
+                parent_ids=[parent1.agent_id, parent2.agent_id],
+                genes=child_genes,
+                crossover_count=max(parent1.crossover_count, parent2.crossover_count) + 1
+            ))
+        return children
+    
     # === ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ ===
     
     def _copy_genes(self, genes: AgentGenes) -> AgentGenes:
@@ -434,12 +535,103 @@ class GeneticOperations:
         
         return merged
 
+# === ЧАСТЬ 2Б: ПОПУЛЯЦИЯ КАК СТРУКТУРА МАССИВОВ ===
+
+class PopulationArrays:
+    """
+    📐 Числовые гены и статистика популяции столбцами NumPy
+
+    Строка i соответствует agents[i]. Приспособленность, отбор, мутация,
+    скрещивание и генетическое разнообразие считаются сразу по всем строкам;
+    объекты AgentDNA создаются только для потомков.
+    """
+    
+    GENES = ("success_rate", "speed_factor", "quality_factor", "learning_rate",
+             "mutation_resistance", "collaboration_skill", "leadership_tendency")
+    # Веса числовых генов в _calculate_genetic_distance
+    DISTANCE_WEIGHTS = (("success_rate", 1.0), ("speed_factor", 0.5),
+                        ("quality_factor", 0.5), ("learning_rate", 0.3))
+    SPECIALIZATION_WEIGHT = 0.3
+    
+    def __init__(self, agents: List[AgentDNA]):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("PopulationArrays требует numpy")
+        self.agents = list(agents)
+        count = len(self.agents)
+        self.genes = {
+            name: np.fromiter((getattr(a.genes, name) for a in self.agents), dtype=float, count=count)
+            for name in self.GENES
+        }
+        self.total_success_rate = np.fromiter((a.total_success_rate for a in self.agents), dtype=float, count=count)
+        self.tasks_completed = np.fromiter((a.tasks_completed for a in self.agents), dtype=float, count=count)
+        self.life_span_days = np.fromiter(
+            (a.life_span.days if a.life_span else 0 for a in self.agents), dtype=float, count=count
+        )
+    
+    def __len__(self) -> int:
+        return len(self.agents)
+    
+    def fitness(self) -> "np.ndarray":
+        """⚡ То же, что GeneticOperations.calculate_fitness, для всех строк"""
+        genes = self.genes
+        base_fitness = (
+            genes["success_rate"] * 0.5 +
+            (genes["speed_factor"] - 0.5) * 0.1 +
+            (genes["quality_factor"] - 0.5) * 0.2 +
+            genes["collaboration_skill"] * 0.2
+        )
+        performance = np.where(self.total_success_rate > 0, self.total_success_rate, genes["success_rate"])
+        fitness = base_fitness * 0.4 + performance * 0.6
+        fitness = fitness + np.minimum(0.1, self.tasks_completed * 0.01)
+        fitness = fitness - np.minimum(0.05, self.life_span_days * 0.001)
+        return np.clip(fitness, 0.0, 1.0)
+    
+    def mean_genetic_distance(self, chunk_size: int = 512) -> float:
+        """🧬 Среднее попарное _calculate_genetic_distance без перебора пар в Python"""
+        count = len(self.agents)
+        if count < 2:
+            return 0.0
+        
+        # Сумма |x_i - x_j| по всем парам через отсортированный столбец - O(n log n)
+        ranks = 2 * np.arange(count) - count + 1
+        total = sum(weight * float(np.dot(np.sort(self.genes[name]), ranks))
+                    for name, weight in self.DISTANCE_WEIGHTS)
+        
+        # Специализации: |A △ B| / |A ∪ B| через матрицу пересечений блоками строк
+        vocabulary: Dict[str, int] = {}
+        cells = [(row, vocabulary.setdefault(spec, len(vocabulary)))
+                 for row, agent in enumerate(self.agents) for spec in set(agent.genes.specialization)]
+        membership = np.zeros((count, max(len(vocabulary), 1)))
+        if cells:
+            rows, columns = zip(*cells)
+            membership[list(rows), list(columns)] = 1.0
+        sizes = membership.sum(axis=1)
+        spec_total = 0.0
+        for start in range(0, count, chunk_size):
+            intersection = membership[start:start + chunk_size] @ membership.T
+            union = sizes[start:start + chunk_size, None] + sizes[None, :] - intersection
+            spec_total += float(((union - intersection) / np.maximum(union, 1.0)).sum())
+        # Каждая пара посчитана дважды, расстояние агента до себя - 0
+        total += self.SPECIALIZATION_WEIGHT * spec_total / 2
+        
+        return total / (count * (count - 1) / 2)
+
 # === ЧАСТЬ 3: ЭВОЛЮЦИОННАЯ ФАБРИКА ===
 
 class EvolutionaryAgentFactory:
-    """🧬 Эволюционная фабрика агентов - управление популяцией и эволюцией"""
+    """
+    🧬 Эволюционная фабрика агентов - управление популяцией и эволюцией
     
-    def __init__(self, storage_path: str = "./evolutionary_storage"):
+    Приспособленность кэшируется по агенту и сбрасывается только при
+    изменении его статистики. Если доступен numpy и активных агентов не
+    меньше vectorize_threshold, эволюция и статистика разнообразия считаются
+    над PopulationArrays. Популяция сохраняется атомарно: после
+    save_batch_size обновлений, не реже раза в save_interval секунд,
+    после эволюции или явным flush().
+    """
+    
+    def __init__(self, storage_path: str = "./evolutionary_storage", save_batch_size: int = 50,
+                 save_interval: float = 30.0, vectorize_threshold: int = 64):
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(exist_ok=True)
         
@@ -458,6 +650,13 @@ class EvolutionaryAgentFactory:
         self.max_population = 20
         self.min_population = 5
         self.retirement_age_days = 30
+        self.vectorize_threshold = vectorize_threshold
+        
+        # Кэш приспособленности: agent_id → fitness
+        self._fitness_cache: Dict[str, float] = {}
+        
+        # Отложенное сохранение
+        self._saver = BatchedSaver(self, "_save_population", save_batch_size, save_interval)
         
         # Загружаем существующую популяцию
         self._load_population()
@@ -490,7 +689,7 @@ class EvolutionaryAgentFactory:
             self._add_to_population(child_dna)
             self._record_evolution_event("birth", child_dna.agent_id, 
                                        parent_ids=child_dna.parent_ids,
-                                       fitness_after=self.genetics.calculate_fitness(child_dna))
+                                       fitness_after=self._fitness(child_dna))
             
             logger.info(f"🧬 Размножение: {parent1.agent_id} × {parent2.agent_id} → {child_dna.agent_id}")
             
@@ -502,7 +701,7 @@ class EvolutionaryAgentFactory:
             self._add_to_population(child_dna)
             self._record_evolution_event("birth", child_dna.agent_id,
                                        parent_ids=[parent.agent_id],
-                                       fitness_after=self.genetics.calculate_fitness(child_dna))
+                                       fitness_after=self._fitness(child_dna))
             
             logger.info(f"🔄 Мутационное размножение: {parent.agent_id} → {child_dna.agent_id}")
             
@@ -530,6 +729,7 @@ class EvolutionaryAgentFactory:
         
         # Обновляем статистику
         agent_dna.tasks_completed += 1
+        self._fitness_cache.pop(agent_id, None)
         
         # Обновляем общий success rate
         old_rate = agent_dna.total_success_rate
@@ -559,8 +759,12 @@ class EvolutionaryAgentFactory:
         
         logger.debug(f"📊 Агент {agent_id}: задач {agent_dna.tasks_completed}, успех {new_rate:.2f}")
         
-        # Сохраняем изменения
-        self._save_population()
+        # Сохраняем изменения пачкой
+        self._saver.record()
+    
+    def flush(self):
+        """💾 Сохранить накопленные изменения (если есть)"""
+        self._saver.flush()
     
     def evolve_population(self, force_evolution: bool = False):
         """🌱 Принудительная эволюция популяции"""
@@ -571,12 +775,18 @@ class EvolutionaryAgentFactory:
         
         logger.info("🧬 Запуск эволюции популяции...")
         
+        agents = list(self.active_agents.values())
+        fitness = self._population_fitness(agents)
+        
+        if NUMPY_AVAILABLE and len(agents) >= self.vectorize_threshold:
+            evolution_count = self._evolve_vectorized(agents, fitness)
+            logger.info(f"🧬 Эволюция завершена: {evolution_count} изменений")
+            self._save_population()
+            return
+        
         # Сортируем агентов по приспособленности
-        sorted_agents = sorted(
-            self.active_agents.values(),
-            key=lambda a: self.genetics.calculate_fitness(a),
-            reverse=True
-        )
+        order = sorted(range(len(agents)), key=fitness.__getitem__, reverse=True)
+        sorted_agents = [agents[i] for i in order]
         
         evolution_count = 0
         
@@ -613,7 +823,7 @@ class EvolutionaryAgentFactory:
         if not candidates:
             return None
         
-        best_agent = max(candidates, key=lambda a: self.genetics.calculate_fitness(a))
+        best_agent = max(candidates, key=self._fitness)
         return best_agent
     
     def get_population_stats(self) -> PopulationStats:
@@ -652,11 +862,7 @@ class EvolutionaryAgentFactory:
         
         # Генетическое разнообразие (упрощённый расчёт)
         if len(active_agents) > 1:
-            diversity_sum = 0
-            for i, agent1 in enumerate(active_agents):
-                for agent2 in active_agents[i+1:]:
-                    diversity_sum += self._calculate_genetic_distance(agent1, agent2)
-            stats.genetic_diversity = diversity_sum / (len(active_agents) * (len(active_agents) - 1) / 2)
+            stats.genetic_diversity = self._mean_genetic_distance(active_agents)
         
         # Эволюция
         stats.total_mutations = sum(a.mutations_count for a in all_agents)
@@ -664,10 +870,73 @@ class EvolutionaryAgentFactory:
         stats.evolution_events = len(self.evolution_history)
         
         # Здоровье популяции
-        stats.population_health = self._calculate_population_health(active_agents)
+        stats.population_health = self._calculate_population_health(
+            active_agents, diversity=stats.genetic_diversity if len(active_agents) > 1 else None
+        )
         
         return stats
     
+    # === ПРИСПОСОБЛЕННОСТЬ И ВЕКТОРНАЯ ЭВОЛЮЦИЯ ===
+    
+    def _fitness(self, agent_dna: AgentDNA) -> float:
+        """⚡ Приспособленность из кэша (считается один раз до изменения статистики агента)"""
+        fitness = self._fitness_cache.get(agent_dna.agent_id)
+        if fitness is None:
+            fitness = self.genetics.calculate_fitness(agent_dna)
+            self._fitness_cache[agent_dna.agent_id] = fitness
+        return fitness
+    
+    def _population_fitness(self, agents: List[AgentDNA]) -> List[float]:
+        """⚡ Приспособленность списка агентов; промахи кэша считаются одним векторным проходом"""
+        missing = [a for a in agents if a.agent_id not in self._fitness_cache]
+        if NUMPY_AVAILABLE and len(missing) >= self.vectorize_threshold:
+            for agent, fitness in zip(missing, PopulationArrays(missing).fitness().tolist()):
+                self._fitness_cache[agent.agent_id] = fitness
+        return [self._fitness(a) for a in agents]
+    
+    def _evolve_vectorized(self, agents: List[AgentDNA], fitness: List[float]) -> int:
+        """🧬 Шаг эволюции над PopulationArrays: те же доли и вероятности, что в evolve_population"""
+        count = len(agents)
+        if count == 0:
+            return 0
+        arrays = PopulationArrays(agents)
+        rng = self.genetics.np_random
+        order = np.argsort(-np.asarray(fitness), kind="stable")
+        # Доли как в evolve_population: худшая треть (не меньше одного), лучшая половина (не меньше двух)
+        worst = order[count - max(1, -(-count // 3)):]
+        best = order[:count // 2 if count >= 4 else 2]
+        
+        # Мутируем худших: 40% шанс, дальше решает сопротивление мутациям
+        candidates = worst[rng.random(len(worst)) < 0.4]
+        mutated_rows, mutants = self.genetics.mutate_population(arrays, candidates, mutation_strength=1.2)
+        for row, mutant in zip(mutated_rows, mutants):
+            self._replace_agent(agents[row].agent_id, mutant)
+        
+        # Скрещиваем соседние пары лучших: 30% шанс, потомок заменяет ещё активного худшего
+        pairs = np.arange(0, len(best) - 1, 2)
+        pairs = pairs[rng.random(len(pairs)) < 0.3]
+        children = self.genetics.crossover_population(arrays, best[pairs], best[pairs + 1])
+        targets = (agents[row].agent_id for row in worst if agents[row].agent_id in self.active_agents)
+        replaced = 0
+        for child, target_id in zip(children, targets):
+            self._replace_agent(target_id, child)
+            replaced += 1
+        
+        logger.info(f"🧬 Векторная эволюция: {len(mutants)} мутаций, {replaced} скрещиваний "
+                    f"(популяция {len(agents)})")
+        return len(mutants) + replaced
+    
+    def _mean_genetic_distance(self, agents: List[AgentDNA]) -> float:
+        """🧬 Среднее попарное генетическое расстояние"""
+        if NUMPY_AVAILABLE:
+            return PopulationArrays(agents).mean_genetic_distance()
+        
+        diversity_sum = 0.0
+        for i, agent1 in enumerate(agents):
+            for agent2 in agents[i+1:]:
+                diversity_sum += self._calculate_genetic_distance(agent1, agent2)
+        return diversity_sum / (len(agents) * (len(agents) - 1) / 2)
+    
     # === ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ ===
     
     def _select_breeding_candidates(self, agent_type: str) -> List[AgentDNA]:
@@ -678,16 +947,16 @@ class EvolutionaryAgentFactory:
         if agent_type != "general":
             candidates = [a for a in candidates if a.genes.agent_type == agent_type or agent_type in a.genes.specialization]
         
-        # Сортируем по приспособленности
-        candidates.sort(key=lambda a: self.genetics.calculate_fitness(a), reverse=True)
-        
-        # Возвращаем лучших (максимум 3)
-        return candidates[:3]
+        # Возвращаем лучших по приспособленности (максимум 3)
+        self._population_fitness(candidates)
+        return heapq.nlargest(3, candidates, key=self._fitness)
     
     def _add_to_population(self, agent_dna: AgentDNA):
         """➕ Добавить агента в популяцию"""
         self.population[agent_dna.agent_id] = agent_dna
         self.active_agents[agent_dna.agent_id] = agent_dna
+        self._fitness_cache.pop(agent_dna.agent_id, None)
+        self._saver.mark_dirty()
     
     def _replace_agent(self, old_agent_id: str, new_agent_dna: AgentDNA):
         """🔄 Заменить агента в популяции"""
@@ -695,6 +964,7 @@ class EvolutionaryAgentFactory:
             # Переводим старого в отставку
             old_agent = self.active_agents.pop(old_agent_id)
             self.retired_agents[old_agent_id] = old_agent
+            self._fitness_cache.pop(old_agent_id, None)
             
             # Добавляем нового
             self._add_to_population(new_agent_dna)
@@ -708,10 +978,9 @@ class EvolutionaryAgentFactory:
         if len(self.active_agents) > self.max_population:
             # Удаляем худших агентов
             excess = len(self.active_agents) - self.max_population
-            sorted_agents = sorted(
-                self.active_agents.values(),
-                key=lambda a: self.genetics.calculate_fitness(a)
-            )
+            agents = list(self.active_agents.values())
+            self._population_fitness(agents)
+            sorted_agents = sorted(agents, key=self._fitness)
             
             for agent in sorted_agents[:excess]:
                 self._retire_agent(agent.agent_id, "population_limit")
@@ -732,6 +1001,8 @@ class EvolutionaryAgentFactory:
             agent = self.active_agents.pop(agent_id)
             agent.life_span = datetime.now() - agent.birth_time
             self.retired_agents[agent_id] = agent
+            self._fitness_cache.pop(agent_id, None)
+            self._saver.mark_dirty()
             
             self._record_evolution_event("retirement", agent_id, selection_reason=reason)
             logger.info(f"🏖️ Агент {agent_id} отправлен в отставку: {reason}")
@@ -768,23 +1039,20 @@ class EvolutionaryAgentFactory:
         
         return distance
     
-    def _calculate_population_health(self, agents: List[AgentDNA]) -> float:
-        """💪 Расчёт здоровья популяции"""
+    def _calculate_population_health(self, agents: List[AgentDNA], diversity: Optional[float] = None) -> float:
+        """💪 Расчёт здоровья популяции (diversity - уже посчитанное разнообразие)"""
         if not agents:
             return 0.0
         
         # Средняя приспособленность
-        avg_fitness = sum(self.genetics.calculate_fitness(a) for a in agents) / len(agents)
+        avg_fitness = sum(self._population_fitness(agents)) / len(agents)
         
         # Генетическое разнообразие
-        if len(agents) > 1:
-            diversity = 0.0
-            for i, agent1 in enumerate(agents):
-                for agent2 in agents[i+1:]:
-                    diversity += self._calculate_genetic_distance(agent1, agent2)
-            diversity = diversity / (len(agents) * (len(agents) - 1) / 2)
-        else:
-            diversity = 0.5  # Средняя оценка для одного агента
+        if diversity is None:
+            if len(agents) > 1:
+                diversity = self._mean_genetic_distance(agents)
+            else:
+                diversity = 0.5  # Средняя оценка для одного агента
         
         # Возрастное распределение
         ages = [(datetime.now() - a.birth_time).days for a in agents]
@@ -796,7 +1064,7 @@ class EvolutionaryAgentFactory:
         return max(0.0, min(1.0, health))
     
     def _save_population(self):
-        """💾 Сохранить популяцию на диск"""
+        """💾 Сохранить популяцию на диск (атомарно: временный файл + os.replace)"""
         try:
             population_file = self.storage_path / "population.json"
             history_file = self.storage_path / "evolution_history.json"
@@ -812,14 +1080,13 @@ class EvolutionaryAgentFactory:
                 }
             }
             
-            with open(population_file, 'w', encoding='utf-8') as f:
-                json.dump(population_data, f, indent=2, default=str)
+            write_json_atomic(population_file, population_data, indent=2, default=str)
             
             # Сохраняем историю эволюции
             history_data = [asdict(event) for event in self.evolution_history[-100:]]  # Последние 100 событий
-            with open(history_file, 'w', encoding='utf-8') as f:
-                json.dump(history_data, f, indent=2, default=str)
-                
+            write_json_atomic(history_file, history_data, indent=2, default=str)
+            
+            self._saver.mark_saved()
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения популяции: {e}")
     
@@ -253,7 +253,7 @@ class IterativeImprovement:
 JSON:"""
         
         try:
-            response = self.llm_provider.complete(feedback_prompt)
+            response = await asyncio.to_thread(self.llm_provider.complete, feedback_prompt)
             logger.debug(f"🔍 LLM ответ для фидбека: {response[:200]}...")
             
             feedback_data = self._parse_feedback_response(response)
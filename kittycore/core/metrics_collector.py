@@ -13,9 +13,15 @@
 """
 
 import asyncio
+import atexit
 import json
+import queue
+import re
 import sqlite3
-from dataclasses import dataclass, asdict
+import threading
+import time
+import weakref
+from dataclasses import dataclass, asdict, fields
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Union, Tuple
 from pathlib import Path
@@ -23,6 +29,7 @@ import statistics
 from collections import defaultdict, deque
 
 from loguru import logger
+from .metrics_registry import METRICS_DROPPED_WRITES
 from .obsidian_db import ObsidianDB, ObsidianNote
 
 
@@ -139,18 +146,238 @@ class SystemMetrics:
         return data
 
 
+def _insert_sql(table: str, columns: List[str], replace: bool = False) -> str:
+    verb = "INSERT OR REPLACE" if replace else "INSERT"
+    return f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+
+TASK_COLUMNS = [f.name for f in fields(TaskMetrics)]
+AGENT_COLUMNS = [f.name for f in fields(AgentMetrics)]
+SYSTEM_COLUMNS = [f.name for f in fields(SystemMetrics)]
+
+TASK_INSERT_SQL = _insert_sql("task_metrics", TASK_COLUMNS, replace=True)
+AGENT_INSERT_SQL = _insert_sql("agent_metrics", AGENT_COLUMNS)
+SYSTEM_INSERT_SQL = _insert_sql("system_metrics", SYSTEM_COLUMNS)
+
+# Агрегаты (rollups) поддерживаются триггерами SQLite при каждой вставке/удалении.
+# Гранулярность: имя -> длина префикса ISO-метки времени
+ROLLUP_BUCKETS = {"minute": 16, "hour": 13, "day": 10}
+ROLLUP_STEPS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# Вклад строки R в суммируемые колонки агрегата задач
+_COMPLETED = "(R.end_time IS NOT NULL AND R.end_time != '')"
+_TIMED = f"({_COMPLETED} AND COALESCE(R.duration_seconds, 0) != 0)"
+_NUMERIC_COMPLEXITY = "(typeof(R.complexity_score) IN ('integer', 'real') AND R.complexity_score != 0)"
+TASK_ROLLUP_SUMS = [
+    ("task_count", "1"),
+    ("completed_count", _COMPLETED),
+    ("failed_count", "(R.end_time IS NULL OR R.end_time = '' OR COALESCE(R.agents_failed, 0) > 0)"),
+    ("agent_failure_count", "(COALESCE(R.agents_failed, 0) > 0)"),
+    ("rework_count", "(COALESCE(R.rework_required, 0) != 0)"),
+    ("low_quality_count", "(COALESCE(R.quality_score, 0) < 0.5)"),
+    ("duration_count", _TIMED),
+    ("duration_sum", f"(CASE WHEN {_TIMED} THEN R.duration_seconds ELSE 0 END)"),
+    ("quality_count", "(COALESCE(R.quality_score, 0) > 0)"),
+    ("quality_sum", "(CASE WHEN R.quality_score > 0 THEN R.quality_score ELSE 0 END)"),
+    ("complexity_count", _NUMERIC_COMPLEXITY),
+    ("complexity_sum", f"(CASE WHEN {_NUMERIC_COMPLEXITY} THEN R.complexity_score ELSE 0 END)"),
+    ("simple_count", f"({_NUMERIC_COMPLEXITY} AND R.complexity_score < 0.3)"),
+    ("medium_count", f"({_NUMERIC_COMPLEXITY} AND R.complexity_score >= 0.3 AND R.complexity_score < 0.7)"),
+    ("complex_count", f"({_NUMERIC_COMPLEXITY} AND R.complexity_score >= 0.7)"),
+    ("llm_tokens_sum", "COALESCE(R.llm_tokens_used, 0)"),
+]
+# Экстремумы: при удалении строки не пересчитываются
+TASK_ROLLUP_EXTREMES = [
+    ("duration_min", "MIN", f"(CASE WHEN {_TIMED} THEN R.duration_seconds END)"),
+    ("duration_max", "MAX", f"(CASE WHEN {_TIMED} THEN R.duration_seconds END)"),
+    ("quality_min", "MIN", "(CASE WHEN R.quality_score > 0 THEN R.quality_score END)"),
+    ("quality_max", "MAX", "(CASE WHEN R.quality_score > 0 THEN R.quality_score END)"),
+]
+AGENT_ROLLUP_SUMS = [
+    ("agent_count", "1"),
+    # Статус может быть NULL: сравнение дало бы NULL в столбце NOT NULL
+    ("completed_count", "COALESCE(R.status = 'completed', 0)"),
+    ("failed_count", "COALESCE(R.status IN ('failed', 'timeout'), 0)"),
+    ("duration_count", "(R.duration_seconds IS NOT NULL)"),
+    ("duration_sum", "COALESCE(R.duration_seconds, 0)"),
+    ("error_sum", "COALESCE(R.error_count, 0)"),
+    ("retry_sum", "COALESCE(R.retry_count, 0)"),
+    ("quality_sum", "COALESCE(R.output_quality, 0)"),
+]
+AGENT_ROLLUP_EXTREMES = [
+    ("duration_max", "MAX", "R.duration_seconds"),
+]
+
+
+@dataclass(frozen=True)
+class RollupSpec:
+    """Описание таблицы агрегатов над таблицей сырых метрик"""
+    table: str
+    source: str
+    group_column: str
+    time_column: str
+    sums: List[Tuple[str, str]]
+    extremes: List[Tuple[str, str, str]]
+
+    @property
+    def columns(self) -> List[str]:
+        return [name for name, _ in self.sums] + [name for name, _, _ in self.extremes]
+
+    def create_table_sql(self) -> str:
+        columns = [f"{name} REAL NOT NULL DEFAULT 0" for name, _ in self.sums]
+        columns += [f"{name} REAL" for name, _, _ in self.extremes]
+        return f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                bucket_size TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                {self.group_column} TEXT NOT NULL,
+                {', '.join(columns)},
+                PRIMARY KEY (bucket_size, bucket_start, {self.group_column})
+            ) WITHOUT ROWID
+        """
+
+    def _upsert_sql(self, bucket: str, row: str, sign: int) -> str:
+        def bind(expression: str) -> str:
+            return re.sub(r"\bR\.", f"{row}.", expression)
+
+        length = ROLLUP_BUCKETS[bucket]
+        names = ["bucket_size", "bucket_start", self.group_column] + [name for name, _ in self.sums]
+        values = [f"'{bucket}'", f"substr({row}.{self.time_column}, 1, {length})",
+                  f"COALESCE({row}.{self.group_column}, '')"]
+        values += [f"{sign} * {bind(expression)}" for _, expression in self.sums]
+        updates = [f"{name} = {name} + excluded.{name}" for name, _ in self.sums]
+        if sign > 0:
+            names += [name for name, _, _ in self.extremes]
+            values += [bind(expression) for _, _, expression in self.extremes]
+            updates += [
+                f"{name} = CASE WHEN excluded.{name} IS NULL THEN {name} "
+                f"WHEN {name} IS NULL THEN excluded.{name} "
+                f"ELSE {func}({name}, excluded.{name}) END"
+                for name, func, _ in self.extremes
+            ]
+        return (
+            f"INSERT INTO {self.table} ({', '.join(names)}) VALUES ({', '.join(values)}) "
+            f"ON CONFLICT(bucket_size, bucket_start, {self.group_column}) DO UPDATE SET {', '.join(updates)};"
+        )
+
+    def trigger_sql(self) -> List[str]:
+        """Триггеры инкрементального обновления (удаление при INSERT OR REPLACE - с recursive_triggers)"""
+        statements = []
+        for event, row, sign in (("INSERT", "NEW", 1), ("DELETE", "OLD", -1)):
+            body = " ".join(self._upsert_sql(bucket, row, sign) for bucket in ROLLUP_BUCKETS)
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{self.table}_{event.lower()} "
+                f"AFTER {event} ON {self.source} BEGIN {body} END"
+            )
+        return statements
+
+    def rebuild_sql(self) -> List[str]:
+        """Пересчёт агрегатов по сырым данным"""
+        statements = [f"DELETE FROM {self.table}"]
+        for bucket, length in ROLLUP_BUCKETS.items():
+            select = [f"'{bucket}'", f"substr(R.{self.time_column}, 1, {length})",
+                      f"COALESCE(R.{self.group_column}, '')"]
+            select += [f"SUM({expression})" for _, expression in self.sums]
+            select += [f"{func}({expression})" for _, func, expression in self.extremes]
+            statements.append(
+                f"INSERT INTO {self.table} (bucket_size, bucket_start, {self.group_column}, {', '.join(self.columns)}) "
+                f"SELECT {', '.join(select)} FROM {self.source} R "
+                f"WHERE R.{self.time_column} IS NOT NULL GROUP BY 2, 3"
+            )
+        return statements
+
+    def totals_sql(self) -> str:
+        select = [f"COALESCE(SUM({name}), 0) AS {name}" for name, _ in self.sums]
+        select += [f"{func}({name}) AS {name}" for name, func, _ in self.extremes]
+        return ", ".join(select)
+
+
+TASK_ROLLUP = RollupSpec("task_rollups", "task_metrics", "task_type", "start_time",
+                         TASK_ROLLUP_SUMS, TASK_ROLLUP_EXTREMES)
+AGENT_ROLLUP = RollupSpec("agent_rollups", "agent_metrics", "agent_type", "start_time",
+                          AGENT_ROLLUP_SUMS, AGENT_ROLLUP_EXTREMES)
+
+
+def _bucket_floor(moment: datetime, bucket: str) -> datetime:
+    """Начало интервала агрегатов, содержащего moment"""
+    moment = moment.replace(second=0, microsecond=0)
+    if bucket in ("hour", "day"):
+        moment = moment.replace(minute=0)
+    if bucket == "day":
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def rollup_bucket_for(hours: float) -> str:
+    """Гранулярность агрегатов для окна: не больше ~1500 интервалов на тип"""
+    if hours <= 24:
+        return "minute"
+    if hours <= 24 * 62:
+        return "hour"
+    return "day"
+
+
+# Условия значений, по которым считается медиана (совпадают с частичными индексами)
+MEDIAN_CONDITIONS = {
+    "duration_seconds": "end_time IS NOT NULL AND end_time != '' AND duration_seconds != 0",
+    "quality_score": "quality_score > 0",
+}
+
+
+def _dict_factory(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def _close_storage_at_exit(storage_ref: "weakref.ref[MetricsStorage]"):
+    storage = storage_ref()
+    if storage is not None:
+        storage.close()
+
+
 class MetricsStorage:
-    """Хранилище метрик в SQLite"""
+    """
+    Хранилище метрик в SQLite
+    
+    Одно долгоживущее соединение в режиме WAL. Записи ставятся в очередь
+    и сбрасываются фоновым потоком пачками (одна транзакция на пачку), поэтому
+    сохранение метрик не блокирует выполнение задач. Чтение сначала дожидается
+    записи уже поставленных в очередь метрик.
+    """
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, batch_size: int = 200, flush_interval: float = 0.5,
+                 background_writes: bool = True):
         self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.background_writes = background_writes
+        
+        self._lock = threading.RLock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending = 0
+        self.dropped_writes = 0  # записи, отброшенные из-за ошибки SQLite
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+        self._conn = self._connect()
         self._init_database()
+        
+        if background_writes:
+            self._writer = threading.Thread(target=self._writer_loop, name="metrics-writer", daemon=True)
+            self._writer.start()
+            atexit.register(_close_storage_at_exit, weakref.ref(self))
+    
+    def _connect(self) -> sqlite3.Connection:
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.row_factory = _dict_factory
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Удаление строки при INSERT OR REPLACE должно вызывать триггеры агрегатов
+        conn.execute("PRAGMA recursive_triggers=ON")
+        return conn
     
     def _init_database(self):
         """Инициализация базы данных метрик"""
-        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        
-        with sqlite3.connect(self.db_path) as conn:
+        with self._lock, self._conn as conn:
             # Таблица метрик задач
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS task_metrics (
@@ -218,204 +445,490 @@ class MetricsStorage:
                 )
             """)
             
-            conn.commit()
+            # Индексы для выборок по времени и по задаче/агенту
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_task_metrics_start_time ON task_metrics(start_time)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_task_metrics_type ON task_metrics(task_type, start_time)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_metrics_start_time ON agent_metrics(start_time)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_metrics_task ON agent_metrics(task_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_metrics_agent ON agent_metrics(agent_id, start_time)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_system_metrics_timestamp ON system_metrics(timestamp)")
+            # Медианы: значения в порядке возрастания без обращения к таблице
+            for column, condition in MEDIAN_CONDITIONS.items():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_task_metrics_{column} "
+                             f"ON task_metrics({column}, start_time, task_type) WHERE {condition}")
+            
+            # Агрегаты по минутам/часам/дням, поддерживаемые триггерами
+            for spec in (TASK_ROLLUP, AGENT_ROLLUP):
+                conn.execute(spec.create_table_sql())
+                for statement in spec.trigger_sql():
+                    conn.execute(statement)
+                # База из прошлой версии: агрегаты пусты, а сырые данные есть
+                has_rollups = conn.execute(f"SELECT 1 FROM {spec.table} LIMIT 1").fetchone()
+                has_rows = conn.execute(f"SELECT 1 FROM {spec.source} LIMIT 1").fetchone()
+                if has_rows and not has_rollups:
+                    for statement in spec.rebuild_sql():
+                        conn.execute(statement)
         
         logger.info(f"📊 База данных метрик инициализирована: {self.db_path}")
     
+    # ---------- запись ----------
+    
+    def _enqueue(self, sql: str, params: tuple):
+        if self._closed:
+            raise RuntimeError("Хранилище метрик закрыто")
+        if not self.background_writes:
+            self._write_batch([(sql, params)])
+            return
+        with self._lock:
+            self._pending += 1
+        self._queue.put((sql, params))
+    
+    def _write_batch(self, batch: List[Tuple[str, tuple]]):
+        """
+        Запись пачки в одной транзакции (подряд идущие одинаковые запросы - через executemany)
+        
+        Если транзакция откатилась, записи повторяются по одной: теряются только
+        ошибочные строки, их число копится в dropped_writes.
+        """
+        with self._lock:
+            try:
+                with self._conn as conn:
+                    start = 0
+                    while start < len(batch):
+                        sql = batch[start][0]
+                        end = start
+                        while end < len(batch) and batch[end][0] == sql:
+                            end += 1
+                        conn.executemany(sql, [params for _, params in batch[start:end]])
+                        start = end
+                return
+            except sqlite3.Error as e:
+                if len(batch) > 1:
+                    logger.warning(f"⚠️ Ошибка записи пачки метрик ({len(batch)} записей): {e} - запись по одной")
+            
+            dropped = 0
+            for sql, params in batch:
+                try:
+                    with self._conn as conn:
+                        conn.execute(sql, params)
+                except sqlite3.Error as e:
+                    dropped += 1
+                    logger.error(f"❌ Запись метрики отброшена: {e}")
+            if dropped:
+                self.dropped_writes += dropped
+                METRICS_DROPPED_WRITES.inc(dropped)
+                logger.error(f"❌ Отброшено записей метрик: {dropped} из {len(batch)}")
+    
+    def _writer_loop(self):
+        """Фоновый поток: собирает записи из очереди в пачки"""
+        while True:
+            item = self._queue.get()
+            batch, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                # flush() не ждёт окончания интервала накопления
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            
+            if batch:
+                self._write_batch(batch)
+                with self._lock:
+                    self._pending -= len(batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+    
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Дождаться записи всех метрик, поставленных в очередь"""
+        if self._writer is None or not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def _sync_pending(self):
+        if self._pending:
+            self.flush()
+    
+    def close(self):
+        """Сбросить очередь и закрыть соединение"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+        with self._lock:
+            self._conn.close()
+    
     def store_task_metrics(self, metrics: TaskMetrics):
         """Сохранить метрики задачи"""
-        with sqlite3.connect(self.db_path) as conn:
-            data = metrics.to_dict()
-            placeholders = ', '.join(['?' for _ in data])
-            columns = ', '.join(data.keys())
-            
-            conn.execute(
-                f"INSERT OR REPLACE INTO task_metrics ({columns}) VALUES ({placeholders})",
-                list(data.values())
-            )
-            conn.commit()
+        data = metrics.to_dict()
+        self._enqueue(TASK_INSERT_SQL, tuple(data[column] for column in TASK_COLUMNS))
     
     def store_agent_metrics(self, metrics: AgentMetrics):
         """Сохранить метрики агента"""
-        with sqlite3.connect(self.db_path) as conn:
-            data = metrics.to_dict()
-            data['tools_used'] = json.dumps(data['tools_used'])
-            
-            placeholders = ', '.join(['?' for _ in data if _ != 'id'])
-            columns = ', '.join([k for k in data.keys() if k != 'id'])
-            
-            conn.execute(
-                f"INSERT INTO agent_metrics ({columns}) VALUES ({placeholders})",
-                [v for k, v in data.items() if k != 'id']
-            )
-            conn.commit()
+        data = metrics.to_dict()
+        data['tools_used'] = json.dumps(data['tools_used'])
+        self._enqueue(AGENT_INSERT_SQL, tuple(data[column] for column in AGENT_COLUMNS))
     
     def store_system_metrics(self, metrics: SystemMetrics):
         """Сохранить системные метрики"""
-        with sqlite3.connect(self.db_path) as conn:
-            data = metrics.to_dict()
-            placeholders = ', '.join(['?' for _ in data if _ != 'id'])
-            columns = ', '.join([k for k in data.keys() if k != 'id'])
-            
-            conn.execute(
-                f"INSERT INTO system_metrics ({columns}) VALUES ({placeholders})",
-                [v for k, v in data.items() if k != 'id']
-            )
-            conn.commit()
+        data = metrics.to_dict()
+        self._enqueue(SYSTEM_INSERT_SQL, tuple(data[column] for column in SYSTEM_COLUMNS))
+    
+    # ---------- чтение ----------
+    
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        self._sync_pending()
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
     
     def get_task_metrics(self, task_id: str) -> Optional[TaskMetrics]:
         """Получить метрики задачи"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                "SELECT * FROM task_metrics WHERE task_id = ?",
-                (task_id,)
-            )
-            row = cursor.fetchone()
-            
-            if row:
-                data = dict(row)
-                data.pop('created_at', None)
-                return TaskMetrics.from_dict(data)
-            return None
+        rows = self._query(
+            f"SELECT {', '.join(TASK_COLUMNS)} FROM task_metrics WHERE task_id = ?",
+            (task_id,)
+        )
+        return TaskMetrics.from_dict(rows[0]) if rows else None
     
-    def get_recent_metrics(self, hours: int = 24) -> Dict[str, Any]:
-        """Получить метрики за последние часы"""
-        since = datetime.now() - timedelta(hours=hours)
+    def get_recent_metrics(self, hours: int = 24, task_type: Optional[str] = None,
+                           task_id: Optional[str] = None, limit: Optional[int] = None,
+                           include: Tuple[str, ...] = ("tasks", "agents", "system")) -> Dict[str, Any]:
+        """
+        Получить метрики за последние часы
         
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            
-            # Метрики задач
-            task_cursor = conn.execute(
-                "SELECT * FROM task_metrics WHERE start_time >= ? ORDER BY start_time DESC",
-                (since.isoformat(),)
+        Фильтрация (период, тип задачи, задача) и ограничение числа строк
+        выполняются в SQL по индексам; include задаёт, какие таблицы читать.
+        """
+        since = (datetime.now() - timedelta(hours=hours)).isoformat()
+        limit_sql = " LIMIT ?" if limit else ""
+        limit_params = (limit,) if limit else ()
+        result = {'tasks': [], 'agents': [], 'system': []}
+        
+        # Метрики задач
+        if "tasks" in include:
+            conditions, params = ["start_time >= ?"], [since]
+            if task_type:
+                conditions.append("task_type = ?")
+                params.append(task_type)
+            if task_id:
+                conditions.append("task_id = ?")
+                params.append(task_id)
+            result['tasks'] = self._query(
+                f"SELECT * FROM task_metrics WHERE {' AND '.join(conditions)} ORDER BY start_time DESC{limit_sql}",
+                tuple(params) + limit_params
             )
-            tasks = [dict(row) for row in task_cursor.fetchall()]
-            
-            # Метрики агентов
-            agent_cursor = conn.execute(
-                "SELECT * FROM agent_metrics WHERE start_time >= ? ORDER BY start_time DESC",
-                (since.isoformat(),)
+        
+        # Метрики агентов
+        if "agents" in include:
+            conditions, params = ["start_time >= ?"], [since]
+            if task_id:
+                conditions.append("task_id = ?")
+                params.append(task_id)
+            result['agents'] = self._query(
+                f"SELECT * FROM agent_metrics WHERE {' AND '.join(conditions)} ORDER BY start_time DESC{limit_sql}",
+                tuple(params) + limit_params
             )
-            agents = [dict(row) for row in agent_cursor.fetchall()]
-            
-            # Системные метрики
-            system_cursor = conn.execute(
-                "SELECT * FROM system_metrics WHERE timestamp >= ? ORDER BY timestamp DESC",
-                (since.isoformat(),)
+        
+        # Системные метрики
+        if "system" in include:
+            result['system'] = self._query(
+                f"SELECT * FROM system_metrics WHERE timestamp >= ? ORDER BY timestamp DESC{limit_sql}",
+                (since,) + limit_params
             )
-            system = [dict(row) for row in system_cursor.fetchall()]
-            
-            return {
-                'tasks': tasks,
-                'agents': agents,
-                'system': system,
-                'period_hours': hours,
-                'retrieved_at': datetime.now().isoformat()
-            }
+        
+        return {
+            **result,
+            'period_hours': hours,
+            'retrieved_at': datetime.now().isoformat()
+        }
+    
+    # ---------- агрегаты ----------
+    
+    def rebuild_rollups(self):
+        """Пересчитать агрегаты по сырым данным"""
+        self._sync_pending()
+        with self._lock, self._conn as conn:
+            for spec in (TASK_ROLLUP, AGENT_ROLLUP):
+                for statement in spec.rebuild_sql():
+                    conn.execute(statement)
+    
+    def _rollup_query(self, spec: RollupSpec, hours: float, group: Optional[str],
+                      bucket: Optional[str], by_group: bool, by_bucket: bool) -> List[Dict[str, Any]]:
+        """
+        Итоги окна: полные интервалы читаются из агрегатов, а неполный
+        начальный интервал добирается из сырых строк по индексу start_time
+        """
+        bucket = bucket or rollup_bucket_for(hours)
+        if bucket not in ROLLUP_BUCKETS:
+            raise ValueError(f"Неизвестная гранулярность: {bucket}")
+        length = ROLLUP_BUCKETS[bucket]
+        since = datetime.now() - timedelta(hours=hours)
+        head_end = (_bucket_floor(since, bucket) + ROLLUP_STEPS[bucket]).isoformat()[:length]
+        
+        rollup_where, rollup_params = ["bucket_size = ?", "bucket_start >= ?"], [bucket, head_end]
+        raw_where, raw_params = ["R.start_time >= ?", "R.start_time < ?"], [since.isoformat(), head_end]
+        if group is not None:
+            rollup_where.append(f"{spec.group_column} = ?")
+            rollup_params.append(group)
+            raw_where.append(f"R.{spec.group_column} = ?")
+            raw_params.append(group)
+        
+        raw_select = [f"substr(R.{spec.time_column}, 1, {length}) AS bucket_start",
+                      f"COALESCE(R.{spec.group_column}, '') AS {spec.group_column}"]
+        raw_select += [f"{expression} AS {name}" for name, expression in spec.sums]
+        raw_select += [f"{expression} AS {name}" for name, _, expression in spec.extremes]
+        
+        keys = (["bucket_start"] if by_bucket else []) + ([spec.group_column] if by_group else [])
+        group_sql = f" GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}" if keys else ""
+        sql = f"""
+            SELECT {', '.join(keys + [spec.totals_sql()])} FROM (
+                SELECT bucket_start, {spec.group_column}, {', '.join(spec.columns)}
+                FROM {spec.table} WHERE {' AND '.join(rollup_where)}
+                UNION ALL
+                SELECT {', '.join(raw_select)} FROM {spec.source} R WHERE {' AND '.join(raw_where)}
+            ){group_sql}
+        """
+        return self._query(sql, tuple(rollup_params + raw_params))
+    
+    def get_task_rollup(self, hours: float = 24, task_type: Optional[str] = None,
+                        by_type: bool = False) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Итоги по задачам за окно из агрегатов
+        
+        by_type=True - отдельная строка на тип задачи.
+        """
+        rows = self._rollup_query(TASK_ROLLUP, hours, task_type, None, by_type, False)
+        return rows if by_type else rows[0]
+    
+    def get_agent_rollup(self, hours: float = 24, agent_type: Optional[str] = None,
+                         by_type: bool = False) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """Итоги по агентам за окно из агрегатов"""
+        rows = self._rollup_query(AGENT_ROLLUP, hours, agent_type, None, by_type, False)
+        return rows if by_type else rows[0]
+    
+    def get_task_timeseries(self, hours: float = 24, bucket: Optional[str] = None,
+                            task_type: Optional[str] = None, by_type: bool = False) -> List[Dict[str, Any]]:
+        """Временной ряд итогов по задачам (для дашбордов)"""
+        return self._rollup_query(TASK_ROLLUP, hours, task_type, bucket, by_type, True)
+    
+    def get_task_median(self, column: str, hours: float = 24, task_type: Optional[str] = None,
+                        count: Optional[int] = None) -> float:
+        """
+        Медиана duration_seconds / quality_score по окну, вычисленная в SQL
+        
+        Значения читаются из частичного индекса в порядке возрастания, поэтому
+        сортировки нет; count (число значений в окне, например из агрегатов)
+        избавляет от отдельного подсчёта.
+        """
+        if column not in MEDIAN_CONDITIONS:
+            raise ValueError(f"Медиана не поддерживается для колонки {column}")
+        since = (datetime.now() - timedelta(hours=hours)).isoformat()
+        where, params = f"{MEDIAN_CONDITIONS[column]} AND start_time >= ?", [since]
+        if task_type:
+            where += " AND task_type = ?"
+            params.append(task_type)
+        if count is None:
+            count = self._query(f"SELECT COUNT(*) AS n FROM task_metrics WHERE {where}", tuple(params))[0]["n"]
+        if not count:
+            return 0
+        rows = self._query(f"""
+            SELECT AVG(value) AS median FROM (
+                SELECT {column} AS value FROM task_metrics WHERE {where}
+                ORDER BY {column} LIMIT ? OFFSET ?
+            )
+        """, tuple(params) + (2 - count % 2, (count - 1) // 2))
+        return rows[0]["median"] or 0
+    
+    def get_edge_tasks(self, hours: float = 24, task_type: Optional[str] = None, count: int = 5,
+                       newest: bool = True, columns: Tuple[str, ...] = ("quality_score", "duration_seconds"),
+                       condition: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Первые или последние count задач окна (по индексу start_time), только нужные колонки"""
+        unknown = set(columns) - set(TASK_COLUMNS)
+        if unknown:
+            raise ValueError(f"Неизвестные колонки: {unknown}")
+        since = (datetime.now() - timedelta(hours=hours)).isoformat()
+        where, params = ["start_time >= ?"], [since]
+        if task_type:
+            where.append("task_type = ?")
+            params.append(task_type)
+        if condition:
+            where.append(condition)
+        order = "DESC" if newest else "ASC"
+        return self._query(
+            f"SELECT {', '.join(columns)} FROM task_metrics WHERE {' AND '.join(where)} "
+            f"ORDER BY start_time {order} LIMIT ?",
+            tuple(params) + (count,)
+        )
 
 
 class MetricsAnalyzer:
-    """Анализатор метрик и трендов"""
+    """
+    Анализатор метрик и трендов
+    
+    Счётчики, суммы и экстремумы читаются из агрегатов MetricsStorage,
+    медианы и тренды - точечными SQL-запросами по индексу start_time,
+    поэтому стоимость анализа не растёт с числом строк в окне.
+    """
     
     def __init__(self, storage: MetricsStorage):
         self.storage = storage
     
-    def analyze_task_performance(self, hours: int = 24) -> Dict[str, Any]:
-        """Анализ производительности задач"""
-        metrics = self.storage.get_recent_metrics(hours)
-        tasks = metrics['tasks']
+    def analyze_task_performance(self, hours: int = 24, task_type: Optional[str] = None,
+                                 include_medians: bool = True) -> Dict[str, Any]:
+        """
+        Анализ производительности задач
         
-        if not tasks:
+        include_medians=False - только агрегаты, без запросов по сырым строкам
+        (медианы в ответе равны None).
+        """
+        totals = self.storage.get_task_rollup(hours, task_type)
+        total_tasks = int(totals['task_count'])
+        
+        if not total_tasks:
             return {'error': 'Нет данных за указанный период'}
         
-        # Базовая статистика
-        completed_tasks = [t for t in tasks if t['end_time']]
-        durations = [t['duration_seconds'] for t in completed_tasks if t['duration_seconds']]
-        quality_scores = [t['quality_score'] for t in tasks if t['quality_score'] > 0]
+        durations = int(totals['duration_count'])
+        qualities = int(totals['quality_count'])
+        
+        def median(column: str, count: int) -> Optional[float]:
+            if not include_medians:
+                return None
+            return self.storage.get_task_median(column, hours, task_type, count) if count else 0
         
         analysis = {
-            'total_tasks': len(tasks),
-            'completed_tasks': len(completed_tasks),
-            'success_rate': len(completed_tasks) / len(tasks) if tasks else 0,
+            'total_tasks': total_tasks,
+            'completed_tasks': int(totals['completed_count']),
+            'success_rate': totals['completed_count'] / total_tasks,
             
             'duration_stats': {
-                'average': statistics.mean(durations) if durations else 0,
-                'median': statistics.median(durations) if durations else 0,
-                'min': min(durations) if durations else 0,
-                'max': max(durations) if durations else 0
+                'average': totals['duration_sum'] / durations if durations else 0,
+                'median': median('duration_seconds', durations),
+                'min': totals['duration_min'] if durations else 0,
+                'max': totals['duration_max'] if durations else 0
             },
             
             'quality_stats': {
-                'average': statistics.mean(quality_scores) if quality_scores else 0,
-                'median': statistics.median(quality_scores) if quality_scores else 0,
-                'min': min(quality_scores) if quality_scores else 0,
-                'max': max(quality_scores) if quality_scores else 0
+                'average': totals['quality_sum'] / qualities if qualities else 0,
+                'median': median('quality_score', qualities),
+                'min': totals['quality_min'] if qualities else 0,
+                'max': totals['quality_max'] if qualities else 0
             },
             
-            'complexity_distribution': self._analyze_complexity_distribution(tasks),
-            'failure_analysis': self._analyze_failures(tasks),
-            'trends': self._analyze_trends(tasks)
+            'complexity_distribution': self._analyze_complexity_distribution(totals, hours, task_type),
+            'failure_analysis': self._analyze_failures(totals),
+            'trends': self._analyze_trends(totals, hours, task_type)
         }
         
         return analysis
     
-    def _analyze_complexity_distribution(self, tasks: List[Dict]) -> Dict[str, Any]:
-        """Анализ распределения сложности задач"""
-        complexities = [t['complexity_score'] for t in tasks if t['complexity_score']]
+    def analyze_agent_performance(self, hours: int = 24) -> Dict[str, Any]:
+        """Сводка по типам агентов за окно"""
+        rows = self.storage.get_agent_rollup(hours, by_type=True)
         
-        if not complexities:
+        if not rows:
+            return {'error': 'Нет данных за указанный период'}
+        
+        return {
+            row['agent_type']: {
+                'total_agents': int(row['agent_count']),
+                'success_rate': row['completed_count'] / row['agent_count'],
+                'failure_rate': row['failed_count'] / row['agent_count'],
+                'average_duration': row['duration_sum'] / row['duration_count'] if row['duration_count'] else 0,
+                'max_duration': row['duration_max'] or 0,
+                'average_errors': row['error_sum'] / row['agent_count'],
+                'average_retries': row['retry_sum'] / row['agent_count'],
+                'average_quality': row['quality_sum'] / row['agent_count']
+            }
+            for row in rows
+        }
+    
+    def get_dashboard(self, hours: int = 24, bucket: Optional[str] = None,
+                      task_type: Optional[str] = None) -> Dict[str, Any]:
+        """Временной ряд для дашборда: задачи, успех и качество по интервалам"""
+        bucket = bucket or rollup_bucket_for(hours)
+        series = [
+            {
+                'bucket_start': row['bucket_start'],
+                'tasks': int(row['task_count']),
+                'completed': int(row['completed_count']),
+                'failed': int(row['failed_count']),
+                'average_duration': row['duration_sum'] / row['duration_count'] if row['duration_count'] else 0,
+                'average_quality': row['quality_sum'] / row['quality_count'] if row['quality_count'] else 0,
+                'llm_tokens': int(row['llm_tokens_sum'])
+            }
+            for row in self.storage.get_task_timeseries(hours, bucket, task_type)
+        ]
+        return {'bucket': bucket, 'period_hours': hours, 'series': series}
+    
+    def _analyze_complexity_distribution(self, totals: Dict[str, Any], hours: int,
+                                         task_type: Optional[str]) -> Dict[str, Any]:
+        """Анализ распределения сложности задач"""
+        if not totals['complexity_count']:
             return {'error': 'Нет данных о сложности'}
         
-        # Категоризация по сложности
-        simple = len([c for c in complexities if c < 0.3])
-        medium = len([c for c in complexities if 0.3 <= c < 0.7])
-        complex = len([c for c in complexities if c >= 0.7])
+        # Первые и последние значения сложности в порядке убывания времени
+        condition = "typeof(complexity_score) IN ('integer', 'real') AND complexity_score != 0"
+        newest = self.storage.get_edge_tasks(hours, task_type, 5, True, ("complexity_score",), condition)
+        oldest = self.storage.get_edge_tasks(hours, task_type, 5, False, ("complexity_score",), condition)
+        newest = [t['complexity_score'] for t in newest]
+        oldest = [t['complexity_score'] for t in reversed(oldest)]
         
         return {
-            'simple_tasks': simple,
-            'medium_tasks': medium,
-            'complex_tasks': complex,
-            'average_complexity': statistics.mean(complexities),
-            'complexity_trend': 'increasing' if complexities[-5:] > complexities[:5] else 'stable'
+            'simple_tasks': int(totals['simple_count']),
+            'medium_tasks': int(totals['medium_count']),
+            'complex_tasks': int(totals['complex_count']),
+            'average_complexity': totals['complexity_sum'] / totals['complexity_count'],
+            'complexity_trend': 'increasing' if oldest > newest else 'stable'
         }
     
-    def _analyze_failures(self, tasks: List[Dict]) -> Dict[str, Any]:
+    def _analyze_failures(self, totals: Dict[str, Any]) -> Dict[str, Any]:
         """Анализ неудач"""
-        failed_tasks = [t for t in tasks if not t['end_time'] or t['agents_failed'] > 0]
-        
-        if not failed_tasks:
+        if not totals['failed_count']:
             return {'failure_rate': 0, 'common_issues': []}
         
-        failure_rate = len(failed_tasks) / len(tasks)
-        
-        # Анализ причин неудач
-        rework_tasks = len([t for t in tasks if t['rework_required']])
-        quality_issues = len([t for t in tasks if t['quality_score'] < 0.5])
+        total_tasks = totals['task_count']
+        rework_tasks = totals['rework_count']
+        quality_issues = totals['low_quality_count']
         
         return {
-            'failure_rate': failure_rate,
-            'rework_rate': rework_tasks / len(tasks),
-            'quality_issues_rate': quality_issues / len(tasks),
+            'failure_rate': totals['failed_count'] / total_tasks,
+            'rework_rate': rework_tasks / total_tasks,
+            'quality_issues_rate': quality_issues / total_tasks,
             'common_issues': [
                 'Низкое качество результата' if quality_issues > 0 else None,
                 'Требуется доработка' if rework_tasks > 0 else None,
-                'Сбои агентов' if any(t['agents_failed'] > 0 for t in tasks) else None
+                'Сбои агентов' if totals['agent_failure_count'] > 0 else None
             ]
         }
     
-    def _analyze_trends(self, tasks: List[Dict]) -> Dict[str, Any]:
+    def _analyze_trends(self, totals: Dict[str, Any], hours: int, task_type: Optional[str]) -> Dict[str, Any]:
         """Анализ трендов"""
-        if len(tasks) < 10:
+        if totals['task_count'] < 10:
             return {'error': 'Недостаточно данных для анализа трендов'}
         
-        # Сортируем по времени
-        sorted_tasks = sorted(tasks, key=lambda x: x['start_time'])
+        columns = ("quality_score", "duration_seconds")
+        recent = self.storage.get_edge_tasks(hours, task_type, 5, True, columns)
+        older = self.storage.get_edge_tasks(hours, task_type, 5, False, columns)
         
         # Тренд качества
-        recent_quality = [t['quality_score'] for t in sorted_tasks[-5:] if t['quality_score'] > 0]
-        older_quality = [t['quality_score'] for t in sorted_tasks[:5] if t['quality_score'] > 0]
+        recent_quality = [t['quality_score'] for t in recent if t['quality_score'] > 0]
+        older_quality = [t['quality_score'] for t in older if t['quality_score'] > 0]
         
         quality_trend = 'improving' if (
             recent_quality and older_quality and 
@@ -423,8 +936,8 @@ class MetricsAnalyzer:
         ) else 'stable'
         
         # Тренд производительности
-        recent_durations = [t['duration_seconds'] for t in sorted_tasks[-5:] if t['duration_seconds']]
-        older_durations = [t['duration_seconds'] for t in sorted_tasks[:5] if t['duration_seconds']]
+        recent_durations = [t['duration_seconds'] for t in recent if t['duration_seconds']]
+        older_durations = [t['duration_seconds'] for t in older if t['duration_seconds']]
         
         performance_trend = 'improving' if (
             recent_durations and older_durations and
@@ -434,7 +947,7 @@ class MetricsAnalyzer:
         return {
             'quality_trend': quality_trend,
             'performance_trend': performance_trend,
-            'volume_trend': 'increasing' if len(sorted_tasks[-5:]) > len(sorted_tasks[:5]) else 'stable'
+            'volume_trend': 'increasing' if len(recent) > len(older) else 'stable'
         }
 
 
@@ -0,0 +1,383 @@
+"""
+📡 MetricsRegistry - Реестр метрик в формате Prometheus для KittyCore 3.0
+
+Лёгкий реестр внутри процесса:
+- Counter, Gauge и Histogram с фиксированными корзинами и метками
+- запись без блокировок: у каждого потока своя ячейка значений,
+  при выгрузке ячейки суммируются (ячейки завершившихся потоков
+  сворачиваются в одну)
+- выгрузка в текстовом формате Prometheus (GET /metrics веб-сервера)
+
+Стандартные метрики горячих путей объявлены в конце модуля: вызовы LLM,
+выполнение инструментов, глубина очередей, кэши, запись в vault и
+активные задачи.
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import get_ident
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Корзины по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return str(int(value)) if value == int(value) and abs(value) < 1e15 else repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _ThreadCells:
+    """
+    Значения, разнесённые по потокам
+
+    Поток пишет только в свою ячейку (список чисел), поэтому запись не
+    требует блокировки; блокировка берётся лишь при появлении нового потока
+    и при чтении.
+    """
+
+    __slots__ = ("width", "_by_ident", "_cells", "_retired", "_lock")
+
+    def __init__(self, width: int):
+        self.width = width
+        self._by_ident: Dict[int, List[float]] = {}
+        self._cells: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0.0] * width
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        cell = self._by_ident.get(get_ident())
+        if cell is None:
+            cell = [0.0] * self.width
+            with self._lock:
+                self._cells.append((threading.current_thread(), cell))
+                self._by_ident[get_ident()] = cell
+        return cell
+
+    def snapshot(self) -> List[float]:
+        with self._lock:
+            alive = []
+            for thread, cell in self._cells:
+                if thread.is_alive():
+                    alive.append((thread, cell))
+                else:
+                    # Поток завершился и больше не пишет - переносим его вклад;
+                    # идентификатор может достаться новому потоку
+                    for i, value in enumerate(cell):
+                        self._retired[i] += value
+                    if self._by_ident.get(thread.ident) is cell:
+                        del self._by_ident[thread.ident]
+            self._cells = alive
+            total = list(self._retired)
+            for _, cell in alive:
+                for i, value in enumerate(cell):
+                    total[i] += value
+        return total
+
+
+class CounterChild:
+    """Монотонный счётчик с конкретными значениями меток"""
+
+    def __init__(self):
+        self._values = _ThreadCells(1)
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Счётчик может только увеличиваться")
+        self._values.cell()[0] += amount
+
+    def get(self) -> float:
+        return self._values.snapshot()[0]
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Sample]:
+        return [(name, labels, self.get())]
+
+
+class GaugeChild:
+    """Значение, которое может расти и убывать"""
+
+    def __init__(self):
+        self._deltas = _ThreadCells(1)
+        self._base = 0.0
+        self._function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        self._deltas.cell()[0] += amount
+
+    def dec(self, amount: float = 1.0):
+        self._deltas.cell()[0] -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self._base = value - self._deltas.snapshot()[0]
+
+    def set_function(self, function: Callable[[], float]):
+        """Значение вычисляется при чтении (например, размер внешней очереди)"""
+        self._function = function
+
+    @contextmanager
+    def track_inprogress(self) -> Iterator[None]:
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._base + self._deltas.snapshot()[0]
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Sample]:
+        return [(name, labels, self.get())]
+
+
+class HistogramChild:
+    """Гистограмма с фиксированными корзинами"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # Ячейка: счётчики корзин, корзина +Inf, сумма
+        self._values = _ThreadCells(len(self.buckets) + 2)
+
+    def observe(self, value: float):
+        cell = self._values.cell()
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def get(self) -> Dict[str, float]:
+        values = self._values.snapshot()
+        return {"count": sum(values[:-1]), "sum": values[-1]}
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Sample]:
+        values = self._values.snapshot()
+        samples, cumulative = [], 0.0
+        for bound, count in zip(self.buckets + (math.inf,), values[:-1]):
+            cumulative += count
+            samples.append((f"{name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        samples.append((f"{name}_sum", labels, values[-1]))
+        samples.append((f"{name}_count", labels, cumulative))
+        return samples
+
+
+class Metric:
+    """Семейство метрик: имя, описание и дочерние значения по меткам"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        # Кэш поиска по исходным значениям меток (без приведения к str)
+        self._lookup: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str, **kwargs: str):
+        """Дочерняя метрика для значений меток (создаётся один раз)"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        child = self._lookup.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}")
+            key = tuple(str(value) for value in values)
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+                self._lookup[values] = child
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name}: укажите метки {self.labelnames}")
+        return self.labels()
+
+    def collect(self) -> List[Sample]:
+        samples = []
+        for key, child in list(self._children.items()):
+            samples.extend(child.samples(self.name, dict(zip(self.labelnames, key))))
+        return samples
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default().set_function(function)
+
+    def track_inprogress(self):
+        return self._default().track_inprogress()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(b for b in buckets if not math.isinf(b)))
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """Регистрирует метрику; повторная регистрация того же типа возвращает существующую"""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Метрика {metric.name} уже зарегистрирована с другим типом или метками")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            doc = metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(f"# HELP {metric.name} {doc}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.collect():
+                if labels:
+                    label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items())
+                    lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ---------- стандартные метрики KittyCore ----------
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "kittycore_llm_request_duration_seconds", "Длительность вызова LLM",
+    ("model", "status"), buckets=LLM_BUCKETS
+)
+LLM_TOKENS = REGISTRY.counter(
+    "kittycore_llm_tokens_total", "Токены LLM (kind: prompt/completion)", ("model", "kind")
+)
+TOOL_EXECUTION_SECONDS = REGISTRY.histogram(
+    "kittycore_tool_execution_duration_seconds", "Длительность выполнения инструмента",
+    ("tool", "action", "status")
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "kittycore_queue_depth", "Число элементов, ожидающих в очереди планировщика", ("queue",)
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "kittycore_cache_requests_total", "Обращения к кэшам (result: hit/miss)", ("cache", "result")
+)
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "kittycore_cache_hit_ratio", "Доля попаданий в кэш с запуска процесса", ("cache",)
+)
+CACHE_INVALIDATIONS = REGISTRY.counter(
+    "kittycore_cache_invalidations_total", "Записи, удалённые из кэшей как устаревшие или ошибочные", ("cache",)
+)
+VAULT_WRITE_SECONDS = REGISTRY.histogram(
+    "kittycore_vault_write_duration_seconds", "Длительность записи заметки в vault", ("folder",)
+)
+WEBSOCKET_DROPPED_MESSAGES = REGISTRY.counter(
+    "kittycore_websocket_dropped_messages_total",
+    "Сообщения, выброшенные из переполненных очередей отправки WebSocket", ("reason",)
+)
+METRICS_DROPPED_WRITES = REGISTRY.counter(
+    "kittycore_metrics_dropped_writes_total", "Записи метрик, отброшенные хранилищем из-за ошибки SQLite"
+)
+ACTIVE_TASKS = REGISTRY.gauge(
+    "kittycore_active_tasks", "Задачи, выполняемые оркестратором"
+)
+
+
+def record_cache_access(cache: str, hit: bool):
+    """Учёт обращения к кэшу; доля попаданий считается при выгрузке"""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+    ratio = CACHE_HIT_RATIO.labels(cache)
+    if ratio._function is None:
+        hits, misses = CACHE_REQUESTS.labels(cache, "hit"), CACHE_REQUESTS.labels(cache, "miss")
+
+        def hit_ratio() -> float:
+            total = hits.get() + misses.get()
+            return hits.get() / total if total else 0.0
+
+        ratio.set_function(hit_ratio)
@@ -25,9 +25,13 @@ from typing import Dict, Any, List, Optional, Union
 from pathlib import Path
 import hashlib
 import re
+import time
+from collections import OrderedDict
 
 from loguru import logger
 
+from .metrics_registry import VAULT_WRITE_SECONDS
+
 class ObsidianNote:
     """Представление заметки Obsidian"""
     
@@ -204,8 +208,12 @@ class ObsidianDB:
         note.updated_at = datetime.now()
         
         # Сохраняем файл
+        write_start = time.perf_counter()
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(note.to_markdown())
+        VAULT_WRITE_SECONDS.labels(folder_name if folder_name in self.folders else "system").observe(
+            time.perf_counter() - write_start
+        )
         
         # Обновляем индекс
         relative_path = filepath.relative_to(self.vault_path)
@@ -475,10 +483,22 @@ class AgentWorkspace:
         return result
 
 class TaskManager:
-    """Менеджер задач в ObsidianDB"""
+    """
+    Менеджер задач в ObsidianDB
+    
+    Заметки активных задач держатся в памяти (task_id → путь и рабочая копия):
+    обновления дописываются в секции рабочей копии, а на диск заметка пишется
+    один раз при flush() - после этапа оркестратора или при завершении задачи.
+    """
     
-    def __init__(self, obsidian_db: ObsidianDB):
+    FINAL_STATUSES = ("completed", "failed", "cancelled")
+    
+    def __init__(self, obsidian_db: ObsidianDB, max_active: int = 256):
         self.db = obsidian_db
+        self.max_active = max_active
+        self._task_paths: Dict[str, str] = {}  # task_id → путь заметки
+        self._active: "OrderedDict[str, ObsidianNote]" = OrderedDict()  # рабочие копии
+        self._dirty: set = set()
         
     def create_task(self, task_description: str, user_id: str = None) -> str:
         """Создаёт новую задачу"""
@@ -518,95 +538,124 @@ class TaskManager:
         
         filename = f"task_{task_id}_{timestamp}.md"
         filepath = self.db.save_note(note, filename)
+        self._task_paths[task_id] = filepath
+        self._remember(task_id, note)
         
         logger.info(f"📋 Создана задача {task_id}: {task_description[:50]}...")
         return task_id
     
     def update_task_status(self, task_id: str, status: str, details: str = ""):
-        """Обновляет статус задачи"""
-        # Находим заметку задачи
-        task_notes = self.db.search_notes(metadata_filter={"task_id": task_id})
+        """Обновляет статус задачи (финальный статус сразу сохраняется на диск)"""
+        note = self._get_working_note(task_id)
+        if not note:
+            return
         
-        for note_info in task_notes:
-            if note_info["metadata"].get("folder") == "tasks":
-                note = self.db.get_note(note_info["path"])
-                if note:
-                    # Обновляем статус в метаданных
-                    note.metadata["status"] = status
-                    note.metadata["updated_timestamp"] = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    
-                    # Обновляем теги
-                    note.tags = [tag for tag in note.tags if tag not in ["active", "completed", "failed"]]
-                    note.tags.append(status)
-                    
-                    # Добавляем детали в контент
-                    if details:
-                        note.content += f"\n\n### Обновление статуса ({datetime.now().strftime('%H:%M:%S')})\n**Статус:** {status}\n{details}"
-                    
-                    self.db.save_note(note, Path(note_info["path"]).name)
-                    logger.info(f"📋 Задача {task_id} обновлена: {status}")
-                    break
+        # Обновляем статус в метаданных
+        note.metadata["status"] = status
+        note.metadata["updated_timestamp"] = datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        # Обновляем теги
+        note.tags = [tag for tag in note.tags if tag not in ["active", "completed", "failed"]]
+        note.tags.append(status)
+        
+        # Добавляем детали в контент
+        if details:
+            note.content += f"\n\n### Обновление статуса ({datetime.now().strftime('%H:%M:%S')})\n**Статус:** {status}\n{details}"
+        
+        self._dirty.add(task_id)
+        if status.startswith(self.FINAL_STATUSES):
+            self.flush(task_id)
+            self._active.pop(task_id, None)
+        logger.info(f"📋 Задача {task_id} обновлена: {status}")
     
     def add_agent_to_task(self, task_id: str, agent_id: str, role: str = ""):
         """Добавляет агента к задаче"""
-        task_notes = self.db.search_notes(metadata_filter={"task_id": task_id})
+        note = self._get_working_note(task_id)
+        if not note:
+            return
         
-        for note_info in task_notes:
-            if note_info["metadata"].get("folder") == "tasks":
-                note = self.db.get_note(note_info["path"])
-                if note:
-                    # Добавляем агента в контент
-                    agent_section = f"\n- **{agent_id}** ({role or 'worker'}) - добавлен {datetime.now().strftime('%H:%M:%S')}"
-                    
-                    if "## Агенты" in note.content:
-                        note.content = note.content.replace(
-                            "*Агенты будут добавлены автоматически*",
-                            agent_section.strip()
-                        )
-                        if agent_section not in note.content:
-                            # Добавляем после секции агентов
-                            note.content = note.content.replace("## Агенты", f"## Агенты{agent_section}")
-                    
-                    # Создаём связь с рабочим пространством агента
-                    self.db.create_link(Path(note_info["path"]).stem, f"agents/{agent_id}", f"Агент {agent_id}")
-                    
-                    self.db.save_note(note, Path(note_info["path"]).name)
-                    logger.info(f"🤖 Агент {agent_id} добавлен к задаче {task_id}")
-                    break
+        agent_line = f"- **{agent_id}** ({role or 'worker'}) - добавлен {datetime.now().strftime('%H:%M:%S')}"
+        note.content = _append_to_section(note.content, "## Агенты", agent_line,
+                                          "*Агенты будут добавлены автоматически*")
+        
+        # Связь с рабочим пространством агента
+        link = f"[[{agent_id}|Агент {agent_id}]]"
+        if link not in note.content:
+            note.content += f"\n\n{link}"
+        
+        self._dirty.add(task_id)
+        logger.info(f"🤖 Агент {agent_id} добавлен к задаче {task_id}")
     
     def add_result_to_task(self, task_id: str, agent_id: str, result_content: str, result_type: str = "result"):
         """Добавляет результат агента к задаче"""
-        task_notes = self.db.search_notes(metadata_filter={"task_id": task_id})
+        note = self._get_working_note(task_id)
+        if not note:
+            return
         
-        for note_info in task_notes:
-            if note_info["metadata"].get("folder") == "tasks":
-                note = self.db.get_note(note_info["path"])
-                if note:
-                    # Добавляем результат в контент
-                    timestamp = datetime.now().strftime('%H:%M:%S')
-                    result_section = f"""
-### {agent_id} - {result_type} ({timestamp})
+        timestamp = datetime.now().strftime('%H:%M:%S')
+        result_section = f"""### {agent_id} - {result_type} ({timestamp})
 
 {result_content[:300]}{"..." if len(result_content) > 300 else ""}
 
-[[{agent_id}_{result_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}|Полный результат]]
-"""
-                    
-                    if "## Результаты" in note.content:
-                        note.content = note.content.replace(
-                            "*Результаты будут добавлены по мере выполнения*",
-                            result_section.strip()
-                        )
-                        if result_section not in note.content:
-                            # Добавляем после секции результатов
-                            note.content = note.content.replace("## Результаты", f"## Результаты{result_section}")
-                    
-                    self.db.save_note(note, Path(note_info["path"]).name)
-                    logger.info(f"📊 Результат от {agent_id} добавлен к задаче {task_id}")
-                    break
+[[{agent_id}_{result_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}|Полный результат]]"""
+        note.content = _append_to_section(note.content, "## Результаты", result_section,
+                                          "*Результаты будут добавлены по мере выполнения*", separator="\n\n")
+        
+        self._dirty.add(task_id)
+        logger.info(f"📊 Результат от {agent_id} добавлен к задаче {task_id}")
+    
+    def flush(self, task_id: str = None) -> int:
+        """Сохраняет изменённые заметки задач (одной записи на задачу); возвращает число записей"""
+        task_ids = [task_id] if task_id else list(self._dirty)
+        written = 0
+        for dirty_id in task_ids:
+            if dirty_id not in self._dirty:
+                continue
+            self._dirty.discard(dirty_id)
+            note = self._active.get(dirty_id)
+            if note is not None:
+                self.db.save_note(note, Path(self._task_paths[dirty_id]).name)
+                written += 1
+        return written
+    
+    def _find_task_path(self, task_id: str) -> Optional[str]:
+        """Путь заметки задачи: из индекса task_id, иначе один проход по индексу vault"""
+        path = self._task_paths.get(task_id)
+        if path is None:
+            for info in self.db._notes_index.values():
+                metadata = info["metadata"]
+                if metadata.get("folder") == "tasks" and metadata.get("task_id"):
+                    self._task_paths.setdefault(str(metadata["task_id"]), info["path"])
+            path = self._task_paths.get(task_id)
+        return path
+    
+    def _get_working_note(self, task_id: str) -> Optional[ObsidianNote]:
+        """Рабочая копия заметки задачи (читается с диска только при первом обращении)"""
+        note = self._active.get(task_id)
+        if note is not None:
+            self._active.move_to_end(task_id)
+            return note
+        
+        path = self._find_task_path(task_id)
+        if not path or not Path(path).exists():
+            return None
+        note = ObsidianNote.from_markdown(path)
+        self._remember(task_id, note)
+        return note
+    
+    def _remember(self, task_id: str, note: ObsidianNote):
+        """Добавляет рабочую копию, вытесняя самые давние задачи"""
+        self._active[task_id] = note
+        self._active.move_to_end(task_id)
+        while len(self._active) > self.max_active:
+            oldest_id = next(iter(self._active))
+            self.flush(oldest_id)
+            del self._active[oldest_id]
     
     def get_task_summary(self, task_id: str) -> Dict[str, Any]:
         """Получает сводку по задаче"""
+        self.flush(task_id)
+        
         # Основная заметка задачи
         task_notes = self.db.search_notes(metadata_filter={"task_id": task_id})
         task_note = None
@@ -655,6 +704,21 @@ class TaskManager:
             "coordination": coordination
         }
 
+def _append_to_section(content: str, heading: str, entry: str, placeholder: str = None,
+                       separator: str = "\n") -> str:
+    """Дописывает запись в конец секции (или заменяет заглушку секции)"""
+    if placeholder and placeholder in content:
+        return content.replace(placeholder, entry, 1)
+    
+    start = content.find(heading)
+    if start == -1:
+        return f"{content}\n\n{heading}{separator}{entry}"
+    
+    next_heading = content.find("\n## ", start + len(heading))
+    if next_heading == -1:
+        return f"{content.rstrip()}{separator}{entry}"
+    return f"{content[:next_heading].rstrip()}{separator}{entry}\n{content[next_heading:]}"
+
 def get_obsidian_db(vault_path: str = "./obsidian_vault") -> ObsidianDB:
     """Получает глобальный экземпляр ObsidianDB"""
     if not hasattr(get_obsidian_db, '_instance'):
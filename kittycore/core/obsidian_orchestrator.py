@@ -669,6 +669,7 @@ class ObsidianOrchestrator:
                 
                 # Добавляем агента к задаче в TaskManager
                 self.task_manager.add_agent_to_task(task_id, agent_id, getattr(agent, 'role', 'worker'))
+            self.task_manager.flush(task_id)
             
             self.agents_created += len(agents)
             logger.info(f"🤖 Создано агентов: {len(agents)}")
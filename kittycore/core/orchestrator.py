@@ -10,10 +10,11 @@
 import asyncio
 import json
 import logging
+import re
 import time
 from datetime import datetime
 from dataclasses import dataclass, asdict
-from typing import Dict, List, Any, Optional, Union
+from typing import Callable, Dict, List, Any, Optional, Union
 from pathlib import Path
 
 # Импорт коллективной памяти, граф-планирования, самообучения и богатых отчётов
@@ -29,11 +30,20 @@ from ..obsidian_integration import ObsidianAdapter, ObsidianConfig
 from .agent_metrics import get_metrics_collector, MetricsCollector, TaskStatus
 from ..memory.vector_memory import get_vector_store, VectorMemoryStore
 from .quality_controller import QualityController
+from .tracing import get_tracer
+from .task_classifier import TaskClassifier
 
 logger = logging.getLogger(__name__)
 
 # === АНАЛИЗ ЗАДАЧ ===
 
+# Тип подзадачи по ключевым словам (текстовый ответ LLM без JSON), первая метка с совпадением
+_SUBTASK_TYPE_CLASSIFIER = TaskClassifier({
+    "analysis": ["анализ", "исследован", "изучен"],
+    "planning": ["план", "стратег", "подход"],
+    "verification": ["проверк", "тест", "валид"]
+}, default_label="execution")
+
 class TaskAnalyzer:
     """Анализ сложности входящих задач с помощью LLM"""
     
@@ -273,15 +283,8 @@ class TaskDecomposer:
                 description = re.sub(r'^[\d\-•\.\)\s]+', '', line).strip()
                 if description:
                     # Определяем тип по ключевым словам
-                    desc_lower = description.lower()
-                    if any(word in desc_lower for word in ["анализ", "исследован", "изучен"]):
-                        task_type = "analysis"
-                    elif any(word in desc_lower for word in ["план", "стратег", "подход"]):
-                        task_type = "planning"
-                    elif any(word in desc_lower for word in ["проверк", "тест", "валид"]):
-                        task_type = "verification"
-                    else:
-                        task_type = "execution"
+                    task_type = (_SUBTASK_TYPE_CLASSIFIER.first_match(description)
+                                 or _SUBTASK_TYPE_CLASSIFIER.default_label)
                     
                     subtasks.append({
                         "id": f"step_{len(subtasks)+1}",
@@ -421,8 +424,14 @@ class ExecutionManager:
     def __init__(self):
         self.execution_status = {}
     
-    async def execute_workflow(self, workflow: Dict, team: Dict) -> Dict[str, Any]:
-        """Выполняет рабочий процесс с реальными агентами"""
+    async def execute_workflow(self, workflow: Dict, team: Dict,
+                               on_step_complete: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Выполняет рабочий процесс с реальными агентами
+        
+        on_step_complete(step_id, step_result) вызывается сразу после каждого
+        шага - так валидация созданных файлов идёт параллельно со следующими шагами.
+        """
         execution_id = f"exec_{int(time.time())}"
         
         # Импортируем IntellectualAgent здесь чтобы избежать циклического импорта
@@ -465,7 +474,10 @@ class ExecutionManager:
                     
                     # Создаём и запускаем интеллектуального агента
                     working_agent = IntellectualAgent(agent_role, subtask)
-                    execution_result = await working_agent.execute_task()
+                    with get_tracer().span("agent.execute", {"agent.id": agent_id, "agent.role": str(agent_role),
+                                                             "step.id": str(step["step_id"])}) as span:
+                        execution_result = await working_agent.execute_task()
+                        span.set_attribute("agent.status", str(execution_result.get("status")))
                     
                     step_result = execution_result["output"]
                     step_status = execution_result["status"]
@@ -488,6 +500,7 @@ class ExecutionManager:
                 
                 results["steps_completed"] += 1
                 print(f"✅ Шаг выполнен: {step['description']}")
+                self._notify_step_complete(on_step_complete, step["step_id"], results["step_results"][step["step_id"]])
                 
             except Exception as e:
                 logger.error(f"❌ Ошибка выполнения шага {step['step_id']}: {e}")
@@ -506,6 +519,16 @@ class ExecutionManager:
         results["end_time"] = datetime.now().isoformat()
         
         return results
+    
+    @staticmethod
+    def _notify_step_complete(callback: Optional[Callable[[str, Dict[str, Any]], None]],
+                              step_id: str, step_result: Dict[str, Any]):
+        if callback is None:
+            return
+        try:
+            callback(step_id, step_result)
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка обработчика завершения шага {step_id}: {e}")
 
 # === КОНФИГУРАЦИЯ ===
 
@@ -864,6 +887,9 @@ class OrchestratorAgent:
             self.tasks_processed += 1
             self.workflows_executed += 1
             
+            # Сообщения чата должны попасть в статистику коллективной памяти
+            await self.shared_chat.flush()
+            
             result = {
                 "task": task,
                 "status": "completed",
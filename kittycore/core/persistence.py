@@ -0,0 +1,91 @@
+"""
+💾 Persistence - общие помощники сохранения на диск KittyCore 3.0
+
+- write_text_atomic / write_json_atomic: запись через временный файл
+  и os.replace - при сбое на диске остаётся прежняя версия файла
+- BatchedSaver: отложенное сохранение пачками, по таймеру, явным flush()
+  и при завершении процесса
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Union
+
+
+def write_text_atomic(path: Union[str, Path], text: str):
+    """Атомарная запись текста (UTF-8)"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_json_atomic(path: Union[str, Path], data: Any, **dump_kwargs):
+    """Атомарная запись JSON (dump_kwargs передаются в json.dumps)"""
+    write_text_atomic(path, json.dumps(data, **dump_kwargs))
+
+
+# Живые BatchedSaver: один обработчик atexit на все, без ссылок, продлевающих им жизнь
+_active_savers: "weakref.WeakSet[BatchedSaver]" = weakref.WeakSet()
+
+
+def _flush_savers_at_exit():
+    for saver in list(_active_savers):
+        saver.flush()
+
+
+atexit.register(_flush_savers_at_exit)
+
+
+class BatchedSaver:
+    """
+    Отложенное сохранение состояния владельца
+
+    record() отмечает изменение и сохраняет после batch_size изменений или если
+    с прошлого сохранения прошло interval секунд; mark_dirty() отмечает изменение
+    без счёта. Сохранение - метод владельца save_method (вызывается по имени,
+    через атрибут экземпляра); он сообщает об успешной записи через mark_saved().
+    Владелец держится по слабой ссылке, а сам сохранитель - в WeakSet
+    обработчика завершения процесса: ни один из них не живёт дольше владельца.
+    """
+
+    def __init__(self, owner: Any, save_method: str, batch_size: int = 50, interval: float = 30.0):
+        self._owner_ref = weakref.ref(owner)
+        self._save_method = save_method
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pending = 0
+        self.dirty = False
+        self._last_save = time.monotonic()
+        _active_savers.add(self)
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def record(self):
+        """Учесть изменение и сохранить, если накопилась пачка или истёк интервал"""
+        self.pending += 1
+        self.dirty = True
+        if self.pending >= self.batch_size or time.monotonic() - self._last_save >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Сохранить накопленные изменения (если есть)"""
+        owner = self._owner_ref()
+        if owner is not None and self.dirty:
+            getattr(owner, self._save_method)()
+
+    def mark_saved(self):
+        self.dirty = False
+        self.pending = 0
+        self._last_save = time.monotonic()
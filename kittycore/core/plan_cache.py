@@ -0,0 +1,237 @@
+"""
+🗂️ PlanCache - Кэш планов решения задач KittyCore 3.0
+
+Повторное использование анализа и декомпозиции успешно решённых задач:
+- поиск похожей задачи по косинусному сходству слов (инвертированный
+  индекс по словам - сравниваются только кандидаты с общими словами)
+- числа и отрицания - параметры задачи: план берётся только у задачи
+  с теми же числами и отрицаниями, иначе задача декомпозируется заново
+- в кэш попадают только планы с оценкой валидации не ниже min_quality
+- найденный план слегка адаптируется: текст исходной задачи в анализе
+  и подзадачах заменяется новым (образ результата вызывающий код
+  извлекает заново)
+- план, не прошедший валидацию при повторном использовании, удаляется
+- обращения учитываются в kittycore_cache_requests_total{cache="plan"}
+
+Хранится в JSON файле (запись атомарная: временный файл + os.replace).
+"""
+
+import copy
+import json
+import math
+import re
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from .metrics_registry import CACHE_INVALIDATIONS, record_cache_access
+from .persistence import write_json_atomic
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+_NEGATIONS = frozenset({"не", "нет", "ни", "без", "нельзя", "not", "no", "never", "without", "dont"})
+
+
+def _word_counts(text: str) -> Counter:
+    # Короткие слова и цифры не отбрасываются: "5" и "7" - разные задачи
+    return Counter(_WORD_RE.findall(text.lower()))
+
+
+def _task_parameters(text: str) -> Tuple[Tuple[str, ...], int]:
+    """Числа задачи (по порядку) и число отрицаний - должны совпасть точно"""
+    text = text.lower()
+    numbers = tuple(number.replace(",", ".") for number in _NUMBER_RE.findall(text))
+    negations = sum(1 for word in _WORD_RE.findall(text.replace("'", "")) if word in _NEGATIONS)
+    return numbers, negations
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b.get(word, 0) for word, count in a.items())
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def _replace_text(value: Any, old: str, new: str) -> Any:
+    """Рекурсивная замена текста задачи в строках плана"""
+    if isinstance(value, str):
+        return value.replace(old, new)
+    if isinstance(value, list):
+        return [_replace_text(item, old, new) for item in value]
+    if isinstance(value, dict):
+        return {key: _replace_text(item, old, new) for key, item in value.items()}
+    return value
+
+
+@dataclass
+class PlanCacheEntry:
+    """Сохранённый план задачи"""
+    entry_id: str
+    task: str
+    analysis: Dict[str, Any]
+    subtasks: List[Dict[str, Any]]
+    quality_score: float
+    created_at: float = field(default_factory=time.time)
+    uses: int = 0
+
+
+@dataclass
+class CachedPlan:
+    """Результат поиска: адаптированный к новой задаче план"""
+    entry_id: str
+    source_task: str
+    similarity: float
+    analysis: Dict[str, Any]
+    subtasks: List[Dict[str, Any]]
+
+
+class PlanCache:
+    """Кэш анализа и декомпозиции задач"""
+
+    def __init__(self, storage_path: Optional[str] = None, similarity_threshold: float = 0.9,
+                 min_quality: float = 0.8, max_entries: int = 1000):
+        self.storage_path = Path(storage_path) if storage_path else None
+        self.similarity_threshold = similarity_threshold
+        self.min_quality = min_quality
+        self.max_entries = max_entries
+
+        self.entries: Dict[str, PlanCacheEntry] = {}
+        self._vectors: Dict[str, Counter] = {}
+        self._parameters: Dict[str, Tuple[Tuple[str, ...], int]] = {}
+        self._word_index: Dict[str, Set[str]] = {}
+        self._counter = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, task: str) -> Optional[CachedPlan]:
+        """Самый похожий сохранённый план не ниже порога сходства с теми же параметрами"""
+        vector = _word_counts(task)
+        parameters = _task_parameters(task)
+        candidates = set()
+        for word in vector:
+            candidates.update(self._word_index.get(word, ()))
+        candidates = {entry_id for entry_id in candidates if self._parameters[entry_id] == parameters}
+
+        best_id, best_similarity = None, 0.0
+        for entry_id in candidates:
+            similarity = _cosine(vector, self._vectors[entry_id])
+            if similarity > best_similarity:
+                best_id, best_similarity = entry_id, similarity
+
+        if best_id is None or best_similarity < self.similarity_threshold:
+            record_cache_access("plan", False)
+            return None
+
+        record_cache_access("plan", True)
+        entry = self.entries[best_id]
+        entry.uses += 1
+        analysis = _replace_text(copy.deepcopy(entry.analysis), entry.task, task)
+        analysis["plan_cache"] = {"source_task": entry.task, "similarity": round(best_similarity, 3)}
+        logger.info(f"🗂️ План задачи взят из кэша (сходство {best_similarity:.2f}): {entry.task[:50]}")
+        return CachedPlan(
+            entry_id=best_id,
+            source_task=entry.task,
+            similarity=best_similarity,
+            analysis=analysis,
+            subtasks=_replace_text(copy.deepcopy(entry.subtasks), entry.task, task)
+        )
+
+    def store(self, task: str, analysis: Dict[str, Any], subtasks: List[Dict[str, Any]],
+              quality_score: float) -> Optional[str]:
+        """Сохранить план успешно решённой задачи (ниже min_quality - не сохраняется)"""
+        if quality_score < self.min_quality or not subtasks:
+            return None
+
+        # Одна задача - одна запись: новый план заменяет прежний
+        for entry_id, entry in list(self.entries.items()):
+            if entry.task == task:
+                self._remove(entry_id)
+
+        self._counter += 1
+        entry_id = f"plan_{int(time.time())}_{self._counter}"
+        analysis = {key: value for key, value in analysis.items() if key != "plan_cache"}
+        self._add(PlanCacheEntry(
+            entry_id=entry_id,
+            task=task,
+            analysis=copy.deepcopy(analysis),
+            subtasks=copy.deepcopy(subtasks),
+            quality_score=quality_score
+        ))
+
+        # Вытесняем самые старые планы
+        while len(self.entries) > self.max_entries:
+            oldest = min(self.entries.values(), key=lambda e: e.created_at)
+            self._remove(oldest.entry_id)
+
+        self._save()
+        return entry_id
+
+    def invalidate(self, entry_id: str, reason: str = "") -> bool:
+        """Удалить план (повторное использование не прошло валидацию)"""
+        if entry_id not in self.entries:
+            return False
+        task = self.entries[entry_id].task
+        self._remove(entry_id)
+        self._save()
+        CACHE_INVALIDATIONS.labels("plan").inc()
+        logger.info(f"🗂️ План удалён из кэша{f' ({reason})' if reason else ''}: {task[:50]}")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "total_uses": sum(entry.uses for entry in self.entries.values()),
+            "similarity_threshold": self.similarity_threshold,
+            "min_quality": self.min_quality
+        }
+
+    # ---------- индекс и хранение ----------
+
+    def _add(self, entry: PlanCacheEntry):
+        vector = _word_counts(entry.task)
+        self.entries[entry.entry_id] = entry
+        self._vectors[entry.entry_id] = vector
+        self._parameters[entry.entry_id] = _task_parameters(entry.task)
+        for word in vector:
+            self._word_index.setdefault(word, set()).add(entry.entry_id)
+
+    def _remove(self, entry_id: str):
+        self.entries.pop(entry_id, None)
+        self._parameters.pop(entry_id, None)
+        for word in self._vectors.pop(entry_id, ()):
+            ids = self._word_index.get(word)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._word_index[word]
+
+    def _load(self):
+        if not self.storage_path or not self.storage_path.exists():
+            return
+        try:
+            data = json.loads(self.storage_path.read_text(encoding="utf-8"))
+            for item in data.get("entries", []):
+                self._add(PlanCacheEntry(**item))
+            self._counter = len(self.entries)
+            logger.info(f"🗂️ Загружено планов: {len(self.entries)}")
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось загрузить кэш планов {self.storage_path}: {e}")
+
+    def _save(self):
+        if not self.storage_path:
+            return
+        try:
+            self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(self.storage_path, {"entries": [asdict(entry) for entry in self.entries.values()]},
+                              ensure_ascii=False, default=str)
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения кэша планов: {e}")
@@ -13,15 +13,20 @@
 🌱 НЕПРЕРЫВНАЯ ЭВОЛЮЦИЯ: Постоянное улучшение формулировок
 """
 
+import heapq
+import itertools
 import json
 import random
 import re
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Deque, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 from pathlib import Path
 from loguru import logger
 
+from .persistence import BatchedSaver, write_json_atomic
+
 # === ЧАСТЬ 1: СТРУКТУРЫ ДАННЫХ ПРОМПТОВ ===
 
 @dataclass
@@ -105,18 +110,62 @@ class PromptPerformance:
     output_length: int = 0
     context_relevance: float = 0.0
 
+@dataclass
+class PerformanceAggregate:
+    """📈 Накопительная статистика по типу задач (переживает обрезку истории)"""
+    
+    count: int = 0
+    successes: int = 0
+    quality_sum: float = 0.0
+    execution_time_sum: float = 0.0
+    
+    def add(self, performance: PromptPerformance):
+        self.count += 1
+        self.successes += 1 if performance.success else 0
+        self.quality_sum += performance.quality_score
+        self.execution_time_sum += performance.execution_time
+    
+    def summary(self) -> Dict[str, float]:
+        count = max(self.count, 1)
+        return {
+            'count': self.count,
+            'success_rate': self.successes / count,
+            'avg_quality_score': self.quality_sum / count,
+            'avg_execution_time': self.execution_time_sum / count
+        }
+
 # === ЧАСТЬ 2: ЭВОЛЮЦИОННЫЕ ОПЕРАЦИИ ПРОМПТОВ ===
 
 class PromptEvolutionEngine:
-    """🧠 Движок эволюции промптов"""
+    """
+    🧠 Движок эволюции промптов
+    
+    Запись использования промпта - горячий путь: статистика промпта
+    обновляется инкрементально, в кучу его типа агента кладётся новая оценка
+    (O(log n), старые записи кучи отбрасываются лениво), история ограничена
+    history_limit записями, а итоги по типам задач копятся в агрегатах.
+    На диск изменения пишутся пачками: после save_batch_size записей,
+    не чаще раза в save_interval секунд или явным flush().
+    """
     
-    def __init__(self, storage_path: str = "./prompt_evolution_storage"):
+    def __init__(self, storage_path: str = "./prompt_evolution_storage",
+                 history_limit: int = 500, save_batch_size: int = 50, save_interval: float = 30.0):
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(exist_ok=True)
         
         # Популяция промптов
         self.prompt_population: Dict[str, PromptDNA] = {}
-        self.performance_history: List[PromptPerformance] = []
+        self.performance_history: Deque[PromptPerformance] = deque(maxlen=history_limit)
+        self.task_type_stats: Dict[str, PerformanceAggregate] = {}
+        
+        # Индекс лучших промптов: agent_type → куча (-fitness, порядок, версия, prompt_id)
+        self._fitness_heaps: Dict[str, List[Tuple[float, int, int, str]]] = {}
+        self._index_versions: Dict[str, int] = {}
+        self._prompt_order: Dict[str, int] = {}
+        self._order_counter = itertools.count()
+        
+        # Отложенное сохранение
+        self._saver = BatchedSaver(self, "_save_prompt_population", save_batch_size, save_interval)
         
         # Настройки эволюции
         self.mutation_rate = 0.15
@@ -129,6 +178,7 @@ class PromptEvolutionEngine:
         
         # Загружаем существующие промпты
         self._load_prompt_population()
+        self._load_performance_history()
         
         logger.info(f"🧠 PromptEvolutionEngine инициализирован")
         logger.info(f"📊 Популяция промптов: {len(self.prompt_population)}")
@@ -198,7 +248,7 @@ class PromptEvolutionEngine:
         )
         
         # Добавляем в популяцию
-        self.prompt_population[prompt_id] = prompt_dna
+        self._register_prompt(prompt_dna)
         self._save_prompt_population()
         
         logger.info(f"🌱 Создан начальный промпт {prompt_id} для агента {agent_type}")
@@ -305,7 +355,7 @@ class PromptEvolutionEngine:
         )
         
         # Добавляем в популяцию
-        self.prompt_population[mutated_id] = mutated_prompt
+        self._register_prompt(mutated_prompt)
         
         logger.info(f"🔄 Мутация {prompt_dna.prompt_id} → {mutated_id}: {', '.join(mutations_applied)}")
         return mutated_prompt
@@ -379,7 +429,7 @@ class PromptEvolutionEngine:
         )
         
         # Добавляем в популяцию
-        self.prompt_population[hybrid_id] = hybrid_prompt
+        self._register_prompt(hybrid_prompt)
         
         logger.info(f"🧬 Скрещивание {parent1.prompt_id} × {parent2.prompt_id} → {hybrid_id}")
         return hybrid_prompt
@@ -514,7 +564,9 @@ class PromptEvolutionEngine:
             **kwargs
         )
         
+        # История ограничена, итоги по типу задачи копятся в агрегате
         self.performance_history.append(performance)
+        self.task_type_stats.setdefault(task_type, PerformanceAggregate()).add(performance)
         
         # Обновляем статистику промпта
         prompt = self.prompt_population[prompt_id]
@@ -535,41 +587,89 @@ class PromptEvolutionEngine:
         new_time = (old_time * (prompt.usage_count - 1) + execution_time) / prompt.usage_count
         prompt.avg_execution_time = new_time
         
+        self._index_prompt(prompt)
+        
         logger.debug(f"📊 Промпт {prompt_id}: использований {prompt.usage_count}, успех {new_success:.2f}")
         
-        # Сохраняем изменения
-        self._save_prompt_population()
+        # Сохраняем изменения пачкой
+        self._saver.record()
     
     def get_best_prompt(self, agent_type: str, task_type: str = None) -> Optional[PromptDNA]:
         """🏆 Получить лучший промпт для агента"""
         
-        # Фильтруем по типу агента
-        candidates = [p for p in self.prompt_population.values() if p.agent_type == agent_type]
+        # Вершина кучи типа агента; устаревшие записи снимаются по пути
+        heap = self._fitness_heaps.get(agent_type)
+        while heap:
+            _, _, version, prompt_id = heap[0]
+            prompt = self.prompt_population.get(prompt_id)
+            if (prompt is not None and prompt.agent_type == agent_type
+                    and self._index_versions.get(prompt_id) == version):
+                return prompt
+            heapq.heappop(heap)
+        
+        # Создаём новый промпт если нет подходящих
+        return self.create_initial_prompt(agent_type)
+    
+    def flush(self):
+        """💾 Сохранить накопленные изменения (если есть)"""
+        self._saver.flush()
+    
+    # === ЧАСТЬ 4B: ИНДЕКС ПРИСПОСОБЛЕННОСТИ ===
+    
+    @staticmethod
+    def _selection_fitness(prompt: PromptDNA) -> float:
+        """🏆 Оценка для выбора лучшего промпта (зависит только от статистики)"""
+        if prompt.usage_count == 0:
+            return 0.5  # Нейтральная оценка для неиспользованных
         
-        if not candidates:
-            # Создаём новый промпт если нет подходящих
-            return self.create_initial_prompt(agent_type)
+        # Комбинируем метрики
+        fitness = (
+            prompt.success_rate * 0.4 +
+            prompt.avg_quality_score * 0.4 +
+            (1.0 - min(prompt.avg_execution_time / 60.0, 1.0)) * 0.2  # Штраф за долгое выполнение
+        )
         
-        # Сортируем по качеству (комбинируем success rate и quality score)
-        def prompt_fitness(prompt: PromptDNA) -> float:
-            if prompt.usage_count == 0:
-                return 0.5  # Нейтральная оценка для неиспользованных
-            
-            # Комбинируем метрики
-            fitness = (
-                prompt.success_rate * 0.4 +
-                prompt.avg_quality_score * 0.4 +
-                (1.0 - min(prompt.avg_execution_time / 60.0, 1.0)) * 0.2  # Штраф за долгое выполнение
-            )
-            
-            # Бонус за больше использований (но не слишком большой)
-            usage_bonus = min(prompt.usage_count / 10.0, 0.1)
-            fitness += usage_bonus
-            
-            return fitness
+        # Бонус за больше использований (но не слишком большой)
+        usage_bonus = min(prompt.usage_count / 10.0, 0.1)
+        fitness += usage_bonus
         
-        best_prompt = max(candidates, key=prompt_fitness)
-        return best_prompt
+        return fitness
+    
+    def _register_prompt(self, prompt: PromptDNA):
+        """➕ Добавить промпт в популяцию и индекс"""
+        self.prompt_population[prompt.prompt_id] = prompt
+        if prompt.prompt_id not in self._prompt_order:
+            self._prompt_order[prompt.prompt_id] = next(self._order_counter)
+        self._index_prompt(prompt)
+    
+    def _index_prompt(self, prompt: PromptDNA):
+        """📌 Новая оценка промпта в куче его типа (прежняя запись становится устаревшей)"""
+        version = self._index_versions.get(prompt.prompt_id, 0) + 1
+        self._index_versions[prompt.prompt_id] = version
+        heap = self._fitness_heaps.setdefault(prompt.agent_type, [])
+        # При равной оценке выигрывает промпт, раньше попавший в популяцию
+        heapq.heappush(heap, (-self._selection_fitness(prompt), self._prompt_order[prompt.prompt_id],
+                              version, prompt.prompt_id))
+        
+        # Устаревших записей накопилось слишком много - пересобираем кучу
+        if len(heap) > 4 * len(self.prompt_population) + 64:
+            self._rebuild_heap(prompt.agent_type)
+    
+    def _rebuild_heap(self, agent_type: str):
+        heap = [
+            (-self._selection_fitness(p), self._prompt_order[p.prompt_id], self._index_versions[p.prompt_id], p.prompt_id)
+            for p in self.prompt_population.values() if p.agent_type == agent_type
+        ]
+        heapq.heapify(heap)
+        self._fitness_heaps[agent_type] = heap
+    
+    def _rebuild_fitness_index(self):
+        """🔁 Полная пересборка индекса (после замены популяции)"""
+        self._fitness_heaps.clear()
+        self._prompt_order.clear()
+        for prompt in self.prompt_population.values():
+            self._prompt_order[prompt.prompt_id] = next(self._order_counter)
+            self._index_prompt(prompt)
     
     def evolve_prompts(self, agent_type: str = None):
         """🌱 Эволюция популяции промптов"""
@@ -658,6 +758,7 @@ class PromptEvolutionEngine:
         
         # Обновляем популяцию
         self.prompt_population = {prompt.prompt_id: prompt for prompt in survivors}
+        self._rebuild_fitness_index()
         
         logger.info(f"📊 Популяция промптов сокращена до {len(self.prompt_population)}")
     
@@ -671,7 +772,8 @@ class PromptEvolutionEngine:
                 'max_generation': 0,
                 'total_mutations': 0,
                 'total_crossovers': 0,
-                'agent_types': []
+                'agent_types': [],
+                'task_types': {}
             }
         
         prompts = list(self.prompt_population.values())
@@ -692,7 +794,8 @@ class PromptEvolutionEngine:
             'max_generation': max_generation,
             'total_mutations': total_mutations,
             'total_crossovers': total_crossovers,
-            'agent_types': agent_types
+            'agent_types': agent_types,
+            'task_types': {task_type: stats.summary() for task_type, stats in self.task_type_stats.items()}
         }
     
     def _load_mutation_templates(self) -> Dict[str, List[str]]:
@@ -704,22 +807,22 @@ class PromptEvolutionEngine:
         }
     
     def _save_prompt_population(self):
-        """💾 Сохранение популяции промптов"""
+        """💾 Сохранение популяции промптов (атомарно)"""
         try:
             population_file = self.storage_path / "prompt_population.json"
             history_file = self.storage_path / "performance_history.json"
+            aggregates_file = self.storage_path / "performance_aggregates.json"
             
             # Сохраняем популяцию
             population_data = {k: asdict(v) for k, v in self.prompt_population.items()}
-            with open(population_file, 'w', encoding='utf-8') as f:
-                json.dump(population_data, f, indent=2, default=str)
+            write_json_atomic(population_file, population_data, indent=2, default=str)
             
-            # Сохраняем историю (последние 500 записей)
-            recent_history = self.performance_history[-500:]
-            history_data = [asdict(h) for h in recent_history]
-            with open(history_file, 'w', encoding='utf-8') as f:
-                json.dump(history_data, f, indent=2, default=str)
-                
+            # Сохраняем историю (последние history_limit записей) и агрегаты
+            write_json_atomic(history_file, [asdict(h) for h in self.performance_history], indent=2, default=str)
+            write_json_atomic(aggregates_file, {k: asdict(v) for k, v in self.task_type_stats.items()},
+                              indent=2, default=str)
+            
+            self._saver.mark_saved()
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения популяции промптов: {e}")
     
@@ -733,12 +836,29 @@ class PromptEvolutionEngine:
                 
                 for prompt_id, prompt_data in data.items():
                     prompt_dna = self._dict_to_prompt_dna(prompt_data)
-                    self.prompt_population[prompt_id] = prompt_dna
+                    self._register_prompt(prompt_dna)
                 
                 logger.info(f"📂 Загружено {len(self.prompt_population)} промптов")
         except Exception as e:
             logger.warning(f"⚠️ Ошибка загрузки популяции промптов: {e}")
     
+    def _load_performance_history(self):
+        """📂 Загрузка истории использования и агрегатов по типам задач"""
+        try:
+            history_file = self.storage_path / "performance_history.json"
+            if history_file.exists():
+                with open(history_file, 'r', encoding='utf-8') as f:
+                    for record in json.load(f):
+                        record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+                        self.performance_history.append(PromptPerformance(**record))
+            
+            aggregates_file = self.storage_path / "performance_aggregates.json"
+            if aggregates_file.exists():
+                with open(aggregates_file, 'r', encoding='utf-8') as f:
+                    self.task_type_stats = {k: PerformanceAggregate(**v) for k, v in json.load(f).items()}
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка загрузки истории промптов: {e}")
+    
     def _dict_to_prompt_dna(self, data: dict) -> PromptDNA:
         """🔄 Преобразование словаря в PromptDNA"""
         genes_data = data.get("genes", {})
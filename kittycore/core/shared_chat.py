@@ -6,11 +6,19 @@
 - История сообщений и контекста
 - Координация действий и распределение задач
 - Синхронизация результатов
+
+История хранится в кольцевом буфере (max_messages) с индексами по типу
+сообщения и адресату, поэтому выборки стоят O(k) от размера ответа.
+Запись в коллективную память идёт пачками в фоне, подписчики
+уведомляются параллельно.
 """
 
 import asyncio
+import heapq
+from collections import deque
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Set
+from itertools import islice
+from typing import Deque, Dict, Any, Iterator, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from loguru import logger
 from ..memory.collective_memory import CollectiveMemory
@@ -43,15 +51,27 @@ class AgentPresence:
 class SharedChat:
     """Общий чат для координации агентов"""
     
-    def __init__(self, team_id: str = "default", collective_memory: Optional[CollectiveMemory] = None):
+    def __init__(self, team_id: str = "default", collective_memory: Optional[CollectiveMemory] = None,
+                 max_messages: int = 1000, memory_batch_size: int = 50):
         self.team_id = team_id
-        self.messages: List[ChatMessage] = []
+        self.max_messages = max_messages
+        self.messages: Deque[ChatMessage] = deque(maxlen=max_messages)
         self.agents: Dict[str, AgentPresence] = {}
         self.subscribers: Dict[str, Set[callable]] = {}  # Подписчики на события
         self.coordinator_id: Optional[str] = None
         self.collective_memory = collective_memory
         self._message_counter = 0
         
+        # Индексы истории: (порядковый номер, сообщение); адресат None - сообщения для всех
+        self._seq = 0
+        self._by_type: Dict[str, Deque[Tuple[int, ChatMessage]]] = {}
+        self._by_recipient: Dict[Optional[str], Deque[Tuple[int, ChatMessage]]] = {}
+        
+        # Фоновая запись в коллективную память
+        self.memory_batch_size = memory_batch_size
+        self._memory_pending: List[Tuple[str, str, List[str]]] = []
+        self._memory_task: Optional[asyncio.Task] = None
+        
         logger.info(f"Создан SharedChat для команды: {team_id}")
     
     def register_agent(self, agent_id: str, agent_role: str, is_coordinator: bool = False) -> None:
@@ -74,7 +94,7 @@ class SharedChat:
             content=f"Агент {agent_role} ({agent_id}) присоединился к команде",
             message_type="info"
         )
-        self.messages.append(welcome_msg)
+        self._append(welcome_msg)
         
         logger.info(f"Агент {agent_id} ({agent_role}) зарегистрирован в чате")
     
@@ -92,7 +112,7 @@ class SharedChat:
                 content=f"Агент {agent_role} ({agent_id}) покинул команду",
                 message_type="info"
             )
-            self.messages.append(goodbye_msg)
+            self._append(goodbye_msg)
             
             logger.info(f"Агент {agent_id} отключён от чата")
     
@@ -115,22 +135,22 @@ class SharedChat:
             requires_response=requires_response
         )
         
-        self.messages.append(message)
+        self._append(message)
         
         # Обновляем статус отправителя
         if sender_id in self.agents:
             self.agents[sender_id].last_seen = datetime.now()
         
-        # Уведомляем подписчиков
-        await self._notify_subscribers('message', message)
-        
-        # Сохраняем в коллективную память
+        # Сохраняем в коллективную память (фоном, пачками)
         if self.collective_memory:
-            await self.collective_memory.store(
-                content=f"Сообщение в чат: {content}",
-                agent_id=sender_id,
-                tags=[message_type, "communication"]
+            self._memory_pending.append(
+                (f"Сообщение в чат: {content}", sender_id, [message_type, "communication"])
             )
+            if self._memory_task is None or self._memory_task.done():
+                self._memory_task = asyncio.get_running_loop().create_task(self._write_memory())
+        
+        # Уведомляем подписчиков
+        await self._notify_subscribers('message', message)
         
         logger.debug(f"Сообщение от {sender_id}: {content[:50]}...")
         return message.id
@@ -230,23 +250,30 @@ class SharedChat:
     def get_recent_messages(self, limit: int = 20, message_type: str = None,
                            since: datetime = None) -> List[ChatMessage]:
         """Получить недавние сообщения"""
-        messages = self.messages
-        
         if message_type:
-            messages = [msg for msg in messages if msg.message_type == message_type]
+            messages = (msg for _, msg in self._live(self._by_type.get(message_type)))
+        else:
+            messages = reversed(self.messages)
         
         if since:
-            messages = [msg for msg in messages if msg.timestamp > since]
+            # Сообщения упорядочены по времени - обход с конца до первого старого
+            messages = _take_while_newer(messages, since)
         
-        return messages[-limit:] if limit else messages
+        result = list(islice(messages, limit) if limit else messages)
+        result.reverse()
+        return result
     
     def get_messages_for_agent(self, agent_id: str, limit: int = 10) -> List[ChatMessage]:
         """Получить сообщения адресованные конкретному агенту"""
-        agent_messages = [
-            msg for msg in self.messages
-            if msg.addressed_to == agent_id or msg.addressed_to is None
-        ]
-        return agent_messages[-limit:] if limit else agent_messages
+        # Слияние с конца двух индексов: лично агенту и всем
+        merged = heapq.merge(
+            self._live(self._by_recipient.get(agent_id)),
+            self._live(self._by_recipient.get(None)),
+            key=lambda item: -item[0]
+        )
+        result = [msg for _, msg in (islice(merged, limit) if limit else merged)]
+        result.reverse()
+        return result
     
     def get_team_status(self) -> Dict[str, Any]:
         """Статус команды"""
@@ -296,16 +323,77 @@ class SharedChat:
         logger.debug(f"Агент {agent_id} подписан на события чата")
     
     async def _notify_subscribers(self, event_type: str, data: Any) -> None:
-        """Уведомление подписчиков"""
-        for agent_id, callbacks in self.subscribers.items():
-            for callback in callbacks:
+        """Уведомление подписчиков (асинхронные вызываются параллельно)"""
+        pending = []
+        for agent_id, callbacks in list(self.subscribers.items()):
+            for callback in list(callbacks):
                 try:
                     if asyncio.iscoroutinefunction(callback):
-                        await callback(event_type, data)
+                        pending.append((agent_id, callback(event_type, data)))
                     else:
                         callback(event_type, data)
                 except Exception as e:
                     logger.error(f"Ошибка уведомления подписчика {agent_id}: {e}")
+        
+        if not pending:
+            return
+        results = await asyncio.gather(*(coro for _, coro in pending), return_exceptions=True)
+        for (agent_id, _), result in zip(pending, results):
+            if isinstance(result, Exception):
+                logger.error(f"Ошибка уведомления подписчика {agent_id}: {result}")
+    
+    # ---------- история и индексы ----------
+    
+    def _append(self, message: ChatMessage) -> None:
+        """Добавить сообщение в кольцевой буфер и индексы"""
+        self._seq += 1
+        entry = (self._seq, message)
+        self.messages.append(message)
+        for index, key in ((self._by_type, message.message_type), (self._by_recipient, message.addressed_to)):
+            bucket = index.get(key)
+            if bucket is None:
+                bucket = index[key] = deque(maxlen=self.max_messages)
+            bucket.append(entry)
+            self._prune(bucket)
+    
+    def _first_live_seq(self) -> int:
+        """Номер самого старого сообщения, оставшегося в буфере"""
+        return self._seq - len(self.messages) + 1
+    
+    def _prune(self, bucket: Deque[Tuple[int, ChatMessage]]) -> None:
+        """Убрать из индекса сообщения, вытесненные из буфера"""
+        first_live = self._first_live_seq()
+        while bucket and bucket[0][0] < first_live:
+            bucket.popleft()
+    
+    def _live(self, bucket: Optional[Deque[Tuple[int, ChatMessage]]]) -> Iterator[Tuple[int, ChatMessage]]:
+        """Записи индекса от новых к старым, только живые"""
+        if not bucket:
+            return
+        first_live = self._first_live_seq()
+        for entry in reversed(bucket):
+            if entry[0] < first_live:
+                return
+            yield entry
+    
+    # ---------- коллективная память ----------
+    
+    async def _write_memory(self) -> None:
+        """Фоновая запись накопленных сообщений в коллективную память"""
+        # Даём отправителям в этом же цикле событий накопить пачку
+        await asyncio.sleep(0)
+        while self._memory_pending:
+            batch = self._memory_pending[:self.memory_batch_size]
+            del self._memory_pending[:len(batch)]
+            try:
+                await self.collective_memory.store_many(batch)
+            except Exception as e:
+                logger.error(f"Ошибка записи чата в коллективную память: {e}")
+    
+    async def flush(self) -> None:
+        """Дождаться записи всех сообщений в коллективную память"""
+        while self._memory_task is not None and not self._memory_task.done():
+            await asyncio.shield(self._memory_task)
     
     def _generate_message_id(self) -> str:
         """Генерация уникального ID сообщения"""
@@ -316,7 +404,13 @@ class SharedChat:
         """Очистка истории сообщений"""
         if len(self.messages) > keep_last:
             removed_count = len(self.messages) - keep_last
-            self.messages = self.messages[-keep_last:]
+            for _ in range(removed_count):
+                self.messages.popleft()
+            for index in (self._by_type, self._by_recipient):
+                for key in list(index):
+                    self._prune(index[key])
+                    if not index[key]:
+                        del index[key]
             logger.info(f"Очищено {removed_count} старых сообщений из чата")
     
     def export_conversation(self) -> Dict[str, Any]:
@@ -346,4 +440,12 @@ class SharedChat:
             ],
             'total_messages': len(self.messages),
             'coordinator': self.coordinator_id
-        } 
\ No newline at end of file
+        }
+
+
+def _take_while_newer(messages: Iterator[ChatMessage], since: datetime) -> Iterator[ChatMessage]:
+    """Сообщения от новых к старым до первого не позже since"""
+    for msg in messages:
+        if msg.timestamp <= since:
+            return
+        yield msg
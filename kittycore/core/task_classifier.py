@@ -0,0 +1,270 @@
+"""
+🏷️ TaskClassifier - Классификатор задач по ключевым словам KittyCore 3.0
+
+Общий классификатор для эвристической маршрутизации и определения типа задач:
+- таблица {метка: [ключевые слова]} компилируется один раз в автомат
+  Ахо-Корасик - все ключевые слова ищутся за один проход по тексту
+  (совпадение по подстроке, как прежние проверки `keyword in text`)
+- уверенность калибруется сглаживанием по числу совпавших слов каждой
+  метки: при 7 метках одно однозначное совпадение ~0.65, конфликт < 0.5
+- необязательная линейная модель (логистическая регрессия по словам и
+  ключевым словам) обучается офлайн на истории решений из vault и
+  уточняет уверенность там, где ключевых слов не хватает
+
+Вызывающий код идёт в LLM только если confidence ниже своего порога.
+"""
+
+import json
+import math
+import random
+import re
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+from loguru import logger
+
+from .persistence import write_json_atomic
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class KeywordAutomaton:
+    """Автомат Ахо-Корасик: поиск всех ключевых слов за один проход"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+
+        for keyword in keywords:
+            if keyword:
+                self._add(keyword.lower())
+        self._build_links()
+
+    def _add(self, keyword: str):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        if keyword not in self._output[state]:
+            self._output[state].append(keyword)
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # Слова, оканчивающиеся в суффиксном состоянии, тоже найдены здесь
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """(позиция конца, ключевое слово) для каждого вхождения; text уже в нижнем регистре"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword in output[state]:
+                yield position, keyword
+
+    def matched(self, text: str) -> Set[str]:
+        """Множество найденных ключевых слов"""
+        return {keyword for _, keyword in self.iter_matches(text.lower())}
+
+
+@dataclass
+class TaskClassification:
+    """Результат классификации"""
+    label: str
+    confidence: float
+    method: str  # keywords | model | default
+    matches: Dict[str, List[str]] = field(default_factory=dict)
+    probabilities: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class LinearTaskModel:
+    """Мультиклассовая логистическая регрессия по разреженным признакам"""
+    labels: List[str]
+    weights: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    bias: Dict[str, float] = field(default_factory=dict)
+    trained_samples: int = 0
+
+    def predict_proba(self, features: Mapping[str, float]) -> Dict[str, float]:
+        scores = {}
+        for label in self.labels:
+            label_weights = self.weights.get(label, {})
+            scores[label] = self.bias.get(label, 0.0) + sum(
+                value * label_weights.get(feature, 0.0) for feature, value in features.items()
+            )
+        top = max(scores.values())
+        exp_scores = {label: math.exp(score - top) for label, score in scores.items()}
+        total = sum(exp_scores.values())
+        return {label: value / total for label, value in exp_scores.items()}
+
+    @classmethod
+    def train(cls, samples: Sequence[Tuple[Mapping[str, float], str]], labels: Sequence[str],
+              epochs: int = 30, learning_rate: float = 0.5, l2: float = 1e-3, seed: int = 0) -> "LinearTaskModel":
+        """SGD по выборке (признаки, метка); метки вне labels пропускаются"""
+        model = cls(labels=list(labels))
+        samples = [(features, label) for features, label in samples if label in model.labels]
+        order = list(range(len(samples)))
+        rng = random.Random(seed)
+        for _ in range(epochs):
+            rng.shuffle(order)
+            for index in order:
+                features, target = samples[index]
+                probabilities = model.predict_proba(features)
+                for label in model.labels:
+                    gradient = probabilities[label] - (1.0 if label == target else 0.0)
+                    label_weights = model.weights.setdefault(label, {})
+                    for feature, value in features.items():
+                        weight = label_weights.get(feature, 0.0)
+                        label_weights[feature] = weight - learning_rate * (gradient * value + l2 * weight)
+                    model.bias[label] = model.bias.get(label, 0.0) - learning_rate * gradient
+        model.trained_samples = len(samples)
+        return model
+
+    def save(self, path: str):
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(target, asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LinearTaskModel"]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось загрузить модель классификатора {path}: {e}")
+            return None
+
+
+class TaskClassifier:
+    """Классификатор задач по таблице ключевых слов (порядок меток - приоритет при равенстве)"""
+
+    def __init__(self, tables: Mapping[str, Sequence[str]], default_label: str,
+                 model: Optional[LinearTaskModel] = None, smoothing: float = 0.1):
+        self.labels = list(tables)
+        self.default_label = default_label
+        self.model = model
+        self.smoothing = smoothing
+
+        self._labels_by_keyword: Dict[str, List[str]] = {}
+        for label, keywords in tables.items():
+            for keyword in keywords:
+                self._labels_by_keyword.setdefault(keyword.lower(), []).append(label)
+        self._automaton = KeywordAutomaton(self._labels_by_keyword)
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """Метка → найденные ключевые слова (в порядке меток таблицы)"""
+        found: Dict[str, List[str]] = {}
+        for keyword in sorted(self._automaton.matched(text)):
+            for label in self._labels_by_keyword[keyword]:
+                found.setdefault(label, []).append(keyword)
+        return {label: found[label] for label in self.labels if label in found}
+
+    def first_match(self, text: str) -> Optional[str]:
+        """Первая по порядку таблицы метка с совпадением (как цепочка if/elif)"""
+        return next(iter(self.match(text)), None)
+
+    def features(self, text: str, matches: Optional[Dict[str, List[str]]] = None) -> Dict[str, float]:
+        """Признаки для линейной модели: слова текста и найденные ключевые слова"""
+        if matches is None:
+            matches = self.match(text)
+        features: Dict[str, float] = {f"w:{word}": 1.0 for word in _WORD_RE.findall(text.lower())}
+        for keywords in matches.values():
+            for keyword in keywords:
+                features[f"k:{keyword}"] = 1.0
+        return features
+
+    def classify(self, text: str) -> TaskClassification:
+        """Метка и калиброванная уверенность"""
+        matches = self.match(text)
+        probabilities = self._keyword_probabilities(matches)
+        method = "keywords" if probabilities else "default"
+
+        # Модель усредняется с оценкой по ключевым словам, а без совпадений решает одна
+        if self.model is not None:
+            model_probabilities = self.model.predict_proba(self.features(text, matches))
+            if probabilities:
+                model_probabilities = {
+                    label: (probabilities[label] + model_probabilities.get(label, 0.0)) / 2
+                    for label in self.labels
+                }
+            probabilities, method = model_probabilities, "model"
+
+        if not probabilities:
+            return TaskClassification(self.default_label, 1.0 / max(len(self.labels), 1), method, matches)
+        label = max(self.labels, key=lambda l: probabilities.get(l, 0.0))
+        return TaskClassification(label, probabilities.get(label, 0.0), method, matches, probabilities)
+
+    def _keyword_probabilities(self, matches: Dict[str, List[str]]) -> Dict[str, float]:
+        """Сглаженная доля совпавших слов: (h + a) / (sum(h) + a * число меток)"""
+        if not matches:
+            return {}
+        hits = {label: len(set(keywords)) for label, keywords in matches.items()}
+        denominator = sum(hits.values()) + self.smoothing * len(self.labels)
+        return {label: (hits.get(label, 0) + self.smoothing) / denominator for label in self.labels}
+
+
+# ---------- история решений и офлайн обучение ----------
+
+def append_history(history_path: str, text: str, label: str, source: str = "llm"):
+    """Дописать размеченную задачу в историю (JSONL в vault)"""
+    path = Path(history_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    record = {"text": text, "label": label, "source": source, "timestamp": datetime.now().isoformat()}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def load_history(history_path: str) -> List[Tuple[str, str]]:
+    """(текст, метка) из истории; битые строки пропускаются"""
+    samples = []
+    try:
+        with open(history_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    samples.append((record["text"], record["label"]))
+                except (ValueError, KeyError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return samples
+
+
+def train_from_history(classifier: TaskClassifier, history_path: str,
+                       model_path: Optional[str] = None, **train_kwargs) -> Optional[LinearTaskModel]:
+    """Обучить линейную модель на истории и (если задан model_path) сохранить её"""
+    samples = load_history(history_path)
+    if not samples:
+        logger.info(f"🏷️ История классификации пуста: {history_path}")
+        return None
+    model = LinearTaskModel.train(
+        [(classifier.features(text), label) for text, label in samples],
+        classifier.labels, **train_kwargs
+    )
+    if model_path:
+        model.save(model_path)
+    logger.info(f"🏷️ Модель классификатора обучена: {model.trained_samples} примеров "
+                f"({dict(Counter(label for _, label in samples))})")
+    return model
@@ -0,0 +1,312 @@
+"""
+🔭 Tracing - Трассировка этапов выполнения KittyCore 3.0
+
+Спаны с отношением родитель-потомок и атрибутами:
+- Tracer.span() - контекстный менеджер для sync и async кода (текущий спан
+  хранится в contextvars, поэтому вложенность сохраняется через await
+  и asyncio.gather)
+- traced() - декоратор для функций и корутин
+- семплирование на уровне трассы: решение принимается в корневом спане
+  и наследуется всеми потомками (несемплированные спаны почти бесплатны)
+- завершённые спаны хранятся в ограниченном буфере
+
+Экспорт:
+- Chrome trace-event JSON (chrome://tracing, Perfetto)
+- OTLP/JSON (формат файлового экспортёра OpenTelemetry, одна строка на выгрузку)
+- сводка по именам спанов с перцентилями длительности (какой этап
+  определяет p99)
+
+Настройка через переменные окружения:
+- KITTYCORE_TRACE_SAMPLE_RATE - доля трасс (0.0-1.0, по умолчанию 1.0)
+- KITTYCORE_TRACE_MAX_SPANS - размер буфера спанов (по умолчанию 10000)
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from loguru import logger
+
+SERVICE_NAME = "kittycore"
+
+
+@dataclass
+class Span:
+    """Завершённый или выполняющийся спан"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: Optional[str] = None
+    thread_id: int = 0
+    sampled: bool = True
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        if self.sampled:
+            self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException):
+        if self.sampled:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("kittycore_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class Tracer:
+    """Трассировщик: создание спанов, буфер завершённых спанов и экспорт"""
+
+    def __init__(self, sample_rate: float = 1.0, max_spans: int = 10000, enabled: bool = True):
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+        self._spans: deque = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    @property
+    def max_spans(self) -> int:
+        return self._spans.maxlen
+
+    def configure(self, sample_rate: Optional[float] = None, max_spans: Optional[int] = None,
+                  enabled: Optional[bool] = None):
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, sample_rate))
+        if enabled is not None:
+            self.enabled = enabled
+        if max_spans is not None and max_spans != self._spans.maxlen:
+            with self._lock:
+                self._spans = deque(self._spans, maxlen=max_spans)
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def _start(self, name: str, attributes: Optional[Dict[str, Any]], root: bool) -> Span:
+        parent = None if root else _current_span.get()
+        if parent is not None:
+            sampled = parent.sampled
+            trace_id = parent.trace_id
+            parent_id = parent.span_id
+        else:
+            sampled = self.enabled and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+            trace_id = _new_id(128)
+            parent_id = None
+        return Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=_new_id(64),
+            parent_id=parent_id,
+            start_ns=time.time_ns(),
+            attributes=dict(attributes) if (sampled and attributes) else {},
+            thread_id=threading.get_ident(),
+            sampled=sampled
+        )
+
+    def _finish(self, span: Span):
+        span.end_ns = time.time_ns()
+        if span.sampled:
+            self._spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, root: bool = False) -> Iterator[Span]:
+        """
+        Спан вокруг блока кода
+
+        Исключение помечает спан как ошибочный и пробрасывается дальше.
+        root=True начинает новую трассу даже внутри другого спана.
+        """
+        span = self._start(name, attributes, root)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    # ---------- чтение и экспорт ----------
+
+    def get_spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        with self._lock:
+            spans = list(self._spans)
+        if trace_id is not None:
+            spans = [s for s in spans if s.trace_id == trace_id]
+        return spans
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def to_chrome_trace(self, spans: Optional[List[Span]] = None) -> Dict[str, Any]:
+        """События формата Chrome trace-event (ph=X, время в микросекундах)"""
+        spans = self.get_spans() if spans is None else spans
+        pid = os.getpid()
+        events = []
+        for span in spans:
+            args = dict(span.attributes)
+            args.update(trace_id=span.trace_id, span_id=span.span_id)
+            if span.parent_id:
+                args["parent_id"] = span.parent_id
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": ((span.end_ns or span.start_ns) - span.start_ns) / 1000,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": args
+            })
+        events.sort(key=lambda e: e["ts"])
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otlp(self, spans: Optional[List[Span]] = None) -> Dict[str, Any]:
+        """Запрос ExportTraceServiceRequest в JSON-кодировке OTLP"""
+        spans = self.get_spans() if spans is None else spans
+        otlp_spans = []
+        for span in spans:
+            item = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1}
+            }
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            otlp_spans.append(item)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                    {"key": "process.pid", "value": {"intValue": str(os.getpid())}}
+                ]},
+                "scopeSpans": [{"scope": {"name": "kittycore.tracing"}, "spans": otlp_spans}]
+            }]
+        }
+
+    def export_chrome_trace(self, path: Union[str, Path], spans: Optional[List[Span]] = None) -> str:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_chrome_trace(spans), ensure_ascii=False), encoding="utf-8")
+        logger.info(f"🔭 Chrome trace сохранён: {path}")
+        return str(path)
+
+    def export_otlp_json(self, path: Union[str, Path], spans: Optional[List[Span]] = None) -> str:
+        """Дописывает выгрузку в файл OTLP/JSON Lines (как файловый экспортёр OpenTelemetry)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_otlp(spans), ensure_ascii=False) + "\n")
+        logger.info(f"🔭 OTLP трассы сохранены: {path}")
+        return str(path)
+
+    def stage_breakdown(self, spans: Optional[List[Span]] = None) -> Dict[str, Dict[str, float]]:
+        """Длительности по именам спанов: число, сумма, среднее, p50/p95/p99 (мс)"""
+        spans = self.get_spans() if spans is None else spans
+        durations: Dict[str, List[float]] = {}
+        for span in spans:
+            durations.setdefault(span.name, []).append(span.duration_ms)
+        breakdown = {}
+        for name, values in durations.items():
+            values.sort()
+            breakdown[name] = {
+                "count": len(values),
+                "total_ms": sum(values),
+                "mean_ms": sum(values) / len(values),
+                "p50_ms": _percentile(values, 50),
+                "p95_ms": _percentile(values, 95),
+                "p99_ms": _percentile(values, 99),
+                "max_ms": values[-1]
+            }
+        return dict(sorted(breakdown.items(), key=lambda item: item[1]["total_ms"], reverse=True))
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+_tracer = Tracer(
+    sample_rate=_env_float("KITTYCORE_TRACE_SAMPLE_RATE", 1.0),
+    max_spans=int(_env_float("KITTYCORE_TRACE_MAX_SPANS", 10000))
+)
+
+
+def get_tracer() -> Tracer:
+    """Глобальный трассировщик процесса"""
+    return _tracer
+
+
+def traced(name: Optional[str] = None, **attributes: Any) -> Callable:
+    """Декоратор: оборачивает функцию или корутину в спан"""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _tracer.span(span_name, attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _tracer.span(span_name, attributes):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -14,11 +14,17 @@
 """
 
 import asyncio
+import contextvars
+import hashlib
 import json
 import os
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, Callable, Iterable, Iterator, List, Optional
 from pathlib import Path
 from dataclasses import dataclass
 
@@ -53,6 +59,10 @@ from ..agents.smart_validator import SmartValidator
 
 # 🐜 Импорт феромонной системы памяти
 from .pheromone_memory import get_pheromone_system, record_agent_success
+from .metrics_registry import ACTIVE_TASKS, record_cache_access
+from .plan_cache import CachedPlan, PlanCache
+from .task_classifier import TaskClassifier
+from .tracing import get_tracer
 
 
 @dataclass
@@ -77,6 +87,11 @@ class UnifiedConfig:
     enable_quality_control: bool = True
     enable_self_improvement: bool = True
     
+    # Кэш планов: анализ и декомпозиция похожих успешно решённых задач
+    enable_plan_cache: bool = True
+    plan_cache_similarity: float = 0.9  # минимальное сходство задач
+    plan_cache_min_quality: float = 0.8  # минимальная оценка валидации для сохранения плана
+    
     # Human-in-the-loop
     enable_human_intervention: bool = True
     intervention_timeout: int = 300  # 5 минут
@@ -92,7 +107,195 @@ class UnifiedConfig:
     vector_memory_path: str = "./vault/system/vector_memory"
     amem_memory_path: str = "./vault/system/amem_memory"  # 🧠 A-MEM хранилище
     metrics_storage_path: str = "./vault/system/metrics"
+    plan_cache_path: str = "./vault/system/plan_cache.json"
     logs_path: str = "./vault/system/logs"
+    
+    # Трассировка этапов: каталог для Chrome trace / OTLP файлов каждой задачи (None - не сохранять)
+    trace_export_path: Optional[str] = None
+    
+    # Пакетное выполнение (solve_many): число одновременно решаемых задач
+    batch_concurrency: int = 4
+    
+    # Потоки для проверки файлов, созданных шагами, во время выполнения workflow
+    validation_workers: int = 4
+    # Файлы больше порога проверяются по началу и концу (паттерны подделок - по всему файлу)
+    validation_max_bytes: int = 1024 * 1024
+    # Результаты проверки файлов по хэшу содержимого (доработка не перепроверяет неизменённые файлы)
+    validation_cache_size: int = 512
+
+
+@dataclass
+class _TaskScope:
+    """Изолированное окружение задачи в пакетном выполнении"""
+    owner: "UnifiedOrchestrator"
+    shared_chat: Optional[SharedChat]
+
+
+# Паттерны отчётов-подделок (см. _detect_fake_reports)
+_FAKE_REPORT_PATTERNS = (
+    # Общие паттерны отчётов
+    'Результат выполнения задачи',
+    'Задача обработана',
+    'Генерировано KittyCore',
+    'Создан файл с результатом',
+    'Отчёт о выполнении',
+    'Анализ задачи',
+    'Время создания:',
+    
+    # HTML отчёты в не-HTML файлах
+    '<div class="header">',
+    '<div class="content">',
+    '<div class="footer">',
+    'Генерировано KittyCore 3.0 🐱',
+    
+    # Шаблонные фразы
+    'TODO: Реализовать логику',
+    'Задача успешно обработана',
+    'с использованием LLM-интеллекта',
+    'интеллектуальным агентом',
+    
+    # Мета-информация вместо контента
+    'Контент для:',
+    'Описание: Создан файл',
+    'Выполнено интеллектуальным агентом',
+    
+    # НОВЫЕ ПАТТЕРНЫ ЗАГЛУШЕК
+    'первое приложение',
+    'второе приложение', 
+    'третье приложение',
+    'opis первого приложения',
+    'opis второго приложения',
+    'первая проблема',
+    'вторая проблема',
+    'Составить отчет о топ-приложениях',
+    'Составить отчёт о топ-приложениях',
+    'найдя все существующие приложения',
+    'В этом файле находятся прототипы',
+    'Анализ сложности реализации popularных приложений'
+)
+_FAKE_REPORT_PATTERNS_BYTES = tuple((pattern, pattern.encode('utf-8')) for pattern in _FAKE_REPORT_PATTERNS)
+# Хвост предыдущего блока, с которым склеивается следующий: паттерн на стыке блоков не теряется
+_FAKE_PATTERN_OVERLAP = max(len(encoded) for _, encoded in _FAKE_REPORT_PATTERNS_BYTES) - 1
+
+# Файлы шагов читаются блоками ограниченного размера, а не через mmap: их могут
+# переписывать следующие шаги workflow, а чтение отображения усечённого файла
+# завершает процесс сигналом SIGBUS, который не перехватить как исключение
+_FILE_READ_CHUNK = 1024 * 1024
+
+
+def _file_digest(f) -> str:
+    """Хэш содержимого файла, потоково по блокам"""
+    digest = hashlib.blake2b(digest_size=16)
+    f.seek(0)
+    for chunk in iter(lambda: f.read(_FILE_READ_CHUNK), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _find_fake_patterns(f) -> List[str]:
+    """Паттерны подделок, найденные в файле (поиск по блокам с перекрытием)"""
+    remaining = {encoded: pattern for pattern, encoded in _FAKE_REPORT_PATTERNS_BYTES}
+    found = set()
+    carry = b""
+    f.seek(0)
+    for chunk in iter(lambda: f.read(_FILE_READ_CHUNK), b""):
+        window = carry + chunk
+        for encoded in [encoded for encoded in remaining if encoded in window]:
+            found.add(remaining.pop(encoded))
+        if not remaining:
+            break
+        carry = window[-_FAKE_PATTERN_OVERLAP:]
+    return [pattern for pattern in _FAKE_REPORT_PATTERNS if pattern in found]
+
+
+def _sample_text(f, max_bytes: int) -> tuple:
+    """Текст файла целиком или начало + конец для больших файлов: (текст, сокращён ли)"""
+    f.seek(0)
+    data = f.read(max_bytes + 1)
+    if len(data) <= max_bytes:
+        return data.decode('utf-8', errors='ignore'), False
+    half = max_bytes // 2
+    head = data[:half].decode('utf-8', errors='ignore')
+    f.seek(0, os.SEEK_END)
+    f.seek(max(f.tell() - half, 0))
+    tail = f.read(half).decode('utf-8', errors='ignore')
+    return f"{head}\n...\n{tail}", True
+
+
+# Тип задачи для феромонной системы (порядок - приоритет: побеждает первая метка с совпадением)
+_TASK_TYPE_CLASSIFIER = TaskClassifier({
+    "web_development": ['сайт', 'веб', 'html', 'приложение', 'интерфейс'],
+    "programming": ['код', 'программа', 'скрипт', 'функция', 'алгоритм'],
+    "data_analysis": ['анализ', 'данные', 'статистика', 'исследование'],
+    "documentation": ['отчет', 'документ', 'описание', 'инструкция'],
+    "design": ['дизайн', 'макет', 'прототип', 'ui', 'ux'],
+    "automation": ['автоматизация', 'бот', 'скрипт', 'процесс'],
+    "testing": ['тест', 'проверка', 'валидация', 'качество']
+}, default_label="general")
+
+
+def _file_signature(file_path: str) -> Optional[tuple]:
+    """Размер и время изменения файла (None - файла нет)"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class _StreamingFileChecks:
+    """
+    Проверки файлов, запущенные по мере завершения шагов workflow
+    
+    Каждый файл шага сразу отправляется в пул потоков; шаг, в файлах которого
+    найдены подделки или невалидное содержимое, попадает в failed_steps
+    (кандидаты на доработку) ещё до окончания выполнения.
+    """
+    
+    def __init__(self, check: Callable[[str], Dict[str, Any]], executor: ThreadPoolExecutor):
+        self._check = check
+        self._executor = executor
+        self._loop = asyncio.get_running_loop()
+        self._futures: Dict[str, asyncio.Future] = {}
+        self.failed_steps: Dict[str, List[str]] = {}
+    
+    def on_step_complete(self, step_id: str, step_result: Dict[str, Any]):
+        files = [f for f in (step_result.get('files_created') or step_result.get('created_files') or []) if f]
+        step_futures = []
+        for file_path in files:
+            # Повторная запись файла более поздним шагом - проверяем заново
+            future = self._loop.run_in_executor(self._executor, self._check, file_path)
+            self._futures[file_path] = future
+            step_futures.append(future)
+        if step_futures:
+            asyncio.gather(*step_futures, return_exceptions=True).add_done_callback(
+                lambda done: self._record_step(step_id, done)
+            )
+    
+    def _record_step(self, step_id: str, done: asyncio.Future):
+        if done.cancelled():
+            return
+        issues = []
+        for check in done.result():
+            if isinstance(check, dict):
+                issues.extend(check.get('issues', []))
+        if issues:
+            self.failed_steps[step_id] = issues
+            logger.warning(f"⚠️ Шаг {step_id} требует доработки: {issues[0]}")
+    
+    async def results(self) -> Dict[str, Dict[str, Any]]:
+        """Дождаться запущенных проверок: путь файла → результат проверки"""
+        if not self._futures:
+            return {}
+        paths = list(self._futures)
+        checks = await asyncio.gather(*(self._futures[p] for p in paths), return_exceptions=True)
+        return {path: check for path, check in zip(paths, checks) if isinstance(check, dict)}
+
+
+# Окружение текущей задачи; у каждой asyncio-задачи своя копия контекста
+_task_scope: contextvars.ContextVar[Optional[_TaskScope]] = contextvars.ContextVar(
+    "kittycore_task_scope", default=None
+)
 
 
 class UnifiedOrchestrator:
@@ -131,9 +334,26 @@ class UnifiedOrchestrator:
         self.agents_created = 0
         self.workflows_executed = 0
         
+        self._batch_counter = 0
+        self._validation_executor: Optional[ThreadPoolExecutor] = None
+        self._file_check_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._file_check_lock = threading.Lock()
+        
         logger.info(f"🧭 UnifiedOrchestrator инициализирован")
         logger.info(f"📁 Единое хранилище: {self.config.vault_path}")
     
+    @property
+    def shared_chat(self) -> Optional[SharedChat]:
+        """Чат текущей задачи пакета, иначе общий чат оркестратора"""
+        scope = _task_scope.get()
+        if scope is not None and scope.owner is self:
+            return scope.shared_chat
+        return self._shared_chat
+    
+    @shared_chat.setter
+    def shared_chat(self, chat: Optional[SharedChat]):
+        self._shared_chat = chat
+    
     def _setup_unified_storage(self):
         """Настройка единого Obsidian-совместимого хранилища"""
         vault_path = Path(self.config.vault_path)
@@ -204,6 +424,17 @@ class UnifiedOrchestrator:
         else:
             self.vector_store = None
         
+        # Кэш планов
+        if self.config.enable_plan_cache:
+            self.plan_cache = PlanCache(
+                storage_path=self.config.plan_cache_path,
+                similarity_threshold=self.config.plan_cache_similarity,
+                min_quality=self.config.plan_cache_min_quality
+            )
+            logger.info("🗂️ Кэш планов активирован")
+        else:
+            self.plan_cache = None
+        
         # A-MEM Enhanced Memory (революционная агентная память)
         if self.config.enable_amem_memory:
             # Создаём путь для A-MEM
@@ -295,6 +526,145 @@ class UnifiedOrchestrator:
         9. Обновление статистики и обучение
         10. Возврат результата с путями к файлам
         """
+        tracer = get_tracer()
+        with ACTIVE_TASKS.track_inprogress(), tracer.span("solve_task", {"task.length": len(task)}) as span:
+            result = await self._solve_task(task, context)
+            span.set_attributes({"task.id": str(result.get("task_id")), "task.status": result.get("status", "")})
+        
+        if self.config.trace_export_path and span.sampled:
+            spans = tracer.get_spans(span.trace_id)
+            trace_dir = Path(self.config.trace_export_path)
+            tracer.export_chrome_trace(trace_dir / f"trace_{result.get('task_id') or span.trace_id}.json", spans)
+            tracer.export_otlp_json(trace_dir / "traces.otlp.jsonl", spans)
+        return result
+    
+    async def solve_many(self, tasks: Iterable[str], concurrency: Optional[int] = None,
+                         context: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        """
+        📦 Пакетное решение задач
+        
+        Результаты в порядке входных задач; подробности - в solve_iter.
+        """
+        results = [result async for result in self.solve_iter(tasks, concurrency, context)]
+        results.sort(key=lambda result: result["batch_index"])
+        return results
+    
+    async def solve_iter(self, tasks: Iterable[str], concurrency: Optional[int] = None,
+                         context: Optional[Dict] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        📦 Пакетное решение задач с выдачей результатов по мере готовности
+        
+        Одновременно решается не больше concurrency задач (по умолчанию
+        config.batch_concurrency); задачи читаются из итератора лениво, поэтому
+        пакет может содержать тысячи задач. Задачи решаются через solve_one:
+        у каждой свой SharedChat и свои рабочие пространства агентов, а LLM провайдер, хранилище,
+        индексы и кэши общие. Ошибка задачи не прерывает пакет: результат
+        получает статус "failed". В каждом результате batch_index - номер
+        задачи во входной последовательности.
+        
+        Синхронные вызовы LLM провайдера выполняются в потоках
+        (asyncio.to_thread), поэтому задачи пакета ждут ответов LLM параллельно;
+        OpenRouterProvider при этом по-прежнему выдерживает min_request_interval
+        между началами запросов.
+        """
+        concurrency = max(1, concurrency or self.config.batch_concurrency)
+        pending = iter(enumerate(tasks))
+        results: asyncio.Queue = asyncio.Queue()
+        
+        async def worker():
+            for index, task in pending:
+                await results.put(await self._solve_in_scope(index, task, context))
+        
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        remaining = len(workers)
+        for worker_task in workers:
+            # Завершившийся воркер сам попадает в очередь как маркер
+            worker_task.add_done_callback(results.put_nowait)
+        
+        try:
+            while remaining:
+                result = await results.get()
+                if isinstance(result, asyncio.Task):
+                    remaining -= 1
+                    if not result.cancelled() and result.exception() is not None:
+                        raise result.exception()
+                    continue
+                yield result
+        finally:
+            for worker_task in workers:
+                worker_task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    
+    async def solve_one(self, task: str, context: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        🎯 Решение задачи в собственном окружении
+        
+        Как solve_task, но со своим SharedChat и своими id и рабочими
+        пространствами агентов - для задач, которые решаются одновременно на
+        одном оркестраторе (solve_iter, очередь задач веб-сервера).
+        Ошибки задачи пробрасываются.
+        """
+        self._batch_counter += 1
+        chat = None
+        if self._shared_chat is not None:
+            chat = SharedChat(
+                team_id=f"team_{self.config.orchestrator_id}_{self._batch_counter}",
+                collective_memory=self.collective_memory
+            )
+            if self.amem_system:
+                chat.amem_system = self.amem_system
+            chat.register_agent(
+                agent_id=self.config.orchestrator_id,
+                agent_role="Orchestrator",
+                is_coordinator=True
+            )
+        
+        token = _task_scope.set(_TaskScope(owner=self, shared_chat=chat))
+        try:
+            return await self.solve_task(task, dict(context) if context else None)
+        finally:
+            if chat is not None:
+                await chat.flush()
+            _task_scope.reset(token)
+    
+    async def _solve_in_scope(self, index: int, task: str, context: Optional[Dict]) -> Dict[str, Any]:
+        """Решение одной задачи пакета: ошибка становится результатом со статусом failed"""
+        try:
+            result = await self.solve_one(task, context)
+        except Exception as e:
+            logger.error(f"❌ Задача пакета #{index} завершилась ошибкой: {e}")
+            result = {
+                "task": task,
+                "task_id": None,
+                "status": "failed",
+                "error": str(e),
+                "completed_at": datetime.now().isoformat()
+            }
+        
+        result["batch_index"] = index
+        return result
+    
+    @contextmanager
+    def _stage(self, name: str, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Iterator[Any]:
+        """
+        Спан этапа решения задачи
+        
+        progress (context['progress_callback'] в solve_task) получает события
+        начала и завершения этапа - так очередь задач веб-сервера сообщает о ходе выполнения.
+        После этапа накопленные изменения заметок задач сохраняются одной записью.
+        """
+        with get_tracer().span(name) as span:
+            if progress:
+                progress({"stage": name, "state": "started"})
+            yield span
+            self.task_manager.flush()
+        if progress:
+            progress({"stage": name, "state": "completed", "duration_ms": round(span.duration_ms, 1)})
+    
+    async def _solve_task(self, task: str, context: Optional[Dict] = None) -> Dict[str, Any]:
+        """Решение задачи (см. solve_task); каждый этап - отдельный спан"""
+        progress = context.get('progress_callback') if context else None
+        stage = lambda name: self._stage(name, progress)
         start_time = datetime.now()
         logger.info(f"🚀 Запуск UnifiedOrchestrator для задачи: {task[:100]}...")
         
@@ -331,11 +701,18 @@ class UnifiedOrchestrator:
         
         try:
             # ЭТАП 1: Создание задачи в едином хранилище
-            task_id = self.task_manager.create_task(task, context.get('user_id') if context else None)
+            with stage("stage.create_task"):
+                task_id = self.task_manager.create_task(task, context.get('user_id') if context else None)
             logger.info(f"📋 Задача создана: {task_id}")
             
-            # ЭТАП 2: Анализ сложности
-            complexity_analysis = await self._analyze_task_with_storage(task, task_id)
+            # ЭТАП 2: Анализ сложности (план похожей задачи - без анализа и декомпозиции через LLM)
+            with stage("stage.analysis") as span:
+                cached_plan = self.plan_cache.lookup(task) if self.plan_cache is not None else None
+                complexity_analysis = await self._analyze_task_with_storage(task, task_id, cached_plan)
+                span.set_attributes({
+                    "complexity": str(complexity_analysis.get('complexity')),
+                    "plan_cache_hit": cached_plan is not None
+                })
             logger.info(f"📊 Анализ: {complexity_analysis['complexity']} ({complexity_analysis['estimated_agents']} агентов)")
             
             # Начинаем отслеживание метрик
@@ -348,74 +725,89 @@ class UnifiedOrchestrator:
                 )
             
             # ЭТАП 3: Проверка необходимости человеческого вмешательства
-            if await self._check_human_intervention_needed(task, complexity_analysis):
-                intervention_result = await self._request_human_guidance(task, complexity_analysis)
-                if intervention_result.get('modified_task'):
-                    task = intervention_result['modified_task']
-                    logger.info(f"👤 Задача скорректирована человеком")
+            with stage("stage.intervention_check"):
+                if await self._check_human_intervention_needed(task, complexity_analysis):
+                    intervention_result = await self._request_human_guidance(task, complexity_analysis)
+                    if intervention_result.get('modified_task'):
+                        task = intervention_result['modified_task']
+                        cached_plan = None
+                        logger.info(f"👤 Задача скорректирована человеком")
             
             # ЭТАП 4: Декомпозиция и планирование
-            subtasks = await self._decompose_task_with_storage(task, complexity_analysis, task_id)
+            with stage("stage.decomposition") as span:
+                subtasks = await self._decompose_task_with_storage(task, complexity_analysis, task_id, cached_plan)
+                span.set_attribute("subtasks", len(subtasks))
             logger.info(f"🔄 Декомпозиция: {len(subtasks)} подзадач")
             
             # ЭТАП 5: Создание команды агентов
-            agents = await self._create_agent_team(subtasks, task_id)
+            with stage("stage.team_creation") as span:
+                agents = await self._create_agent_team(subtasks, task_id)
+                span.set_attribute("agents", len(agents))
             logger.info(f"🤖 Создано агентов: {len(agents)}")
             
             # ЭТАП 6: Выполнение с координацией
-            execution_result = await self._execute_with_unified_coordination(agents, subtasks, task, task_id)
+            with stage("stage.execution") as span:
+                execution_result = await self._execute_with_unified_coordination(agents, subtasks, task, task_id)
+                span.set_attribute("status", str(execution_result.get('status')))
             logger.info(f"⚡ Выполнение завершено: {execution_result['status']}")
             
             # ЭТАП 7: Валидация результатов
             # Добавляем анализ задачи в execution_result для валидации
             execution_result['task_analysis'] = complexity_analysis
-            validation_result = await self._validate_results(task, execution_result)
+            with stage("stage.validation") as span:
+                validation_result = await self._validate_results(task, execution_result)
+                span.set_attribute("quality_score", float(validation_result.get('quality_score', 0) or 0))
             logger.info(f"✅ Валидация: {validation_result.get('quality_score', 0):.2f}")
+            self._update_plan_cache(task, complexity_analysis, subtasks, validation_result, cached_plan)
             
             # ЭТАП 8: Агрегация и финализация
-            final_result = await self._finalize_task_results(task_id, execution_result, validation_result)
+            with stage("stage.finalization"):
+                final_result = await self._finalize_task_results(task_id, execution_result, validation_result)
             
             # ЭТАП 9: Обновление статистики и обучение
-            await self._update_learning_systems(task, final_result, start_time)
+            with stage("stage.learning"):
+                await self._update_learning_systems(task, final_result, start_time)
             
             # ЭТАП 10: Завершение отслеживания метрик
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
             
             # Сохраняем успешные решения в векторную память
-            if self.vector_store and validation_result.get('quality_score', 0) >= 0.7:
-                solution_summary = self._create_solution_summary(final_result)
+            with stage("stage.vector_store"):
+                if self.vector_store and validation_result.get('quality_score', 0) >= 0.7:
+                    solution_summary = self._create_solution_summary(final_result)
                 
-                self.vector_store.add_task_solution(
-                    task_id=task_id,
-                    task_description=task,
-                    solution=solution_summary,
-                    success_score=validation_result.get('quality_score', 0.0),
-                    metadata={
-                        'task_type': complexity_analysis.get('task_type', 'general'),
-                        'complexity_score': complexity_analysis['complexity'],
-                        'agents_used': len(agents),
-                        'duration_seconds': duration,
-                        'files_created': len(final_result.get('created_files', []))
-                    }
-                )
+                    self.vector_store.add_task_solution(
+                        task_id=task_id,
+                        task_description=task,
+                        solution=solution_summary,
+                        success_score=validation_result.get('quality_score', 0.0),
+                        metadata={
+                            'task_type': complexity_analysis.get('task_type', 'general'),
+                            'complexity_score': complexity_analysis['complexity'],
+                            'agents_used': len(agents),
+                            'duration_seconds': duration,
+                            'files_created': len(final_result.get('created_files', []))
+                        }
+                    )
             self.tasks_processed += 1
             
             # Завершаем отслеживание метрик
-            if self.metrics_collector and task_metrics:
-                self.metrics_collector.finish_task_tracking(
-                    task_id=task_id,
-                    agents_created=len(agents),
-                    agents_succeeded=sum(1 for agent_data in agents.values() 
-                                       if agent_data.get('status') == 'completed'),
-                    agents_failed=sum(1 for agent_data in agents.values() 
-                                    if agent_data.get('status') == 'failed'),
-                    quality_score=validation_result.get('quality_score', 0.0),
-                    validation_passed=validation_result.get('quality_score', 0) >= 0.7,
-                    rework_required=validation_result.get('quality_score', 0) < 0.7,
-                    files_created=len(final_result.get('created_files', [])),
-                    human_interventions=final_result.get('human_interventions', 0)
-                )
+            with stage("stage.metrics"):
+                if self.metrics_collector and task_metrics:
+                    self.metrics_collector.finish_task_tracking(
+                        task_id=task_id,
+                        agents_created=len(agents),
+                        agents_succeeded=sum(1 for agent_data in agents.values() 
+                                           if agent_data.get('status') == 'completed'),
+                        agents_failed=sum(1 for agent_data in agents.values() 
+                                        if agent_data.get('status') == 'failed'),
+                        quality_score=validation_result.get('quality_score', 0.0),
+                        validation_passed=validation_result.get('quality_score', 0) >= 0.7,
+                        rework_required=validation_result.get('quality_score', 0) < 0.7,
+                        files_created=len(final_result.get('created_files', [])),
+                        human_interventions=final_result.get('human_interventions', 0)
+                    )
             
             result = {
                 "task": task,
@@ -437,6 +829,7 @@ class UnifiedOrchestrator:
                 "subtasks": subtasks,
                 "validation": validation_result,
                 "agents_created": len(agents),
+                "plan_reused": cached_plan is not None,
                 
                 # Метрики производительности
                 "metrics": self.metrics_collector.get_current_stats() if self.metrics_collector else None,
@@ -496,14 +889,22 @@ class UnifiedOrchestrator:
     
     # === РЕАЛИЗАЦИЯ ВСПОМОГАТЕЛЬНЫХ МЕТОДОВ ===
     
-    async def _analyze_task_with_storage(self, task: str, task_id: str) -> Dict[str, Any]:
+    async def _analyze_task_with_storage(self, task: str, task_id: str,
+                                         cached_plan: Optional[CachedPlan] = None) -> Dict[str, Any]:
         """Анализ задачи с сохранением в хранилище"""
-        # Используем базовый анализатор
-        analysis = self.task_analyzer.analyze_task_complexity(task)
-        
-        # НОВОЕ: Извлекаем образ конечного результата
-        expected_outcome = await self._extract_expected_outcome(task)
-        analysis['expected_outcome'] = expected_outcome
+        if cached_plan:
+            # Анализ сложности берётся из плана похожей задачи, а образ результата -
+            # от новой задачи: по нему валидируется именно она
+            analysis = cached_plan.analysis
+            expected_outcome = await self._extract_expected_outcome(task)
+            analysis['expected_outcome'] = expected_outcome
+        else:
+            # Используем базовый анализатор
+            analysis = await asyncio.to_thread(self.task_analyzer.analyze_task_complexity, task)
+            
+            # НОВОЕ: Извлекаем образ конечного результата
+            expected_outcome = await self._extract_expected_outcome(task)
+            analysis['expected_outcome'] = expected_outcome
         
         # Сохраняем анализ в ObsidianDB
         analysis_note = ObsidianNote(
@@ -585,7 +986,7 @@ class UnifiedOrchestrator:
 Будь конкретным и практичным. Фокусируйся на реальной пользе для пользователя."""
 
             # Отправляем запрос к LLM
-            llm_response = self.task_analyzer.llm.complete(pm_prompt)
+            llm_response = await asyncio.to_thread(self.task_analyzer.llm.complete, pm_prompt)
             
             # Парсим ответ LLM
             import json
@@ -1053,12 +1454,27 @@ class UnifiedOrchestrator:
             logger.error(f"❌ Ошибка обработки вмешательства: {e}")
             return {"approved": False, "error": str(e)}
     
+    def _update_plan_cache(self, task: str, analysis: Dict, subtasks: List[Dict],
+                           validation_result: Dict, cached_plan: Optional[CachedPlan]) -> None:
+        """Сохранение удачного плана в кэш или удаление повторно использованного неудачного"""
+        if self.plan_cache is None:
+            return
+        quality_score = validation_result.get('quality_score', 0) or 0
+        if cached_plan is None:
+            self.plan_cache.store(task, analysis, subtasks, quality_score)
+        elif quality_score < 0.7:
+            self.plan_cache.invalidate(cached_plan.entry_id, f"оценка {quality_score:.2f}")
+    
     # === ОСТАЛЬНЫЕ МЕТОДЫ (ЗАГЛУШКИ ДЛЯ СЛЕДУЮЩИХ ЧАСТЕЙ) ===
     
-    async def _decompose_task_with_storage(self, task: str, analysis: Dict, task_id: str) -> List[Dict[str, Any]]:
+    async def _decompose_task_with_storage(self, task: str, analysis: Dict, task_id: str,
+                                           cached_plan: Optional[CachedPlan] = None) -> List[Dict[str, Any]]:
         """Декомпозиция задачи с сохранением в хранилище"""
-        # Используем базовый декомпозер
-        subtasks = self.task_decomposer.decompose_task(task, analysis['complexity'])
+        if cached_plan:
+            subtasks = cached_plan.subtasks
+        else:
+            # Используем базовый декомпозер
+            subtasks = await asyncio.to_thread(self.task_decomposer.decompose_task, task, analysis['complexity'])
         
         # Создаём граф workflow для визуализации
         workflow_graph = None
@@ -1227,7 +1643,11 @@ class UnifiedOrchestrator:
             
             # Создаём IntellectualAgent
             agent = IntellectualAgent(agent_role, subtask)
-            agent_id = f"agent_{subtask_id}"
+            # В пакете агенты разных задач не должны делить рабочие пространства
+            if _task_scope.get() is not None:
+                agent_id = f"agent_{task_id}_{subtask_id}"
+            else:
+                agent_id = f"agent_{subtask_id}"
             agents[agent_id] = agent
             
             # Создаём рабочее пространство агента в ObsidianDB
@@ -1522,9 +1942,12 @@ class UnifiedOrchestrator:
                 }
             )
         
-        # Выполняем через базовый ExecutionManager
+        # Выполняем через базовый ExecutionManager; файлы шагов проверяются по ходу выполнения
+        file_checks = _StreamingFileChecks(lambda path: self._check_file(path, task), self._get_validation_executor())
         try:
-            execution_result = await self.execution_manager.execute_workflow(workflow, team)
+            execution_result = await self.execution_manager.execute_workflow(
+                workflow, team, on_step_complete=file_checks.on_step_complete
+            )
             
             # Обновляем статус выполнения
             success_count = len([r for r in execution_result.get('results', []) if r.get('success', False)])
@@ -1590,6 +2013,10 @@ class UnifiedOrchestrator:
                 "workflow": workflow
             }
         
+        execution_result['file_checks'] = await file_checks.results()
+        if file_checks.failed_steps:
+            execution_result['early_rework'] = dict(file_checks.failed_steps)
+        
         # Уведомляем о завершении
         if self.shared_chat:
             success_count = len([r for r in execution_result.get('results', []) if r.get('success', False)])
@@ -1796,6 +2223,9 @@ class UnifiedOrchestrator:
             needs_rework = validation_result['quality_score'] < 0.7
             validation_result['needs_rework'] = needs_rework
             
+            if execution_result.get('early_rework'):
+                validation_result['rework_steps'] = list(execution_result['early_rework'])
+            
             if needs_rework:
                 logger.warning(f"⚠️ Результат требует доработки: {validation_result['quality_score']:.2f}")
                 validation_result['rework_reasons'] = await self._identify_rework_reasons(
@@ -1972,7 +2402,9 @@ class UnifiedOrchestrator:
             validation_details.append(f"✅ Создано файлов: {len(created_files)}")
             
             # НОВОЕ: Проверяем содержимое файлов
-            content_validation = await self._validate_file_contents(created_files, task, expected_outcome)
+            content_validation = await self._validate_file_contents(
+                created_files, task, expected_outcome, execution_result.get('file_checks')
+            )
             validation_score += content_validation['score_bonus']
             validation_details.extend(content_validation['details'])
             issues.extend(content_validation['issues'])
@@ -1987,12 +2419,16 @@ class UnifiedOrchestrator:
             'meets_requirements': validation_score >= 0.7
         }
     
-    async def _validate_file_contents(self, created_files: List[str], task: str, expected_outcome: Dict) -> Dict[str, Any]:
+    async def _validate_file_contents(self, created_files: List[str], task: str, expected_outcome: Dict,
+                                      precomputed: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         РЕВОЛЮЦИОННАЯ валидация содержимого файлов - ПРЕВОСХОДИТ ВСЕ СИСТЕМЫ!
         
         Проверяет что файлы содержат РЕАЛЬНЫЙ контент, а не отчёты под нужными расширениями.
         НОВИНКА: ЖЁСТКИЕ ШТРАФЫ за поддельные отчёты!
+        
+        precomputed - проверки, выполненные во время workflow (_StreamingFileChecks);
+        повторно проверяются только новые и изменившиеся с тех пор файлы.
         """
         score_bonus = 0.0
         details = []
@@ -2000,43 +2436,48 @@ class UnifiedOrchestrator:
         fake_files_count = 0
         total_files_count = 0
         
+        precomputed = precomputed or {}
+        checks = {}
+        missing = []
         for file_path in created_files:
-            try:
-                # Читаем содержимое файла
-                if os.path.exists(file_path):
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                else:
-                    issues.append(f"❌ Файл не найден: {file_path}")
-                    continue
-                
-                total_files_count += 1
-                
-                # Определяем ожидаемый тип содержимого по расширению
-                file_ext = os.path.splitext(file_path)[1].lower()
-                content_check = self._check_content_by_extension(file_path, content, file_ext, task)
-                
-                # СНАЧАЛА проверяем на подделки - ЭТО ПРИОРИТЕТ!
-                fake_report_check = self._detect_fake_reports(content, file_path, task)
-                if fake_report_check['is_fake']:
-                    fake_files_count += 1
-                    issues.append(f"🚨 ПОДДЕЛКА: {file_path}: {fake_report_check['reason']}")
-                    # ЖЁСТКИЙ ШТРАФ за подделку - минус от базового балла!
-                    score_bonus -= 0.25  # Каждая подделка = -25% от базового балла
-                    continue  # Не даём бонусы за поддельные файлы!
-                
-                # Только если файл НЕ подделка - проверяем содержимое
-                if content_check['is_valid']:
-                    score_bonus += content_check['bonus']
-                    details.append(f"✅ {file_path}: {content_check['reason']}")
-                else:
-                    issues.append(f"❌ {file_path}: {content_check['reason']}")
-                    score_bonus -= 0.05  # Малый штраф за невалидное содержимое
-                
-                details.append(f"✅ {file_path}: содержимое аутентично")
-                
-            except Exception as e:
-                issues.append(f"❌ Ошибка чтения {file_path}: {e}")
+            check = precomputed.get(file_path)
+            if check is not None and check.get('signature') == _file_signature(file_path):
+                checks[file_path] = check
+            else:
+                missing.append(file_path)
+        if missing:
+            loop = asyncio.get_running_loop()
+            executor = self._get_validation_executor()
+            fresh = await asyncio.gather(*(loop.run_in_executor(executor, self._check_file, path, task)
+                                           for path in missing))
+            checks.update(zip(missing, fresh))
+        
+        for file_path in created_files:
+            check = checks[file_path]
+            if check.get('error'):
+                issues.append(check['error'])
+                continue
+            
+            total_files_count += 1
+            
+            # СНАЧАЛА проверяем на подделки - ЭТО ПРИОРИТЕТ!
+            if check['is_fake']:
+                fake_files_count += 1
+                issues.extend(check['issues'])
+                # ЖЁСТКИЙ ШТРАФ за подделку - минус от базового балла!
+                score_bonus -= 0.25  # Каждая подделка = -25% от базового балла
+                continue  # Не даём бонусы за поддельные файлы!
+            
+            # Только если файл НЕ подделка - проверяем содержимое
+            content_check = check['content_check']
+            if content_check['is_valid']:
+                score_bonus += content_check['bonus']
+                details.append(f"✅ {file_path}: {content_check['reason']}")
+            else:
+                issues.extend(check['issues'])
+                score_bonus -= 0.05  # Малый штраф за невалидное содержимое
+            
+            details.append(f"✅ {file_path}: содержимое аутентично")
         
         # КРИТИЧЕСКАЯ ЛОГИКА: Если много подделок - результат провален!
         fake_ratio = fake_files_count / max(total_files_count, 1)
@@ -2057,6 +2498,75 @@ class UnifiedOrchestrator:
             'fake_ratio': fake_ratio
         }
     
+    def _check_file(self, file_path: str, task: str) -> Dict[str, Any]:
+        """
+        Синтаксическая проверка одного файла (выполняется в пуле потоков)
+        
+        Файл читается блоками: паттерны подделок ищутся по всему файлу,
+        а проверки содержимого для файлов больше validation_max_bytes идут
+        по началу и концу. Результат кэшируется по хэшу содержимого.
+        signature (размер и время изменения) позволяет понять, что файл
+        не менялся с момента проверки.
+        """
+        signature = _file_signature(file_path)
+        if signature is None:
+            return {'signature': None, 'error': f"❌ Файл не найден: {file_path}", 'issues': []}
+        try:
+            file_ext = os.path.splitext(file_path)[1].lower()
+            with open(file_path, 'rb') as f:
+                cache_key = (file_path, task, _file_digest(f))
+                with self._file_check_lock:
+                    cached = self._file_check_cache.get(cache_key)
+                    if cached is not None:
+                        self._file_check_cache.move_to_end(cache_key)
+                record_cache_access("file_validation", cached is not None)
+                if cached is not None:
+                    return {**cached, 'signature': signature}
+                
+                content, sampled = _sample_text(f, self.config.validation_max_bytes)
+                found_patterns = _find_fake_patterns(f)
+            
+            content_check = self._check_content_by_extension(file_path, content, file_ext, task)
+            if sampled and file_ext == '.json':
+                content_check = self._check_sampled_json(content)
+            fake_report_check = self._detect_fake_reports(content, file_path, task, found_patterns)
+        except Exception as e:
+            return {'signature': signature, 'error': f"❌ Ошибка чтения {file_path}: {e}", 'issues': []}
+        
+        issues = []
+        if fake_report_check['is_fake']:
+            issues.append(f"🚨 ПОДДЕЛКА: {file_path}: {fake_report_check['reason']}")
+        elif not content_check['is_valid']:
+            issues.append(f"❌ {file_path}: {content_check['reason']}")
+        
+        check = {
+            'error': None,
+            'is_fake': fake_report_check['is_fake'],
+            'content_check': content_check,
+            'issues': issues,
+            'sampled': sampled
+        }
+        with self._file_check_lock:
+            self._file_check_cache[cache_key] = check
+            while len(self._file_check_cache) > self.config.validation_cache_size:
+                self._file_check_cache.popitem(last=False)
+        return {**check, 'signature': signature}
+    
+    @staticmethod
+    def _check_sampled_json(content: str) -> Dict[str, Any]:
+        """JSON больше validation_max_bytes: целиком не разбирается, проверяются начало и конец"""
+        head, _, tail = content.partition("\n...\n")
+        if head.lstrip()[:1] in ('{', '[') and tail.rstrip()[-1:] in ('}', ']'):
+            return {'is_valid': True, 'bonus': 0.1, 'reason': 'JSON (проверены начало и конец файла)'}
+        return {'is_valid': False, 'bonus': 0, 'reason': 'не является валидным JSON'}
+    
+    def _get_validation_executor(self) -> ThreadPoolExecutor:
+        if self._validation_executor is None:
+            self._validation_executor = ThreadPoolExecutor(
+                max_workers=self.config.validation_workers, thread_name_prefix="kittycore-validation"
+            )
+        return self._validation_executor
+    
     def _check_content_by_extension(self, file_path: str, content: str, file_ext: str, task: str) -> Dict[str, Any]:
         """Проверка соответствия содержимого расширению файла"""
         
@@ -2162,61 +2672,20 @@ class UnifiedOrchestrator:
         except:
             return False
     
-    def _detect_fake_reports(self, content: str, file_path: str, task: str) -> Dict[str, Any]:
+    def _detect_fake_reports(self, content: str, file_path: str, task: str,
+                             found_patterns: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Детектор отчётов-подделок - УНИКАЛЬНАЯ ФИЧА KITTYCORE!
         
         Обнаруживает когда агенты создают отчёты под видом реального контента.
+        found_patterns - паттерны, уже найденные сканированием файла (_check_file).
         """
         
-        # Паттерны отчётов-подделок
-        fake_patterns = [
-            # Общие паттерны отчётов
-            'Результат выполнения задачи',
-            'Задача обработана',
-            'Генерировано KittyCore',
-            'Создан файл с результатом',
-            'Отчёт о выполнении',
-            'Анализ задачи',
-            'Время создания:',
-            
-            # HTML отчёты в не-HTML файлах
-            '<div class="header">',
-            '<div class="content">',
-            '<div class="footer">',
-            'Генерировано KittyCore 3.0 🐱',
-            
-            # Шаблонные фразы
-            'TODO: Реализовать логику',
-            'Задача успешно обработана',
-            'с использованием LLM-интеллекта',
-            'интеллектуальным агентом',
-            
-            # Мета-информация вместо контента
-            'Контент для:',
-            'Описание: Создан файл',
-            'Выполнено интеллектуальным агентом',
-            
-            # НОВЫЕ ПАТТЕРНЫ ЗАГЛУШЕК
-            'первое приложение',
-            'второе приложение', 
-            'третье приложение',
-            'opis первого приложения',
-            'opis второго приложения',
-            'первая проблема',
-            'вторая проблема',
-            'Составить отчет о топ-приложениях',
-            'Составить отчёт о топ-приложениях',
-            'найдя все существующие приложения',
-            'В этом файле находятся прототипы',
-            'Анализ сложности реализации popularных приложений'
-        ]
-        
         # Проверяем наличие паттернов подделок
-        fake_indicators_found = []
-        for pattern in fake_patterns:
-            if pattern in content:
-                fake_indicators_found.append(pattern)
+        if found_patterns is None:
+            fake_indicators_found = [pattern for pattern in _FAKE_REPORT_PATTERNS if pattern in content]
+        else:
+            fake_indicators_found = list(found_patterns)
         
         # Специальная проверка для Python файлов
         if file_path.endswith('.py'):
@@ -2270,6 +2739,10 @@ class UnifiedOrchestrator:
             if "❌" in issue:
                 reasons.append(issue.replace("❌ ", ""))
         
+        # Шаги, файлы которых не прошли проверку ещё во время выполнения
+        for step_id in validation_result.get('rework_steps', []):
+            reasons.append(f"Переделать шаг {step_id}: файлы не прошли проверку")
+        
         # Причины в зависимости от типа результата
         validation_type = validation_result.get('validation_type', 'generic')
         
@@ -2634,24 +3107,7 @@ class UnifiedOrchestrator:
 
     def _determine_task_type(self, task: str) -> str:
         """🐜 Определить тип задачи для феромонной системы"""
-        task_lower = task.lower()
-        
-        if any(keyword in task_lower for keyword in ['сайт', 'веб', 'html', 'приложение', 'интерфейс']):
-            return "web_development"
-        elif any(keyword in task_lower for keyword in ['код', 'программа', 'скрипт', 'функция', 'алгоритм']):
-            return "programming"
-        elif any(keyword in task_lower for keyword in ['анализ', 'данные', 'статистика', 'исследование']):
-            return "data_analysis"
-        elif any(keyword in task_lower for keyword in ['отчет', 'документ', 'описание', 'инструкция']):
-            return "documentation"
-        elif any(keyword in task_lower for keyword in ['дизайн', 'макет', 'прототип', 'ui', 'ux']):
-            return "design"
-        elif any(keyword in task_lower for keyword in ['автоматизация', 'бот', 'скрипт', 'процесс']):
-            return "automation"
-        elif any(keyword in task_lower for keyword in ['тест', 'проверка', 'валидация', 'качество']):
-            return "testing"
-        else:
-            return "general"
+        return _TASK_TYPE_CLASSIFIER.first_match(task) or _TASK_TYPE_CLASSIFIER.default_label
     
     def _extract_solution_pattern(self, final_result: Dict) -> str:
         """🐜 Извлечь паттерн решения из результатов"""
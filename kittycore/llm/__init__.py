@@ -12,9 +12,13 @@ import os
 import json
 import httpx
 import asyncio
+import threading
 from typing import Dict, Any, Optional, Iterator
 from dataclasses import dataclass
 
+from ..core.metrics_registry import LLM_REQUEST_SECONDS, LLM_TOKENS
+from ..core.tracing import get_tracer
+
 @dataclass
 class LLMConfig:
     """Конфигурация LLM"""
@@ -49,6 +53,8 @@ class OpenRouterProvider(LLMProvider):
         self.base_url = "https://openrouter.ai/api/v1"
         self.last_request_time = 0
         self.min_request_interval = 3.5  # Минимум 3.5 секунды между запросами (безопасно для 20/мин лимита)
+        # complete() вызывается из потоков (asyncio.to_thread): интервал соблюдается между всеми
+        self._rate_lock = threading.Lock()
         
         if not self.api_key:
             raise ValueError("❌ OPENROUTER_API_KEY не найден! Система НЕ МОЖЕТ работать без LLM!")
@@ -60,41 +66,55 @@ class OpenRouterProvider(LLMProvider):
         
         # Rate limiting - ждём если нужно
         import time
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last
-            print(f"🛡️ Rate limiting: ждём {sleep_time:.1f}с...")
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        with self._rate_lock:
+            current_time = time.time()
+            time_since_last = current_time - self.last_request_time
+            if time_since_last < self.min_request_interval:
+                sleep_time = self.min_request_interval - time_since_last
+                print(f"🛡️ Rate limiting: ждём {sleep_time:.1f}с...")
+                time.sleep(sleep_time)
             
-        try:
-            response = httpx.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.config.model,
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": kwargs.get("temperature", self.config.temperature),
-                    "max_tokens": kwargs.get("max_tokens", self.config.max_tokens)
-                },
-                timeout=self.config.timeout
-            )
+            self.last_request_time = time.time()
+        with get_tracer().span("llm.complete", {"llm.model": self.config.model,
+                                                "llm.prompt_chars": len(prompt)}) as span:
+            request_start = time.perf_counter()
+            status = "error"
             
-            if response.status_code == 200:
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
-            else:
-                raise Exception(f"❌ КРИТИЧЕСКАЯ ОШИБКА LLM API: {response.status_code} - {response.text}")
+            try:
+                response = httpx.post(
+                    f"{self.base_url}/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {self.api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "model": self.config.model,
+                        "messages": [
+                            {"role": "user", "content": prompt}
+                        ],
+                        "temperature": kwargs.get("temperature", self.config.temperature),
+                        "max_tokens": kwargs.get("max_tokens", self.config.max_tokens)
+                    },
+                    timeout=self.config.timeout
+                )
+            
+                if response.status_code == 200:
+                    data = response.json()
+                    usage = data.get("usage") or {}
+                    LLM_TOKENS.labels(self.config.model, "prompt").inc(usage.get("prompt_tokens") or 0)
+                    LLM_TOKENS.labels(self.config.model, "completion").inc(usage.get("completion_tokens") or 0)
+                    span.set_attributes({"llm.prompt_tokens": usage.get("prompt_tokens") or 0,
+                                         "llm.completion_tokens": usage.get("completion_tokens") or 0})
+                    status = "success"
+                    return data["choices"][0]["message"]["content"]
+                else:
+                    raise Exception(f"❌ КРИТИЧЕСКАЯ ОШИБКА LLM API: {response.status_code} - {response.text}")
                 
-        except Exception as e:
-            raise Exception(f"❌ КРИТИЧЕСКАЯ ОШИБКА LLM: {e} - СИСТЕМА НЕ МОЖЕТ РАБОТАТЬ БЕЗ LLM!")
+            except Exception as e:
+                raise Exception(f"❌ КРИТИЧЕСКАЯ ОШИБКА LLM: {e} - СИСТЕМА НЕ МОЖЕТ РАБОТАТЬ БЕЗ LLM!")
+        
+            finally:
+                LLM_REQUEST_SECONDS.labels(self.config.model, status).observe(time.perf_counter() - request_start)
 
 class SimpleLocalProvider(LLMProvider):
     """УДАЛЕН - НЕТ МОКОВ!"""
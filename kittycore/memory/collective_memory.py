@@ -12,7 +12,7 @@
 
 import asyncio
 from dataclasses import dataclass
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime 
 
 @dataclass
@@ -49,6 +49,10 @@ class CollectiveMemory:
         self.agent_contributions[agent_id] = self.agent_contributions.get(agent_id, 0) + 1
         return entry_id 
 
+    async def store_many(self, items: List[Tuple[str, str, List[str]]]) -> List[str]:
+        """Сохранить пачку воспоминаний (content, agent_id, tags)"""
+        return [await self.store(content, agent_id, tags) for content, agent_id, tags in items]
+
     async def search(self, query: str, limit: int = 5) -> List[TeamMemoryEntry]:
         """Поиск в коллективной памяти"""
         results = []
@@ -302,4 +302,82 @@ class TestDataAnalysisTool:
         
         assert result['success'] is False
         assert 'Неизвестное действие' in result['error']
-        assert 'available_actions' in result 
\ No newline at end of file
+        assert 'available_actions' in result 
+
+class TestLargeFileLoading:
+    """Тесты экономных режимов загрузки (optimized / chunked)"""
+    
+    def test_optimized_load_downcasts_and_categorizes(self, data_tool, csv_file):
+        """optimized сжимает числа и переводит строки с малой кардинальностью в category"""
+        result = data_tool.execute("load_data", file_path=csv_file, dataset_name="opt",
+                                   load_mode="optimized", chunk_size=30)
+        
+        assert result.success is True
+        dtypes = result.data['data_info']['dtypes']
+        assert dtypes['category'] == 'category'
+        assert dtypes['quantity'] == 'int8'
+        assert dtypes['price'] == 'float32'
+        assert dtypes['name'] == 'object'
+        assert result.data['data_info']['shape'] == (103, 6)
+    
+    def test_optimized_analysis_matches_full(self, data_tool, csv_file):
+        """Статистика optimized совпадает с полной загрузкой"""
+        data_tool.execute("load_data", file_path=csv_file, dataset_name="full")
+        data_tool.execute("load_data", file_path=csv_file, dataset_name="opt",
+                          load_mode="optimized", chunk_size=30)
+        
+        full = data_tool.execute("analyze_basic", dataset_name="full").data
+        opt = data_tool.execute("analyze_basic", dataset_name="opt").data
+        
+        assert opt['missing_values']['total_missing'] == full['missing_values']['total_missing']
+        assert opt['categorical_statistics']['category']['value_counts'] == \
+            full['categorical_statistics']['category']['value_counts']
+        assert opt['numeric_statistics']['price']['mean'] == pytest.approx(
+            full['numeric_statistics']['price']['mean'], rel=1e-5)
+    
+    def test_chunked_aggregates_match_full(self, data_tool, csv_file):
+        """Потоковые агрегаты совпадают с расчётом по всему DataFrame"""
+        data_tool.execute("load_data", file_path=csv_file, dataset_name="full")
+        result = data_tool.execute("load_data", file_path=csv_file, dataset_name="chunked",
+                                   load_mode="chunked", chunk_size=17)
+        
+        assert result.success is True
+        assert result.data['data_info']['chunks_processed'] == 7
+        
+        full = data_tool.execute("analyze_basic", dataset_name="full").data
+        chunked = data_tool.execute("analyze_basic", dataset_name="chunked").data
+        
+        assert chunked['basic_info']['shape'] == full['basic_info']['shape']
+        assert chunked['missing_values']['missing_counts'] == full['missing_values']['missing_counts']
+        assert chunked['missing_values']['complete_rows'] == full['missing_values']['complete_rows']
+        for col in ['price', 'quantity', 'rating']:
+            for stat in ['count', 'mean', 'std', 'min', 'max', 'skewness', 'kurtosis']:
+                assert chunked['numeric_statistics'][col][stat] == pytest.approx(
+                    full['numeric_statistics'][col][stat], rel=1e-9), (col, stat)
+        assert chunked['categorical_statistics']['category']['value_counts'] == \
+            full['categorical_statistics']['category']['value_counts']
+    
+    def test_chunked_report_and_export(self, data_tool, csv_file, tmp_path):
+        """Отчёт и экспорт работают без хранения датасета в памяти"""
+        data_tool.execute("load_data", file_path=csv_file, dataset_name="chunked",
+                          load_mode="chunked", chunk_size=25)
+        
+        report = data_tool.execute("generate_report", dataset_name="chunked", report_type="comprehensive")
+        assert report.success is True
+        duplicates = report.data['report']['analysis_results']['data_quality']['duplicates']
+        assert duplicates['duplicate_rows'] == 3
+        
+        output = tmp_path / "export.csv"
+        exported = data_tool.execute("export_data", dataset_name="chunked", output_path=str(output))
+        assert exported.success is True
+        assert pd.read_csv(output).shape == (103, 6)
+        
+        cleaned = data_tool.execute("clean_data", dataset_name="chunked")
+        assert cleaned.success is False
+    
+    def test_invalid_load_mode(self, data_tool, csv_file):
+        """Неизвестный режим загрузки"""
+        result = data_tool.execute("load_data", file_path=csv_file, load_mode="mmap")
+        
+        assert result.success is False
+        assert 'Неизвестный режим загрузки' in result.error
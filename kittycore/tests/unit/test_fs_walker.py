@@ -0,0 +1,144 @@
+"""
+🧪 Тесты потокового обхода директорий SuperSystemTool
+
+Проверяем:
+- Детерминированный порядок и курсорную пагинацию
+- Фильтры, глубину и исключения
+- Параллельный обход поддеревьев
+- safe_file_list и scan_directory_safety поверх обходчика
+"""
+
+import os
+
+import pytest
+
+from kittycore.tools.fs_walker import DirectoryWalker
+from kittycore.tools.super_system_tool import SuperSystemTool
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Дерево: src/{a..e}.py, src/pkg/{x,y}.txt, docs/readme.md, node_modules/lib/index.js, top.log"""
+    for name in "abcde":
+        (tmp_path / "src").mkdir(exist_ok=True)
+        (tmp_path / "src" / f"{name}.py").write_text(name)
+    (tmp_path / "src" / "pkg").mkdir()
+    (tmp_path / "src" / "pkg" / "x.txt").write_text("x")
+    (tmp_path / "src" / "pkg" / "y.txt").write_text("y")
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "readme.md").write_text("readme")
+    (tmp_path / "node_modules" / "lib").mkdir(parents=True)
+    (tmp_path / "node_modules" / "lib" / "index.js").write_text("js")
+    (tmp_path / "top.log").write_text("log")
+    return tmp_path
+
+
+def relative_paths(entries):
+    return [e.relative_path.replace(os.sep, "/") for e in entries]
+
+
+class TestDirectoryWalker:
+    """Тесты DirectoryWalker"""
+
+    def test_directories_first_preorder(self, tree):
+        paths = relative_paths(DirectoryWalker(str(tree)).walk())
+
+        assert paths == [
+            "docs", "docs/readme.md",
+            "node_modules", "node_modules/lib", "node_modules/lib/index.js",
+            "src", "src/pkg", "src/pkg/x.txt", "src/pkg/y.txt",
+            "src/a.py", "src/b.py", "src/c.py", "src/d.py", "src/e.py",
+            "top.log"
+        ]
+
+    @pytest.mark.parametrize("limit", [1, 2, 3, 4, 7])
+    def test_pages_cover_tree_exactly_once(self, tree, limit):
+        walker = DirectoryWalker(str(tree))
+        expected = relative_paths(walker.walk())
+
+        collected, cursor = [], None
+        while True:
+            page, cursor = DirectoryWalker(str(tree)).page(cursor, limit)
+            collected.extend(relative_paths(page))
+            assert len(page) <= limit
+            if cursor is None:
+                break
+
+        assert collected == expected
+
+    def test_cursor_survives_deleted_entry(self, tree):
+        page, cursor = DirectoryWalker(str(tree)).page(limit=8)
+        assert relative_paths(page)[-1] == "src/pkg/x.txt"
+        (tree / "src" / "pkg" / "x.txt").unlink()
+
+        rest, _ = DirectoryWalker(str(tree)).page(cursor, limit=100)
+
+        assert relative_paths(rest)[0] == "src/pkg/y.txt"
+
+    def test_filters_depth_and_exclusions(self, tree):
+        python_files = DirectoryWalker(str(tree), extensions=["py"]).walk()
+        shallow = DirectoryWalker(str(tree), max_depth=1).walk()
+        pruned = DirectoryWalker(str(tree), pattern="*.js", exclude_dirs=["node_modules"]).walk()
+
+        assert relative_paths(python_files) == [f"src/{n}.py" for n in "abcde"]
+        assert relative_paths(shallow) == ["docs", "node_modules", "src", "top.log"]
+        assert list(pruned) == []
+
+    def test_parallel_walk_keeps_order(self, tree):
+        sequential = relative_paths(DirectoryWalker(str(tree)).walk())
+        parallel = relative_paths(DirectoryWalker(str(tree), workers=4).walk())
+        paged, _ = DirectoryWalker(str(tree), workers=4).page(limit=5)
+
+        assert parallel == sequential
+        assert relative_paths(paged) == sequential[:5]
+
+    def test_stat_data_from_entries(self, tree):
+        entry = next(e for e in DirectoryWalker(str(tree)).walk() if e.name == "readme.md")
+
+        assert entry.size == len("readme")
+        assert entry.depth == 2
+        assert entry.extension == ".md"
+        assert entry.path == os.path.join(str(tree), "docs", "readme.md")
+
+
+class TestSuperSystemToolListing:
+    """safe_file_list и scan_directory_safety поверх обходчика"""
+
+    def setup_method(self):
+        self.tool = SuperSystemTool()
+
+    def test_paginated_recursive_listing(self, tree):
+        first = self.tool.execute("safe_file_list", path=str(tree), recursive=True, limit=10)
+        second = self.tool.execute("safe_file_list", path=str(tree), recursive=True, limit=10,
+                                   cursor=first.data["next_cursor"])
+
+        assert first.success is True
+        assert first.data["total_items"] == 10
+        assert first.data["has_more"] is True
+        assert second.data["total_items"] == 5
+        assert second.data["has_more"] is False
+        names = [i["name"] for i in first.data["items"] + second.data["items"]]
+        assert len(names) == len(set(names)) == 15
+
+    def test_listing_with_filters(self, tree):
+        result = self.tool.execute("safe_file_list", path=str(tree), recursive=True,
+                                   extensions=[".txt", ".md"], exclude_dirs=["node_modules"])
+
+        assert sorted(i["name"] for i in result.data["items"]) == ["readme.md", "x.txt", "y.txt"]
+        assert all(i["is_safe"] for i in result.data["items"])
+
+    def test_invalid_cursor(self, tree):
+        result = self.tool.execute("safe_file_list", path=str(tree), cursor="bogus")
+
+        assert result.success is False
+
+    def test_scan_directory_safety_uses_walker(self, tree):
+        full = self.tool.execute("scan_directory_safety", path=str(tree), recursive=True)
+        pruned = self.tool.execute("scan_directory_safety", path=str(tree), recursive=True,
+                                   exclude_dirs=["node_modules"], parallel=True)
+        shallow = self.tool.execute("scan_directory_safety", path=str(tree))
+
+        assert full.data["safety_scan"]["scanned_files"] == 10
+        assert full.data["safety_scan"]["unsafe_files"] == 0
+        assert pruned.data["safety_scan"]["scanned_files"] == 9
+        assert shallow.data["safety_scan"]["scanned_files"] == 1
@@ -0,0 +1,122 @@
+"""
+🧪 Тесты кольцевых буферов метрик для мониторинга SuperSystemTool
+
+Проверяем:
+- Добавление с перезаписью старых отсчётов
+- Выборку окна по времени после переполнения
+- Агрегаты и прореживание в грубые уровни
+- Данные мониторинга SuperSystemTool поверх буфера
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from kittycore.tools.metrics_buffer import MetricsRingBuffer, TieredMetricsStore, DownsampleTier
+from kittycore.tools.super_system_tool import SuperSystemTool
+
+
+class TestMetricsRingBuffer:
+    """Тесты колоночного кольцевого буфера"""
+
+    def test_overwrites_oldest_records(self):
+        buffer = MetricsRingBuffer(["value"], capacity=5)
+        for i in range(12):
+            buffer.append(float(i), [i * 10])
+
+        timestamps, values = buffer.window()
+
+        assert len(buffer) == 5
+        assert timestamps.tolist() == [7.0, 8.0, 9.0, 10.0, 11.0]
+        assert buffer.column(values, "value").tolist() == [70, 80, 90, 100, 110]
+
+    def test_window_after_wraparound(self):
+        buffer = MetricsRingBuffer(["value"], capacity=8)
+        for i in range(20):
+            buffer.append(float(i), [i])
+
+        timestamps, _ = buffer.window(start=13.5, end=17)
+        _, last = buffer.window(last_n=3)
+
+        assert timestamps.tolist() == [14.0, 15.0, 16.0, 17.0]
+        assert last[:, 0].tolist() == [17, 18, 19]
+
+    def test_aggregates(self):
+        buffer = MetricsRingBuffer(["cpu", "memory"], capacity=200)
+        for i in range(101):
+            buffer.append(float(i), [i, 50])
+
+        stats = buffer.aggregate()
+
+        assert stats["cpu"]["min"] == 0
+        assert stats["cpu"]["max"] == 100
+        assert stats["cpu"]["mean"] == pytest.approx(50)
+        assert stats["cpu"]["p95"] == pytest.approx(95)
+        assert stats["memory"]["p50"] == 50
+
+    def test_non_monotonic_timestamp_clamped(self):
+        buffer = MetricsRingBuffer(["value"], capacity=4)
+        buffer.append(10.0, [1])
+        buffer.append(9.0, [2])
+
+        assert buffer.window()[0].tolist() == [10.0, 10.0]
+
+
+class TestTieredMetricsStore:
+    """Тесты прореживания"""
+
+    def test_downsampling_keeps_extremes(self):
+        store = TieredMetricsStore(["cpu"], raw_capacity=10, tiers=[DownsampleTier(10.0, 100)])
+        # 0.5 с между отсчётами, пик 99 во втором интервале
+        for i in range(100):
+            store.append(i * 0.5, [99.0 if i == 25 else float(i % 10)])
+
+        summary = store.summary(window_seconds=45)
+
+        assert len(store) == 10
+        assert summary["tier"] == "10s"
+        assert summary["count"] == 4  # завершённые интервалы 0-40 с
+        assert summary["columns"]["cpu"]["max"] == 99.0
+        assert summary["columns"]["cpu"]["min"] == 0.0
+
+    def test_raw_tier_used_when_it_covers_window(self):
+        store = TieredMetricsStore(["cpu"], raw_capacity=100)
+        for i in range(50):
+            store.append(1000.0 + i, [float(i)])
+
+        summary = store.summary(window_seconds=10)
+
+        assert summary["tier"] == "raw"
+        assert summary["count"] == 11
+        assert summary["columns"]["cpu"]["min"] == 39.0
+
+    def test_memory_is_constant(self):
+        store = TieredMetricsStore(["a", "b"], raw_capacity=100)
+        before = store.get_stats()["memory_bytes"]
+        for i in range(10_000):
+            store.append(i * 0.1, np.array([i, -i]))
+
+        assert store.get_stats()["memory_bytes"] == before
+        assert len(store) == 100
+
+
+class TestSuperSystemToolMonitoring:
+    """Мониторинг SuperSystemTool поверх буфера"""
+
+    def test_subsecond_sampling(self):
+        tool = SuperSystemTool()
+        result = tool.execute("start_monitoring", interval=0.02, max_records=5)
+        assert result.success is True
+
+        time.sleep(0.3)
+        data = tool.execute("get_monitoring_data", last_n=3)
+        stopped = tool.execute("stop_monitoring")
+
+        assert data.success is True
+        assert data.data["records_count"] == 5
+        assert len(data.data["monitoring_data"]) == 3
+        assert "cpu_percent" in data.data["monitoring_data"][0]
+        assert data.data["statistics"]["memory_max"] >= data.data["statistics"]["memory_min"]
+        assert stopped.success is True
+        assert stopped.data["records_collected"] == 5
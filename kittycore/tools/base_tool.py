@@ -11,12 +11,15 @@
 """
 
 import logging
+import time
 from abc import ABC, abstractmethod
 from datetime import datetime
 from typing import Dict, Any, List, Optional, Callable
 from pathlib import Path
 
 from .unified_tool_result import ToolResult
+from ..core.metrics_registry import TOOL_EXECUTION_SECONDS
+from ..core.tracing import get_tracer
 
 logger = logging.getLogger(__name__)
 
@@ -83,12 +86,21 @@ class Tool(ABC):
             return False
     
     def _execute_with_logging(self, **kwargs) -> ToolResult:
-        """Выполнение с логированием и статистикой"""
-        start_time = datetime.now()
+        """Выполнение с логированием, статистикой, метрикой длительности и спаном трассировки"""
+        action = str(kwargs.get("action", ""))
+        with get_tracer().span(f"tool.{self.name}", {"tool.action": action}) as span:
+            result = self._execute_measured(action, kwargs)
+            span.set_attribute("tool.success", bool(getattr(result, "success", True)))
+            return result
+    
+    def _execute_measured(self, action: str, kwargs: Dict[str, Any]) -> ToolResult:
+        start_time = time.perf_counter()
+        status = "error"
         
         try:
             # Валидация параметров
             if not self.validate_params(kwargs):
+                status = "invalid"
                 return ToolResult(
                     success=False,
                     error="Ошибка валидации параметров"
@@ -96,12 +108,13 @@ class Tool(ABC):
             
             # Выполнение
             result = self.execute(**kwargs)
+            status = "success" if getattr(result, "success", True) else "failure"
             
             # Обновляем статистику
             self.execution_count += 1
             self.last_execution = datetime.now()
             
-            execution_time = (datetime.now() - start_time).total_seconds()
+            execution_time = time.perf_counter() - start_time
             logger.info(f"✅ {self.name} выполнен за {execution_time:.2f}с")
             
             return result
@@ -109,6 +122,11 @@ class Tool(ABC):
         except Exception as e:
             logger.error(f"❌ Ошибка выполнения {self.name}: {e}")
             return ToolResult(success=False, error=str(e))
+        
+        finally:
+            TOOL_EXECUTION_SECONDS.labels(self.name, action, status).observe(
+                time.perf_counter() - start_time
+            )
     
     def get_stats(self) -> Dict[str, Any]:
         """Получить статистику использования инструмента"""
@@ -7,6 +7,7 @@ DataAnalysisTool для KittyCore 3.0 - Инструмент анализа да
 - Генерация отчётов
 - Визуализация данных
 - Машинное обучение (базовые модели)
+- Экономная загрузка больших файлов (оптимизация типов, потоковая обработка)
 """
 
 import pandas as pd
@@ -14,6 +15,7 @@ import numpy as np
 import json
 import csv
 import asyncio
+from collections import Counter
 from typing import Dict, List, Any, Optional, Union
 from pathlib import Path
 import logging
@@ -21,9 +23,246 @@ import logging
 from .base_tool import Tool
 from .unified_tool_result import ToolResult
 
+# Опциональный Arrow-движок для чтения CSV
+try:
+    import pyarrow  # noqa: F401
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
+# Параметры экономной загрузки
+LOAD_MODES = ['full', 'optimized', 'chunked']
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_SAMPLE_ROWS = 10_000
+CATEGORY_MAX_RATIO = 0.5      # Доля уникальных значений в выборке, ниже которой строка -> category
+MAX_TRACKED_VALUES = 10_000   # Лимит точного подсчёта значений категориальной колонки в chunked режиме
+
+
+class ChunkedDataset:
+    """
+    Датасет, обработанный по частям без загрузки в память целиком
+
+    Хранит инкрементальные агрегаты (количество строк, пропуски, моменты
+    числовых колонок, частоты значений, равномерную выборку строк),
+    достаточные для analyze_basic и generate_report на файлах больше RAM.
+    Медиана и квантили считаются по выборке и поэтому приблизительны.
+    """
+
+    def __init__(self, file_path: Path, read_kwargs: Dict[str, Any],
+                 sample_rows: int = DEFAULT_SAMPLE_ROWS):
+        self.file_path = file_path
+        self.read_kwargs = read_kwargs
+        self.sample_rows = sample_rows
+
+        self.rows = 0
+        self.chunks = 0
+        self.columns: List[str] = []
+        self.dtypes: Dict[str, str] = {}
+        self.memory_bytes = 0
+        self.missing: Dict[str, int] = {}
+        self.complete_rows = 0
+        self.head: List[Dict[str, Any]] = []
+
+        # Моменты числовых колонок: n, mean, M2, M3, M4, min, max
+        self.moments: Dict[str, Dict[str, float]] = {}
+        # Частоты значений текстовых колонок
+        self.value_counts: Dict[str, Counter] = {}
+        self.value_counts_exact: Dict[str, bool] = {}
+        # Число значений текстовых колонок, приводимых к числу
+        self.numeric_like: Dict[str, int] = {}
+
+        self._sample: Optional[pd.DataFrame] = None
+        self._sample_keys: Optional[np.ndarray] = None
+        self._row_hashes: List[np.ndarray] = []
+        self._duplicates: Optional[int] = None
+        self._rng = np.random.default_rng(42)
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Повторное чтение файла по частям (для экспорта)"""
+        return pd.read_csv(self.file_path, chunksize=chunk_size, **self.read_kwargs)
+
+    @property
+    def shape(self):
+        return (self.rows, len(self.columns))
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        return [col for col in self.columns if col in self.moments]
+
+    @property
+    def text_columns(self) -> List[str]:
+        return [col for col in self.columns if col in self.value_counts]
+
+    @property
+    def total_missing(self) -> int:
+        return int(sum(self.missing.values()))
+
+    @property
+    def duplicate_rows(self) -> int:
+        if self._duplicates is None:
+            if self._row_hashes:
+                hashes = np.concatenate(self._row_hashes)
+                self._duplicates = int(len(hashes) - len(np.unique(hashes)))
+            else:
+                self._duplicates = 0
+            self._row_hashes = []
+        return self._duplicates
+
+    def update(self, chunk: pd.DataFrame):
+        """Учесть очередную часть файла в агрегатах"""
+        if not self.columns:
+            self.columns = chunk.columns.tolist()
+            self.head = chunk.head().to_dict('records')
+            self.missing = {col: 0 for col in self.columns}
+
+        self.chunks += 1
+        self.rows += len(chunk)
+        self.memory_bytes += int(chunk.memory_usage(deep=True).sum())
+        self.complete_rows += int(chunk.notna().all(axis=1).sum())
+        for col, count in chunk.isnull().sum().items():
+            self.missing[col] += int(count)
+
+        for col in chunk.columns:
+            series = chunk[col]
+            # Колонка с числами в одном чанке и строками в другом считается текстовой
+            self.dtypes[col] = self._merge_dtype(self.dtypes.get(col), str(series.dtype))
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                self._update_moments(col, series.dropna().to_numpy(dtype=np.float64))
+            elif series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+                self._update_value_counts(col, series)
+                self.numeric_like[col] = self.numeric_like.get(col, 0) + int(
+                    pd.to_numeric(series, errors='coerce').notna().sum()
+                )
+
+        self._row_hashes.append(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+        self._update_sample(chunk)
+
+    @staticmethod
+    def _merge_dtype(previous: Optional[str], current: str) -> str:
+        if previous is None or previous == current:
+            return current
+        if 'object' in (previous, current):
+            return 'object'
+        if previous.startswith(('int', 'float')) and current.startswith(('int', 'float')):
+            return 'float64'
+        return 'object'
+
+    def _update_moments(self, col: str, values: np.ndarray):
+        """Слияние центральных моментов (формулы Pébay) для mean/std/skew/kurtosis"""
+        nb = len(values)
+        if nb == 0:
+            self.moments.setdefault(col, {'n': 0, 'mean': 0.0, 'M2': 0.0, 'M3': 0.0, 'M4': 0.0,
+                                          'min': np.nan, 'max': np.nan})
+            return
+
+        mean_b = values.mean()
+        dev = values - mean_b
+        m2b = float((dev ** 2).sum())
+        m3b = float((dev ** 3).sum())
+        m4b = float((dev ** 4).sum())
+
+        stats = self.moments.get(col)
+        if stats is None or stats['n'] == 0:
+            self.moments[col] = {'n': nb, 'mean': float(mean_b), 'M2': m2b, 'M3': m3b, 'M4': m4b,
+                                 'min': float(values.min()), 'max': float(values.max())}
+            return
+
+        na = stats['n']
+        n = na + nb
+        delta = mean_b - stats['mean']
+        d_n = delta / n
+        m2a, m3a, m4a = stats['M2'], stats['M3'], stats['M4']
+
+        stats['M4'] = (m4a + m4b
+                       + delta * d_n ** 3 * na * nb * (na * na - na * nb + nb * nb)
+                       + 6 * d_n ** 2 * (na * na * m2b + nb * nb * m2a)
+                       + 4 * d_n * (na * m3b - nb * m3a))
+        stats['M3'] = (m3a + m3b
+                       + delta * d_n ** 2 * na * nb * (na - nb)
+                       + 3 * d_n * (na * m2b - nb * m2a))
+        stats['M2'] = m2a + m2b + delta * d_n * na * nb
+        stats['mean'] = stats['mean'] + nb * d_n
+        stats['n'] = n
+        stats['min'] = float(min(stats['min'], values.min()))
+        stats['max'] = float(max(stats['max'], values.max()))
+
+    def _update_value_counts(self, col: str, series: pd.Series):
+        counter = self.value_counts.setdefault(col, Counter())
+        self.value_counts_exact.setdefault(col, True)
+        value_counts = series.value_counts()
+        counter.update(value_counts[value_counts > 0].to_dict())
+        if len(counter) > MAX_TRACKED_VALUES:
+            # Высокая кардинальность: оставляем только частые значения
+            self.value_counts[col] = Counter(dict(counter.most_common(MAX_TRACKED_VALUES // 2)))
+            self.value_counts_exact[col] = False
+
+    def _update_sample(self, chunk: pd.DataFrame):
+        """Равномерная выборка строк (bottom-k по случайным ключам)"""
+        keys = self._rng.random(len(chunk))
+        if self._sample is None:
+            candidates, candidate_keys = chunk, keys
+        else:
+            candidates = pd.concat([self._sample, chunk], ignore_index=True)
+            candidate_keys = np.concatenate([self._sample_keys, keys])
+
+        if len(candidate_keys) > self.sample_rows:
+            keep = np.argpartition(candidate_keys, self.sample_rows)[:self.sample_rows]
+            candidates = candidates.iloc[keep]
+            candidate_keys = candidate_keys[keep]
+
+        self._sample = candidates.reset_index(drop=True)
+        self._sample_keys = candidate_keys
+
+    def numeric_summary(self, col: str) -> Dict[str, Any]:
+        """Статистика числовой колонки в формате describe() + доп. метрики"""
+        stats = self.moments[col]
+        n = stats['n']
+        m2, m3, m4 = stats['M2'], stats['M3'], stats['M4']
+
+        std = float(np.sqrt(m2 / (n - 1))) if n > 1 else np.nan
+        skewness = np.nan
+        kurtosis = np.nan
+        if n > 2 and m2 > 0:
+            skewness = float(np.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / (m2 / n) ** 1.5)
+        if n > 3 and m2 > 0:
+            kurtosis = float(n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2)
+                             - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+
+        sample = self._sample[col].dropna() if self._sample is not None else pd.Series(dtype=float)
+        quantiles = sample.quantile([0.25, 0.5, 0.75]).tolist() if len(sample) else [np.nan] * 3
+        mode = sample.mode()
+
+        return {
+            'count': float(n),
+            'mean': stats['mean'] if n else np.nan,
+            'std': std,
+            'min': stats['min'],
+            '25%': quantiles[0],
+            '50%': quantiles[1],
+            '75%': quantiles[2],
+            'max': stats['max'],
+            'median': quantiles[1],
+            'mode': mode.iloc[0] if len(mode) > 0 else None,
+            'skewness': skewness,
+            'kurtosis': kurtosis
+        }
+
+    def categorical_summary(self, col: str, top: int = 10) -> Dict[str, Any]:
+        """Частоты значений текстовой колонки"""
+        counter = self.value_counts[col]
+        most_common = counter.most_common(top)
+        return {
+            'unique_values': len(counter),
+            'unique_values_exact': self.value_counts_exact[col],
+            'most_frequent': most_common[0][0] if most_common else None,
+            'most_frequent_count': int(most_common[0][1]) if most_common else 0,
+            'value_counts': {value: int(count) for value, count in most_common}
+        }
+
+
 class DataAnalysisTool(Tool):
     """
     Инструмент для анализа данных
@@ -70,6 +309,27 @@ class DataAnalysisTool(Tool):
                     "type": "string", 
                     "description": "Имя датасета"
                 },
+                "load_mode": {
+                    "type": "string",
+                    "description": "Режим загрузки (для load_data): full - целиком как есть, "
+                                   "optimized - типы по выборке, понижение разрядности чисел "
+                                   "(float32 ≈ 7 значащих цифр) и category для строк с малым числом значений, "
+                                   "chunked - потоковые агрегаты для файлов больше RAM (CSV/TSV)",
+                    "enum": LOAD_MODES
+                },
+                "engine": {
+                    "type": "string",
+                    "description": "Движок чтения CSV (pyarrow требует установленного pyarrow)",
+                    "enum": ["pandas", "pyarrow"]
+                },
+                "chunk_size": {
+                    "type": "integer",
+                    "description": "Размер части в строках для optimized/chunked режимов"
+                },
+                "sample_rows": {
+                    "type": "integer",
+                    "description": "Размер выборки для определения типов и квантилей"
+                },
                 "operations": {
                     "type": "array",
                     "description": "Список операций очистки (для clean_data)",
@@ -167,13 +427,20 @@ class DataAnalysisTool(Tool):
             filtered_kwargs = {k: v for k, v in kwargs.items() if k in method_signature.parameters}
             return asyncio.run(method(**filtered_kwargs)) 
     
-    async def _load_data(self, file_path: str, dataset_name: Optional[str] = None) -> Dict[str, Any]:
+    async def _load_data(self, file_path: str, dataset_name: Optional[str] = None,
+                         load_mode: str = 'full', engine: str = 'pandas',
+                         chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         sample_rows: int = DEFAULT_SAMPLE_ROWS) -> Dict[str, Any]:
         """
         Загрузка данных из файла
         
         Args:
             file_path: Путь к файлу
             dataset_name: Имя датасета (опционально)
+            load_mode: Режим загрузки ('full', 'optimized', 'chunked')
+            engine: Движок чтения CSV ('pandas', 'pyarrow')
+            chunk_size: Размер части в строках
+            sample_rows: Размер выборки для определения типов
             
         Returns:
             Результат загрузки
@@ -187,6 +454,19 @@ class DataAnalysisTool(Tool):
                     'error': f'Файл не найден: {file_path}'
                 }
             
+            if load_mode not in LOAD_MODES:
+                return {
+                    'success': False,
+                    'error': f'Неизвестный режим загрузки: {load_mode}',
+                    'load_modes': LOAD_MODES
+                }
+            
+            if engine == 'pyarrow' and not ARROW_AVAILABLE:
+                return {
+                    'success': False,
+                    'error': 'Движок pyarrow недоступен. Выполните: pip install pyarrow'
+                }
+            
             # Определение имени датасета
             if not dataset_name:
                 dataset_name = file_path.stem
@@ -194,27 +474,39 @@ class DataAnalysisTool(Tool):
             # Загрузка в зависимости от формата
             file_ext = file_path.suffix.lower()
             
-            if file_ext == '.csv':
-                df = pd.read_csv(file_path)
-            elif file_ext == '.tsv':
-                df = pd.read_csv(file_path, sep='\t')
-            elif file_ext in ['.xlsx', '.xls']:
-                df = pd.read_excel(file_path)
-            elif file_ext == '.json':
-                df = pd.read_json(file_path)
-            else:
+            if file_ext not in self.supported_formats:
                 return {
                     'success': False,
                     'error': f'Неподдерживаемый формат: {file_ext}',
                     'supported_formats': self.supported_formats
                 }
             
+            if load_mode == 'chunked':
+                return self._load_chunked(file_path, dataset_name, chunk_size, sample_rows)
+            
+            if file_ext in ['.csv', '.tsv']:
+                read_kwargs = {'sep': '\t'} if file_ext == '.tsv' else {}
+                if load_mode == 'optimized':
+                    df = self._read_csv_optimized(file_path, read_kwargs, engine, chunk_size, sample_rows)
+                elif engine == 'pyarrow':
+                    df = self._read_csv_arrow(file_path, read_kwargs)
+                else:
+                    df = pd.read_csv(file_path, **read_kwargs)
+            else:
+                if file_ext in ['.xlsx', '.xls']:
+                    df = pd.read_excel(file_path)
+                else:
+                    df = pd.read_json(file_path)
+                if load_mode == 'optimized':
+                    df = self._optimize_dtypes(df, self._category_candidates(df.head(sample_rows)))
+            
             # Сохранение в кеш
             self._data_cache[dataset_name] = df
             
             # Информация о загруженных данных
             info = {
                 'dataset_name': dataset_name,
+                'load_mode': load_mode,
                 'shape': df.shape,
                 'columns': df.columns.tolist(),
                 'dtypes': df.dtypes.astype(str).to_dict(),
@@ -223,7 +515,7 @@ class DataAnalysisTool(Tool):
                 'head': df.head().to_dict('records')
             }
             
-            logger.info(f"Загружен датасет '{dataset_name}': {df.shape}")
+            logger.info(f"Загружен датасет '{dataset_name}' ({load_mode}): {df.shape}")
             
             return {
                 'success': True,
@@ -238,12 +530,127 @@ class DataAnalysisTool(Tool):
                 'error': f'Ошибка загрузки: {str(e)}'
             }
     
+    def _category_candidates(self, sample: pd.DataFrame) -> List[str]:
+        """Строковые колонки выборки с малой долей уникальных значений"""
+        candidates = []
+        for col in sample.select_dtypes(include=['object', 'string']).columns:
+            non_null = sample[col].dropna()
+            if len(non_null) and non_null.nunique() <= len(non_null) * CATEGORY_MAX_RATIO:
+                candidates.append(col)
+        return candidates
+    
+    def _optimize_dtypes(self, df: pd.DataFrame, category_columns: List[str]) -> pd.DataFrame:
+        """Понижение разрядности чисел и перевод строк с малой кардинальностью в category"""
+        for col in df.columns:
+            series = df[col]
+            if pd.api.types.is_bool_dtype(series):
+                continue
+            if pd.api.types.is_integer_dtype(series):
+                df[col] = pd.to_numeric(series, downcast='integer')
+            elif pd.api.types.is_float_dtype(series):
+                df[col] = pd.to_numeric(series, downcast='float')
+            elif col in category_columns and not isinstance(series.dtype, pd.CategoricalDtype):
+                df[col] = series.astype('category')
+        return df
+    
+    def _read_csv_optimized(self, file_path: Path, read_kwargs: Dict[str, Any], engine: str,
+                            chunk_size: int, sample_rows: int) -> pd.DataFrame:
+        """
+        Чтение CSV с оптимизацией типов
+        
+        Типы определяются по выборке первых sample_rows строк. Файл читается
+        частями, каждая часть сжимается сразу, поэтому пиковая память примерно
+        равна итоговому размеру плюс одна часть в исходных типах.
+        """
+        sample = pd.read_csv(file_path, nrows=sample_rows, **read_kwargs)
+        category_columns = self._category_candidates(sample)
+        
+        if engine == 'pyarrow':
+            return self._optimize_dtypes(self._read_csv_arrow(file_path, read_kwargs), category_columns)
+        
+        dtype = {col: 'category' for col in category_columns}
+        chunks = [
+            self._optimize_dtypes(chunk, category_columns)
+            for chunk in pd.read_csv(file_path, dtype=dtype, chunksize=chunk_size, **read_kwargs)
+        ]
+        if not chunks:
+            return sample
+        if len(chunks) == 1:
+            return chunks[0]
+        
+        # Категории разных частей приводятся к общему набору, иначе concat вернёт object
+        for col in category_columns:
+            categories = pd.api.types.union_categoricals(
+                [chunk[col] for chunk in chunks], ignore_order=True
+            ).categories
+            for chunk in chunks:
+                chunk[col] = chunk[col].cat.set_categories(categories)
+        
+        return pd.concat(chunks, ignore_index=True)
+    
+    def _read_csv_arrow(self, file_path: Path, read_kwargs: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Многопоточное чтение CSV через pyarrow
+        
+        Числа остаются в NumPy-типах (на Arrow-типах pandas не считает skew/kurt),
+        строки хранятся в компактном string[pyarrow].
+        """
+        df = pd.read_csv(file_path, engine='pyarrow', **read_kwargs)
+        for col in df.select_dtypes(include=['object']).columns:
+            df[col] = df[col].astype('string[pyarrow]')
+        return df
+    
+    def _load_chunked(self, file_path: Path, dataset_name: str, chunk_size: int,
+                      sample_rows: int) -> Dict[str, Any]:
+        """Потоковая обработка CSV/TSV без загрузки файла в память целиком"""
+        file_ext = file_path.suffix.lower()
+        if file_ext not in ['.csv', '.tsv']:
+            return {
+                'success': False,
+                'error': f'Режим chunked поддерживает только CSV/TSV, получено: {file_ext}'
+            }
+        
+        read_kwargs = {'sep': '\t'} if file_ext == '.tsv' else {}
+        dataset = ChunkedDataset(file_path, read_kwargs, sample_rows=sample_rows)
+        for chunk in dataset.iter_chunks(chunk_size):
+            dataset.update(chunk)
+        
+        self._data_cache[dataset_name] = dataset
+        
+        info = {
+            'dataset_name': dataset_name,
+            'load_mode': 'chunked',
+            'shape': dataset.shape,
+            'columns': dataset.columns,
+            'dtypes': dataset.dtypes,
+            'memory_usage': f"{dataset.memory_bytes / 1024:.2f} KB (оценка, в памяти не хранится)",
+            'missing_values': dataset.missing,
+            'head': dataset.head,
+            'chunks_processed': dataset.chunks
+        }
+        
+        logger.info(f"Обработан по частям датасет '{dataset_name}': {dataset.shape}, частей: {dataset.chunks}")
+        
+        return {
+            'success': True,
+            'message': f'Данные обработаны по частям: {dataset.rows} строк, {len(dataset.columns)} столбцов',
+            'data_info': info
+        }
+    
     async def _get_datasets_list(self) -> Dict[str, Any]:
         """Получение списка загруженных датасетов"""
         try:
             datasets_info = {}
             
             for name, df in self._data_cache.items():
+                if isinstance(df, ChunkedDataset):
+                    datasets_info[name] = {
+                        'shape': df.shape,
+                        'columns': len(df.columns),
+                        'memory_usage': f"{df.memory_bytes / 1024:.2f} KB (оценка)",
+                        'load_mode': 'chunked'
+                    }
+                    continue
                 datasets_info[name] = {
                     'shape': df.shape,
                     'columns': len(df.columns),
@@ -281,6 +688,8 @@ class DataAnalysisTool(Tool):
                 }
             
             df = self._data_cache[dataset_name]
+            if isinstance(df, ChunkedDataset):
+                return self._analyze_basic_chunked(dataset_name, df)
             
             # Базовая информация
             basic_info = {
@@ -294,7 +703,7 @@ class DataAnalysisTool(Tool):
             dtypes_info = {
                 'column_types': df.dtypes.astype(str).to_dict(),
                 'numeric_columns': df.select_dtypes(include=[np.number]).columns.tolist(),
-                'text_columns': df.select_dtypes(include=['object']).columns.tolist(),
+                'text_columns': self._text_columns(df).tolist(),
                 'datetime_columns': df.select_dtypes(include=['datetime64']).columns.tolist()
             }
             
@@ -324,7 +733,7 @@ class DataAnalysisTool(Tool):
             
             # Анализ категориальных данных
             categorical_stats = {}
-            text_cols = df.select_dtypes(include=['object']).columns
+            text_cols = self._text_columns(df)
             
             for col in text_cols:
                 if col not in categorical_stats:
@@ -360,6 +769,59 @@ class DataAnalysisTool(Tool):
                 'error': f'Ошибка анализа: {str(e)}'
             } 
     
+    def _text_columns(self, df: pd.DataFrame) -> pd.Index:
+        """Текстовые колонки, включая category и Arrow-строки"""
+        return df.select_dtypes(include=['object', 'category', 'string']).columns
+    
+    def _analyze_basic_chunked(self, dataset_name: str, dataset: ChunkedDataset) -> Dict[str, Any]:
+        """Базовый анализ по агрегатам, накопленным при потоковой загрузке"""
+        rows = dataset.rows
+        total_missing = dataset.total_missing
+        
+        result = {
+            'success': True,
+            'dataset_name': dataset_name,
+            'basic_info': {
+                'shape': dataset.shape,
+                'total_rows': rows,
+                'total_columns': len(dataset.columns),
+                'memory_usage': f"{dataset.memory_bytes / 1024:.2f} KB (оценка)"
+            },
+            'data_types': {
+                'column_types': dataset.dtypes,
+                'numeric_columns': dataset.numeric_columns,
+                'text_columns': dataset.text_columns,
+                'datetime_columns': []
+            },
+            'missing_values': {
+                'missing_counts': dataset.missing,
+                'missing_percentages': {
+                    col: round(count / rows * 100, 2) if rows else 0.0
+                    for col, count in dataset.missing.items()
+                },
+                'total_missing': total_missing,
+                'complete_rows': dataset.complete_rows
+            },
+            'numeric_statistics': {col: dataset.numeric_summary(col) for col in dataset.numeric_columns},
+            'categorical_statistics': {
+                col: {
+                    'unique_values': summary['unique_values'],
+                    'most_frequent': summary['most_frequent'],
+                    'value_counts': summary['value_counts']
+                }
+                for col, summary in ((col, dataset.categorical_summary(col)) for col in dataset.text_columns)
+            },
+            'summary': {
+                'data_quality': 'Good' if total_missing < rows * 0.1 else 'Needs cleaning',
+                'analysis_date': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'load_mode': 'chunked',
+                'approximate_fields': ['median', 'mode', '25%', '50%', '75%']
+            }
+        }
+        
+        logger.info(f"Проведён базовый анализ датасета '{dataset_name}' по потоковым агрегатам")
+        return result
+    
     async def _clean_data(self, dataset_name: str, operations: List[str] = None) -> Dict[str, Any]:
         """
         Очистка и предобработка данных
@@ -378,6 +840,13 @@ class DataAnalysisTool(Tool):
                     'error': f'Датасет "{dataset_name}" не найден'
                 }
             
+            if isinstance(self._data_cache[dataset_name], ChunkedDataset):
+                return {
+                    'success': False,
+                    'error': f'Датасет "{dataset_name}" загружен в режиме chunked и не хранится в памяти. '
+                             f'Для очистки загрузите его в режиме optimized'
+                }
+            
             df = self._data_cache[dataset_name].copy()
             original_shape = df.shape
             
@@ -408,13 +877,15 @@ class DataAnalysisTool(Tool):
                         df[col].fillna(df[col].median(), inplace=True)
                 
                 # Для категориальных - заполнение модой
-                categorical_cols = df.select_dtypes(include=['object']).columns
+                categorical_cols = self._text_columns(df)
                 for col in categorical_cols:
                     if df[col].isnull().sum() > 0:
                         mode_value = df[col].mode()
                         if len(mode_value) > 0:
                             df[col].fillna(mode_value.iloc[0], inplace=True)
                         else:
+                            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                                df[col] = df[col].cat.add_categories(['Unknown'])
                             df[col].fillna('Unknown', inplace=True)
                 
                 missing_after = df.isnull().sum().sum()
@@ -508,6 +979,8 @@ class DataAnalysisTool(Tool):
                 }
             
             df = self._data_cache[dataset_name]
+            if isinstance(df, ChunkedDataset):
+                return self._generate_report_chunked(dataset_name, df, report_type)
             
             # Базовые метрики
             basic_metrics = {
@@ -538,7 +1011,7 @@ class DataAnalysisTool(Tool):
                 # Анализ типов данных
                 data_types = {
                     'numeric_columns': df.select_dtypes(include=[np.number]).columns.tolist(),
-                    'text_columns': df.select_dtypes(include=['object']).columns.tolist(),
+                    'text_columns': self._text_columns(df).tolist(),
                     'datetime_columns': df.select_dtypes(include=['datetime64']).columns.tolist(),
                     'column_types': df.dtypes.astype(str).to_dict()
                 }
@@ -568,7 +1041,7 @@ class DataAnalysisTool(Tool):
                 
                 # Анализ категориальных данных
                 categorical_analysis = {}
-                text_cols = df.select_dtypes(include=['object']).columns
+                text_cols = self._text_columns(df)
                 
                 for col in text_cols:
                     value_counts = df[col].value_counts()
@@ -633,6 +1106,111 @@ class DataAnalysisTool(Tool):
                 'error': f'Ошибка генерации отчёта: {str(e)}'
             }
     
+    def _generate_report_chunked(self, dataset_name: str, dataset: ChunkedDataset,
+                                 report_type: str) -> Dict[str, Any]:
+        """Отчёт по агрегатам потоковой загрузки (та же структура, что и для DataFrame)"""
+        rows = dataset.rows
+        cells = rows * len(dataset.columns)
+        total_missing = dataset.total_missing
+        duplicates = dataset.duplicate_rows
+        missing_pct = total_missing / cells * 100 if cells else 0.0
+        duplicate_pct = duplicates / rows * 100 if rows else 0.0
+        
+        basic_metrics = {
+            'dataset_overview': {
+                'name': dataset_name,
+                'rows': rows,
+                'columns': len(dataset.columns),
+                'memory_usage_kb': round(dataset.memory_bytes / 1024, 2),
+                'completeness': round(100 - missing_pct, 2)
+            }
+        }
+        
+        if report_type in ['comprehensive', 'executive']:
+            basic_metrics.update({
+                'data_quality': {
+                    'missing_values': {
+                        'total_missing': total_missing,
+                        'missing_percentage': round(missing_pct, 2),
+                        'columns_with_missing': [col for col, count in dataset.missing.items() if count > 0],
+                        'complete_rows': dataset.complete_rows
+                    },
+                    'duplicates': {
+                        'duplicate_rows': duplicates,
+                        'duplicate_percentage': round(duplicate_pct, 2)
+                    }
+                },
+                'data_types': {
+                    'numeric_columns': dataset.numeric_columns,
+                    'text_columns': dataset.text_columns,
+                    'datetime_columns': [],
+                    'column_types': dataset.dtypes
+                }
+            })
+        
+        if report_type == 'comprehensive':
+            numeric_analysis = {}
+            for col in dataset.numeric_columns:
+                summary = dataset.numeric_summary(col)
+                numeric_analysis[col] = {
+                    'mean': float(summary['mean']),
+                    'median': float(summary['median']),
+                    'std': float(summary['std']),
+                    'min': float(summary['min']),
+                    'max': float(summary['max']),
+                    'q25': float(summary['25%']),
+                    'q75': float(summary['75%']),
+                    'skewness': float(summary['skewness']),
+                    'kurtosis': float(summary['kurtosis'])
+                }
+            
+            categorical_analysis = {}
+            for col in dataset.text_columns:
+                summary = dataset.categorical_summary(col, top=5)
+                categorical_analysis[col] = {
+                    'unique_values': summary['unique_values'],
+                    'most_frequent': str(summary['most_frequent']) if summary['most_frequent'] is not None else None,
+                    'most_frequent_count': summary['most_frequent_count'],
+                    'top_5_values': summary['value_counts']
+                }
+            
+            basic_metrics.update({
+                'numeric_analysis': numeric_analysis,
+                'categorical_analysis': categorical_analysis
+            })
+        
+        recommendations = []
+        if missing_pct > 5:
+            recommendations.append("Рассмотрите обработку пропущенных значений (>5% от общего объёма)")
+        if duplicates > 0:
+            recommendations.append(f"Обнаружено {duplicates} дублированных строк - рекомендуется удаление")
+        for col, numeric_count in dataset.numeric_like.items():
+            if rows and numeric_count / rows > 0.8:
+                recommendations.append(f"Колонка '{col}' содержит числовые данные - рекомендуется изменить тип")
+        
+        report = {
+            'report_info': {
+                'dataset_name': dataset_name,
+                'report_type': report_type,
+                'generated_at': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'tool_version': '1.0',
+                'load_mode': 'chunked'
+            },
+            'analysis_results': basic_metrics,
+            'recommendations': recommendations,
+            'summary': {
+                'data_quality_score': max(0, 100 - missing_pct - duplicate_pct),
+                'ready_for_analysis': missing_pct < 10 and duplicate_pct < 5
+            }
+        }
+        
+        logger.info(f"Сгенерирован {report_type} отчёт для датасета '{dataset_name}' по потоковым агрегатам")
+        
+        return {
+            'success': True,
+            'report': report
+        }
+    
     async def _export_data(self, dataset_name: str, output_path: str, file_format: str = 'csv') -> Dict[str, Any]:
         """
         Экспорт данных в файл
@@ -658,7 +1236,17 @@ class DataAnalysisTool(Tool):
             # Создание директории если не существует
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
-            if file_format.lower() == 'csv':
+            if isinstance(df, ChunkedDataset):
+                if file_format.lower() != 'csv':
+                    return {
+                        'success': False,
+                        'error': 'Датасет в режиме chunked экспортируется только в csv',
+                        'supported_formats': ['csv']
+                    }
+                # Потоковое копирование по частям
+                for i, chunk in enumerate(df.iter_chunks()):
+                    chunk.to_csv(output_path, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+            elif file_format.lower() == 'csv':
                 df.to_csv(output_path, index=False)
             elif file_format.lower() == 'excel':
                 df.to_excel(output_path, index=False)
@@ -678,8 +1266,8 @@ class DataAnalysisTool(Tool):
                 'message': f'Данные успешно экспортированы',
                 'output_path': str(output_path),
                 'file_size_kb': round(output_path.stat().st_size / 1024, 2),
-                'rows_exported': len(df),
-                'columns_exported': len(df.columns)
+                'rows_exported': df.shape[0],
+                'columns_exported': df.shape[1]
             }
             
         except Exception as e:
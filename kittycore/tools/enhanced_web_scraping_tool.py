@@ -1,11 +1,14 @@
 """
 Продвинутый инструмент веб-скрапинга для KittyCore 3.0
-Поддерживает парсинг HTML, извлечение метаданных, фильтрацию контента
+Поддерживает парсинг HTML, извлечение метаданных, фильтрацию контента,
+пул соединений с HTTP-кэшем, выбор парсера (lxml / html.parser)
+и обход сайтов (action="crawl") с потоковой выдачей страниц
 """
 
 import asyncio
 import time
 import re
+from contextlib import aclosing
 from typing import Dict, List, Optional, Any, Union
 from urllib.parse import urljoin, urlparse
 from dataclasses import dataclass
@@ -25,6 +28,11 @@ except ImportError:
 
 from .base_tool import Tool, ToolResult
 from .web_common import ScrapingResult, is_valid_url, clean_text, create_headers, WebSession
+from .web_fetch import FetchPool, HttpCache, FetchResponse, parse_html, resolve_parser, PARSERS
+from .web_crawler import WebCrawler, CrawlConfig, CrawlPage
+
+# Страницы, чьё тело крупнее этого порога (в символах, до обрезки), парсятся в пуле потоков, а не в event loop
+OFFLOOP_PARSE_THRESHOLD = 200_000
 
 
 @dataclass
@@ -37,6 +45,8 @@ class ScrapingConfig:
     max_content_length: int = 50000
     timeout: int = 30
     follow_redirects: bool = True
+    parser: str = "auto"
+    use_cache: bool = True
 
 
 class EnhancedWebScrapingTool(Tool):
@@ -49,15 +59,23 @@ class EnhancedWebScrapingTool(Tool):
     - Метаданные страницы (title, description, keywords)
     - Фильтрация и очистка контента
     - Поддержка множественных URL
-    - Асинхронная обработка
+    - Асинхронная обработка через общий пул соединений
+    - HTTP-кэш (ETag / Last-Modified / Cache-Control), опционально на диске
+    - Обход сайта с приоритетной очередью, robots.txt и бюджетами (crawl)
     """
     
-    def __init__(self):
+    def __init__(self, max_concurrency: int = 10, per_host_limit: int = 4,
+                 cache_dir: Optional[str] = None, cache_entries: int = 512):
         super().__init__(
             name="enhanced_web_scraping",
             description="Продвинутый веб-скрапинг с извлечением структурированных данных"
         )
         self.session = WebSession()
+        self.fetch_pool = FetchPool(
+            max_concurrency=max_concurrency,
+            per_host_limit=per_host_limit,
+            cache=HttpCache(max_entries=cache_entries, cache_dir=cache_dir)
+        )
         
         # Проверка зависимостей
         if not AIOHTTP_AVAILABLE:
@@ -70,10 +88,51 @@ class EnhancedWebScrapingTool(Tool):
         return {
             "type": "object",
             "properties": {
+                "action": {
+                    "type": "string",
+                    "enum": ["scrape", "crawl"],
+                    "default": "scrape",
+                    "description": "scrape - загрузить указанные URL, crawl - обойти сайт начиная с urls"
+                },
                 "urls": {
                     "type": "array",
                     "items": {"type": "string"},
-                    "description": "Список URL для скрапинга"
+                    "description": "Список URL для скрапинга (для crawl - стартовые URL)"
+                },
+                "max_depth": {
+                    "type": "integer",
+                    "default": 2,
+                    "description": "Глубина обхода от стартовых URL (для crawl)"
+                },
+                "max_pages": {
+                    "type": "integer",
+                    "default": 50,
+                    "description": "Максимум загружаемых страниц (для crawl)"
+                },
+                "same_domain": {
+                    "type": "boolean",
+                    "default": True,
+                    "description": "Не выходить за домены стартовых URL (для crawl)"
+                },
+                "politeness_delay": {
+                    "type": "number",
+                    "default": 1.0,
+                    "description": "Пауза между запросами к одному домену, сек (для crawl)"
+                },
+                "respect_robots": {
+                    "type": "boolean",
+                    "default": True,
+                    "description": "Соблюдать robots.txt (для crawl)"
+                },
+                "priority_keywords": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Ссылки с этими словами в URL обходятся раньше (для crawl)"
+                },
+                "exclude_patterns": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Подстроки URL, которые не нужно обходить (для crawl)"
                 },
                 "extract_links": {
                     "type": "boolean",
@@ -99,6 +158,17 @@ class EnhancedWebScrapingTool(Tool):
                     "type": "integer",
                     "default": 50000,
                     "description": "Максимальная длина контента"
+                },
+                "parser": {
+                    "type": "string",
+                    "enum": PARSERS,
+                    "default": "auto",
+                    "description": "HTML-парсер: auto (lxml если установлен), lxml, html.parser"
+                },
+                "use_cache": {
+                    "type": "boolean",
+                    "default": True,
+                    "description": "Использовать HTTP-кэш ответов"
                 }
             },
             "required": ["urls"]
@@ -117,7 +187,9 @@ class EnhancedWebScrapingTool(Tool):
                 extract_images=kwargs.get("extract_images", True),
                 extract_metadata=kwargs.get("extract_metadata", True),
                 filter_text=kwargs.get("filter_text", True),
-                max_content_length=kwargs.get("max_content_length", 50000)
+                max_content_length=kwargs.get("max_content_length", 50000),
+                parser=kwargs.get("parser", "auto"),
+                use_cache=kwargs.get("use_cache", True)
             )
             
             # Валидация URL
@@ -135,6 +207,9 @@ class EnhancedWebScrapingTool(Tool):
                     data={"results": []}
                 )
             
+            if kwargs.get("action", "scrape") == "crawl":
+                return await self._crawl(valid_urls, config, self._crawl_config(kwargs))
+            
             # Асинхронный скрапинг
             results = await self._scrape_multiple_urls(valid_urls, config)
             
@@ -143,6 +218,7 @@ class EnhancedWebScrapingTool(Tool):
                 data={
                     "total_urls": len(valid_urls),
                     "successful_scrapes": len([r for r in results if r.success]),
+                    "cache_hits": len([r for r in results if r.metadata and r.metadata.get("from_cache")]),
                     "results": [self._format_result(r) for r in results]
                 }
             )
@@ -156,18 +232,10 @@ class EnhancedWebScrapingTool(Tool):
             )
     
     async def _scrape_multiple_urls(self, urls: List[str], config: ScrapingConfig) -> List[ScrapingResult]:
-        """Асинхронный скрапинг множественных URL"""
-        tasks = []
-        
-        async with aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=config.timeout),
-            headers=create_headers()
-        ) as session:
-            for url in urls:
-                task = self._scrape_single_url(session, url, config)
-                tasks.append(task)
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        """Асинхронный скрапинг множественных URL через общий пул соединений"""
+        # Параллельность ограничивается семафором пула, а не числом URL
+        tasks = [self._scrape_single_url(url, config) for url in urls]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Обработка результатов и исключений
         processed_results = []
@@ -184,63 +252,11 @@ class EnhancedWebScrapingTool(Tool):
         
         return processed_results
     
-    async def _scrape_single_url(self, session: aiohttp.ClientSession, url: str, config: ScrapingConfig) -> ScrapingResult:
+    async def _scrape_single_url(self, url: str, config: ScrapingConfig) -> ScrapingResult:
         """Скрапинг одного URL"""
-        start_time = time.time()
-        
         try:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return ScrapingResult(
-                        url=url,
-                        success=False,
-                        data={},
-                        error=f"HTTP {response.status}: {response.reason}"
-                    )
-                
-                # Получаем контент
-                content = await response.text()
-                response_time = time.time() - start_time
-                
-                # Ограничиваем размер контента
-                if len(content) > config.max_content_length:
-                    content = content[:config.max_content_length]
-                
-                # Парсим HTML
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Собираем все данные в структуру data
-                scraped_data = {
-                    "response_time": response_time,
-                    "content_length": len(content),
-                    "raw_html": content[:1000] if len(content) > 1000 else content,  # Первые 1000 символов
-                }
-                
-                # Извлекаем текст
-                if config.filter_text:
-                    scraped_data["text"] = self._extract_clean_text(soup)
-                else:
-                    scraped_data["text"] = soup.get_text()
-                
-                # Извлекаем метаданные
-                if config.extract_metadata:
-                    scraped_data["page_metadata"] = self._extract_metadata(soup)
-                
-                # Извлекаем ссылки
-                if config.extract_links:
-                    scraped_data["links"] = self._extract_links(soup, url)
-                
-                # Извлекаем изображения
-                if config.extract_images:
-                    scraped_data["images"] = self._extract_images(soup, url)
-                
-                # Создаем правильный результат
-                return ScrapingResult(
-                    url=url,
-                    success=True,
-                    data=scraped_data,
-                    error=None
-                )
+            response = await self.fetch_pool.fetch(url, use_cache=config.use_cache)
+            return await self._process_response(response, config)
                 
         except Exception as e:
             return ScrapingResult(
@@ -250,6 +266,142 @@ class EnhancedWebScrapingTool(Tool):
                 error=str(e)
             )
     
+    async def _process_response(self, response: FetchResponse, config: ScrapingConfig) -> ScrapingResult:
+        """Разбор загруженной страницы (крупные страницы - вне event loop)"""
+        if response.status != 200:
+            return ScrapingResult(
+                url=response.url,
+                success=False,
+                data={},
+                error=f"HTTP {response.status}: {response.reason}"
+            )
+        
+        scraped_data = await self._parse_body(self._parse_page, response, config)
+        scraped_data["response_time"] = response.response_time
+        
+        return ScrapingResult(
+            url=response.url,
+            success=True,
+            data=scraped_data,
+            metadata={
+                "from_cache": response.from_cache,
+                "revalidated": response.revalidated,
+                "parser": resolve_parser(config.parser)
+            },
+            error=None
+        )
+    
+    async def _parse_body(self, parser, response: FetchResponse, config: ScrapingConfig):
+        """
+        Обрезка контента и вызов парсера
+        
+        Порог сравнивается с исходным размером тела, до обрезки по
+        max_content_length: иначе при настройках по умолчанию крупные
+        страницы никогда не уходили бы в пул потоков.
+        """
+        content = response.text[:config.max_content_length]
+        if len(response.text) > OFFLOOP_PARSE_THRESHOLD:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, parser, content, response.url, config)
+        return parser(content, response.url, config)
+    
+    def _parse_page(self, content: str, url: str, config: ScrapingConfig, soup=None) -> Dict[str, Any]:
+        """Синхронный парсинг HTML и извлечение данных"""
+        if soup is None:
+            soup = parse_html(content, config.parser)
+        
+        # Собираем все данные в структуру data
+        scraped_data = {
+            "content_length": len(content),
+            "raw_html": content[:1000] if len(content) > 1000 else content,  # Первые 1000 символов
+        }
+        
+        # Извлекаем текст
+        if config.filter_text:
+            scraped_data["text"] = self._extract_clean_text(soup)
+        else:
+            scraped_data["text"] = soup.get_text()
+        
+        # Извлекаем метаданные
+        if config.extract_metadata:
+            scraped_data["page_metadata"] = self._extract_metadata(soup)
+        
+        # Извлекаем ссылки
+        if config.extract_links:
+            scraped_data["links"] = self._extract_links(soup, url)
+        
+        # Извлекаем изображения
+        if config.extract_images:
+            scraped_data["images"] = self._extract_images(soup, url)
+        
+        return scraped_data
+    
+    def _crawl_config(self, kwargs: Dict[str, Any]) -> CrawlConfig:
+        """Параметры обхода из аргументов инструмента"""
+        defaults = CrawlConfig()
+        return CrawlConfig(
+            max_depth=kwargs.get("max_depth", defaults.max_depth),
+            max_pages=kwargs.get("max_pages", defaults.max_pages),
+            same_domain=kwargs.get("same_domain", defaults.same_domain),
+            politeness_delay=kwargs.get("politeness_delay", defaults.politeness_delay),
+            respect_robots=kwargs.get("respect_robots", defaults.respect_robots),
+            concurrency=kwargs.get("concurrency", defaults.concurrency),
+            priority_keywords=kwargs.get("priority_keywords") or [],
+            exclude_patterns=kwargs.get("exclude_patterns") or []
+        )
+    
+    async def crawl_stream(self, start_urls: List[str], config: Optional[ScrapingConfig] = None,
+                           crawl_config: Optional[CrawlConfig] = None):
+        """
+        Обход сайта с потоковой выдачей страниц
+        
+        Асинхронный итератор CrawlPage: обработку страниц можно начинать
+        до завершения обхода.
+        """
+        config = config or ScrapingConfig()
+        
+        async def process_page(response: FetchResponse):
+            return await self._parse_body(self._parse_crawl_page, response, config)
+        
+        crawler = WebCrawler(self.fetch_pool, process_page, crawl_config)
+        # aclosing останавливает воркеры, если потребитель прервал обход
+        async with aclosing(crawler.crawl(start_urls)) as pages:
+            async for page in pages:
+                yield page
+    
+    def _parse_crawl_page(self, content: str, url: str, config: ScrapingConfig):
+        """Парсинг страницы обхода: данные страницы и все ссылки для очереди"""
+        soup = parse_html(content, config.parser)
+        links = [a['href'] for a in soup.find_all('a', href=True)]
+        return self._parse_page(content, url, config, soup=soup), links
+    
+    async def _crawl(self, start_urls: List[str], config: ScrapingConfig,
+                     crawl_config: CrawlConfig) -> ToolResult:
+        """Обход сайта с накоплением результатов для ответа инструмента"""
+        results = []
+        async for page in self.crawl_stream(start_urls, config, crawl_config):
+            result = ScrapingResult(url=page.url, success=page.success, data=page.data,
+                                    metadata={"from_cache": page.from_cache}, error=page.error)
+            formatted = self._format_result(result)
+            formatted["depth"] = page.depth
+            results.append(formatted)
+        
+        return ToolResult(
+            success=True,
+            data={
+                "action": "crawl",
+                "start_urls": start_urls,
+                "pages_crawled": len(results),
+                "successful_scrapes": len([r for r in results if r["success"]]),
+                "max_depth_reached": max((r["depth"] for r in results), default=0),
+                "results": results
+            }
+        )
+    
+    async def close(self):
+        """Закрытие пула соединений"""
+        await self.fetch_pool.close()
+    
     def _extract_clean_text(self, soup) -> str:
         """Извлечение и очистка текста"""
         # Удаляем скрипты и стили
@@ -353,6 +505,9 @@ class EnhancedWebScrapingTool(Tool):
         if "response_time" in data:
             formatted["response_time"] = f"{data['response_time']:.2f}s"
         
+        if result.metadata and result.metadata.get("from_cache"):
+            formatted["from_cache"] = True
+        
         if "content_length" in data:
             formatted["content_length"] = data["content_length"]
         
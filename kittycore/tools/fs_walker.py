@@ -0,0 +1,205 @@
+"""
+📂 FS Walker - Потоковый обход директорий для SuperSystemTool KittyCore 3.0
+
+DirectoryWalker обходит дерево через os.scandir и использует закэшированные
+в DirEntry данные stat, поэтому на каждый элемент приходится не больше
+одного системного вызова stat. Возможности:
+- детерминированный порядок (в каждой директории сначала поддиректории,
+  затем файлы, по имени) и курсорная пагинация без повторного обхода
+  уже отданных поддеревьев
+- фильтры по glob-шаблону и расширениям прямо во время обхода
+- ограничение глубины и исключение директорий (node_modules, .git, ...)
+- параллельное чтение поддиректорий пулом потоков с сохранением порядка
+"""
+
+import concurrent.futures
+import fnmatch
+import os
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+SortKey = Tuple[bool, str, str]
+
+
+@dataclass
+class WalkEntry:
+    """Элемент обхода"""
+    path: str
+    relative_path: str
+    name: str
+    is_dir: bool
+    size: int
+    mtime: float
+    depth: int
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.name)[1] if not self.is_dir else ""
+
+
+def _is_dir(entry: os.DirEntry) -> bool:
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def _sort_key(entry: os.DirEntry) -> SortKey:
+    return (not _is_dir(entry), entry.name.lower(), entry.name)
+
+
+def _list_dir(path: str) -> Tuple[List[os.DirEntry], Optional[str]]:
+    """Отсортированное содержимое директории и текст ошибки, если её не удалось прочитать"""
+    try:
+        with os.scandir(path) as iterator:
+            entries = list(iterator)
+    except OSError as e:
+        return [], f"{path}: {e.strerror or e}"
+    entries.sort(key=_sort_key)
+    return entries, None
+
+
+def encode_cursor(entry: WalkEntry) -> str:
+    """Курсор продолжения после элемента: тип + относительный путь"""
+    return ("d:" if entry.is_dir else "f:") + entry.relative_path.replace(os.sep, "/")
+
+
+def decode_cursor(cursor: str) -> Tuple[SortKey, ...]:
+    kind, _, relative = cursor.partition(":")
+    if kind not in ("d", "f") or not relative:
+        raise ValueError(f"Некорректный курсор: {cursor}")
+    parts = relative.split("/")
+    keys = [(False, part.lower(), part) for part in parts[:-1]]
+    keys.append((kind == "f", parts[-1].lower(), parts[-1]))
+    return tuple(keys)
+
+
+class DirectoryWalker:
+    """
+    Обход дерева директорий через os.scandir
+
+    Фильтры pattern / extensions относятся к файлам; если хотя бы один задан,
+    директории не попадают в выдачу, а только обходятся.
+    """
+
+    def __init__(self,
+                 root: str,
+                 max_depth: Optional[int] = None,
+                 pattern: Optional[str] = None,
+                 extensions: Optional[Iterable[str]] = None,
+                 exclude_dirs: Optional[Iterable[str]] = None,
+                 include_dirs: bool = True,
+                 workers: int = 1):
+        self.root = os.path.abspath(root)
+        self.max_depth = max_depth
+        self.pattern = pattern
+        self.extensions: Optional[Set[str]] = {
+            (ext if ext.startswith(".") else f".{ext}").lower() for ext in extensions
+        } if extensions else None
+        self.exclude_dirs = set(exclude_dirs or ())
+        self.include_dirs = include_dirs and not (pattern or self.extensions)
+        self.workers = max(1, workers)
+        self.errors: List[str] = []
+
+    def _matches(self, entry: os.DirEntry, is_dir: bool) -> bool:
+        if is_dir:
+            return self.include_dirs
+        if self.extensions is not None and os.path.splitext(entry.name)[1].lower() not in self.extensions:
+            return False
+        return self.pattern is None or fnmatch.fnmatch(entry.name, self.pattern)
+
+    def _make_entry(self, entry: os.DirEntry, is_dir: bool, depth: int) -> Optional[WalkEntry]:
+        try:
+            stat = entry.stat()
+        except OSError:
+            # Битые ссылки и недоступные файлы пропускаются
+            return None
+        return WalkEntry(
+            path=entry.path,
+            relative_path=os.path.relpath(entry.path, self.root),
+            name=entry.name,
+            is_dir=is_dir,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            depth=depth
+        )
+
+    def _descend(self, entry: os.DirEntry, is_dir: bool, depth: int) -> bool:
+        if not is_dir or entry.name in self.exclude_dirs:
+            return False
+        if self.max_depth is not None and depth >= self.max_depth:
+            return False
+        try:
+            # Символические ссылки на директории не обходим (защита от циклов)
+            return not entry.is_symlink()
+        except OSError:
+            return False
+
+    def walk(self, cursor: Optional[str] = None) -> Iterator[WalkEntry]:
+        """Элементы дерева в детерминированном порядке, начиная после cursor"""
+        cursor_keys = decode_cursor(cursor) if cursor else None
+        entries, error = _list_dir(self.root)
+        if error:
+            self.errors.append(error)
+
+        if self.workers == 1:
+            yield from self._walk(entries, 1, (), cursor_keys, None)
+            return
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            yield from self._walk(entries, 1, (), cursor_keys, executor)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _walk(self, entries: List[os.DirEntry], depth: int, prefix: Tuple[SortKey, ...],
+              cursor_keys: Optional[Tuple[SortKey, ...]],
+              executor: Optional[concurrent.futures.Executor]) -> Iterator[WalkEntry]:
+        # Сначала решаем, что отдавать и куда спускаться, чтобы заранее
+        # запустить чтение поддиректорий в пуле
+        plan = []
+        for entry in entries:
+            key = prefix + (_sort_key(entry),)
+            sub_cursor = None
+            emit = True
+            if cursor_keys is not None:
+                cursor_prefix = cursor_keys[:len(key)]
+                if key < cursor_prefix:
+                    # Всё поддерево уже было отдано на предыдущих страницах
+                    continue
+                if key == cursor_prefix:
+                    emit = False
+                    sub_cursor = cursor_keys if len(cursor_keys) > len(key) else None
+            is_dir = not key[-1][0]
+            descend = self._descend(entry, is_dir, depth)
+            plan.append((entry, key, is_dir, emit, descend, sub_cursor))
+
+        pending = {}
+        if executor is not None:
+            pending = {entry.path: executor.submit(_list_dir, entry.path)
+                       for entry, _, _, _, descend, _ in plan if descend}
+
+        for entry, key, is_dir, emit, descend, sub_cursor in plan:
+            if emit and self._matches(entry, is_dir):
+                item = self._make_entry(entry, is_dir, depth)
+                if item is not None:
+                    yield item
+            if descend:
+                future = pending.get(entry.path)
+                children, error = future.result() if future else _list_dir(entry.path)
+                if error:
+                    self.errors.append(error)
+                yield from self._walk(children, depth + 1, key, sub_cursor, executor)
+
+    def page(self, cursor: Optional[str] = None, limit: int = 1000) -> Tuple[List[WalkEntry], Optional[str]]:
+        """Страница из limit элементов и курсор следующей страницы (None - обход завершён)"""
+        items = []
+        iterator = self.walk(cursor)
+        try:
+            for item in iterator:
+                if len(items) == limit:
+                    return items, encode_cursor(items[-1])
+                items.append(item)
+        finally:
+            iterator.close()
+        return items, None
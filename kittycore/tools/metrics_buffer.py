@@ -0,0 +1,272 @@
+"""
+📈 Metrics Buffer - Кольцевые буферы метрик для мониторинга KittyCore 3.0
+
+Компоненты:
+- MetricsRingBuffer: колоночный буфер фиксированной ёмкости на NumPy,
+  добавление отсчёта за O(1), выборка окна по времени бинарным поиском
+- TieredMetricsStore: сырые отсчёты + автоматическое прореживание в более
+  грубые уровни (среднее/минимум/максимум за интервал) для длительного
+  хранения при постоянном объёме памяти
+"""
+
+import math
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+class MetricsRingBuffer:
+    """
+    Колоночный кольцевой буфер метрик
+
+    Метки времени и значения хранятся в заранее выделенных массивах, новый
+    отсчёт перезаписывает самый старый. Метки времени не убывают (более ранняя
+    метка приравнивается к последней), поэтому окно ищется через searchsorted.
+    """
+
+    def __init__(self, columns: Sequence[str], capacity: int):
+        if capacity < 1:
+            raise ValueError("Ёмкость буфера должна быть положительной")
+        self.columns = list(columns)
+        self.capacity = capacity
+        self._column_index = {name: i for i, name in enumerate(self.columns)}
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros((capacity, len(self.columns)), dtype=np.float64)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self._timestamps.nbytes + self._values.nbytes
+
+    @property
+    def _start(self) -> int:
+        """Физический индекс самого старого отсчёта"""
+        return self._next if self._size == self.capacity else 0
+
+    @property
+    def first_timestamp(self) -> Optional[float]:
+        return float(self._timestamps[self._start]) if self._size else None
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        return float(self._timestamps[self._next - 1]) if self._size else None
+
+    def append(self, timestamp: float, values: Sequence[float]):
+        last = self.last_timestamp
+        if last is not None and timestamp < last:
+            timestamp = last
+        pos = self._next
+        self._timestamps[pos] = timestamp
+        self._values[pos] = values
+        self._next = (pos + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def _search(self, timestamp: float, side: str) -> int:
+        """Логическая позиция метки времени (0 - самый старый отсчёт)"""
+        if self._size < self.capacity:
+            return int(np.searchsorted(self._timestamps[:self._size], timestamp, side))
+        # Буфер заполнен: два отсортированных отрезка [next:] и [:next]
+        older = self._timestamps[self._next:]
+        newer = self._timestamps[:self._next]
+        return int(np.searchsorted(older, timestamp, side) + np.searchsorted(newer, timestamp, side))
+
+    def window(self, start: Optional[float] = None, end: Optional[float] = None,
+               last_n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Отсчёты в интервале [start, end] в хронологическом порядке (копия)"""
+        lo = 0 if start is None else self._search(start, "left")
+        hi = self._size if end is None else self._search(end, "right")
+        if last_n is not None:
+            lo = max(lo, hi - last_n)
+        if hi <= lo:
+            return np.empty(0), np.empty((0, len(self.columns)))
+        positions = (self._start + np.arange(lo, hi)) % self.capacity
+        return self._timestamps[positions], self._values[positions]
+
+    def column(self, values: np.ndarray, name: str) -> np.ndarray:
+        return values[:, self._column_index[name]]
+
+    def aggregate(self, start: Optional[float] = None, end: Optional[float] = None,
+                  columns: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, float]]:
+        """min / max / mean / перцентили по каждой колонке окна"""
+        _, values = self.window(start, end)
+        if len(values) == 0:
+            return {}
+        result = {}
+        for name in columns or self.columns:
+            data = self.column(values, name)
+            stats = {
+                "min": float(data.min()),
+                "max": float(data.max()),
+                "mean": float(data.mean())
+            }
+            for q, value in zip(PERCENTILES, np.percentile(data, PERCENTILES)):
+                stats[f"p{q}"] = float(value)
+            result[name] = stats
+        return result
+
+    def records(self, start: Optional[float] = None, end: Optional[float] = None,
+                last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Отсчёты в виде словарей (ISO-метки времени формируются только при чтении)"""
+        timestamps, values = self.window(start, end, last_n)
+        return [
+            {"timestamp": datetime.fromtimestamp(ts).isoformat(),
+             **dict(zip(self.columns, row.tolist()))}
+            for ts, row in zip(timestamps.tolist(), values)
+        ]
+
+
+@dataclass
+class DownsampleTier:
+    """Уровень прореживания: интервал агрегации и число хранимых интервалов"""
+    resolution: float
+    capacity: int
+
+    @property
+    def retention_seconds(self) -> float:
+        return self.resolution * self.capacity
+
+
+# 10 с за 6 часов и 1 мин за сутки
+DEFAULT_TIERS = (DownsampleTier(10.0, 2160), DownsampleTier(60.0, 1440))
+
+
+class _Bucket:
+    """Незавершённый интервал уровня прореживания"""
+
+    def __init__(self, width: int):
+        self.start: Optional[float] = None
+        self.count = 0
+        self.sum = np.zeros(width)
+        self.min = np.full(width, np.inf)
+        self.max = np.full(width, -np.inf)
+
+    def reset(self, start: float):
+        self.start = start
+        self.count = 0
+        self.sum.fill(0.0)
+        self.min.fill(np.inf)
+        self.max.fill(-np.inf)
+
+    def add(self, row: np.ndarray):
+        self.count += 1
+        self.sum += row
+        np.minimum(self.min, row, out=self.min)
+        np.maximum(self.max, row, out=self.max)
+
+    def row(self) -> np.ndarray:
+        # Колонки уровня: c, c_min, c_max для каждой метрики
+        return np.column_stack((self.sum / self.count, self.min, self.max)).ravel()
+
+
+class TieredMetricsStore:
+    """
+    Хранилище метрик с уровнями прореживания
+
+    Каждый отсчёт пишется в сырой кольцевой буфер и добавляется в текущие
+    интервалы всех уровней; завершённый интервал сбрасывается в буфер уровня
+    как среднее, минимум и максимум. Память и стоимость отсчёта постоянны
+    и не зависят от длительности мониторинга. Запросы по окну выбирают самый
+    подробный уровень, который покрывает окно целиком.
+    """
+
+    def __init__(self, columns: Sequence[str], raw_capacity: int = 1000,
+                 tiers: Sequence[DownsampleTier] = DEFAULT_TIERS):
+        self.columns = list(columns)
+        self.raw = MetricsRingBuffer(self.columns, raw_capacity)
+        tier_columns = [name for column in self.columns for name in (column, f"{column}_min", f"{column}_max")]
+        self.tiers = [(tier, MetricsRingBuffer(tier_columns, tier.capacity))
+                      for tier in sorted(tiers, key=lambda t: t.resolution)]
+        self._buckets = [_Bucket(len(self.columns)) for _ in self.tiers]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def append(self, timestamp: float, values: Sequence[float]):
+        row = np.asarray(values, dtype=np.float64)
+        with self._lock:
+            self.raw.append(timestamp, row)
+            for (tier, buffer), bucket in zip(self.tiers, self._buckets):
+                bucket_start = math.floor(timestamp / tier.resolution) * tier.resolution
+                if bucket.start is None:
+                    bucket.reset(bucket_start)
+                elif bucket_start > bucket.start:
+                    buffer.append(bucket.start, bucket.row())
+                    bucket.reset(bucket_start)
+                bucket.add(row)
+
+    def _select(self, start: Optional[float]) -> Tuple[str, Optional[DownsampleTier], MetricsRingBuffer]:
+        """Самый подробный уровень, покрывающий окно (иначе - с самыми старыми данными)"""
+        candidates = [("raw", None, self.raw)] + [
+            (f"{tier.resolution:g}s", tier, buffer) for tier, buffer in self.tiers
+        ]
+        if start is None:
+            return candidates[0]
+        available = [c for c in candidates if len(c[2])]
+        if not available:
+            return candidates[0]
+        for candidate in available:
+            if candidate[2].first_timestamp <= start:
+                return candidate
+        return min(available, key=lambda c: c[2].first_timestamp)
+
+    def summary(self, window_seconds: Optional[float] = None, now: Optional[float] = None) -> Dict[str, Any]:
+        """Агрегаты за последние window_seconds секунд (None - всё сырое окно)"""
+        with self._lock:
+            end = now if now is not None else self.raw.last_timestamp
+            start = end - window_seconds if (window_seconds is not None and end is not None) else None
+            name, tier, buffer = self._select(start)
+            if tier is not None and start is not None:
+                # Интервал помечен временем начала - берём и тот, что начался до окна
+                start -= tier.resolution
+            timestamps, _ = buffer.window(start, end)
+            aggregates = buffer.aggregate(start, end)
+
+        columns = {}
+        for column in self.columns:
+            if column not in aggregates:
+                continue
+            stats = dict(aggregates[column])
+            if tier is not None:
+                # Для прореженных данных экстремумы берутся из колонок min/max,
+                # перцентили приблизительные (по средним интервалов)
+                stats["min"] = aggregates[f"{column}_min"]["min"]
+                stats["max"] = aggregates[f"{column}_max"]["max"]
+            columns[column] = stats
+
+        return {
+            "tier": name,
+            "resolution_seconds": tier.resolution if tier else None,
+            "count": len(timestamps),
+            "start": datetime.fromtimestamp(timestamps[0]).isoformat() if len(timestamps) else None,
+            "end": datetime.fromtimestamp(timestamps[-1]).isoformat() if len(timestamps) else None,
+            "timespan_seconds": float(timestamps[-1] - timestamps[0]) if len(timestamps) else 0.0,
+            "columns": columns
+        }
+
+    def records(self, last_n: Optional[int] = None, window_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            end = self.raw.last_timestamp
+            start = end - window_seconds if (window_seconds is not None and end is not None) else None
+            return self.raw.records(start, end, last_n)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "raw": {"records": len(self.raw), "capacity": self.raw.capacity},
+            "tiers": [
+                {"resolution_seconds": tier.resolution, "records": len(buffer), "capacity": buffer.capacity,
+                 "retention_hours": round(tier.retention_seconds / 3600, 2)}
+                for tier, buffer in self.tiers
+            ],
+            "memory_bytes": self.raw.nbytes + sum(buffer.nbytes for _, buffer in self.tiers)
+        }
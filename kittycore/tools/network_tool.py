@@ -9,9 +9,11 @@ NetworkTool - Продвинутый сетевой инструмент для
 - Работа с WebSocket
 - DNS резолвинг и анализ
 - Проверка доступности хостов
+- Сканирование портов (скользящее окно, адаптивный таймаут, потоковая выдача)
 """
 
 import asyncio
+import functools
 import json
 import socket
 import ssl
@@ -19,7 +21,7 @@ import time
 import urllib.parse
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional, Union
 
 import aiohttp
 import dns.resolver
@@ -75,6 +77,74 @@ class HostCheck:
     error: Optional[str] = None
 
 
+@dataclass
+class PortScanResult:
+    """Результат проверки одного порта"""
+    host: str
+    port: int
+    status: str  # open / closed / filtered / error
+    response_time: float
+    service_name: Optional[str] = None
+    error: Optional[str] = None
+
+
+MAX_PORT = 65535
+DEFAULT_SCAN_CONCURRENCY = 500
+MIN_SCAN_TIMEOUT = 0.05
+
+
+@functools.lru_cache(maxsize=4096)
+def _service_name(port: int) -> Optional[str]:
+    try:
+        return socket.getservbyport(port)
+    except OSError:
+        return None
+
+
+def _max_open_sockets(requested: int) -> int:
+    """Ограничение параллельности лимитом файловых дескрипторов процесса"""
+    try:
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            return max(1, min(requested, soft - 64))
+    except (ImportError, ValueError, OSError):
+        pass
+    return max(1, requested)
+
+
+class AdaptiveTimeout:
+    """
+    Таймаут соединения по наблюдаемым RTT (как RTO в TCP, RFC 6298)
+    
+    До первых измерений используется максимальный таймаут. Затем
+    timeout = srtt + 4 * rttvar, но не меньше min_timeout и не больше max_timeout.
+    Ответы closed (RST) приходят за один RTT и тоже учитываются.
+    """
+    
+    def __init__(self, max_timeout: float, min_timeout: float = MIN_SCAN_TIMEOUT):
+        self.max_timeout = max_timeout
+        self.min_timeout = min(min_timeout, max_timeout)
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.samples = 0
+    
+    def observe(self, rtt: float):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.samples += 1
+    
+    @property
+    def current(self) -> float:
+        if self.srtt is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, self.srtt + 4 * self.rttvar))
+
+
 class NetworkTool(Tool):
     """Продвинутый сетевой инструмент"""
     
@@ -113,6 +183,7 @@ class NetworkTool(Tool):
             "get_dns_records",
             "scan_port",
             "scan_ports_range",
+            "scan_hosts",
             "get_network_connections",
             "trace_route",
             "get_whois_info",
@@ -440,57 +511,155 @@ class NetworkTool(Tool):
                 error=f"Сканирование порта неудачно: {str(e)}"
             )
     
-    async def scan_ports_range(self, host: str, start_port: int = 1, end_port: int = 1000, timeout: float = 1.0) -> ToolResult:
-        """Сканирование диапазона портов"""
+    async def _probe_port(self, host: str, address: str, port: int, timeout: float,
+                          family: int = socket.AF_INET) -> PortScanResult:
+        """Неблокирующая проверка порта на сыром сокете (без stream-обвязки asyncio)"""
+        loop = asyncio.get_running_loop()
+        start_time = time.perf_counter()
+        try:
+            # Нехватка дескрипторов (EMFILE) - ошибка одного порта, а не воркера
+            sock = socket.socket(family, socket.SOCK_STREAM)
+        except OSError as e:
+            return PortScanResult(host=host, port=port, status="error", response_time=0.0, error=str(e))
+        sock.setblocking(False)
+        try:
+            async with asyncio.timeout(timeout):
+                await loop.sock_connect(sock, (address, port))
+        except TimeoutError:
+            return PortScanResult(host=host, port=port, status="filtered",
+                                  response_time=time.perf_counter() - start_time)
+        except ConnectionRefusedError:
+            return PortScanResult(host=host, port=port, status="closed",
+                                  response_time=time.perf_counter() - start_time)
+        except OSError as e:
+            return PortScanResult(host=host, port=port, status="error",
+                                  response_time=time.perf_counter() - start_time, error=str(e))
+        finally:
+            sock.close()
+        
+        return PortScanResult(host=host, port=port, status="open",
+                              response_time=time.perf_counter() - start_time,
+                              service_name=_service_name(port))
+    
+    async def scan_ports_stream(self,
+                                hosts: Union[str, List[str]],
+                                ports: Iterable[int],
+                                timeout: float = 1.0,
+                                concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+                                adaptive_timeout: bool = True) -> AsyncIterator[PortScanResult]:
+        """
+        Потоковое сканирование портов одного или нескольких хостов
+        
+        Пары (хост, порт) раздаются из общего итератора фиксированному числу
+        воркеров: медленный порт занимает одно место в окне и не задерживает
+        остальные. Результаты отдаются по мере готовности.
+        
+        С adaptive_timeout порт, не ответивший за srtt + 4 * rttvar хоста, сразу
+        считается filtered, без повторной попытки с полным timeout: так
+        отфильтрованные порты стоят меньше полного таймаута, но ответ медленнее
+        оценки тоже будет filtered. Для исчерпывающей проверки - adaptive_timeout=False.
+        """
+        if isinstance(hosts, str):
+            hosts = [hosts]
+        ports = list(ports)
+        
+        # Резолвим каждый хост один раз, а не на каждый порт
+        loop = asyncio.get_running_loop()
+        addresses: Dict[str, tuple] = {}
+        for host in hosts:
+            try:
+                infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+                addresses[host] = (infos[0][4][0], infos[0][0])
+            except OSError as e:
+                yield PortScanResult(host=host, port=0, status="error", response_time=0.0,
+                                     error=f"Не удалось разрешить имя: {e}")
+        
+        timeouts = {host: AdaptiveTimeout(timeout) for host in addresses}
+        # Хосты чередуются, чтобы окно покрывало их параллельно
+        targets = iter([(host, port) for port in ports for host in addresses])
+        results: asyncio.Queue = asyncio.Queue()
+        
+        async def worker():
+            for host, port in targets:
+                address, family = addresses[host]
+                estimator = timeouts[host]
+                current_timeout = estimator.current if adaptive_timeout else timeout
+                try:
+                    result = await self._probe_port(host, address, port, current_timeout, family)
+                except Exception as e:
+                    # Сбой одного порта не должен останавливать воркер и обрывать поток
+                    result = PortScanResult(host=host, port=port, status="error", response_time=0.0,
+                                            error=str(e))
+                if adaptive_timeout and result.status in ("open", "closed"):
+                    estimator.observe(result.response_time)
+                await results.put(result)
+        
+        workers = [asyncio.create_task(worker())
+                   for _ in range(min(_max_open_sockets(concurrency), len(ports) * len(addresses)))]
+        done = asyncio.gather(*workers)
+        done.add_done_callback(lambda _: results.put_nowait(None))
+        
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                yield result
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    
+    def _validate_port_range(self, start_port: int, end_port: int) -> Optional[str]:
+        if not (1 <= start_port <= end_port <= MAX_PORT):
+            return f"Некорректный диапазон портов: {start_port}-{end_port} (допустимо 1-{MAX_PORT})"
+        return None
+    
+    async def scan_ports_range(self, host: str, start_port: int = 1, end_port: int = 1000, timeout: float = 1.0,
+                               concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+                               adaptive_timeout: bool = True) -> ToolResult:
+        """Сканирование диапазона портов (до полного 1-65535)"""
         try:
+            error = self._validate_port_range(start_port, end_port)
+            if error:
+                return ToolResult(success=False, error=error)
+            
             open_ports = []
-            closed_ports = []
+            status_counts = {"closed": 0, "filtered": 0, "error": 0}
             total_scanned = 0
             
             start_time = time.time()
             
-            # Ограничиваем количество портов для сканирования
-            max_ports = min(end_port - start_port + 1, 200)  # Максимум 200 портов
-            actual_end = min(end_port, start_port + max_ports - 1)
-            
-            # Создаём задачи для параллельного сканирования
-            scan_tasks = []
-            for port in range(start_port, actual_end + 1):
-                task = self.scan_port(host, port, timeout)
-                scan_tasks.append(task)
-            
-            # Выполняем сканирование батчами по 50 портов
-            batch_size = 50
-            for i in range(0, len(scan_tasks), batch_size):
-                batch = scan_tasks[i:i + batch_size]
-                results = await asyncio.gather(*batch, return_exceptions=True)
+            async for result in self.scan_ports_stream(host, range(start_port, end_port + 1), timeout,
+                                                       concurrency, adaptive_timeout):
+                if result.port == 0:
+                    return ToolResult(success=False, error=result.error)
                 
-                for result in results:
-                    if isinstance(result, Exception):
-                        continue
-                    
-                    if result.success and result.data["is_reachable"]:
-                        open_ports.append({
-                            "port": result.data["port"],
-                            "service_name": result.data.get("service_name"),
-                            "response_time": result.data["response_time"]
-                        })
-                    else:
-                        closed_ports.append(result.data["port"])
-                    
-                    total_scanned += 1
+                if result.status == "open":
+                    open_ports.append({
+                        "port": result.port,
+                        "service_name": result.service_name,
+                        "response_time": result.response_time
+                    })
+                elif result.status in status_counts:
+                    status_counts[result.status] += 1
+                
+                total_scanned += 1
             
             total_time = time.time() - start_time
+            open_ports.sort(key=lambda item: item["port"])
             
             return ToolResult(
                 success=True,
                 data={
                     "host": host,
-                    "port_range": f"{start_port}-{actual_end}",
+                    "port_range": f"{start_port}-{end_port}",
                     "total_scanned": total_scanned,
                     "open_ports": open_ports,
                     "open_count": len(open_ports),
-                    "closed_count": len(closed_ports),
+                    "closed_count": status_counts["closed"],
+                    "filtered_count": status_counts["filtered"],
+                    "error_count": status_counts["error"],
                     "scan_time": total_time,
                     "ports_per_second": total_scanned / total_time if total_time > 0 else 0
                 }
@@ -502,6 +671,55 @@ class NetworkTool(Tool):
                 error=f"Сканирование диапазона портов неудачно: {str(e)}"
             )
     
+    async def scan_hosts(self, hosts: List[str], start_port: int = 1, end_port: int = 1000, timeout: float = 1.0,
+                         concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+                         adaptive_timeout: bool = True) -> ToolResult:
+        """Параллельное сканирование одного диапазона портов на нескольких хостах"""
+        try:
+            error = self._validate_port_range(start_port, end_port)
+            if error:
+                return ToolResult(success=False, error=error)
+            
+            summary = {host: {"open_ports": [], "scanned": 0, "error": None} for host in hosts}
+            start_time = time.time()
+            
+            async for result in self.scan_ports_stream(hosts, range(start_port, end_port + 1), timeout,
+                                                       concurrency, adaptive_timeout):
+                host_summary = summary[result.host]
+                if result.port == 0:
+                    host_summary["error"] = result.error
+                    continue
+                host_summary["scanned"] += 1
+                if result.status == "open":
+                    host_summary["open_ports"].append({
+                        "port": result.port,
+                        "service_name": result.service_name,
+                        "response_time": result.response_time
+                    })
+            
+            total_time = time.time() - start_time
+            for host_summary in summary.values():
+                host_summary["open_ports"].sort(key=lambda item: item["port"])
+                host_summary["open_count"] = len(host_summary["open_ports"])
+            
+            total_scanned = sum(item["scanned"] for item in summary.values())
+            return ToolResult(
+                success=True,
+                data={
+                    "hosts": summary,
+                    "port_range": f"{start_port}-{end_port}",
+                    "total_scanned": total_scanned,
+                    "scan_time": total_time,
+                    "ports_per_second": total_scanned / total_time if total_time > 0 else 0
+                }
+            )
+            
+        except Exception as e:
+            return ToolResult(
+                success=False,
+                error=f"Сканирование хостов неудачно: {str(e)}"
+            )
+    
     # Реализуем обязательные методы
     async def execute(self, action: str, **kwargs) -> ToolResult:
         """Выполнение действия"""
@@ -527,6 +745,8 @@ class NetworkTool(Tool):
             return await self.scan_port(**kwargs)
         elif action == "scan_ports_range":
             return await self.scan_ports_range(**kwargs)
+        elif action == "scan_hosts":
+            return await self.scan_hosts(**kwargs)
         else:
             return ToolResult(
                 success=False,
@@ -569,7 +789,20 @@ class NetworkTool(Tool):
                 },
                 "end_port": {
                     "type": "integer",
-                    "description": "Конечный порт для сканирования"
+                    "description": "Конечный порт для сканирования (до 65535)"
+                },
+                "hosts": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Список хостов для scan_hosts"
+                },
+                "concurrency": {
+                    "type": "integer",
+                    "description": "Число одновременных соединений при сканировании портов"
+                },
+                "adaptive_timeout": {
+                    "type": "boolean",
+                    "description": "Подстраивать таймаут сканирования под наблюдаемые RTT"
                 },
                 "record_type": {
                     "type": "string",
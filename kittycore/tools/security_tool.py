@@ -8,8 +8,16 @@ SecurityTool - Продвинутый инструмент безопаснос
 - Анализ сетевой безопасности
 - Детекция вредоносного контента
 - Аудит конфигураций безопасности
+
+Чистый код просматривается за один проход: все паттерны уязвимостей собраны
+в одно регулярное выражение-префильтр, а правила по отдельности ищутся только
+в коде, где префильтр что-то нашёл. Номера строк вычисляются бинарным поиском
+по индексу переводов строк.
 """
 
+import asyncio
+import bisect
+import concurrent.futures
 import hashlib
 import hmac
 import secrets
@@ -22,7 +30,9 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from typing import Dict, Any, List, Optional, Union, Set, Tuple
 from pathlib import Path
+import os
 import subprocess
+from collections import OrderedDict
 
 from loguru import logger
 
@@ -84,6 +94,141 @@ class SecurityAudit:
     compliance_checks: Dict[str, bool]
 
 
+# Расширения файлов, которые сканирует scan_directory по умолчанию
+CODE_EXTENSIONS = {
+    '.py', '.js', '.jsx', '.ts', '.tsx', '.php', '.java', '.cpp', '.c', '.h',
+    '.cs', '.rb', '.go', '.html', '.sql', '.sh'
+}
+EXCLUDED_DIRS = {'.git', '.hg', '.svn', 'node_modules', '__pycache__', '.venv', 'venv', '.tox'}
+# Меньше файлов выгоднее сканировать в текущем процессе, чем поднимать пул
+PROCESS_POOL_MIN_FILES = 8
+# Сколько результатов сканирования и отпечатков файлов держать в памяти (LRU)
+FILE_SCAN_CACHE_SIZE = 4096
+
+HARDCODED_PASSWORD_RE = re.compile(r'password\s*=\s*[\'"][^\'"]{6,}[\'"]', re.IGNORECASE)
+
+
+@dataclass
+class PatternRule:
+    """Правило поиска уязвимости"""
+    category: str
+    pattern: str
+    severity: str
+    description: str
+    cwe: Optional[str] = None
+
+
+class LineIndex:
+    """Индекс смещений переводов строк: номер строки по позиции за O(log n)"""
+    
+    def __init__(self, text: str):
+        self._offsets = []
+        pos = text.find('\n')
+        while pos != -1:
+            self._offsets.append(pos)
+            pos = text.find('\n', pos + 1)
+    
+    def line_of(self, position: int) -> int:
+        return bisect.bisect_left(self._offsets, position) + 1
+    
+    @property
+    def lines_count(self) -> int:
+        return len(self._offsets) + 1
+
+
+class VulnerabilityScanner:
+    """
+    Многошаблонный сканер уязвимостей
+    
+    Паттерны компилируются один раз. Их альтернация (?:...)|(?:...) служит
+    префильтром: если она ничего не нашла, не сработает ни одно правило, и код
+    без уязвимостей просматривается за один проход. Иначе каждое правило ищется
+    своим проходом - совпадения разных правил могут пересекаться, и в общей
+    альтернации первое сработавшее правило скрыло бы остальные. Если паттерны
+    нельзя объединить (например, в них свои именованные группы), префильтр
+    не используется.
+    """
+    
+    def __init__(self, patterns: Dict[str, List[Dict]]):
+        self.source = patterns
+        self.rules = [
+            PatternRule(category=category, pattern=data["pattern"], severity=data["severity"],
+                        description=data["description"], cwe=data.get("cwe"))
+            for category, items in patterns.items()
+            for data in items
+        ]
+        self.fingerprint = hashlib.sha256(
+            json.dumps([asdict(rule) for rule in self.rules]).encode('utf-8')
+        ).hexdigest()[:16]
+        
+        flags = re.IGNORECASE | re.MULTILINE
+        self._separate = [re.compile(rule.pattern, flags) for rule in self.rules]
+        try:
+            self._combined = re.compile('|'.join(f"(?:{rule.pattern})" for rule in self.rules), flags)
+        except re.error:
+            self._combined = None
+    
+    def scan(self, code: str, line_index: Optional[LineIndex] = None) -> List[Tuple[int, int, str]]:
+        """Поиск уязвимостей: список (индекс правила, номер строки, фрагмент кода)"""
+        if self._combined is not None and self._combined.search(code) is None:
+            return []
+        
+        line_index = line_index or LineIndex(code)
+        found = []
+        for rule_index, compiled in enumerate(self._separate):
+            for match in compiled.finditer(code):
+                found.append((match.start(), rule_index, match.group(0)))
+        found.sort()
+        return [(rule_index, line_index.line_of(start), snippet) for start, rule_index, snippet in found]
+
+
+def check_code_compliance(code: str) -> Dict[str, bool]:
+    """Проверка соответствия стандартам безопасности"""
+    lowered = code.lower()
+    return {
+        "has_input_validation": "validate" in lowered or "sanitize" in lowered,
+        "has_error_handling": "try:" in code or "catch" in code or "except" in code,
+        "has_logging": "log" in lowered or "logger" in lowered,
+        "no_hardcoded_secrets": not bool(HARDCODED_PASSWORD_RE.search(code)),
+        "uses_https": "https://" in code,
+        "has_authentication": "auth" in lowered or "login" in lowered
+    }
+
+
+# Сканер процесса-воркера пула (создаётся один раз в _init_scan_worker)
+_worker_scanner: Optional[VulnerabilityScanner] = None
+
+
+def _init_scan_worker(patterns: Dict[str, List[Dict]]):
+    global _worker_scanner
+    _worker_scanner = VulnerabilityScanner(patterns)
+
+
+def _scan_file(path: str, scanner: Optional[VulnerabilityScanner] = None,
+               raw: Optional[bytes] = None, sha: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Сканирование одного файла (выполняется в воркере пула или в текущем процессе)
+    
+    raw и sha передаются, если файл уже прочитан и захеширован при проверке кэша.
+    """
+    scanner = scanner or _worker_scanner
+    try:
+        if raw is None:
+            raw = Path(path).read_bytes()
+        code = raw.decode('utf-8')
+    except (OSError, UnicodeDecodeError) as e:
+        return {"path": path, "error": str(e)}
+    
+    line_index = LineIndex(code)
+    return {
+        "path": path,
+        "sha256": sha or hashlib.sha256(raw).hexdigest(),
+        "lines": line_index.lines_count,
+        "findings": scanner.scan(code, line_index),
+        "compliance": check_code_compliance(code)
+    }
+
+
 class SecurityTool(Tool):
     """Продвинутый инструмент безопасности"""
     
@@ -102,12 +247,20 @@ class SecurityTool(Tool):
         self._default_timeout = 30.0
         self._max_file_size = 10 * 1024 * 1024  # 10MB
         
+        self._scanner: Optional[VulnerabilityScanner] = None
+        # Результаты сканирования файлов: "<отпечаток правил>:<sha256>" -> результат (LRU)
+        self._file_scan_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._file_scan_cache_size = FILE_SCAN_CACHE_SIZE
+        # path -> (mtime_ns, size, sha256): неизменённые файлы не перечитываются (LRU)
+        self._file_stat_cache: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+        
         logger.info("🔒 SecurityTool инициализирован")
     
     def get_available_actions(self) -> List[str]:
         """Получение списка доступных действий"""
         return [
             "scan_code_vulnerabilities",
+            "scan_directory",
             "scan_web_vulnerabilities", 
             "analyze_password",
             "generate_secure_password",
@@ -244,36 +397,16 @@ class SecurityTool(Tool):
             if language == "auto":
                 language = self._detect_language(code, file_path)
             
-            vulnerabilities = []
             scan_start = time.time()
-            
-            # Сканируем по каждой категории уязвимостей
-            for category, patterns in self._vulnerability_patterns.items():
-                for pattern_data in patterns:
-                    pattern = pattern_data["pattern"]
-                    matches = re.finditer(pattern, code, re.IGNORECASE | re.MULTILINE)
-                    
-                    for match in matches:
-                        # Находим номер строки
-                        line_num = code[:match.start()].count('\n') + 1
-                        
-                        vulnerability = SecurityVulnerability(
-                            id=f"{category}_{len(vulnerabilities) + 1}",
-                            title=f"{category.replace('_', ' ').title()} Vulnerability",
-                            description=pattern_data["description"],
-                            severity=pattern_data["severity"],
-                            category=category,
-                            location=f"Line {line_num}" + (f" in {file_path}" if file_path else ""),
-                            code_snippet=match.group(0),
-                            cwe_id=pattern_data.get("cwe"),
-                            recommendation=self._get_vulnerability_recommendation(category)
-                        )
-                        vulnerabilities.append(vulnerability)
+            line_index = LineIndex(code)
+            vulnerabilities = self._build_vulnerabilities(
+                self._get_scanner().scan(code, line_index), file_path
+            )
             
             scan_duration = time.time() - scan_start
             
             # Вычисляем общий рейтинг безопасности
-            security_score = self._calculate_security_score(vulnerabilities, len(code.split('\n')))
+            security_score = self._calculate_security_score(vulnerabilities, line_index.lines_count)
             risk_level = self._get_risk_level(vulnerabilities)
             
             audit = SecurityAudit(
@@ -307,6 +440,195 @@ class SecurityTool(Tool):
                 error=f"Ошибка сканирования кода: {str(e)}"
             )
     
+    def _get_scanner(self) -> VulnerabilityScanner:
+        """Скомпилированный сканер (пересобирается при замене набора паттернов)"""
+        if self._scanner is None or self._scanner.source is not self._vulnerability_patterns:
+            self._scanner = VulnerabilityScanner(self._vulnerability_patterns)
+        return self._scanner
+    
+    def _build_vulnerabilities(self, findings: List[Tuple[int, int, str]], file_path: Optional[str] = None,
+                               id_offset: int = 0) -> List[SecurityVulnerability]:
+        """Преобразование найденных совпадений в SecurityVulnerability"""
+        rules = self._get_scanner().rules
+        vulnerabilities = []
+        for number, (rule_index, line_num, snippet) in enumerate(findings, start=id_offset + 1):
+            rule = rules[rule_index]
+            vulnerabilities.append(SecurityVulnerability(
+                id=f"{rule.category}_{number}",
+                title=f"{rule.category.replace('_', ' ').title()} Vulnerability",
+                description=rule.description,
+                severity=rule.severity,
+                category=rule.category,
+                location=f"Line {line_num}" + (f" in {file_path}" if file_path else ""),
+                code_snippet=snippet,
+                cwe_id=rule.cwe,
+                recommendation=self._get_vulnerability_recommendation(rule.category)
+            ))
+        return vulnerabilities
+    
+    def _collect_files(self, directory: Path, extensions: Set[str], exclude_dirs: Set[str]) -> List[Path]:
+        files = []
+        for root, dirs, names in os.walk(directory):
+            dirs[:] = [d for d in dirs if d not in exclude_dirs]
+            for name in names:
+                if os.path.splitext(name)[1].lower() in extensions:
+                    files.append(Path(root) / name)
+        return sorted(files)
+    
+    def _cached_file_result(self, path: Path, stat: os.stat_result,
+                            fingerprint: str) -> Tuple[Optional[Dict[str, Any]], Optional[bytes], Optional[str]]:
+        """
+        Результат из кэша, если содержимое файла не изменилось
+        
+        Возвращает (результат, прочитанные байты, sha256): при промахе байты и хеш
+        передаются в _scan_file, чтобы не читать и не хешировать файл повторно.
+        """
+        key = str(path)
+        raw = None
+        known = self._file_stat_cache.get(key)
+        if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            sha = known[2]
+            self._file_stat_cache.move_to_end(key)
+        else:
+            try:
+                raw = path.read_bytes()
+            except OSError:
+                return None, None, None
+            sha = hashlib.sha256(raw).hexdigest()
+            self._file_stat_cache[key] = (stat.st_mtime_ns, stat.st_size, sha)
+            self._file_stat_cache.move_to_end(key)
+            while len(self._file_stat_cache) > self._file_scan_cache_size:
+                self._file_stat_cache.popitem(last=False)
+        
+        cache_key = f"{fingerprint}:{sha}"
+        cached = self._file_scan_cache.get(cache_key)
+        if cached is not None:
+            self._file_scan_cache.move_to_end(cache_key)
+        return cached, raw, sha
+    
+    def _remember_file_result(self, fingerprint: str, result: Dict[str, Any]):
+        """Запомнить результат сканирования, вытеснив самый давний при переполнении"""
+        cache_key = f"{fingerprint}:{result['sha256']}"
+        self._file_scan_cache[cache_key] = result
+        self._file_scan_cache.move_to_end(cache_key)
+        while len(self._file_scan_cache) > self._file_scan_cache_size:
+            self._file_scan_cache.popitem(last=False)
+    
+    async def scan_directory(self,
+                             directory: str,
+                             extensions: Optional[List[str]] = None,
+                             exclude_dirs: Optional[List[str]] = None,
+                             max_workers: Optional[int] = None,
+                             use_cache: bool = True) -> ToolResult:
+        """
+        Сканирование всех файлов проекта на уязвимости
+        
+        Файлы раздаются пулу процессов; результаты кэшируются по хешу содержимого,
+        поэтому при повторном сканировании неизменённые файлы пропускаются.
+        """
+        try:
+            root = Path(directory)
+            if not root.is_dir():
+                return ToolResult(
+                    success=False,
+                    error=f"Директория не найдена: {directory}"
+                )
+            
+            scan_start = time.time()
+            scanner = self._get_scanner()
+            extensions = {e.lower() if e.startswith('.') else f".{e.lower()}" for e in extensions} \
+                if extensions else CODE_EXTENSIONS
+            exclude = set(exclude_dirs) if exclude_dirs is not None else EXCLUDED_DIRS
+            
+            file_results: Dict[str, Dict[str, Any]] = {}
+            # (путь, байты, sha256): уже прочитанное при проверке кэша не читается повторно
+            to_scan: List[Tuple[str, Optional[bytes], Optional[str]]] = []
+            skipped: List[Dict[str, str]] = []
+            cache_hits = 0
+            
+            for path in self._collect_files(root, extensions, exclude):
+                try:
+                    stat = path.stat()
+                except OSError as e:
+                    # Битая ссылка или файл, удалённый во время обхода, не отменяют сканирование
+                    skipped.append({"file_path": str(path), "reason": str(e)})
+                    continue
+                if stat.st_size > self._max_file_size:
+                    skipped.append({"file_path": str(path), "reason": f"Файл слишком большой: {stat.st_size} байт"})
+                    continue
+                cached, raw, sha = self._cached_file_result(path, stat, scanner.fingerprint) \
+                    if use_cache else (None, None, None)
+                if cached is not None:
+                    file_results[str(path)] = cached
+                    cache_hits += 1
+                else:
+                    to_scan.append((str(path), raw, sha))
+            
+            if len(to_scan) < PROCESS_POOL_MIN_FILES or max_workers == 1:
+                scanned = [_scan_file(path, scanner, raw, sha) for path, raw, sha in to_scan]
+            else:
+                loop = asyncio.get_running_loop()
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    initializer=_init_scan_worker,
+                    initargs=(self._vulnerability_patterns,)
+                ) as pool:
+                    scanned = await asyncio.gather(*[
+                        loop.run_in_executor(pool, _scan_file, path, None, raw, sha)
+                        for path, raw, sha in to_scan
+                    ])
+            
+            for result in scanned:
+                if "error" in result:
+                    skipped.append({"file_path": result["path"], "reason": result["error"]})
+                    continue
+                file_results[result["path"]] = result
+                self._remember_file_result(scanner.fingerprint, result)
+            
+            all_vulnerabilities: List[SecurityVulnerability] = []
+            files_report = []
+            for path in sorted(file_results):
+                result = file_results[path]
+                vulnerabilities = self._build_vulnerabilities(result["findings"], path, len(all_vulnerabilities))
+                all_vulnerabilities.extend(vulnerabilities)
+                files_report.append({
+                    "file_path": path,
+                    "language": self._detect_language("", path),
+                    "lines": result["lines"],
+                    "vulnerabilities": len(vulnerabilities),
+                    "security_score": self._calculate_security_score(vulnerabilities, result["lines"]),
+                    "risk_level": self._get_risk_level(vulnerabilities),
+                    "compliance_checks": result["compliance"]
+                })
+            
+            return ToolResult(
+                success=True,
+                data={
+                    "directory": str(root),
+                    "files_scanned": len(file_results),
+                    "files_from_cache": cache_hits,
+                    "files_skipped": skipped,
+                    "scan_duration": time.time() - scan_start,
+                    "risk_level": self._get_risk_level(all_vulnerabilities),
+                    "recommendations": self._generate_code_recommendations(all_vulnerabilities),
+                    "files": files_report,
+                    "vulnerabilities": [asdict(v) for v in all_vulnerabilities],
+                    "summary": {
+                        "total_vulnerabilities": len(all_vulnerabilities),
+                        "critical": len([v for v in all_vulnerabilities if v.severity == "critical"]),
+                        "high": len([v for v in all_vulnerabilities if v.severity == "high"]),
+                        "medium": len([v for v in all_vulnerabilities if v.severity == "medium"]),
+                        "low": len([v for v in all_vulnerabilities if v.severity == "low"])
+                    }
+                }
+            )
+            
+        except Exception as e:
+            return ToolResult(
+                success=False,
+                error=f"Ошибка сканирования директории: {str(e)}"
+            )
+    
     async def analyze_password(self, password: str) -> ToolResult:
         """Анализ пароля на безопасность"""
         try:
@@ -579,14 +901,7 @@ class SecurityTool(Tool):
     
     def _check_code_compliance(self, code: str) -> Dict[str, bool]:
         """Проверка соответствия стандартам безопасности"""
-        return {
-            "has_input_validation": "validate" in code.lower() or "sanitize" in code.lower(),
-            "has_error_handling": "try:" in code or "catch" in code or "except" in code,
-            "has_logging": "log" in code.lower() or "logger" in code.lower(),
-            "no_hardcoded_secrets": not bool(re.search(r'password\s*=\s*[\'"][^\'"]{6,}[\'"]', code, re.IGNORECASE)),
-            "uses_https": "https://" in code,
-            "has_authentication": "auth" in code.lower() or "login" in code.lower()
-        }
+        return check_code_compliance(code)
     
     def _calculate_password_entropy(self, password: str) -> float:
         """Вычисление энтропии пароля"""
@@ -736,6 +1051,8 @@ class SecurityTool(Tool):
         """Выполнение действия"""
         if action == "scan_code_vulnerabilities":
             return await self.scan_code_vulnerabilities(**kwargs)
+        elif action == "scan_directory":
+            return await self.scan_directory(**kwargs)
         elif action == "analyze_password":
             return await self.analyze_password(**kwargs)
         elif action == "generate_secure_password":
@@ -769,6 +1086,28 @@ class SecurityTool(Tool):
                     "type": "string",
                     "description": "Язык программирования (auto для автоопределения)"
                 },
+                "directory": {
+                    "type": "string",
+                    "description": "Директория проекта для scan_directory"
+                },
+                "extensions": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Расширения сканируемых файлов (по умолчанию - исходный код)"
+                },
+                "exclude_dirs": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Имена пропускаемых директорий"
+                },
+                "max_workers": {
+                    "type": "integer",
+                    "description": "Число процессов для scan_directory (по умолчанию - число CPU)"
+                },
+                "use_cache": {
+                    "type": "boolean",
+                    "description": "Пропускать файлы, не изменившиеся с прошлого сканирования"
+                },
                 "password": {
                     "type": "string",
                     "description": "Пароль для анализа"
@@ -25,6 +25,18 @@ from typing import Dict, Any, List, Optional, Union
 from loguru import logger
 
 from .base_tool import Tool, ToolResult
+from .metrics_buffer import TieredMetricsStore, DEFAULT_TIERS
+from .fs_walker import DirectoryWalker
+
+# Колонки мониторинга в порядке записи в буфер
+MONITORING_COLUMNS = (
+    "cpu_percent", "memory_percent", "memory_available_gb", "disk_percent",
+    "disk_free_gb", "network_bytes_sent", "network_bytes_recv"
+)
+
+# Размер страницы safe_file_list и число потоков параллельного обхода
+DEFAULT_LIST_PAGE_SIZE = 1000
+LIST_PARALLEL_WORKERS = 8
 
 # ========================================
 # 📊 DATACLASSES - ОБЪЕДИНЁННЫЕ СТРУКТУРЫ
@@ -120,8 +132,10 @@ class SuperSystemTool(Tool):
         # Мониторинг
         self._monitoring_active = False
         self._monitoring_thread = None
-        self._monitoring_data = []
+        self._monitoring_stop = threading.Event()
+        self._monitoring_interval = 1.0
         self._max_monitoring_records = 1000
+        self._monitoring_store = TieredMetricsStore(MONITORING_COLUMNS, self._max_monitoring_records)
         
         # Безопасность файлов
         self.allowed_extensions = {
@@ -163,7 +177,7 @@ class SuperSystemTool(Tool):
                 "safe_file_read": {"description": "Безопасное чтение файла", "parameters": {"path": "str", "encoding": "str", "max_size": "int"}},
                 "safe_file_write": {"description": "Безопасная запись файла", "parameters": {"path": "str", "content": "str", "encoding": "str"}},
                 "safe_file_delete": {"description": "Безопасное удаление файла", "parameters": {"path": "str", "force": "bool"}},
-                "safe_file_list": {"description": "Безопасный список файлов", "parameters": {"path": "str", "recursive": "bool"}},
+                "safe_file_list": {"description": "Безопасный список файлов (постранично)", "parameters": {"path": "str", "recursive": "bool", "max_depth": "int", "pattern": "str", "extensions": "list", "exclude_dirs": "list", "cursor": "str", "limit": "int", "parallel": "bool"}},
                 
                 # 📁 РАСШИРЕННЫЕ ФАЙЛОВЫЕ ОПЕРАЦИИ
                 "file_info": {"description": "Детальная информация о файле", "parameters": {"path": "str"}},
@@ -176,12 +190,12 @@ class SuperSystemTool(Tool):
                 # 🛡️ БЕЗОПАСНОСТЬ И ВАЛИДАЦИЯ  
                 "validate_file_path": {"description": "Валидация пути файла", "parameters": {"path": "str"}},
                 "check_file_safety": {"description": "Проверка безопасности файла", "parameters": {"path": "str"}},
-                "scan_directory_safety": {"description": "Сканирование безопасности директории", "parameters": {"path": "str", "recursive": "bool"}},
+                "scan_directory_safety": {"description": "Сканирование безопасности директории", "parameters": {"path": "str", "recursive": "bool", "max_depth": "int", "exclude_dirs": "list", "parallel": "bool"}},
                 
                 # 📊 МОНИТОРИНГ
                 "start_monitoring": {"description": "Запуск мониторинга", "parameters": {"interval": "float", "max_records": "int"}},
                 "stop_monitoring": {"description": "Остановка мониторинга"},
-                "get_monitoring_data": {"description": "Получение данных мониторинга"},
+                "get_monitoring_data": {"description": "Получение данных мониторинга", "parameters": {"window_seconds": "float", "last_n": "int"}},
                 "get_system_metrics": {"description": "Ключевые метрики системы"},
                 "check_system_health": {"description": "Проверка здоровья системы"}
             }
@@ -258,7 +272,7 @@ class SuperSystemTool(Tool):
             elif action == "stop_monitoring":
                 return self._stop_monitoring()
             elif action == "get_monitoring_data":
-                return self._get_monitoring_data()
+                return self._get_monitoring_data(**kwargs)
             elif action == "get_system_metrics":
                 return self._get_system_metrics()
             elif action == "check_system_health":
@@ -1087,8 +1101,16 @@ class SuperSystemTool(Tool):
             logger.error(f"❌ Ошибка удаления файла {path}: {e}")
             return ToolResult(success=False, error=f"Ошибка удаления файла: {str(e)}")
 
-    def _safe_file_list(self, path: str = ".", recursive: bool = False) -> ToolResult:
-        """📋 Безопасный список файлов"""
+    def _safe_file_list(self, path: str = ".", recursive: bool = False, max_depth: Optional[int] = None,
+                        pattern: Optional[str] = None, extensions: Optional[List[str]] = None,
+                        exclude_dirs: Optional[List[str]] = None, cursor: Optional[str] = None,
+                        limit: int = DEFAULT_LIST_PAGE_SIZE, parallel: bool = False) -> ToolResult:
+        """
+        📋 Безопасный список файлов
+        
+        Обход потоковый (os.scandir) и постраничный: возвращается не больше limit
+        элементов, для продолжения нужно передать next_cursor из ответа.
+        """
         try:
             dir_path = Path(path)
             
@@ -1104,53 +1126,53 @@ class SuperSystemTool(Tool):
             if not is_safe:
                 return ToolResult(success=False, error=f"Небезопасный путь: {safety_msg}")
             
-            items = []
+            if not os.access(dir_path, os.R_OK | os.X_OK):
+                return ToolResult(success=False, error=f"Недостаточно прав для чтения директории: {path}")
             
+            walker = DirectoryWalker(
+                str(dir_path),
+                max_depth=max_depth if recursive else 1,
+                pattern=pattern,
+                extensions=extensions,
+                exclude_dirs=exclude_dirs,
+                workers=LIST_PARALLEL_WORKERS if parallel else 1
+            )
             try:
-                if recursive:
-                    files = dir_path.rglob("*")
-                else:
-                    files = dir_path.iterdir()
-                
-                for item in files:
-                    try:
-                        stat_info = item.stat()
-                        item_info = {
-                            "name": item.name,
-                            "path": str(item.absolute()),
-                            "type": "file" if item.is_file() else "directory",
-                            "size_bytes": stat_info.st_size if item.is_file() else None,
-                            "size_mb": round(stat_info.st_size / (1024**2), 2) if item.is_file() else None,
-                            "modified_time": stat_info.st_mtime,
-                            "modified_formatted": datetime.fromtimestamp(stat_info.st_mtime).isoformat(),
-                            "extension": item.suffix if item.is_file() else None,
-                            "is_safe": self._is_safe_extension(str(item)) if item.is_file() else True
-                        }
-                        items.append(item_info)
-                        
-                    except (PermissionError, OSError):
-                        # Пропускаем недоступные файлы
-                        continue
-                
-            except PermissionError:
-                return ToolResult(success=False, error=f"Недостаточно прав для чтения директории: {path}")
+                entries, next_cursor = walker.page(cursor, max(1, limit))
+            except ValueError as e:
+                return ToolResult(success=False, error=str(e))
             
-            # Сортировка: сначала директории, потом файлы
-            items.sort(key=lambda x: (x["type"] == "file", x["name"].lower()))
+            items = []
+            for entry in entries:
+                is_file = not entry.is_dir
+                items.append({
+                    "name": entry.name,
+                    "path": entry.path,
+                    "type": "file" if is_file else "directory",
+                    "size_bytes": entry.size if is_file else None,
+                    "size_mb": round(entry.size / (1024**2), 2) if is_file else None,
+                    "modified_time": entry.mtime,
+                    "modified_formatted": datetime.fromtimestamp(entry.mtime).isoformat(),
+                    "extension": entry.extension if is_file else None,
+                    "is_safe": entry.extension.lower() in self.allowed_extensions if is_file else True
+                })
             
-            logger.info(f"📋 Получен список: {len(items)} элементов в {path}")
+            logger.info(f"📋 Получен список: {len(items)} элементов в {path}" + (" (есть продолжение)" if next_cursor else ""))
             
             return ToolResult(
                 success=True,
                 data={
                     "operation": "safe_file_list",
-                    "path": str(dir_path.absolute()),
+                    "path": walker.root,
                     "items": items,
                     "total_items": len(items),
                     "files_count": len([i for i in items if i["type"] == "file"]),
                     "directories_count": len([i for i in items if i["type"] == "directory"]),
                     "safe_files_count": len([i for i in items if i["type"] == "file" and i["is_safe"]]),
                     "recursive": recursive,
+                    "has_more": next_cursor is not None,
+                    "next_cursor": next_cursor,
+                    "unreadable_directories": walker.errors[:20],
                     "timestamp": datetime.now().isoformat(),
                     "source": "SuperSystemTool"
                 }
@@ -1632,7 +1654,8 @@ class SuperSystemTool(Tool):
                 error=f"Ошибка проверки безопасности файла {path}: {str(e)}"
             )
 
-    def _scan_directory_safety(self, path: str, recursive: bool = False) -> ToolResult:
+    def _scan_directory_safety(self, path: str, recursive: bool = False, max_depth: Optional[int] = None,
+                               exclude_dirs: Optional[List[str]] = None, parallel: bool = False) -> ToolResult:
         """🔍 Сканирование безопасности директории"""
         try:
             if not path:
@@ -1662,55 +1685,62 @@ class SuperSystemTool(Tool):
             }
             
             try:
-                if recursive:
-                    files = [f for f in dir_path.rglob("*") if f.is_file()]
-                else:
-                    files = [f for f in dir_path.iterdir() if f.is_file()]
-                
-                scan_results["scanned_files"] = len(files)
+                if not os.access(dir_path, os.R_OK | os.X_OK):
+                    raise PermissionError(path)
                 
+                walker = DirectoryWalker(
+                    str(dir_path),
+                    max_depth=max_depth if recursive else 1,
+                    exclude_dirs=exclude_dirs,
+                    include_dirs=False,
+                    workers=LIST_PARALLEL_WORKERS if parallel else 1
+                )
                 largest_size = 0
                 
-                for file_path in files:
+                for entry in walker.walk():
                     try:
-                        file_size = file_path.stat().st_size
+                        file_size = entry.size
+                        scan_results["scanned_files"] += 1
                         scan_results["total_size_bytes"] += file_size
                         
                         # Отслеживаем самый большой файл
                         if file_size > largest_size:
                             largest_size = file_size
                             scan_results["largest_file"] = {
-                                "path": str(file_path),
+                                "path": entry.path,
                                 "size_bytes": file_size,
                                 "size_mb": round(file_size / (1024**2), 2)
                             }
                         
                         # Проверка безопасности расширения
-                        if self._is_safe_extension(str(file_path)):
+                        if entry.extension.lower() in self.allowed_extensions:
                             scan_results["safe_files"] += 1
                         else:
                             scan_results["unsafe_files"] += 1
-                            if file_path.suffix:
-                                scan_results["unsafe_file_list"].append({
-                                    "path": str(file_path),
-                                    "extension": file_path.suffix,
-                                    "size_mb": round(file_size / (1024**2), 2)
-                                })
+                            if entry.extension:
+                                if len(scan_results["unsafe_file_list"]) < 20:
+                                    scan_results["unsafe_file_list"].append({
+                                        "path": entry.path,
+                                        "extension": entry.extension,
+                                        "size_mb": round(file_size / (1024**2), 2)
+                                    })
                             else:
                                 scan_results["unknown_extensions"] += 1
-                                scan_results["unknown_extension_list"].append({
-                                    "path": str(file_path),
-                                    "size_mb": round(file_size / (1024**2), 2)
-                                })
+                                if len(scan_results["unknown_extension_list"]) < 20:
+                                    scan_results["unknown_extension_list"].append({
+                                        "path": entry.path,
+                                        "size_mb": round(file_size / (1024**2), 2)
+                                    })
                         
                         # Проверка размера
                         if file_size > self.max_file_size_mb * 1024 * 1024 * 0.5:  # 50% от лимита
                             scan_results["large_files"] += 1
-                            scan_results["large_file_list"].append({
-                                "path": str(file_path),
-                                "size_mb": round(file_size / (1024**2), 2),
-                                "extension": file_path.suffix
-                            })
+                            if len(scan_results["large_file_list"]) < 20:
+                                scan_results["large_file_list"].append({
+                                    "path": entry.path,
+                                    "size_mb": round(file_size / (1024**2), 2),
+                                    "extension": entry.extension
+                                })
                         
                     except (PermissionError, OSError):
                         continue
@@ -1721,11 +1751,6 @@ class SuperSystemTool(Tool):
                         (scan_results["safe_files"] / scan_results["scanned_files"]) * 100, 1
                     )
                 
-                # Ограничиваем списки для вывода
-                scan_results["unsafe_file_list"] = scan_results["unsafe_file_list"][:20]
-                scan_results["large_file_list"] = scan_results["large_file_list"][:20]
-                scan_results["unknown_extension_list"] = scan_results["unknown_extension_list"][:20]
-                
             except PermissionError:
                 return ToolResult(success=False, error=f"Недостаточно прав для сканирования директории: {path}")
             
@@ -1853,46 +1878,43 @@ class SuperSystemTool(Tool):
                     error="Мониторинг уже активен. Сначала остановите текущий мониторинг."
                 )
             
-            # Настройки мониторинга
-            self._monitoring_active = True
-            self._monitoring_data.clear()
+            # Настройки мониторинга: сырые отсчёты в кольцевом буфере фиксированного размера,
+            # старые данные остаются в прореженных уровнях
             if max_records:
                 self._max_monitoring_records = max_records
+            self._monitoring_store = TieredMetricsStore(MONITORING_COLUMNS, self._max_monitoring_records)
+            self._monitoring_interval = interval
+            self._monitoring_stop.clear()
+            self._monitoring_active = True
+            store = self._monitoring_store
+            stop = self._monitoring_stop
             
             def monitoring_loop():
                 """Цикл мониторинга"""
-                while self._monitoring_active:
+                # Первый вызов без интервала только запоминает счётчики CPU
+                psutil.cpu_percent(interval=None)
+                while not stop.is_set():
                     try:
-                        # Собираем метрики
-                        cpu_percent = psutil.cpu_percent(interval=0.1)
+                        # Собираем метрики (cpu_percent - загрузка с прошлого отсчёта, без блокировки)
                         memory = psutil.virtual_memory()
                         disk = psutil.disk_usage('/')
                         net_io = psutil.net_io_counters()
                         
-                        # Создаем запись
-                        record = {
-                            "timestamp": datetime.now().isoformat(),
-                            "cpu_percent": cpu_percent,
-                            "memory_percent": memory.percent,
-                            "memory_available_gb": round(memory.available / (1024**3), 2),
-                            "disk_percent": round((disk.used / disk.total) * 100, 2),
-                            "disk_free_gb": round(disk.free / (1024**3), 2),
-                            "network_bytes_sent": net_io.bytes_sent,
-                            "network_bytes_recv": net_io.bytes_recv
-                        }
-                        
-                        # Добавляем запись
-                        self._monitoring_data.append(record)
-                        
-                        # Ограничиваем количество записей
-                        if len(self._monitoring_data) > self._max_monitoring_records:
-                            self._monitoring_data.pop(0)
+                        store.append(time.time(), (
+                            psutil.cpu_percent(interval=None),
+                            memory.percent,
+                            memory.available / (1024**3),
+                            (disk.used / disk.total) * 100,
+                            disk.free / (1024**3),
+                            net_io.bytes_sent,
+                            net_io.bytes_recv
+                        ))
                         
-                        time.sleep(interval)
+                        stop.wait(interval)
                         
                     except Exception as e:
                         logger.error(f"❌ Ошибка в цикле мониторинга: {e}")
-                        time.sleep(5)  # Пауза при ошибке
+                        stop.wait(5)  # Пауза при ошибке
             
             # Запускаем мониторинг в отдельном потоке
             self._monitoring_thread = threading.Thread(target=monitoring_loop, daemon=True)
@@ -1906,6 +1928,10 @@ class SuperSystemTool(Tool):
                     "operation": "start_monitoring",
                     "interval_seconds": interval,
                     "max_records": self._max_monitoring_records,
+                    "downsample_tiers": [
+                        {"resolution_seconds": tier.resolution, "retention_hours": round(tier.retention_seconds / 3600, 2)}
+                        for tier in DEFAULT_TIERS
+                    ],
                     "monitoring_active": self._monitoring_active,
                     "timestamp": datetime.now().isoformat(),
                     "source": "SuperSystemTool"
@@ -1928,12 +1954,13 @@ class SuperSystemTool(Tool):
             
             # Останавливаем мониторинг
             self._monitoring_active = False
+            self._monitoring_stop.set()
             
             # Ждём завершения потока
             if self._monitoring_thread and self._monitoring_thread.is_alive():
                 self._monitoring_thread.join(timeout=5)
             
-            records_count = len(self._monitoring_data)
+            records_count = len(self._monitoring_store)
             
             logger.info(f"⏹️ Остановлен мониторинг системы ({records_count} записей собрано)")
             
@@ -1952,10 +1979,18 @@ class SuperSystemTool(Tool):
             logger.error(f"❌ Ошибка остановки мониторинга: {e}")
             return ToolResult(success=False, error=f"Ошибка остановки мониторинга: {str(e)}")
 
-    def _get_monitoring_data(self) -> ToolResult:
-        """📈 Получение данных мониторинга"""
+    def _get_monitoring_data(self, window_seconds: Optional[float] = None, last_n: int = 100) -> ToolResult:
+        """
+        📈 Получение данных мониторинга
+        
+        Args:
+            window_seconds: окно агрегации в секундах (None - все сырые отсчёты);
+                            окна длиннее сырого буфера считаются по прореженным уровням
+            last_n: сколько последних сырых отсчётов вернуть
+        """
         try:
-            records_count = len(self._monitoring_data)
+            store = self._monitoring_store
+            records_count = len(store)
             
             if records_count == 0:
                 return ToolResult(
@@ -1970,32 +2005,36 @@ class SuperSystemTool(Tool):
                     }
                 )
             
-            # Статистика по данным
-            if records_count > 0:
-                cpu_values = [r["cpu_percent"] for r in self._monitoring_data]
-                memory_values = [r["memory_percent"] for r in self._monitoring_data]
-                
-                statistics = {
-                    "cpu_avg": round(sum(cpu_values) / len(cpu_values), 2),
-                    "cpu_max": max(cpu_values),
-                    "cpu_min": min(cpu_values),
-                    "memory_avg": round(sum(memory_values) / len(memory_values), 2),
-                    "memory_max": max(memory_values),
-                    "memory_min": min(memory_values),
-                    "timespan_minutes": round((records_count * 1.0) / 60, 2)  # Примерно
-                }
-            else:
-                statistics = {}
+            # Статистика по окну
+            summary = store.summary(window_seconds)
+            cpu = summary["columns"].get("cpu_percent", {})
+            memory = summary["columns"].get("memory_percent", {})
+            statistics = {
+                "cpu_avg": round(cpu.get("mean", 0.0), 2),
+                "cpu_max": cpu.get("max"),
+                "cpu_min": cpu.get("min"),
+                "cpu_p95": round(cpu.get("p95", 0.0), 2),
+                "memory_avg": round(memory.get("mean", 0.0), 2),
+                "memory_max": memory.get("max"),
+                "memory_min": memory.get("min"),
+                "memory_p95": round(memory.get("p95", 0.0), 2),
+                "timespan_minutes": round(summary["timespan_seconds"] / 60, 2)
+            }
+            
+            monitoring_data = store.records(last_n=last_n)
             
             return ToolResult(
                 success=True,
                 data={
-                    "monitoring_data": self._monitoring_data[-100:],  # Последние 100 записей
+                    "monitoring_data": monitoring_data,
                     "records_count": records_count,
+                    "data_points_count": summary["count"],
                     "monitoring_active": self._monitoring_active,
                     "statistics": statistics,
+                    "aggregates": summary,
+                    "storage": store.get_stats(),
                     "total_records_available": records_count,
-                    "showing_last_records": min(100, records_count),
+                    "showing_last_records": len(monitoring_data),
                     "timestamp": datetime.now().isoformat(),
                     "source": "SuperSystemTool"
                 }
@@ -0,0 +1,357 @@
+"""
+🕷️ Web Crawler - Обход сайтов для веб-инструментов KittyCore 3.0
+
+Компоненты:
+- normalize_url: каноническая форма URL для дедупликации
+- BloomFilter / create_seen_set: компактное множество посещённых URL
+- CrawlFrontier: приоритетная очередь URL с бюджетами глубины
+- RobotsCache: кэш robots.txt по origin (с учётом Crawl-delay)
+- WebCrawler: асинхронный обход, отдающий страницы потоком по мере загрузки
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import logging
+import math
+import posixpath
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+from urllib.robotparser import RobotFileParser
+
+from .web_fetch import FetchPool, FetchResponse, get_header
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "yclid", "_openstat")
+# Начиная с этого бюджета страниц множество посещённых URL хранится в Bloom-фильтре
+BLOOM_THRESHOLD = 10_000
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    Каноническая форма URL
+
+    Абсолютизирует относительные ссылки, приводит схему и хост к нижнему
+    регистру, убирает порт по умолчанию, фрагмент, трекинговые параметры,
+    сортирует query и схлопывает ./ и ../ в пути.
+    Возвращает None для не-HTTP ссылок (mailto:, javascript: и т.п.).
+    """
+    if base:
+        url = urljoin(base, url.strip())
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parsed.hostname:
+        return None
+
+    host = parsed.hostname.lower()
+    port = parsed.port
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+    path = parsed.path or "/"
+    if "." in path:
+        trailing = path.endswith("/")
+        path = posixpath.normpath(path)
+        if path.startswith("//"):
+            path = "/" + path.lstrip("/")
+        if trailing and path != "/":
+            path += "/"
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ))
+
+    return urlunparse((scheme, netloc, path, "", query, ""))
+
+
+class BloomFilter:
+    """
+    Bloom-фильтр на bytearray
+
+    Ложноположительные срабатывания возможны с вероятностью error_rate
+    (URL будет ошибочно пропущен), ложноотрицательных нет.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def create_seen_set(expected_items: int, error_rate: float = 0.001):
+    """Обычное множество для небольших обходов, Bloom-фильтр для больших"""
+    if expected_items >= BLOOM_THRESHOLD:
+        return BloomFilter(expected_items, error_rate)
+    return set()
+
+
+class CrawlFrontier:
+    """
+    Приоритетная очередь URL для обхода
+
+    Меньший приоритет извлекается раньше. По умолчанию приоритет равен глубине
+    (обход в ширину); совпадение URL с ключевыми словами поднимает ссылку выше.
+    """
+
+    def __init__(self, seen, priority_keywords: Optional[List[str]] = None):
+        self.seen = seen
+        self.priority_keywords = [kw.lower() for kw in (priority_keywords or [])]
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._counter = itertools.count()
+
+    def score(self, url: str, depth: int) -> float:
+        lowered = url.lower()
+        boost = sum(1 for kw in self.priority_keywords if kw in lowered)
+        return depth - 0.5 * boost
+
+    def push(self, url: str, depth: int) -> bool:
+        """Добавить URL, если он ещё не встречался"""
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        heapq.heappush(self._heap, (self.score(url, depth), next(self._counter), url, depth))
+        return True
+
+    def pop(self) -> Tuple[str, int]:
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class RobotsCache:
+    """Кэш правил robots.txt по origin"""
+
+    def __init__(self, fetch_pool: FetchPool, user_agent: str = "*"):
+        self.fetch_pool = fetch_pool
+        self.user_agent = user_agent
+        self._parsers: Dict[str, Optional[RobotFileParser]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def origin(url: str) -> str:
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    async def _get_parser(self, url: str) -> Optional[RobotFileParser]:
+        origin = self.origin(url)
+        if origin in self._parsers:
+            return self._parsers[origin]
+
+        lock = self._locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            if origin not in self._parsers:
+                parser = None
+                try:
+                    response = await self.fetch_pool.fetch(f"{origin}/robots.txt")
+                    if response.status == 200:
+                        parser = RobotFileParser()
+                        parser.parse(response.text.splitlines())
+                except Exception as e:
+                    logger.debug(f"robots.txt недоступен для {origin}: {e}")
+                # None - правил нет, разрешено всё
+                self._parsers[origin] = parser
+        return self._parsers[origin]
+
+    async def allowed(self, url: str) -> bool:
+        parser = await self._get_parser(url)
+        return parser is None or parser.can_fetch(self.user_agent, url)
+
+    async def crawl_delay(self, url: str) -> Optional[float]:
+        parser = await self._get_parser(url)
+        if parser is None:
+            return None
+        delay = parser.crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+
+@dataclass
+class CrawlConfig:
+    """Параметры обхода"""
+    max_depth: int = 2
+    max_pages: int = 50
+    same_domain: bool = True
+    politeness_delay: float = 1.0
+    respect_robots: bool = True
+    concurrency: int = 4
+    priority_keywords: List[str] = field(default_factory=list)
+    exclude_patterns: List[str] = field(default_factory=list)
+    bloom_error_rate: float = 0.001
+
+
+@dataclass
+class CrawlPage:
+    """Страница, полученная при обходе"""
+    url: str
+    depth: int
+    success: bool
+    data: Dict[str, Any]
+    links: List[str]
+    from_cache: bool = False
+    error: Optional[str] = None
+
+
+# Обработчик загруженной страницы: возвращает данные страницы и все ссылки на ней
+PageProcessor = Callable[[FetchResponse], Awaitable[Tuple[Dict[str, Any], List[str]]]]
+
+
+class WebCrawler:
+    """
+    Асинхронный обход сайта
+
+    Несколько воркеров забирают URL из приоритетной очереди, соблюдают
+    задержку между запросами к одному домену и robots.txt, а готовые страницы
+    сразу отдаются потребителю через асинхронный итератор crawl().
+    """
+
+    def __init__(self, fetch_pool: FetchPool, process_page: PageProcessor,
+                 config: Optional[CrawlConfig] = None):
+        self.fetch_pool = fetch_pool
+        self.process_page = process_page
+        self.config = config or CrawlConfig()
+        self.robots = RobotsCache(fetch_pool)
+
+        self._domain_locks: Dict[str, asyncio.Lock] = {}
+        self._domain_last_fetch: Dict[str, float] = {}
+        self.stats = {"fetched": 0, "skipped_robots": 0, "errors": 0, "enqueued": 0}
+
+    def _accept(self, url: str, allowed_domains: set) -> bool:
+        if self.config.same_domain and urlparse(url).netloc not in allowed_domains:
+            return False
+        return not any(pattern in url for pattern in self.config.exclude_patterns)
+
+    async def _wait_politeness(self, url: str):
+        """Задержка между запросами к одному домену (max из настроек и Crawl-delay)"""
+        domain = urlparse(url).netloc
+        delay = self.config.politeness_delay
+        if self.config.respect_robots:
+            robots_delay = await self.robots.crawl_delay(url)
+            if robots_delay:
+                delay = max(delay, robots_delay)
+
+        lock = self._domain_locks.setdefault(domain, asyncio.Lock())
+        async with lock:
+            last = self._domain_last_fetch.get(domain)
+            if last is not None:
+                wait = last + delay - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            self._domain_last_fetch[domain] = time.monotonic()
+
+    async def _fetch_page(self, url: str, depth: int) -> Optional[CrawlPage]:
+        if self.config.respect_robots and not await self.robots.allowed(url):
+            self.stats["skipped_robots"] += 1
+            return None
+
+        await self._wait_politeness(url)
+        try:
+            response = await self.fetch_pool.fetch(url)
+            self.stats["fetched"] += 1
+            content_type = get_header(response.headers, "Content-Type") or "text/html"
+            if response.status != 200 or "html" not in content_type:
+                return CrawlPage(url=url, depth=depth, success=False, data={}, links=[],
+                                 from_cache=response.from_cache,
+                                 error=f"HTTP {response.status}: {content_type}")
+
+            data, links = await self.process_page(response)
+            return CrawlPage(url=url, depth=depth, success=True, data=data, links=links,
+                             from_cache=response.from_cache)
+        except Exception as e:
+            self.stats["errors"] += 1
+            return CrawlPage(url=url, depth=depth, success=False, data={}, links=[], error=str(e))
+
+    async def crawl(self, start_urls: List[str]) -> AsyncIterator[CrawlPage]:
+        """Обход начиная с start_urls; страницы отдаются по мере загрузки"""
+        config = self.config
+        frontier = CrawlFrontier(
+            create_seen_set(config.max_pages * 20, config.bloom_error_rate),
+            config.priority_keywords
+        )
+
+        allowed_domains = set()
+        for url in start_urls:
+            normalized = normalize_url(url)
+            if normalized:
+                allowed_domains.add(urlparse(normalized).netloc)
+                if frontier.push(normalized, 0):
+                    self.stats["enqueued"] += 1
+
+        results: asyncio.Queue = asyncio.Queue()
+        wakeup = asyncio.Event()
+        scheduled = 0
+        active = 0
+
+        async def worker():
+            nonlocal scheduled, active
+            while True:
+                if len(frontier) == 0:
+                    if active == 0:
+                        # Очередь пуста и никто не может добавить новых ссылок
+                        wakeup.set()
+                        return
+                    wakeup.clear()
+                    await wakeup.wait()
+                    continue
+                if scheduled >= config.max_pages:
+                    wakeup.set()
+                    return
+
+                url, depth = frontier.pop()
+                scheduled += 1
+                active += 1
+                try:
+                    page = await self._fetch_page(url, depth)
+                    if page is None:
+                        # Запрещено robots.txt - страница не расходует бюджет
+                        scheduled -= 1
+                        continue
+                    if page.success and depth < config.max_depth:
+                        for link in page.links:
+                            normalized = normalize_url(link, url)
+                            if normalized and self._accept(normalized, allowed_domains):
+                                if frontier.push(normalized, depth + 1):
+                                    self.stats["enqueued"] += 1
+                    await results.put(page)
+                finally:
+                    active -= 1
+                    wakeup.set()
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, config.concurrency))]
+        done = asyncio.gather(*workers)
+        done.add_done_callback(lambda _: results.put_nowait(None))
+
+        try:
+            while True:
+                page = await results.get()
+                if page is None:
+                    break
+                yield page
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,396 @@
+"""
+🌐 Web Fetch - Пул соединений и HTTP-кэш для веб-инструментов KittyCore 3.0
+
+Общий слой загрузки страниц:
+- FetchPool: долгоживущая aiohttp-сессия с лимитами соединений на хост
+  и глобальным ограничением параллельности
+- HttpCache: кэш с учётом ETag / Last-Modified / Cache-Control
+  и опциональным хранением тел ответов на диске
+- parse_html: выбор парсера (lxml / html.parser) во время выполнения
+"""
+
+import asyncio
+import email.utils
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+import aiohttp
+
+from .web_common import create_headers
+from ..core.metrics_registry import record_cache_access
+
+try:
+    from bs4 import BeautifulSoup
+    BS4_AVAILABLE = True
+except ImportError:
+    BS4_AVAILABLE = False
+    BeautifulSoup = None
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+PARSERS = ["auto", "lxml", "html.parser"]
+
+
+def resolve_parser(parser: str = "auto") -> str:
+    """Выбор доступного парсера BeautifulSoup"""
+    if parser == "lxml" and not LXML_AVAILABLE:
+        logger.warning("lxml не установлен - используется html.parser")
+        return "html.parser"
+    if parser == "auto":
+        return "lxml" if LXML_AVAILABLE else "html.parser"
+    return parser
+
+
+def parse_html(content: str, parser: str = "auto"):
+    """Парсинг HTML выбранным парсером"""
+    return BeautifulSoup(content, resolve_parser(parser))
+
+
+@dataclass
+class CacheEntry:
+    """Закэшированный ответ"""
+    url: str
+    status: int
+    body: str
+    headers: Dict[str, str]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fresh_until: float = 0.0
+    stored_at: float = field(default_factory=time.time)
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.fresh_until
+
+    @property
+    def has_validators(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+@dataclass
+class FetchResponse:
+    """Результат загрузки страницы"""
+    url: str
+    status: int
+    text: str
+    headers: Dict[str, str]
+    response_time: float
+    from_cache: bool = False
+    revalidated: bool = False
+    reason: str = ""
+
+
+def get_header(headers: Dict[str, str], name: str) -> Optional[str]:
+    """Регистронезависимое чтение заголовка из обычного словаря"""
+    if name in headers:
+        return headers[name]
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Разбор заголовка Cache-Control в словарь директив"""
+    directives = {}
+    if not value:
+        return directives
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition("=")
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: Dict[str, str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Время жизни ответа в секундах по Cache-Control / Expires
+
+    Returns:
+        None если ответ нельзя кэшировать (no-store / private),
+        0 если ответ нужно перепроверять при каждом использовании
+    """
+    now = now or time.time()
+    directives = parse_cache_control(get_header(headers, "Cache-Control"))
+
+    if "no-store" in directives or "private" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name):
+            try:
+                return max(0.0, float(directives[name]))
+            except ValueError:
+                return 0.0
+    expires_header = get_header(headers, "Expires")
+    if expires_header:
+        try:
+            expires = email.utils.parsedate_to_datetime(expires_header).timestamp()
+            return max(0.0, expires - now)
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+
+class HttpCache:
+    """
+    HTTP-кэш ответов
+
+    Хранит ответы в LRU-словаре в памяти. Если задан cache_dir, тела ответов
+    и метаданные дополнительно сохраняются на диск и переживают перезапуск.
+    Ответы без сроков свежести, но с ETag/Last-Modified, перепроверяются
+    условным запросом.
+    """
+
+    def __init__(self, max_entries: int = 512, max_entry_bytes: int = 5 * 1024 * 1024,
+                 cache_dir: Optional[Union[str, Path]] = None):
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stores": 0}
+
+    def _disk_path(self, url: str) -> Path:
+        return self.cache_dir / hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+            return entry
+
+        if self.cache_dir:
+            entry = self._load_from_disk(url)
+            if entry is not None:
+                self._remember(entry)
+        return entry
+
+    def store(self, url: str, status: int, body: str, headers: Dict[str, str]) -> Optional[CacheEntry]:
+        """Сохранить ответ, если заголовки это разрешают"""
+        lifetime = freshness_lifetime(headers)
+        if lifetime is None or status != 200 or len(body) > self.max_entry_bytes:
+            self.invalidate(url)
+            return None
+
+        etag = get_header(headers, "ETag")
+        last_modified = get_header(headers, "Last-Modified")
+        if lifetime == 0 and not (etag or last_modified):
+            # Без срока свежести и без валидаторов кэш бесполезен
+            return None
+
+        entry = CacheEntry(
+            url=url,
+            status=status,
+            body=body,
+            headers=dict(headers),
+            etag=etag,
+            last_modified=last_modified,
+            fresh_until=time.time() + lifetime
+        )
+        self._remember(entry)
+        self.stats["stores"] += 1
+        if self.cache_dir:
+            self._save_to_disk(entry)
+        return entry
+
+    def refresh(self, entry: CacheEntry, headers: Dict[str, str]) -> CacheEntry:
+        """Обновить срок свежести после ответа 304 Not Modified"""
+        merged = {**entry.headers, **dict(headers)}
+        lifetime = freshness_lifetime(merged) or 0.0
+        entry.headers = merged
+        entry.etag = get_header(merged, "ETag") or entry.etag
+        entry.last_modified = get_header(merged, "Last-Modified") or entry.last_modified
+        entry.fresh_until = time.time() + lifetime
+        if self.cache_dir:
+            self._save_to_disk(entry)
+        return entry
+
+    def invalidate(self, url: str):
+        self._entries.pop(url, None)
+        if self.cache_dir:
+            for suffix in (".json", ".body"):
+                self._disk_path(url).with_suffix(suffix).unlink(missing_ok=True)
+
+    def clear(self):
+        for url in list(self._entries):
+            self.invalidate(url)
+
+    def _remember(self, entry: CacheEntry):
+        self._entries[entry.url] = entry
+        self._entries.move_to_end(entry.url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save_to_disk(self, entry: CacheEntry):
+        path = self._disk_path(entry.url)
+        try:
+            meta = asdict(entry)
+            meta.pop("body")
+            path.with_suffix(".body").write_text(entry.body, encoding="utf-8")
+            path.with_suffix(".json").write_text(json.dumps(meta), encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить ответ в дисковый кэш: {e}")
+
+    def _load_from_disk(self, url: str) -> Optional[CacheEntry]:
+        path = self._disk_path(url)
+        try:
+            meta = json.loads(path.with_suffix(".json").read_text(encoding="utf-8"))
+            body = path.with_suffix(".body").read_text(encoding="utf-8")
+            return CacheEntry(body=body, **meta)
+        except (OSError, ValueError, TypeError):
+            return None
+
+
+class FetchPool:
+    """
+    Пул HTTP-соединений для веб-инструментов
+
+    Одна aiohttp-сессия живёт между вызовами инструмента (пересоздаётся, если
+    закрыта или принадлежит другому event loop). Число соединений на хост
+    ограничено коннектором, общее число одновременных запросов - семафором.
+
+    Сессия закрывается в своём loop: рядом с ней живёт задача-сторож, которую
+    asyncio.run при завершении отменяет вместе с остальными задачами. Если loop
+    сменился без этого (закрыт вручную), старая сессия закрывается при создании
+    новой.
+    """
+
+    def __init__(self, max_concurrency: int = 10, per_host_limit: int = 4, timeout: int = 30,
+                 cache: Optional[HttpCache] = None, headers: Optional[Dict[str, str]] = None):
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.cache = cache
+        self.headers = headers or create_headers()
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session_guard: Optional[asyncio.Task] = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._session is not None and not self._session.closed:
+                await self._close_stale_session()
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.per_host_limit,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=self.headers
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+            self._session_guard = loop.create_task(self._close_on_loop_shutdown(self._session))
+        return self._session
+
+    @staticmethod
+    async def _close_on_loop_shutdown(session: aiohttp.ClientSession):
+        """Ждёт отмены (конец asyncio.run или close()) и закрывает сессию в её loop"""
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            if not session.closed:
+                await session.close()
+
+    async def _close_stale_session(self):
+        """Закрыть сессию, оставшуюся от другого event loop"""
+        session, old_loop = self._session, self._loop
+        self._session = None
+        self._session_guard = None
+        if old_loop is not None and not old_loop.is_closed():
+            # loop ещё жив - сессия закрывается в нём, как только он её обслужит
+            asyncio.run_coroutine_threadsafe(session.close(), old_loop)
+            return
+        # loop закрыт: коннектор закрывается синхронно, транспорты мёртвого loop уже не обслуживаются
+        await session.close()
+
+    async def fetch(self, url: str, use_cache: bool = True) -> FetchResponse:
+        """
+        Загрузка страницы с учётом кэша
+
+        Свежая запись кэша возвращается без сети; устаревшая запись
+        с валидаторами перепроверяется условным запросом.
+        """
+        start_time = time.time()
+        entry = self.cache.get(url) if (self.cache and use_cache) else None
+
+        if entry is not None and entry.is_fresh:
+            self.cache.stats["hits"] += 1
+            record_cache_access("http", True)
+            return FetchResponse(url=url, status=entry.status, text=entry.body, headers=entry.headers,
+                                 response_time=time.time() - start_time, from_cache=True)
+
+        request_headers = {}
+        if entry is not None:
+            if entry.etag:
+                request_headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request_headers["If-Modified-Since"] = entry.last_modified
+
+        session = await self.get_session()
+        async with self._semaphore:
+            async with session.get(url, headers=request_headers) as response:
+                headers = dict(response.headers)
+
+                if response.status == 304 and entry is not None:
+                    self.cache.stats["revalidated"] += 1
+                    record_cache_access("http", True)
+                    entry = self.cache.refresh(entry, headers)
+                    return FetchResponse(url=url, status=entry.status, text=entry.body, headers=entry.headers,
+                                         response_time=time.time() - start_time, from_cache=True,
+                                         revalidated=True)
+
+                text = await response.text(errors="replace")
+
+        if self.cache and use_cache:
+            self.cache.stats["misses"] += 1
+            record_cache_access("http", False)
+            self.cache.store(url, response.status, text, headers)
+
+        return FetchResponse(url=url, status=response.status, text=text, headers=headers,
+                             response_time=time.time() - start_time, reason=response.reason or "")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "per_host_limit": self.per_host_limit,
+            "session_open": bool(self._session and not self._session.closed),
+            "cache": dict(self.cache.stats) if self.cache else None
+        }
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        guard = self._session_guard
+        if self._session and not self._session.closed:
+            if self._loop is loop:
+                await self._session.close()
+            else:
+                await self._close_stale_session()
+        if guard is not None and not guard.done() and guard.get_loop() is loop:
+            guard.cancel()
+        self._session = None
+        self._session_guard = None
@@ -6,6 +6,8 @@ Unified интерфейс для всех веб-инструментов по
 
 Архитектура после рефакторинга:
 - web_common.py: Общие структуры и утилиты
+- web_fetch.py: Пул соединений, HTTP-кэш и выбор HTML-парсера
+- web_crawler.py: Обход сайтов (очередь, robots.txt, дедупликация URL)
 - enhanced_web_search_tool.py: Продвинутый поиск (DuckDuckGo + fallback)
 - enhanced_web_scraping_tool.py: Продвинутый скрапинг (BeautifulSoup + метаданные)
 - api_request_tool.py: HTTP API клиент
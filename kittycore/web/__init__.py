@@ -6,7 +6,8 @@ KittyCore 3.0 Web Interface Module
 """
 
 from .server import WebServer, create_app
-from .websocket_manager import WebSocketManager
+from .websocket_manager import WebSocketManager, SendPolicy
+from .job_queue import JobQueue, JobStatus, QueueFullError
 
 __version__ = "3.0.0"
-__all__ = ["WebServer", "create_app", "WebSocketManager"] 
\ No newline at end of file
+__all__ = ["WebServer", "create_app", "WebSocketManager", "SendPolicy", "JobQueue", "JobStatus", "QueueFullError"] 
\ No newline at end of file
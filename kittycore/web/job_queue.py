@@ -0,0 +1,449 @@
+"""
+KittyCore 3.0 Job Queue
+
+Ограниченная очередь задач с пулом воркеров для веб-сервера:
+задачи из POST /api/task и WebSocket сообщения execute_task выполняются
+UnifiedOrchestrator в фоне, клиент получает job_id, статус/результат,
+может отменить задачу, а ход выполнения отправляется в комнату WebSocket.
+
+Возможности:
+- ограниченная очередь: при переполнении QueueFullError с оценкой Retry-After
+- настраиваемое число воркеров
+- отмена ожидающих и выполняющихся задач
+- необязательное SQLite хранилище: ожидающие задачи переживают перезапуск
+
+Настройка через переменные окружения (см. create_job_queue):
+- KITTYCORE_JOB_WORKERS - число воркеров (по умолчанию 2)
+- KITTYCORE_JOB_QUEUE_SIZE - максимум ожидающих задач (по умолчанию 100)
+- KITTYCORE_JOB_DB - путь к SQLite базе задач (по умолчанию без сохранения)
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from ..core.metrics_registry import QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    """Статус задачи в очереди"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class QueueFullError(Exception):
+    """Очередь заполнена: повторить запрос через retry_after секунд"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Очередь задач заполнена, повторите через {retry_after} с")
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    """Задача пользователя в очереди"""
+    job_id: str
+    prompt: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    room: Optional[str] = None
+    status: JobStatus = JobStatus.QUEUED
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    progress: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=50))
+    cancel_requested: bool = False
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "prompt": self.prompt,
+            "room": self.room,
+            "status": self.status.value,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+            "progress": list(self.progress)
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+# Выполнение задачи: (задача, функция прогресса) -> результат
+JobRunner = Callable[[Job, Callable[[Dict[str, Any]], None]], Awaitable[Dict[str, Any]]]
+# Публикация событий: (комната или None для всех, сообщение)
+JobPublisher = Callable[[Optional[str], Dict[str, Any]], Awaitable[None]]
+
+
+def _to_json_safe(value: Any) -> Any:
+    """Результат оркестратора может содержать datetime, Path и т.п."""
+    return json.loads(json.dumps(value, ensure_ascii=False, default=str))
+
+
+class JobStore:
+    """SQLite хранилище задач (одна строка на задачу, обновляется при смене статуса)"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                prompt TEXT NOT NULL,
+                options TEXT,
+                room TEXT,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                result TEXT,
+                error TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    def save(self, job: Job):
+        row = (
+            job.job_id, job.prompt, json.dumps(job.options, ensure_ascii=False, default=str), job.room,
+            job.status.value, job.created_at.isoformat(),
+            job.started_at.isoformat() if job.started_at else None,
+            job.finished_at.isoformat() if job.finished_at else None,
+            json.dumps(job.result, ensure_ascii=False) if job.result is not None else None,
+            job.error
+        )
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            self._conn.commit()
+
+    def _row_to_job(self, row) -> Job:
+        return Job(
+            job_id=row[0], prompt=row[1], options=json.loads(row[2] or "{}"), room=row[3],
+            status=JobStatus(row[4]), created_at=datetime.fromisoformat(row[5]),
+            started_at=datetime.fromisoformat(row[6]) if row[6] else None,
+            finished_at=datetime.fromisoformat(row[7]) if row[7] else None,
+            result=json.loads(row[8]) if row[8] else None, error=row[9]
+        )
+
+    def load(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def load_unfinished(self) -> List[Job]:
+        """Ожидающие и прерванные перезапуском задачи в порядке поступления"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """Ограниченная очередь задач с пулом асинхронных воркеров"""
+
+    def __init__(self, runner: JobRunner, workers: int = 2, max_queued: int = 100,
+                 store: Optional[JobStore] = None, publisher: Optional[JobPublisher] = None,
+                 max_finished: int = 1000):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.store = store
+        self.publisher = publisher
+        self.max_finished = max_finished
+
+        self.jobs: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued = 0
+        self._running: Dict[str, asyncio.Task] = {}
+        self._workers: List[asyncio.Task] = []
+        self._event_tasks: set = set()
+        # Скользящее среднее длительности задачи для оценки Retry-After
+        self._avg_duration = 5.0
+
+    # ---------- жизненный цикл ----------
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        """Запускает воркеры и возвращает в очередь сохранённые незавершённые задачи"""
+        if self.started:
+            return
+        self._queue = asyncio.Queue()
+        if self.store:
+            restored = self.store.load_unfinished()
+            for job in restored:
+                job.status = JobStatus.QUEUED
+                job.started_at = None
+                self._enqueue(job)
+            if restored:
+                logger.info(f"Restored {len(restored)} unfinished jobs from {self.store.db_path}")
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Job queue started: {self.workers} workers, max {self.max_queued} queued jobs")
+
+    async def stop(self):
+        """Останавливает воркеры; ожидающие задачи остаются в хранилище"""
+        for task in self._running.values():
+            task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._running.clear()
+        close = getattr(self.runner, "close", None)
+        if close is not None:
+            close()
+        if self.store:
+            self.store.close()
+
+    # ---------- API ----------
+
+    def retry_after(self) -> int:
+        """Оценка времени до освобождения места в очереди (секунды)"""
+        return max(1, min(300, math.ceil(self._avg_duration * (self._queued + 1) / self.workers)))
+
+    async def submit(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                     room: Optional[str] = None) -> Job:
+        """Ставит задачу в очередь; QueueFullError если ожидающих задач уже max_queued"""
+        await self.start()
+        if self._queued >= self.max_queued:
+            raise QueueFullError(self.retry_after())
+
+        job = Job(job_id=uuid.uuid4().hex[:12], prompt=prompt, options=dict(options or {}), room=room)
+        self._enqueue(job)
+        await self._publish(job, {"type": "task_queued", "queue_position": self._queued})
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is None and self.store:
+            job = self.store.load(job_id)
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """Отменяет задачу: ожидающая снимается сразу, выполняющаяся прерывается"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_requested = True
+        if job.status == JobStatus.QUEUED:
+            # Из asyncio.Queue не удалить элемент - воркер пропустит задачу
+            self._queued -= 1
+            self._update_depth()
+            await self._finish(job, JobStatus.CANCELLED)
+        elif job_id in self._running:
+            self._running[job_id].cancel()
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self.jobs.values():
+            counts[job.status.value] += 1
+        counts["workers"] = self.workers
+        counts["max_queued"] = self.max_queued
+        return counts
+
+    # ---------- внутреннее ----------
+
+    def _enqueue(self, job: Job):
+        self.jobs[job.job_id] = job
+        self._queued += 1
+        self._update_depth()
+        if self.store:
+            self.store.save(job)
+        self._queue.put_nowait(job.job_id)
+
+    def _update_depth(self):
+        QUEUE_DEPTH.labels("tasks").set(self._queued)
+
+    async def _publish(self, job: Job, message: Dict[str, Any]):
+        if not self.publisher:
+            return
+        message = {"job_id": job.job_id, "task_id": job.job_id, "timestamp": datetime.now().isoformat(), **message}
+        try:
+            await self.publisher(job.room, message)
+        except Exception as e:
+            logger.error(f"Error publishing job event: {e}")
+
+    def _progress_callback(self, job: Job) -> Callable[[Dict[str, Any]], None]:
+        """Синхронный callback для оркестратора: событие сохраняется и отправляется в комнату"""
+        loop = asyncio.get_running_loop()
+
+        def progress(event: Dict[str, Any]):
+            event = dict(event, timestamp=datetime.now().isoformat())
+            job.progress.append(event)
+            if self.publisher:
+                task = loop.create_task(self._publish(job, {"type": "task_progress", **event}))
+                self._event_tasks.add(task)
+                task.add_done_callback(self._event_tasks.discard)
+
+        return progress
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.status != JobStatus.QUEUED:
+                continue  # отменена, пока ждала в очереди
+            self._queued -= 1
+            self._update_depth()
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now()
+        if self.store:
+            self.store.save(job)
+        await self._publish(job, {"type": "task_started", "prompt": job.prompt})
+        # cancel() во время публикации не находит задачу в _running - проверяем флаг
+        if job.cancel_requested:
+            await self._finish(job, JobStatus.CANCELLED)
+            return
+
+        # Между проверкой и регистрацией нет await - окна для cancel() не остаётся
+        started = time.perf_counter()
+        task = asyncio.create_task(self.runner(job, self._progress_callback(job)))
+        self._running[job.job_id] = task
+        try:
+            result = await task
+            job.result = _to_json_safe(result)
+            await self._finish(job, JobStatus.COMPLETED)
+        except asyncio.CancelledError:
+            if not job.cancel_requested:
+                raise  # останавливается сам воркер
+            await self._finish(job, JobStatus.CANCELLED)
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {e}")
+            job.error = f"{type(e).__name__}: {e}"
+            await self._finish(job, JobStatus.FAILED)
+        finally:
+            self._running.pop(job.job_id, None)
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.perf_counter() - started)
+
+    async def _finish(self, job: Job, status: JobStatus):
+        job.status = status
+        job.finished_at = datetime.now()
+        if self.store:
+            self.store.save(job)
+
+        message = {"type": f"task_{status.value}", "status": status.value}
+        if status == JobStatus.COMPLETED:
+            result = job.result or {}
+            message["result"] = f"Задача завершена: {result.get('status', 'completed')}"
+            message["created_files"] = result.get("created_files", [])
+        elif status == JobStatus.FAILED:
+            message["error"] = job.error
+        await self._publish(job, message)
+
+        # Память ограничена: старые завершённые задачи остаются только в хранилище
+        self._finished[job.job_id] = None
+        while len(self._finished) > self.max_finished:
+            old_id, _ = self._finished.popitem(last=False)
+            self.jobs.pop(old_id, None)
+
+
+class OrchestratorRunner:
+    """
+    Выполнение задач UnifiedOrchestrator (создаётся при первой задаче)
+
+    Оркестратор живёт в отдельном потоке со своим event loop: синхронная работа
+    задач не блокирует цикл веб-сервера. Каждая задача решается через solve_one -
+    со своим SharedChat, id и рабочими пространствами агентов.
+    """
+
+    def __init__(self, config=None):
+        self.config = config
+        self._orchestrator = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _orchestrator_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever,
+                                                name="kittycore-orchestrator", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def __call__(self, job: Job, progress: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        server_loop = asyncio.get_running_loop()
+
+        def report(event: Dict[str, Any]):
+            # Оркестратор вызывает callback в своём потоке
+            server_loop.call_soon_threadsafe(progress, event)
+
+        context = dict(job.options, job_id=job.job_id, progress_callback=report)
+        future = asyncio.run_coroutine_threadsafe(self._solve(job.prompt, context), self._orchestrator_loop())
+        # Отмена задачи очереди отменяет и решение в потоке оркестратора
+        return await asyncio.wrap_future(future)
+
+    async def _solve(self, prompt: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        if self._orchestrator is None:
+            from ..core.unified_orchestrator import UnifiedOrchestrator
+            self._orchestrator = UnifiedOrchestrator(self.config)
+        return await self._orchestrator.solve_one(prompt, context)
+
+    def close(self):
+        """Останавливает поток оркестратора"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if not loop.is_running():
+            loop.close()
+
+
+def create_job_queue(publisher: Optional[JobPublisher] = None, runner: Optional[JobRunner] = None) -> JobQueue:
+    """Очередь задач веб-сервера с настройками из переменных окружения"""
+    db_path = os.getenv("KITTYCORE_JOB_DB")
+    return JobQueue(
+        runner=runner or OrchestratorRunner(),
+        workers=int(os.getenv("KITTYCORE_JOB_WORKERS", "2")),
+        max_queued=int(os.getenv("KITTYCORE_JOB_QUEUE_SIZE", "100")),
+        store=JobStore(db_path) if db_path else None,
+        publisher=publisher
+    )
@@ -9,6 +9,7 @@ import asyncio
 import json
 import logging
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
@@ -16,11 +17,13 @@ from typing import Dict, List, Optional
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, Response
 from pydantic import BaseModel
 import uvicorn
 
 from .websocket_manager import WebSocketManager, websocket_manager
+from .job_queue import JobQueue, QueueFullError, create_job_queue
+from ..core.metrics_registry import REGISTRY, CONTENT_TYPE, QUEUE_DEPTH
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +32,7 @@ class TaskRequest(BaseModel):
     """Модель запроса на выполнение задачи"""
     prompt: str
     options: Optional[Dict] = {}
+    room: Optional[str] = None  # Комната для событий выполнения (None - всем)
 
 
 class SystemStatus(BaseModel):
@@ -37,19 +41,43 @@ class SystemStatus(BaseModel):
     timestamp: str
     active_connections: int
     rooms: Dict[str, int]
+    jobs: Dict[str, int] = {}
     version: str = "3.0.0"
 
 
-def create_app() -> FastAPI:
-    """Создать экземпляр FastAPI приложения"""
+async def publish_job_event(room: Optional[str], message: Dict):
+    """События очереди задач: в комнату отправителя или всем подключенным"""
+    if room:
+        await websocket_manager.broadcast_to_room(room, message)
+    else:
+        await websocket_manager.broadcast(message)
+
+
+def create_app(job_queue: Optional[JobQueue] = None) -> FastAPI:
+    """
+    Создать экземпляр FastAPI приложения
+    
+    Args:
+        job_queue: Очередь задач (по умолчанию UnifiedOrchestrator с настройками из окружения)
+    """
+    job_queue = job_queue or create_job_queue(publisher=publish_job_event)
+    
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Воркеры стартуют с сервером, чтобы сохранённые задачи продолжили выполнение
+        await job_queue.start()
+        yield
+        await job_queue.stop()
     
     app = FastAPI(
         title="KittyCore 3.0 Web Interface",
         description="Уберфутуристичный веб-интерфейс для агентных систем",
         version="3.0.0",
         docs_url="/api/docs",
-        redoc_url="/api/redoc"
+        redoc_url="/api/redoc",
+        lifespan=lifespan
     )
+    app.state.job_queue = job_queue
     
     # CORS middleware для dev окружения
     app.add_middleware(
@@ -60,6 +88,15 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Метрики веб-слоя вычисляются при выгрузке /metrics
+    REGISTRY.gauge(
+        "kittycore_websocket_connections", "Активные WebSocket соединения"
+    ).set_function(websocket_manager.get_connection_count)
+    QUEUE_DEPTH.labels("websocket_send").set_function(websocket_manager.get_send_queue_depth)
+    REGISTRY.gauge(
+        "kittycore_websocket_send_queue_max", "Самая длинная очередь отправки WebSocket соединения"
+    ).set_function(websocket_manager.get_max_send_queue_depth)
+    
     # Статические файлы (будем создавать фронтенд позже)
     static_dir = Path(__file__).parent / "static"
     if static_dir.exists():
@@ -179,9 +216,24 @@ def create_app() -> FastAPI:
                         case 'agent_spawned':
                             addLog('Создан агент: ' + data.agent_type, 'info');
                             break;
+                        case 'task_queued':
+                            addLog('Задача в очереди: ' + data.task_id, 'info');
+                            break;
+                        case 'task_progress':
+                            addLog('[' + data.task_id + '] ' + data.stage + ': ' + data.state, 'info');
+                            break;
                         case 'task_completed':
                             addLog('Задача завершена: ' + data.result, 'info');
                             break;
+                        case 'task_failed':
+                            addLog('Ошибка задачи ' + data.task_id + ': ' + data.error, 'error');
+                            break;
+                        case 'task_cancelled':
+                            addLog('Задача отменена: ' + data.task_id, 'warning');
+                            break;
+                        case 'task_rejected':
+                            addLog('Очередь заполнена, повторите через ' + data.retry_after + ' с', 'warning');
+                            break;
                         default:
                             addLog('Получено: ' + JSON.stringify(data), 'info');
                     }
@@ -241,25 +293,50 @@ def create_app() -> FastAPI:
             status="active",
             timestamp=datetime.now().isoformat(),
             active_connections=websocket_manager.get_connection_count(),
-            rooms=websocket_manager.get_rooms_info()
+            rooms=websocket_manager.get_rooms_info(),
+            jobs=job_queue.stats()
         )
     
-    @app.post("/api/task")
+    @app.get("/metrics")
+    async def metrics() -> Response:
+        """Метрики в текстовом формате Prometheus"""
+        return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+    
+    @app.post("/api/task", status_code=202)
     async def execute_task(task: TaskRequest):
-        """Выполнить задачу через REST API"""
+        """Поставить задачу в очередь на выполнение UnifiedOrchestrator"""
         try:
-            # Пока что просто отправляем уведомление через WebSocket
-            await websocket_manager.send_system_notification(
-                f"Получена задача через API: {task.prompt}",
-                "info"
-            )
-            
-            # TODO: Интеграция с OrchestratorAgent
-            return {"status": "received", "task_id": f"task_{datetime.now().timestamp()}"}
-            
+            job = await job_queue.submit(task.prompt, task.options, task.room)
+        except QueueFullError as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
         except Exception as e:
             logger.error(f"Error executing task: {e}")
             raise HTTPException(status_code=500, detail=str(e))
+        
+        return {
+            "status": job.status.value,
+            "task_id": job.job_id,
+            "status_url": f"/api/task/{job.job_id}"
+        }
+    
+    @app.get("/api/task/{task_id}")
+    async def get_task(task_id: str):
+        """Статус, ход выполнения и результат задачи"""
+        job = job_queue.get(task_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Задача {task_id} не найдена")
+        return job.to_dict()
+    
+    @app.delete("/api/task/{task_id}")
+    async def cancel_task(task_id: str):
+        """Отменить ожидающую или выполняющуюся задачу"""
+        job = job_queue.get(task_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Задача {task_id} не найдена")
+        if job.finished:
+            raise HTTPException(status_code=409, detail=f"Задача {task_id} уже завершена: {job.status.value}")
+        await job_queue.cancel(task_id)
+        return job.to_dict(include_result=False)
     
     @app.websocket("/ws")
     async def websocket_endpoint(websocket: WebSocket):
@@ -276,39 +353,43 @@ def create_app() -> FastAPI:
                 message = json.loads(data)
                 
                 # Обрабатываем разные типы сообщений
-                await handle_websocket_message(websocket, message)
+                await handle_websocket_message(websocket, message, job_queue)
                 
         except WebSocketDisconnect:
             await websocket_manager.disconnect(websocket)
         except Exception as e:
             logger.error(f"WebSocket error: {e}")
             await websocket_manager.disconnect(websocket)
+    
+    return app
 
 
-async def handle_websocket_message(websocket: WebSocket, message: Dict):
+async def handle_websocket_message(websocket: WebSocket, message: Dict, job_queue: Optional[JobQueue] = None):
     """Обработать сообщение от WebSocket клиента"""
     message_type = message.get("type")
     
-    if message_type == "execute_task":
-        prompt = message.get("prompt", "")
-        
-        # Уведомляем всех о начале выполнения задачи
-        await websocket_manager.broadcast({
-            "type": "task_started",
-            "prompt": prompt,
-            "task_id": f"task_{datetime.now().timestamp()}",
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # TODO: Интеграция с OrchestratorAgent
-        # Пока что симулируем выполнение
-        await asyncio.sleep(1)
-        
-        await websocket_manager.send_personal_message(websocket, {
-            "type": "task_completed",
-            "result": f"Задача '{prompt}' принята к выполнению (демо режим)",
-            "timestamp": datetime.now().isoformat()
-        })
+    if message_type == "execute_task" and job_queue is not None:
+        # События выполнения уходят в комнату отправителя
+        metadata = websocket_manager.get_connection_metadata(websocket) or {}
+        try:
+            await job_queue.submit(message.get("prompt", ""), message.get("options") or {}, metadata.get("room"))
+        except QueueFullError as e:
+            await websocket_manager.send_personal_message(websocket, {
+                "type": "task_rejected",
+                "reason": str(e),
+                "retry_after": e.retry_after,
+                "timestamp": datetime.now().isoformat()
+            })
+    
+    elif message_type == "cancel_task" and job_queue is not None:
+        job = await job_queue.cancel(message.get("task_id", ""))
+        if job is None:
+            await websocket_manager.send_personal_message(websocket, {
+                "type": "system_notification",
+                "message": f"Задача {message.get('task_id')} не найдена",
+                "level": "warning",
+                "timestamp": datetime.now().isoformat()
+            })
         
     elif message_type == "ping":
         await websocket_manager.send_personal_message(websocket, {
@@ -3,23 +3,148 @@ KittyCore 3.0 WebSocket Manager
 
 Управление WebSocket соединениями для real-time коммуникации
 с агентными системами.
+
+У каждого соединения своя ограниченная очередь отправки, которую
+разбирает отдельная задача: рассылка сериализует сообщение один раз
+и только кладёт его в очереди, не дожидаясь медленных клиентов.
+Политики переполнения очереди (SendPolicy):
+- drop_oldest - выбросить самое старое сообщение
+- coalesce - заменить ожидающее событие прогресса той же задачи новым
+  (если такого нет - выбросить самое старое)
+- disconnect - отключить медленного клиента
+
+Настройка глобального менеджера: KITTYCORE_WS_SEND_QUEUE (по умолчанию 256)
+и KITTYCORE_WS_SEND_POLICY (по умолчанию coalesce).
 """
 
 import asyncio
 import json
 import logging
+import os
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Set, Optional, Any
+from enum import Enum
+from typing import Deque, Dict, List, Set, Optional, Any, Tuple
 
 from fastapi import WebSocket, WebSocketDisconnect
 
+from ..core.metrics_registry import WEBSOCKET_DROPPED_MESSAGES
+
 logger = logging.getLogger(__name__)
 
+# Типы сообщений, для которых важно только последнее значение
+# (потоковые токены - дельты текста, их слияние теряло бы часть ответа)
+COALESCE_TYPES = {"task_progress", "ping"}
+
+
+class SendPolicy(str, Enum):
+    """Поведение при переполнении очереди отправки соединения"""
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+def coalesce_key(message: Dict[str, Any]) -> Optional[Tuple[str, Any]]:
+    """Ключ слияния: тип сообщения и задача (None - сообщение не сливается)"""
+    message_type = message.get("type")
+    if message_type not in COALESCE_TYPES:
+        return None
+    return message_type, message.get("task_id")
+
+
+class ConnectionSender:
+    """Очередь отправки одного соединения и задача, которая её разбирает"""
+    
+    def __init__(self, websocket: WebSocket, manager: "WebSocketManager", max_queue: int, policy: SendPolicy):
+        self.websocket = websocket
+        self.manager = manager
+        self.max_queue = max_queue
+        self.policy = policy
+        self.queue: Deque[Tuple[str, Optional[Tuple[str, Any]]]] = deque()
+        self.dropped = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = asyncio.create_task(self._drain())
+    
+    def enqueue(self, text: str, key: Optional[Tuple[str, Any]] = None) -> bool:
+        """
+        Положить сериализованное сообщение в очередь (без ожидания)
+        
+        Returns:
+            bool: False если соединение отключено политикой disconnect
+        """
+        if self.closed:
+            return False
+        if len(self.queue) >= self.max_queue:
+            if self.policy == SendPolicy.DISCONNECT:
+                self.closed = True
+                self._drop("disconnect")
+                self.manager._schedule_disconnect(self.websocket, slow=True)
+                return False
+            if self.policy == SendPolicy.COALESCE and key is not None:
+                for index, (_, queued_key) in enumerate(self.queue):
+                    if queued_key == key:
+                        self.queue[index] = (text, key)
+                        self._drop("coalesced")
+                        return True
+            self.queue.popleft()
+            self._drop("drop_oldest")
+        self.queue.append((text, key))
+        self._idle.clear()
+        self._ready.set()
+        return True
+    
+    def _drop(self, reason: str):
+        self.dropped += 1
+        WEBSOCKET_DROPPED_MESSAGES.labels(reason).inc()
+    
+    async def _drain(self):
+        while True:
+            if not self.queue:
+                self._ready.clear()
+                self._idle.set()
+                await self._ready.wait()
+                continue
+            text, _ = self.queue.popleft()
+            try:
+                await self.websocket.send_text(text)
+            except Exception as e:
+                if not isinstance(e, WebSocketDisconnect):
+                    logger.error(f"Error sending to WebSocket: {e}")
+                self.closed = True
+                self._idle.set()
+                self.manager._schedule_disconnect(self.websocket)
+                return
+    
+    async def flush(self):
+        """Дождаться отправки всех сообщений из очереди"""
+        await self._idle.wait()
+    
+    async def close(self):
+        self.closed = True
+        self.queue.clear()
+        self._idle.set()
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
 
 class WebSocketManager:
     """Менеджер WebSocket соединений для KittyCore"""
     
-    def __init__(self):
+    def __init__(self, max_queue: int = 256, policy: SendPolicy = SendPolicy.COALESCE):
+        # Размер очереди отправки на соединение и политика переполнения
+        self.max_queue = max_queue
+        self.policy = SendPolicy(policy)
+        
+        # Очереди отправки соединений
+        self.senders: Dict[WebSocket, ConnectionSender] = {}
+        
+        # Отключения, запланированные из синхронного кода
+        self._pending_disconnects: Set[asyncio.Task] = set()
+        
         # Активные соединения
         self.active_connections: Set[WebSocket] = set()
         
@@ -48,6 +173,7 @@ class WebSocketManager:
             
             # Добавляем в активные соединения
             self.active_connections.add(websocket)
+            self.senders[websocket] = ConnectionSender(websocket, self, self.max_queue, self.policy)
             
             # Добавляем в комнату
             if room not in self.rooms:
@@ -100,7 +226,12 @@ class WebSocketManager:
             room = metadata.get("room", "default")
             
             # Удаляем из активных соединений
+            if websocket not in self.active_connections:
+                return
             self.active_connections.discard(websocket)
+            sender = self.senders.pop(websocket, None)
+            if sender:
+                await sender.close()
             
             # Удаляем из комнаты
             if room in self.rooms:
@@ -134,14 +265,21 @@ class WebSocketManager:
             websocket: Целевое WebSocket соединение
             message: Словарь с данными для отправки
         """
-        try:
-            if websocket in self.active_connections:
-                await websocket.send_text(json.dumps(message, ensure_ascii=False))
-        except WebSocketDisconnect:
-            await self.disconnect(websocket)
-        except Exception as e:
-            logger.error(f"Error sending personal message: {e}")
-            await self.disconnect(websocket)
+        sender = self.senders.get(websocket)
+        if sender:
+            sender.enqueue(json.dumps(message, ensure_ascii=False), coalesce_key(message))
+    
+    def _fan_out(self, connections, message: Dict[str, Any], exclude: Optional[List[WebSocket]]):
+        """Сериализует сообщение один раз и кладёт его в очереди соединений"""
+        text = json.dumps(message, ensure_ascii=False)
+        key = coalesce_key(message)
+        exclude = exclude or []
+        # Копия: политика disconnect может менять множество соединений
+        for connection in list(connections):
+            if connection not in exclude:
+                sender = self.senders.get(connection)
+                if sender:
+                    sender.enqueue(text, key)
     
     async def broadcast(self, message: Dict[str, Any], exclude: Optional[List[WebSocket]] = None):
         """
@@ -151,22 +289,7 @@ class WebSocketManager:
             message: Словарь с данными для отправки
             exclude: Список WebSocket для исключения из рассылки
         """
-        exclude = exclude or []
-        disconnected = []
-        
-        for connection in self.active_connections:
-            if connection not in exclude:
-                try:
-                    await connection.send_text(json.dumps(message, ensure_ascii=False))
-                except WebSocketDisconnect:
-                    disconnected.append(connection)
-                except Exception as e:
-                    logger.error(f"Error broadcasting to connection: {e}")
-                    disconnected.append(connection)
-        
-        # Удаляем отключенные соединения
-        for connection in disconnected:
-            await self.disconnect(connection)
+        self._fan_out(self.active_connections, message, exclude)
     
     async def broadcast_to_room(self, room: str, message: Dict[str, Any], exclude: Optional[List[WebSocket]] = None):
         """
@@ -177,26 +300,39 @@ class WebSocketManager:
             message: Словарь с данными для отправки
             exclude: Список WebSocket для исключения из рассылки
         """
-        exclude = exclude or []
-        
-        if room not in self.rooms:
-            return
-        
-        disconnected = []
-        
-        for connection in self.rooms[room]:
-            if connection not in exclude:
-                try:
-                    await connection.send_text(json.dumps(message, ensure_ascii=False))
-                except WebSocketDisconnect:
-                    disconnected.append(connection)
-                except Exception as e:
-                    logger.error(f"Error broadcasting to room {room}: {e}")
-                    disconnected.append(connection)
-        
-        # Удаляем отключенные соединения
-        for connection in disconnected:
-            await self.disconnect(connection)
+        if room in self.rooms:
+            self._fan_out(self.rooms[room], message, exclude)
+    
+    def _schedule_disconnect(self, websocket: WebSocket, slow: bool = False):
+        """Отключение из синхронного кода очереди (ошибка отправки или медленный клиент)"""
+        if slow:
+            logger.warning("Disconnecting slow WebSocket consumer: send queue is full")
+        task = asyncio.get_running_loop().create_task(self._disconnect_and_close(websocket, slow))
+        self._pending_disconnects.add(task)
+        task.add_done_callback(self._pending_disconnects.discard)
+    
+    async def _disconnect_and_close(self, websocket: WebSocket, slow: bool):
+        await self.disconnect(websocket)
+        if slow:
+            try:
+                # 1013: Try Again Later
+                await websocket.close(code=1013)
+            except Exception:
+                pass
+    
+    async def flush(self, timeout: Optional[float] = None):
+        """Дождаться отправки всех поставленных в очереди сообщений"""
+        await asyncio.wait_for(
+            asyncio.gather(*(sender.flush() for sender in list(self.senders.values()))), timeout
+        )
+    
+    def get_send_queue_depth(self) -> int:
+        """Суммарное число сообщений, ожидающих отправки"""
+        return sum(len(sender.queue) for sender in self.senders.values())
+    
+    def get_max_send_queue_depth(self) -> int:
+        """Самая длинная очередь отправки (отстающий клиент)"""
+        return max((len(sender.queue) for sender in self.senders.values()), default=0)
     
     def get_connection_count(self, room: Optional[str] = None) -> int:
         """
@@ -259,7 +395,10 @@ class WebSocketManager:
 
 
 # Глобальный экземпляр менеджера (singleton pattern)
-websocket_manager = WebSocketManager()
+websocket_manager = WebSocketManager(
+    max_queue=int(os.getenv("KITTYCORE_WS_SEND_QUEUE", "256")),
+    policy=os.getenv("KITTYCORE_WS_SEND_POLICY", SendPolicy.COALESCE.value)
+)
 
 
 async def get_websocket_manager() -> WebSocketManager:
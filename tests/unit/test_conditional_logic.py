@@ -0,0 +1,82 @@
+"""
+Тесты компилируемых условий AdvancedConditionEngine KittyCore 3.0
+"""
+
+import pytest
+
+from kittycore.core.conditional_logic import AdvancedConditionEngine, CompiledCondition
+
+CONTEXT = {
+    "user_role": "admin",
+    "user_age": 25,
+    "user_status": "active",
+    "kitten_energy": 85,
+    "tasks_completed_today": 2,
+    "user name": "Bob",
+    "tags": ["vip", "new"],
+    "user": {"name": "Ann"},
+}
+
+
+@pytest.fixture
+def parser():
+    return AdvancedConditionEngine().parser
+
+
+class TestExpressionParser:
+    """Разбор и вычисление выражений"""
+
+    @pytest.mark.parametrize("expression, expected", [
+        ("user_age > 18 and user_role == 'admin'", True),
+        ("user_age > 18 AND NOT user_status == 'active'", False),
+        ("(kitten.energy() > 50) or missing > 3", True),
+        ("kitten.skill('Nova', 'analysis') > 8", True),
+        ("kitten.mood() == 'enthusiastic'", True),
+        ("{user name} == 'Bob'", True),
+        ("tags contains 'vip' and user_role starts_with 'ad'", True),
+        ("user_role.ends_with('min')", True),
+        ("user.name == 'Ann'", True),
+        ("user_status in ['active', 'new'] and len(tags) == 2", True),
+        ("missing is None and not missing", True),
+        ("missing > 3", False),
+    ])
+    def test_evaluates_expressions(self, parser, expression, expected):
+        result = parser.parse_and_evaluate(expression, CONTEXT)
+
+        assert result.success
+        assert result.value is expected
+
+    def test_context_values_are_not_spliced_into_source(self, parser):
+        context = {"name": "x' or __import__('os').system('exit 1') or '", "other": "admin"}
+
+        result = parser.parse_and_evaluate("name == other", context)
+
+        assert result.success and result.value is False
+
+    @pytest.mark.parametrize("expression", [
+        "user_age >",
+        "lambda: 1",
+        "user_age @ 2",
+        "[x for x in tags]",
+    ])
+    def test_invalid_expressions_fail(self, parser, expression):
+        result = parser.parse_and_evaluate(expression, CONTEXT)
+
+        assert not result.success and result.value is False
+
+    def test_expressions_are_compiled_once(self, parser, monkeypatch):
+        compiled = []
+        original = CompiledCondition.compile.__func__
+
+        def counting_compile(cls, expression):
+            compiled.append(expression)
+            return original(cls, expression)
+
+        monkeypatch.setattr(CompiledCondition, "compile", classmethod(counting_compile))
+
+        for age in range(100):
+            result = parser.parse_and_evaluate("user_age > 18", {"user_age": age})
+            assert result.value is (age > 18)
+            parser.parse_and_evaluate("user_age >", {})
+
+        assert compiled == ["user_age > 18", "user_age >"]
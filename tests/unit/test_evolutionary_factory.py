@@ -0,0 +1,167 @@
+"""
+Тесты кэша приспособленности, векторных операций и сохранения EvolutionaryAgentFactory KittyCore 3.0
+"""
+
+import json
+import random
+from datetime import timedelta
+
+import pytest
+
+from kittycore.core.evolutionary_factory import EvolutionaryAgentFactory, GeneticOperations, NUMPY_AVAILABLE
+
+needs_numpy = pytest.mark.skipif(not NUMPY_AVAILABLE, reason="numpy не установлен")
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+
+def make_agents(count, seed=1):
+    genetics = GeneticOperations()
+    genetics.random.seed(seed)
+    rng = random.Random(seed)
+    specializations = ["python", "web", "data", "design", "api"]
+    agents = []
+    for i in range(count):
+        agent = genetics.create_initial_agent(rng.choice(["code", "web", "analysis"]),
+                                              rng.sample(specializations, rng.randint(1, 3)))
+        agent.agent_id = f"agent_{i}"
+        agent.tasks_completed = rng.randint(0, 20)
+        agent.total_success_rate = rng.choice([0.0, rng.random()])
+        if rng.random() < 0.3:
+            agent.life_span = timedelta(days=rng.randint(0, 90))
+        agents.append(agent)
+    return agents
+
+
+class AlwaysZeroRandom:
+    """Генератор numpy, у которого random() всегда возвращает нули"""
+
+    def __init__(self, generator):
+        self._generator = generator
+
+    def random(self, size=None):
+        return np.zeros(size)
+
+    def __getattr__(self, name):
+        return getattr(self._generator, name)
+
+
+@pytest.fixture
+def factory(tmp_path):
+    return EvolutionaryAgentFactory(str(tmp_path / "evolution"), save_batch_size=10, vectorize_threshold=64)
+
+
+@needs_numpy
+class TestPopulationArrays:
+    """Векторные расчёты совпадают с поагентными"""
+
+    def test_fitness_and_diversity_match_scalar(self, factory):
+        from kittycore.core.evolutionary_factory import PopulationArrays
+
+        agents = make_agents(150)
+        arrays = PopulationArrays(agents)
+
+        assert arrays.fitness().tolist() == pytest.approx(
+            [factory.genetics.calculate_fitness(a) for a in agents], abs=1e-12
+        )
+        pairs = [factory._calculate_genetic_distance(a, b) for i, a in enumerate(agents) for b in agents[i + 1:]]
+        assert arrays.mean_genetic_distance(chunk_size=32) == pytest.approx(sum(pairs) / len(pairs), rel=1e-9)
+
+    def test_vectorized_evolution_keeps_population_valid(self, factory, monkeypatch):
+        factory.max_population = 1000
+        for agent in make_agents(600):
+            factory._add_to_population(agent)
+        fitness_before = {a.agent_id: factory._fitness(a) for a in factory.active_agents.values()}
+        worst_third_limit = sorted(fitness_before.values())[600 // 3 - 1]
+        monkeypatch.setattr(factory.genetics, "mutation_rate", 1.0)
+        saves = []
+        monkeypatch.setattr(factory, "_save_population", lambda: saves.append(len(factory.active_agents)))
+
+        factory.evolve_population()
+
+        active = list(factory.active_agents.values())
+        children = [a for a in active if a.parent_ids]
+        assert len(active) == 600 and saves == [600]
+        assert children and len(factory.retired_agents) == len(children)
+        for child in children:
+            parents = [factory.population[pid] for pid in child.parent_ids]
+            assert child.generation == max(p.generation for p in parents) + 1
+            assert 0.0 <= child.genes.success_rate <= 1.0
+            assert 0.5 <= child.genes.speed_factor <= 2.0
+            assert child.agent_id not in factory.retired_agents
+        # Заменяются только агенты из худшей трети
+        assert all(fitness_before[agent_id] <= worst_third_limit for agent_id in factory.retired_agents)
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 4])
+    def test_vectorized_evolution_on_tiny_population(self, tmp_path, monkeypatch, size):
+        """При низком vectorize_threshold заменяется не вся популяция"""
+        factory = EvolutionaryAgentFactory(str(tmp_path / "evolution"), vectorize_threshold=1)
+        for agent in make_agents(size):
+            factory._add_to_population(agent)
+        monkeypatch.setattr(factory.genetics, "mutation_rate", 1.0)
+        # Все броски "успешны": мутация и скрещивание срабатывают при любой возможности
+        monkeypatch.setattr(factory.genetics, "np_random", AlwaysZeroRandom(factory.genetics.np_random))
+        
+        factory.evolve_population(force_evolution=True)
+        
+        survivors = [a for a in factory.active_agents.values() if not a.parent_ids]
+        assert len(factory.active_agents) == size
+        assert len(factory.retired_agents) == max(1, -(-size // 3))
+        assert len(survivors) == size - len(factory.retired_agents)
+
+
+class TestFitnessCache:
+    """Приспособленность пересчитывается только для изменившихся агентов"""
+
+    def test_only_updated_agent_is_recomputed(self, factory, monkeypatch):
+        agents = make_agents(20)
+        for agent in agents:
+            factory._add_to_population(agent)
+        calls = []
+        original = factory.genetics.calculate_fitness
+
+        def counting_fitness(agent_dna, task_history=None):
+            calls.append(agent_dna.agent_id)
+            return original(agent_dna, task_history)
+
+        monkeypatch.setattr(factory.genetics, "calculate_fitness", counting_fitness)
+
+        best = factory.get_best_agent()
+        assert factory.get_best_agent() is best
+        assert len(calls) == 20
+
+        calls.clear()
+        factory.update_agent_performance("agent_3", True)
+        factory.get_best_agent()
+        factory.get_best_agent("code")
+        assert calls == ["agent_3"]
+        assert factory.get_best_agent() is max(agents, key=original)
+
+
+class TestPeriodicPersistence:
+    """Сохранение после пачки обновлений, атомарной записью"""
+
+    def test_updates_are_saved_in_batches(self, factory, tmp_path, monkeypatch):
+        agent = factory.spawn_agent("code", ["python"])
+        saves = []
+        original_save = factory._save_population
+
+        def counting_save():
+            saves.append(factory._saver.pending)
+            original_save()
+
+        monkeypatch.setattr(factory, "_save_population", counting_save)
+
+        for i in range(25):
+            factory.update_agent_performance(agent.agent_id, i % 5 != 0)
+
+        assert saves == [10, 10]
+        factory.flush()
+        factory.flush()
+        assert saves == [10, 10, 5]
+
+        storage = tmp_path / "evolution"
+        data = json.loads((storage / "population.json").read_text(encoding="utf-8"))
+        assert data["active_agents"][agent.agent_id]["tasks_completed"] == 25
+        assert not list(storage.glob("*.tmp"))
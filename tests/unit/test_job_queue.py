@@ -0,0 +1,289 @@
+"""
+Тесты очереди задач веб-сервера KittyCore 3.0
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from kittycore.core.metrics_registry import QUEUE_DEPTH
+from kittycore.web.job_queue import JobQueue, JobStatus, JobStore, OrchestratorRunner, QueueFullError
+
+
+class FakeRunner:
+    """Выполнение задачи: этапы через progress, пауза до release()"""
+
+    def __init__(self, blocking: bool = False):
+        self.started = []
+        self.gate = asyncio.Event()
+        if not blocking:
+            self.gate.set()
+
+    def release(self):
+        self.gate.set()
+
+    async def __call__(self, job, progress):
+        self.started.append(job.prompt)
+        progress({"stage": "stage.analysis", "state": "started"})
+        await self.gate.wait()
+        if job.prompt == "boom":
+            raise RuntimeError("LLM недоступен")
+        progress({"stage": "stage.analysis", "state": "completed"})
+        return {"status": "completed", "created_files": ["outputs/result.md"], "prompt": job.prompt}
+
+
+class Recorder:
+    """Публикатор событий, запоминающий (комната, сообщение)"""
+
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, room, message):
+        self.events.append((room, message))
+
+    def types(self, job_id):
+        return [m["type"] for _, m in self.events if m["job_id"] == job_id]
+
+
+async def wait_for(job, *statuses, timeout: float = 2.0):
+    async def poll():
+        while job.status not in statuses:
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+class TestJobQueue:
+    """Тесты JobQueue"""
+
+    def test_job_runs_and_reports_progress_to_room(self):
+        async def scenario():
+            recorder = Recorder()
+            queue = JobQueue(FakeRunner(), workers=2, publisher=recorder)
+            job = await queue.submit("создай отчёт", {"user_id": "u1"}, room="main")
+            await wait_for(job, JobStatus.COMPLETED)
+            await asyncio.sleep(0.01)
+            await queue.stop()
+            return job, recorder
+
+        job, recorder = asyncio.run(scenario())
+
+        assert job.result["created_files"] == ["outputs/result.md"]
+        assert [e["state"] for e in job.progress] == ["started", "completed"]
+        assert recorder.types(job.job_id) == ["task_queued", "task_started", "task_progress",
+                                              "task_progress", "task_completed"]
+        assert {room for room, _ in recorder.events} == {"main"}
+        assert job.to_dict()["status"] == "completed"
+
+    def test_backpressure_when_queue_is_full(self):
+        async def scenario():
+            runner = FakeRunner(blocking=True)
+            queue = JobQueue(runner, workers=1, max_queued=2)
+            running = await queue.submit("первая")
+            await wait_for(running, JobStatus.RUNNING)
+            await queue.submit("вторая")
+            await queue.submit("третья")
+            depth = QUEUE_DEPTH.labels("tasks").get()
+            with pytest.raises(QueueFullError) as error:
+                await queue.submit("лишняя")
+            runner.release()
+            await queue.stop()
+            return error.value, depth
+
+        error, depth = asyncio.run(scenario())
+
+        assert error.retry_after >= 1
+        assert depth == 2
+
+    def test_cancel_queued_and_running_jobs(self):
+        async def scenario():
+            runner = FakeRunner(blocking=True)
+            queue = JobQueue(runner, workers=1)
+            running = await queue.submit("долгая")
+            queued = await queue.submit("ожидающая")
+            await wait_for(running, JobStatus.RUNNING)
+
+            await queue.cancel(queued.job_id)
+            await queue.cancel(running.job_id)
+            await wait_for(running, JobStatus.CANCELLED)
+            follow_up = await queue.submit("следующая")
+            runner.release()
+            await wait_for(follow_up, JobStatus.COMPLETED)
+            await queue.stop()
+            return running, queued, runner
+
+        running, queued, runner = asyncio.run(scenario())
+
+        assert queued.status == JobStatus.CANCELLED
+        assert running.status == JobStatus.CANCELLED
+        # Отменённая в очереди задача не запускалась, воркер пережил отмену
+        assert runner.started == ["долгая", "следующая"]
+
+    def test_cancel_while_start_is_published(self):
+        async def scenario():
+            runner = FakeRunner()
+            queue = None
+            cancelled = []
+
+            async def publisher(room, message):
+                # Отмена приходит, пока публикуется task_started
+                if message["type"] == "task_started":
+                    cancelled.append(await queue.cancel(message["job_id"]))
+
+            queue = JobQueue(runner, workers=1, publisher=publisher)
+            job = await queue.submit("отменённая")
+            await wait_for(job, JobStatus.CANCELLED, JobStatus.COMPLETED)
+            await queue.stop()
+            return job, runner, cancelled
+
+        job, runner, cancelled = asyncio.run(scenario())
+
+        assert cancelled == [job] and job.cancel_requested
+        assert job.status == JobStatus.CANCELLED
+        assert runner.started == []
+
+    def test_failed_job_keeps_error(self):
+        async def scenario():
+            queue = JobQueue(FakeRunner(), workers=1)
+            job = await queue.submit("boom")
+            await wait_for(job, JobStatus.FAILED)
+            await queue.stop()
+            return job
+
+        job = asyncio.run(scenario())
+
+        assert "LLM недоступен" in job.error
+
+    def test_unfinished_jobs_survive_restart(self, tmp_path):
+        db_path = str(tmp_path / "jobs.db")
+
+        async def first_run():
+            queue = JobQueue(FakeRunner(blocking=True), workers=1, store=JobStore(db_path))
+            interrupted = await queue.submit("прерванная")
+            waiting = await queue.submit("ожидающая")
+            await wait_for(interrupted, JobStatus.RUNNING)
+            await queue.stop()
+            return interrupted.job_id, waiting.job_id
+
+        async def second_run():
+            runner = FakeRunner()
+            queue = JobQueue(runner, workers=1, store=JobStore(db_path), max_finished=1)
+            await queue.start()
+            jobs = [queue.get(job_id) for job_id in ids]
+            for job in jobs:
+                await wait_for(job, JobStatus.COMPLETED)
+            # Вытесненная из памяти задача читается из хранилища
+            evicted = queue.get(ids[0])
+            await queue.stop()
+            return runner, evicted
+
+        ids = asyncio.run(first_run())
+        runner, evicted = asyncio.run(second_run())
+
+        assert runner.started == ["прерванная", "ожидающая"]
+        assert evicted.status == JobStatus.COMPLETED
+        assert evicted.result["prompt"] == "прерванная"
+
+
+class TestTaskEndpoints:
+    """REST API очереди задач"""
+
+    def test_submit_status_cancel_and_429(self):
+        from kittycore.web.server import create_app
+
+        runner = FakeRunner(blocking=True)
+        queue = JobQueue(runner, workers=1, max_queued=1)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=create_app(job_queue=queue))
+            async with httpx.AsyncClient(transport=transport, base_url="http://kittycore") as client:
+                first = await client.post("/api/task", json={"prompt": "первая"})
+                await wait_for(queue.get(first.json()["task_id"]), JobStatus.RUNNING)
+                second = await client.post("/api/task", json={"prompt": "вторая"})
+                rejected = await client.post("/api/task", json={"prompt": "третья"})
+                cancelled = await client.delete(f"/api/task/{second.json()['task_id']}")
+                runner.release()
+                await wait_for(queue.get(first.json()["task_id"]), JobStatus.COMPLETED)
+                status = await client.get(f"/api/task/{first.json()['task_id']}")
+                missing = await client.get("/api/task/unknown")
+                again = await client.delete(f"/api/task/{first.json()['task_id']}")
+                system = await client.get("/api/status")
+            await queue.stop()
+            return first, rejected, cancelled, status, missing, again, system
+
+        first, rejected, cancelled, status, missing, again, system = asyncio.run(scenario())
+
+        assert first.status_code == 202
+        assert first.json()["status_url"] == f"/api/task/{first.json()['task_id']}"
+        assert rejected.status_code == 429
+        assert int(rejected.headers["Retry-After"]) >= 1
+        assert cancelled.json()["status"] == "cancelled"
+        assert status.json()["status"] == "completed"
+        assert status.json()["result"]["prompt"] == "первая"
+        assert missing.status_code == 404
+        assert again.status_code == 409
+        assert system.json()["jobs"]["completed"] == 1
+
+
+class TestOrchestratorRunner:
+    """Задачи веб-сервера в окружении solve_one и вне цикла сервера"""
+
+    @pytest.fixture
+    def runner(self, tmp_path, monkeypatch):
+        from kittycore.core.unified_orchestrator import UnifiedConfig, UnifiedOrchestrator
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+        orchestrator = UnifiedOrchestrator(UnifiedConfig(
+            vault_path=str(tmp_path / "vault"),
+            enable_vector_memory=False,
+            enable_amem_memory=False,
+            enable_human_intervention=False,
+            enable_metrics=False
+        ))
+
+        async def solve(task, context=None):
+            chat = orchestrator.shared_chat
+            chat.register_agent(f"agent_{task}", "worker")
+            time.sleep(0.2)  # синхронная работа задачи
+            context["progress_callback"]({"stage": "stage.analysis", "state": "completed"})
+            return {"status": "completed", "chat": id(chat), "thread": threading.current_thread().name}
+
+        orchestrator._solve_task = solve
+        runner = OrchestratorRunner()
+        runner._orchestrator = orchestrator
+        yield runner
+        runner.close()
+
+    def test_jobs_isolated_and_server_loop_not_blocked(self, runner):
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            ticking = asyncio.create_task(ticker())
+            queue = JobQueue(runner, workers=2)
+            jobs = [await queue.submit("первая"), await queue.submit("вторая")]
+            for job in jobs:
+                await wait_for(job, JobStatus.COMPLETED)
+            await asyncio.sleep(0.01)
+            ticking.cancel()
+            await queue.stop()
+            return jobs, ticks
+
+        jobs, ticks = asyncio.run(scenario())
+
+        assert all(job.result["thread"] == "kittycore-orchestrator" for job in jobs)
+        # У каждой задачи свой чат, не общий чат оркестратора
+        chats = {job.result["chat"] for job in jobs}
+        assert len(chats) == 2 and id(runner._orchestrator._shared_chat) not in chats
+        assert all([e["state"] for e in job.progress] == ["completed"] for job in jobs)
+        # 0.4с синхронной работы прошли вне цикла сервера
+        assert ticks >= 20
+        assert runner._loop is None
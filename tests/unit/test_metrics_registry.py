@@ -0,0 +1,151 @@
+"""
+Тесты реестра метрик Prometheus KittyCore 3.0
+"""
+
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from kittycore.core.metrics_registry import (
+    MetricsRegistry,
+    QUEUE_DEPTH,
+    REGISTRY,
+    TOOL_EXECUTION_SECONDS,
+    record_cache_access
+)
+from kittycore.tools.base_tool import Tool, ToolResult
+
+
+class EchoTool(Tool):
+    """Инструмент для проверки метрик выполнения"""
+
+    def __init__(self):
+        super().__init__("echo_metrics_tool", "Возвращает переданное значение")
+
+    def execute(self, **kwargs) -> ToolResult:
+        if kwargs.get("action") == "fail":
+            raise RuntimeError("сбой")
+        return ToolResult(success=True, data=kwargs)
+
+    def get_schema(self):
+        return {"type": "object", "properties": {"action": {"type": "string"}}, "required": ["action"]}
+
+
+class TestMetricsRegistry:
+    """Тесты MetricsRegistry"""
+
+    def setup_method(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_from_many_threads(self):
+        counter = self.registry.counter("test_events_total", "События", ("kind",))
+
+        def work():
+            for _ in range(10_000):
+                counter.labels("a").inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.labels("a").get() == 80_000
+        # Ячейки завершившихся потоков свёрнуты, сумма сохранена
+        assert counter.labels("a").get() == 80_000
+        with pytest.raises(ValueError):
+            counter.labels("a").inc(-1)
+
+    def test_histogram_exposition(self):
+        histogram = self.registry.histogram("test_latency_seconds", "Задержка", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        text = self.registry.render()
+
+        assert "# TYPE test_latency_seconds histogram" in text
+        assert 'test_latency_seconds_bucket{le="0.1"} 2' in text
+        assert 'test_latency_seconds_bucket{le="1"} 3' in text
+        assert 'test_latency_seconds_bucket{le="+Inf"} 4' in text
+        assert "test_latency_seconds_count 4" in text
+        assert "test_latency_seconds_sum 3.65" in text
+
+    def test_gauge_set_inc_and_function(self):
+        gauge = self.registry.gauge("test_depth", "Глубина", ("queue",))
+        gauge.labels("jobs").set(5)
+        gauge.labels("jobs").inc(2)
+        gauge.labels("jobs").dec()
+        gauge.labels("external").set_function(lambda: 42)
+        with gauge.labels("inflight").track_inprogress():
+            inflight = gauge.labels("inflight").get()
+
+        assert gauge.labels("jobs").get() == 6
+        assert gauge.labels("external").get() == 42
+        assert inflight == 1
+        assert gauge.labels("inflight").get() == 0
+
+    def test_label_escaping_and_registration(self):
+        counter = self.registry.counter("test_escape_total", "Экранирование", ("path",))
+        counter.labels('a"b\\c\nd').inc()
+
+        assert 'test_escape_total{path="a\\"b\\\\c\\nd"} 1' in self.registry.render()
+        assert self.registry.counter("test_escape_total", "Повтор", ("path",)) is counter
+        with pytest.raises(ValueError):
+            self.registry.gauge("test_escape_total", "Другой тип")
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+
+
+class TestHotPathMetrics:
+    """Метрики инструментов, кэшей и эндпоинт /metrics"""
+
+    def test_tool_execution_is_recorded(self):
+        tool = EchoTool()
+
+        assert tool._execute_with_logging(action="ping").success is True
+        assert tool._execute_with_logging(action="fail").success is False
+        assert tool._execute_with_logging().success is False
+
+        labels = ("echo_metrics_tool",)
+        assert TOOL_EXECUTION_SECONDS.labels(*labels, "ping", "success").get()["count"] >= 1
+        assert TOOL_EXECUTION_SECONDS.labels(*labels, "fail", "error").get()["count"] >= 1
+        assert TOOL_EXECUTION_SECONDS.labels(*labels, "", "invalid").get()["count"] >= 1
+
+    def test_llm_queue_depth_follows_dequeue(self):
+        from kittycore.core.adaptive_rate_control import RequestPriority, RequestQueue
+
+        async def scenario():
+            request_queue = RequestQueue()
+            pending = [asyncio.ensure_future(request_queue.add_request({"n": i}, RequestPriority.MEDIUM))
+                       for i in range(3)]
+            await asyncio.sleep(0)
+            depth_after_enqueue = QUEUE_DEPTH.labels("llm_requests").get()
+            request = request_queue.queue.pop(0)
+            request.future.set_result("ok")
+            depth_after_dequeue = QUEUE_DEPTH.labels("llm_requests").get()
+            for task in pending:
+                task.cancel()
+            return depth_after_enqueue, depth_after_dequeue
+
+        assert asyncio.run(scenario()) == (3, 2)
+
+    def test_metrics_endpoint(self):
+        from kittycore.web.server import create_app
+
+        record_cache_access("test_cache", True)
+        record_cache_access("test_cache", False)
+
+        async def scrape():
+            transport = httpx.ASGITransport(app=create_app())
+            async with httpx.AsyncClient(transport=transport, base_url="http://kittycore") as client:
+                return await client.get("/metrics")
+
+        response = asyncio.run(scrape())
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'kittycore_cache_hit_ratio{cache="test_cache"} 0.5' in response.text
+        assert "kittycore_websocket_connections 0" in response.text
+        assert REGISTRY.get("kittycore_active_tasks") is not None
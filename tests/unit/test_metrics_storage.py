@@ -0,0 +1,251 @@
+"""
+Тесты хранилища метрик MetricsStorage KittyCore 3.0
+"""
+
+import random
+import sqlite3
+import statistics
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from kittycore.core.metrics_collector import (
+    MetricsStorage,
+    MetricsAnalyzer,
+    TaskMetrics,
+    AgentMetrics,
+    SystemMetrics
+)
+from kittycore.core.metrics_registry import METRICS_DROPPED_WRITES
+
+
+def make_task(task_id: str, task_type: str = "analysis", hours_ago: float = 0.0, **kwargs) -> TaskMetrics:
+    start = datetime.now() - timedelta(hours=hours_ago)
+    return TaskMetrics(task_id=task_id, task_type=task_type, complexity_score=0.5,
+                       start_time=start, end_time=start + timedelta(seconds=5),
+                       duration_seconds=5.0, **kwargs)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = MetricsStorage(str(tmp_path / "metrics.db"), flush_interval=0.05)
+    yield storage
+    storage.close()
+
+
+class TestMetricsStorage:
+    """Тесты MetricsStorage"""
+
+    def test_wal_mode_and_indexes(self, storage):
+        conn = sqlite3.connect(storage.db_path)
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        conn.close()
+
+        assert mode == "wal"
+        assert {"idx_task_metrics_start_time", "idx_agent_metrics_task",
+                "idx_system_metrics_timestamp"} <= indexes
+
+    def test_read_your_writes(self, storage):
+        storage.store_task_metrics(make_task("task_1", quality_score=0.9))
+
+        metrics = storage.get_task_metrics("task_1")
+
+        assert metrics is not None
+        assert metrics.quality_score == 0.9
+        assert metrics.start_time.tzinfo is None
+
+    def test_writes_are_batched(self, storage):
+        with patch.object(storage, "_write_batch", wraps=storage._write_batch) as write_batch:
+            for i in range(500):
+                storage.store_agent_metrics(AgentMetrics(
+                    agent_id=f"agent_{i}", agent_type="worker", task_id="task_1",
+                    start_time=datetime.now(), tools_used=["web_search"]
+                ))
+            assert storage.flush() is True
+
+        rows = storage.get_recent_metrics(include=("agents",))["agents"]
+        assert len(rows) == 500
+        assert write_batch.call_count < 50
+        assert rows[0]["tools_used"] == '["web_search"]'
+
+    def test_recent_metrics_filtered_in_sql(self, storage):
+        storage.store_task_metrics(make_task("old", hours_ago=48))
+        for i in range(5):
+            storage.store_task_metrics(make_task(f"analysis_{i}", hours_ago=i * 0.1))
+        storage.store_task_metrics(make_task("code_1", task_type="code"))
+        storage.store_system_metrics(SystemMetrics(timestamp=datetime.now(), cpu_usage=12.5))
+
+        everything = storage.get_recent_metrics(hours=24)
+        analysis = storage.get_recent_metrics(hours=24, task_type="analysis", limit=2, include=("tasks",))
+
+        assert len(everything["tasks"]) == 6
+        assert len(everything["system"]) == 1
+        assert [t["task_id"] for t in analysis["tasks"]] == ["analysis_0", "analysis_1"]
+        assert analysis["agents"] == [] and analysis["system"] == []
+
+    def test_bad_row_does_not_drop_batch(self, storage):
+        dropped_before = METRICS_DROPPED_WRITES.labels().get()
+        for i in range(10):
+            storage.store_task_metrics(make_task(f"task_{i}"))
+        # Строка с нарушением NOT NULL посреди пачки
+        storage._enqueue("INSERT INTO task_metrics (task_id) VALUES (NULL)", ())
+        for i in range(10, 15):
+            storage.store_task_metrics(make_task(f"task_{i}"))
+        assert storage.flush() is True
+
+        assert len(storage.get_recent_metrics(include=("tasks",))["tasks"]) == 15
+        assert storage.dropped_writes == 1
+        assert METRICS_DROPPED_WRITES.labels().get() == dropped_before + 1
+
+    def test_close_flushes_queue(self, tmp_path):
+        path = str(tmp_path / "metrics.db")
+        storage = MetricsStorage(path, flush_interval=10)
+        for i in range(20):
+            storage.store_task_metrics(make_task(f"task_{i}"))
+        storage.close()
+
+        reopened = MetricsStorage(path, background_writes=False)
+        assert len(reopened.get_recent_metrics()["tasks"]) == 20
+        reopened.close()
+
+    def test_synchronous_mode(self, tmp_path):
+        storage = MetricsStorage(str(tmp_path / "metrics.db"), background_writes=False)
+        storage.store_task_metrics(make_task("task_sync"))
+
+        conn = sqlite3.connect(storage.db_path)
+        count = conn.execute("SELECT COUNT(*) FROM task_metrics").fetchone()[0]
+        conn.close()
+        storage.close()
+
+        assert count == 1
+
+
+def reference_analysis(tasks):
+    """Прежний расчёт анализатора по списку строк окна"""
+    completed = [t for t in tasks if t['end_time']]
+    durations = [t['duration_seconds'] for t in completed if t['duration_seconds']]
+    qualities = [t['quality_score'] for t in tasks if t['quality_score'] > 0]
+    complexities = [t['complexity_score'] for t in tasks if t['complexity_score']]
+    return {
+        'total_tasks': len(tasks),
+        'completed_tasks': len(completed),
+        'duration': (statistics.mean(durations), statistics.median(durations), min(durations), max(durations)),
+        'quality': (statistics.mean(qualities), statistics.median(qualities), min(qualities), max(qualities)),
+        'simple_tasks': len([c for c in complexities if c < 0.3]),
+        'complex_tasks': len([c for c in complexities if c >= 0.7]),
+        'complexity_trend': 'increasing' if complexities[-5:] > complexities[:5] else 'stable',
+        'failure_rate': len([t for t in tasks if not t['end_time'] or t['agents_failed'] > 0]) / len(tasks),
+        'rework_rate': len([t for t in tasks if t['rework_required']]) / len(tasks),
+    }
+
+
+class TestMetricsRollups:
+    """Агрегаты задач и агентов и анализ поверх них"""
+
+    @pytest.fixture
+    def sync_storage(self, tmp_path):
+        storage = MetricsStorage(str(tmp_path / "metrics.db"), background_writes=False)
+        yield storage
+        storage.close()
+
+    def test_rollups_follow_inserts_and_replaces(self, sync_storage):
+        sync_storage.store_task_metrics(make_task("task_1", quality_score=0.4))
+        sync_storage.store_task_metrics(make_task("task_2", quality_score=0.8))
+        # Повторная запись той же задачи заменяет строку, а не добавляет вторую
+        sync_storage.store_task_metrics(make_task("task_2", quality_score=0.6, rework_required=True))
+
+        totals = sync_storage.get_task_rollup(hours=1)
+        hourly = sync_storage._query("SELECT SUM(task_count) AS n FROM task_rollups WHERE bucket_size = 'hour'")
+
+        assert totals['task_count'] == 2
+        assert totals['quality_sum'] == pytest.approx(1.0)
+        assert totals['rework_count'] == 1
+        assert totals['low_quality_count'] == 1
+        assert hourly[0]['n'] == 2
+
+    def test_analysis_matches_row_based_computation(self, sync_storage):
+        rng = random.Random(7)
+        now = datetime.now()
+        for i in range(200):
+            start = now - timedelta(minutes=rng.uniform(0, 60 * 30))
+            sync_storage.store_task_metrics(TaskMetrics(
+                task_id=f"task_{i}", task_type=rng.choice(["analysis", "code"]),
+                complexity_score=rng.choice([0, 0.1, 0.5, 0.9]), start_time=start,
+                end_time=start + timedelta(seconds=3) if i % 7 else None,
+                duration_seconds=rng.uniform(0.5, 10), quality_score=rng.random(),
+                agents_failed=int(i % 11 == 0), rework_required=i % 5 == 0
+            ))
+
+        analysis = MetricsAnalyzer(sync_storage).analyze_task_performance(hours=24)
+        expected = reference_analysis(sync_storage.get_recent_metrics(hours=24, include=("tasks",))["tasks"])
+        duration, quality = analysis['duration_stats'], analysis['quality_stats']
+
+        assert analysis['total_tasks'] == expected['total_tasks']
+        assert analysis['completed_tasks'] == expected['completed_tasks']
+        assert (duration['average'], duration['median'], duration['min'], duration['max']) == \
+            pytest.approx(expected['duration'])
+        assert (quality['average'], quality['median'], quality['min'], quality['max']) == \
+            pytest.approx(expected['quality'])
+        assert analysis['complexity_distribution']['simple_tasks'] == expected['simple_tasks']
+        assert analysis['complexity_distribution']['complex_tasks'] == expected['complex_tasks']
+        assert analysis['complexity_distribution']['complexity_trend'] == expected['complexity_trend']
+        assert analysis['failure_analysis']['failure_rate'] == pytest.approx(expected['failure_rate'])
+        assert analysis['failure_analysis']['rework_rate'] == pytest.approx(expected['rework_rate'])
+
+    def test_dashboard_timeseries_and_agents(self, sync_storage):
+        for i in range(3):
+            sync_storage.store_task_metrics(make_task(f"recent_{i}", hours_ago=0.01))
+        sync_storage.store_task_metrics(make_task("older", task_type="code", hours_ago=3))
+        sync_storage.store_agent_metrics(AgentMetrics(agent_id="a1", agent_type="worker", task_id="recent_0",
+                                                      start_time=datetime.now(), status="completed",
+                                                      duration_seconds=2.0))
+        analyzer = MetricsAnalyzer(sync_storage)
+
+        dashboard = analyzer.get_dashboard(hours=6, bucket="hour")
+        by_type = sync_storage.get_task_rollup(hours=6, by_type=True)
+        agents = analyzer.analyze_agent_performance(hours=1)
+
+        assert dashboard['bucket'] == "hour"
+        assert sum(point['tasks'] for point in dashboard['series']) == 4
+        assert {row['task_type']: row['task_count'] for row in by_type} == {"analysis": 3, "code": 1}
+        assert agents["worker"]["success_rate"] == 1.0
+        assert agents["worker"]["average_duration"] == 2.0
+
+    def test_agent_with_null_status_does_not_break_batch(self, tmp_path):
+        storage = MetricsStorage(str(tmp_path / "metrics.db"), flush_interval=10)
+        for i in range(20):
+            storage.store_task_metrics(make_task(f"task_{i}"))
+        storage.store_agent_metrics(AgentMetrics(agent_id="a1", agent_type="worker", task_id="task_0",
+                                                 start_time=datetime.now(), status=None))
+        storage.store_agent_metrics(AgentMetrics(agent_id="a2", agent_type="worker", task_id="task_1",
+                                                 start_time=datetime.now(), status="completed"))
+        assert storage.flush() is True
+
+        analysis = MetricsAnalyzer(storage).analyze_task_performance(hours=1)
+        agents = storage._query("SELECT SUM(agent_count) AS n, SUM(completed_count) AS done "
+                                "FROM agent_rollups WHERE bucket_size = 'hour'")
+        storage.close()
+
+        assert analysis['total_tasks'] == 20
+        assert agents[0]['n'] == 2 and agents[0]['done'] == 1
+
+    def test_rollups_backfilled_for_existing_database(self, tmp_path):
+        path = str(tmp_path / "metrics.db")
+        storage = MetricsStorage(path, background_writes=False)
+        for i in range(4):
+            storage.store_task_metrics(make_task(f"task_{i}"))
+        storage.close()
+        # База предыдущей версии: сырые строки без агрегатов
+        conn = sqlite3.connect(path)
+        conn.execute("DROP TABLE task_rollups")
+        conn.execute("DROP TRIGGER trg_task_rollups_insert")
+        conn.commit()
+        conn.close()
+
+        reopened = MetricsStorage(path, background_writes=False)
+        totals = reopened.get_task_rollup(hours=1)
+        reopened.close()
+
+        assert totals['task_count'] == 4
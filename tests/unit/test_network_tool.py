@@ -4,6 +4,7 @@
 
 import pytest
 import asyncio
+import socket
 from unittest.mock import patch, MagicMock, AsyncMock
 from kittycore.tools.network_tool import (
     NetworkTool,
@@ -224,35 +225,150 @@ PING example.com (93.184.216.34): 56 data bytes
     @pytest.mark.asyncio
     async def test_scan_ports_range(self, network_tool):
         """Тест сканирования диапазона портов"""
-        with patch.object(network_tool, 'scan_port') as mock_scan:
-            from kittycore.tools.base_tool import ToolResult
-            
-            # Настраиваем мок: порт 80 открыт, остальные закрыты
-            def scan_side_effect(host, port, timeout):
-                if port == 80:
-                    return ToolResult(success=True, data={
-                        "port": port,
-                        "is_reachable": True,
-                        "response_time": 0.1,
-                        "service_name": "http"
-                    })
-                else:
-                    return ToolResult(success=True, data={
-                        "port": port,
-                        "is_reachable": False,
-                        "response_time": 1.0
-                    })
-            
-            mock_scan.side_effect = scan_side_effect
-            
-            result = await network_tool.scan_ports_range("example.com", 79, 81)
-            
-            assert result.success is True
-            assert result.data["host"] == "example.com"
-            assert result.data["open_count"] == 1
-            assert result.data["total_scanned"] == 3
-            assert len(result.data["open_ports"]) == 1
-            assert result.data["open_ports"][0]["port"] == 80
+        # Локальный слушающий сокет: порт открыт, соседние закрыты
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        port = server.getsockname()[1]
+        
+        try:
+            result = await network_tool.scan_ports_range("127.0.0.1", port - 1, port + 1)
+        finally:
+            server.close()
+        
+        assert result.success is True
+        assert result.data["host"] == "127.0.0.1"
+        assert result.data["open_count"] == 1
+        assert result.data["total_scanned"] == 3
+        assert len(result.data["open_ports"]) == 1
+        assert result.data["open_ports"][0]["port"] == port
+    
+    @pytest.mark.asyncio
+    async def test_scan_ports_range_has_no_port_cap(self, network_tool):
+        """Диапазон больше 200 портов сканируется целиком"""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        port = server.getsockname()[1]
+        start = max(1, port - 500)
+        
+        try:
+            result = await network_tool.scan_ports_range("127.0.0.1", start, port, concurrency=100)
+        finally:
+            server.close()
+        
+        assert result.success is True
+        assert result.data["total_scanned"] == port - start + 1
+        assert port in [item["port"] for item in result.data["open_ports"]]
+    
+    @pytest.mark.asyncio
+    async def test_scan_ports_range_counts_statuses_separately(self, network_tool):
+        """Отфильтрованные и ошибочные порты не считаются закрытыми"""
+        from kittycore.tools.network_tool import PortScanResult
+        
+        statuses = {1: "open", 2: "closed", 3: "closed", 4: "filtered", 5: "error", 6: "filtered"}
+        
+        async def fake_stream(host, ports, *args):
+            for port in ports:
+                yield PortScanResult(host=host, port=port, status=statuses[port], response_time=0.01)
+        
+        with patch.object(network_tool, 'scan_ports_stream', fake_stream):
+            result = await network_tool.scan_ports_range("127.0.0.1", 1, 6)
+        
+        assert result.success is True
+        assert result.data["total_scanned"] == 6
+        assert result.data["open_count"] == 1
+        assert result.data["closed_count"] == 2
+        assert result.data["filtered_count"] == 2
+        assert result.data["error_count"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_scan_ports_range_invalid(self, network_tool):
+        """Тест некорректного диапазона портов"""
+        result = await network_tool.scan_ports_range("127.0.0.1", 100, 70000)
+        
+        assert result.success is False
+        assert "диапазон" in result.error.lower()
+    
+    @pytest.mark.asyncio
+    async def test_scan_ports_stream_multiple_hosts(self, network_tool):
+        """Потоковое сканирование нескольких хостов"""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        port = server.getsockname()[1]
+        
+        try:
+            results = [r async for r in network_tool.scan_ports_stream(
+                ["127.0.0.1", "localhost"], [port, port + 1], timeout=0.5)]
+        finally:
+            server.close()
+        
+        assert len(results) == 4
+        assert {r.host for r in results} == {"127.0.0.1", "localhost"}
+        assert {r.status for r in results if r.port == port} == {"open"}
+    
+    @pytest.mark.asyncio
+    async def test_adaptive_timeout_is_not_retried(self, network_tool):
+        """Порт, не ответивший за адаптивный таймаут, проверяется один раз"""
+        from kittycore.tools.network_tool import PortScanResult
+        
+        probes = []
+        
+        async def fake_probe(host, address, port, timeout, family=socket.AF_INET):
+            probes.append((port, timeout))
+            status = "closed" if port % 2 else "filtered"
+            return PortScanResult(host=host, port=port, status=status, response_time=0.001)
+        
+        with patch.object(network_tool, '_probe_port', fake_probe):
+            result = await network_tool.scan_ports_range("127.0.0.1", 1, 10, timeout=1.0, concurrency=1)
+        
+        assert result.data["filtered_count"] == 5
+        assert sorted(port for port, _ in probes) == list(range(1, 11))
+        # После первых ответов таймаут сокращается
+        assert probes[-1][1] < 1.0
+    
+    @pytest.mark.asyncio
+    async def test_socket_exhaustion_does_not_truncate_stream(self, network_tool):
+        """EMFILE при создании сокета - ошибка порта, остальные порты сканируются"""
+        import errno
+        
+        real_socket = socket.socket
+        calls = []
+        
+        def flaky_socket(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise OSError(errno.EMFILE, "Too many open files")
+            return real_socket(*args, **kwargs)
+        
+        server = real_socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        port = server.getsockname()[1]
+        
+        try:
+            with patch("kittycore.tools.network_tool.socket.socket", flaky_socket):
+                result = await network_tool.scan_ports_range("127.0.0.1", port, port + 4, concurrency=1)
+        finally:
+            server.close()
+        
+        assert result.success is True
+        assert result.data["total_scanned"] == 5
+        assert result.data["error_count"] == 1
+        assert result.data["open_count"] == 1
+    
+    def test_adaptive_timeout(self):
+        """Таймаут сходится к наблюдаемым RTT"""
+        from kittycore.tools.network_tool import AdaptiveTimeout
+        
+        estimator = AdaptiveTimeout(max_timeout=1.0, min_timeout=0.01)
+        assert estimator.current == 1.0
+        
+        for _ in range(20):
+            estimator.observe(0.02)
+        
+        assert 0.01 <= estimator.current < 0.1
     
     @pytest.mark.asyncio
     async def test_execute_method(self, network_tool):
@@ -0,0 +1,83 @@
+"""
+Тесты атомарной записи и отложенного сохранения KittyCore 3.0
+"""
+
+import gc
+import json
+
+import pytest
+
+from kittycore.core.persistence import BatchedSaver, write_json_atomic
+
+
+class Owner:
+    def __init__(self, batch_size=3, interval=3600.0):
+        self.saves = 0
+        self.saver = BatchedSaver(self, "save", batch_size, interval)
+
+    def save(self):
+        self.saves += 1
+        self.saver.mark_saved()
+
+
+class TestWriteJsonAtomic:
+    """Запись через временный файл"""
+
+    def test_failed_write_keeps_previous_version(self, tmp_path):
+        path = tmp_path / "state.json"
+        write_json_atomic(path, {"version": 1}, ensure_ascii=False)
+
+        with pytest.raises(TypeError):
+            write_json_atomic(path, {"version": object()})
+
+        assert json.loads(path.read_text(encoding="utf-8")) == {"version": 1}
+        assert not list(tmp_path.glob("*.tmp"))
+
+
+class TestBatchedSaver:
+    """Сохранение пачкой, по интервалу и явным flush()"""
+
+    def test_saves_after_batch_and_on_flush(self):
+        owner = Owner(batch_size=3)
+        for _ in range(7):
+            owner.saver.record()
+        assert owner.saves == 2 and owner.saver.pending == 1
+
+        owner.saver.flush()
+        owner.saver.flush()
+        assert owner.saves == 3
+
+        owner.saver.mark_dirty()
+        owner.saver.flush()
+        assert owner.saves == 4
+
+    def test_interval_triggers_save(self):
+        owner = Owner(batch_size=100, interval=0.0)
+        owner.saver.record()
+        assert owner.saves == 1
+
+    def test_does_not_keep_owner_alive(self):
+        owner = Owner()
+        saver = owner.saver
+        saver.record()
+        del owner
+        gc.collect()
+
+        # Владелец собран: отложенный flush при выходе ничего не делает
+        saver.flush()
+        assert saver.pending == 1
+
+    def test_exit_hook_does_not_pin_savers(self):
+        from kittycore.core import persistence
+
+        before = len(persistence._active_savers)
+        owners = [Owner() for _ in range(5)]
+        assert len(persistence._active_savers) == before + 5
+
+        owners[0].saver.record()
+        persistence._flush_savers_at_exit()
+        assert owners[0].saves == 1 and owners[1].saves == 0
+
+        del owners
+        gc.collect()
+        assert len(persistence._active_savers) == before
@@ -0,0 +1,84 @@
+"""
+Тесты индекса приспособленности и отложенного сохранения PromptEvolutionEngine KittyCore 3.0
+"""
+
+import json
+import random
+
+from kittycore.core.prompt_evolution import PromptEvolutionEngine
+
+
+def best_by_full_scan(engine, agent_type):
+    """Прежний выбор: max по всей популяции типа агента"""
+    candidates = [p for p in engine.prompt_population.values() if p.agent_type == agent_type]
+    return max(candidates, key=engine._selection_fitness)
+
+
+class TestFitnessIndex:
+    """Лучший промпт из кучи совпадает с полным перебором"""
+
+    def test_heap_matches_full_scan(self, tmp_path):
+        engine = PromptEvolutionEngine(str(tmp_path / "prompts"), save_batch_size=10_000)
+        rng = random.Random(3)
+        prompts = [engine.create_initial_prompt(agent_type) for agent_type in ("code", "web") for _ in range(5)]
+        prompts.append(engine.mutate_prompt(prompts[0]))
+
+        for _ in range(400):
+            prompt = rng.choice(prompts)
+            engine.record_prompt_performance(prompt.prompt_id, "task", rng.random() < 0.6,
+                                             rng.random(), rng.uniform(1, 90))
+            for agent_type in ("code", "web"):
+                assert engine.get_best_prompt(agent_type) is best_by_full_scan(engine, agent_type)
+
+        # Устаревшие записи кучи не копятся бесконечно
+        assert all(len(heap) <= 4 * len(engine.prompt_population) + 65 for heap in engine._fitness_heaps.values())
+
+    def test_index_follows_population_trimming(self, tmp_path):
+        engine = PromptEvolutionEngine(str(tmp_path / "prompts"))
+        engine.max_population = 3
+        prompts = [engine.create_initial_prompt("code") for _ in range(6)]
+        for prompt in prompts[:3]:
+            engine.record_prompt_performance(prompt.prompt_id, "task", False, 0.0, 120.0)
+
+        engine._manage_prompt_population_size()
+
+        assert engine.get_best_prompt("code") is best_by_full_scan(engine, "code")
+        assert engine.get_best_prompt("code").prompt_id in engine.prompt_population
+
+
+class TestBatchedPersistence:
+    """История ограничена, запись на диск - пачками"""
+
+    def test_records_are_saved_in_batches(self, tmp_path, monkeypatch):
+        storage = tmp_path / "prompts"
+        engine = PromptEvolutionEngine(str(storage), history_limit=20, save_batch_size=25)
+        prompt = engine.create_initial_prompt("analysis")
+        saves = []
+        original_save = engine._save_prompt_population
+
+        def counting_save():
+            saves.append(engine._saver.pending)
+            original_save()
+
+        monkeypatch.setattr(engine, "_save_prompt_population", counting_save)
+
+        for i in range(60):
+            engine.record_prompt_performance(prompt.prompt_id, "data_analysis", i % 2 == 0, 0.5, 10.0)
+
+        assert saves == [25, 25]
+        assert len(engine.performance_history) == 20
+        stats = engine.get_population_stats()["task_types"]["data_analysis"]
+        assert stats["count"] == 60 and stats["success_rate"] == 0.5
+
+        engine.flush()
+        assert saves == [25, 25, 10]
+        engine.flush()
+        assert len(saves) == 3
+
+        saved = json.loads((storage / "prompt_population.json").read_text(encoding="utf-8"))
+        assert saved[prompt.prompt_id]["usage_count"] == 60
+
+        reloaded = PromptEvolutionEngine(str(storage), history_limit=20)
+        assert len(reloaded.performance_history) == 20
+        assert reloaded.task_type_stats["data_analysis"].count == 60
+        assert reloaded.get_best_prompt("analysis").prompt_id == prompt.prompt_id
@@ -4,13 +4,16 @@
 
 import pytest
 import asyncio
+from pathlib import Path
 from unittest.mock import patch, MagicMock
 from kittycore.tools.security_tool import (
     SecurityTool,
     SecurityVulnerability,
     PasswordAnalysis,
     HashAnalysis,
-    SecurityAudit
+    SecurityAudit,
+    VulnerabilityScanner,
+    LineIndex
 )
 
 
@@ -376,6 +379,144 @@ def safe_function(user_input):
         assert "необходимо указать" in result.error.lower()
 
 
+class TestPatternEngine:
+    """Тесты однопроходного сканера и сканирования директорий"""
+    
+    @pytest.fixture
+    def security_tool(self):
+        return SecurityTool()
+    
+    def test_line_index(self):
+        code = "a\nbb\n\nccc"
+        index = LineIndex(code)
+        
+        assert index.lines_count == 4
+        for position in range(len(code)):
+            assert index.line_of(position) == code[:position].count('\n') + 1
+    
+    @pytest.mark.asyncio
+    async def test_line_numbers_in_large_code(self, security_tool):
+        """Номера строк совпадают с подсчётом переводов строк"""
+        filler = "x = 1\n" * 5000
+        code = filler + 'password = "secret_value"\n' + filler + 'hashlib.md5.new(data)\n'
+        
+        result = await security_tool.scan_code_vulnerabilities(code=code)
+        
+        locations = {v["category"]: v["location"] for v in result.data["audit"]["vulnerabilities"]}
+        assert locations["hardcoded_secrets"] == "Line 5001"
+        assert locations["weak_crypto"] == "Line 10002"
+    
+    def test_separate_patterns_fallback(self):
+        """Паттерны с собственными именованными группами сканируются по отдельности"""
+        scanner = VulnerabilityScanner({
+            "custom": [
+                {"pattern": r"(?P<name>eval)\(", "severity": "high", "description": "eval"},
+                {"pattern": r"(?P<name>exec)\(", "severity": "high", "description": "exec"}
+            ]
+        })
+        
+        findings = scanner.scan("exec(a)\neval(b)")
+        
+        assert [(rule, line) for rule, line, _ in findings] == [(1, 1), (0, 2)]
+    
+    def test_overlapping_rules_are_all_reported(self):
+        """Совпадение одного правила не скрывает пересекающееся совпадение другого"""
+        scanner = VulnerabilityScanner({
+            "exec": [{"pattern": r"os\.system\(.*?\)", "severity": "high", "description": "exec"}],
+            "path_traversal": [{"pattern": r"\.\./", "severity": "medium", "description": "traversal"}]
+        })
+        
+        findings = scanner.scan("x = 1\nos.system('cat ../etc/passwd')\n")
+        
+        assert [(rule, line) for rule, line, _ in findings] == [(0, 2), (1, 2)]
+        assert scanner.scan("x = 1\n") == []
+    
+    @pytest.mark.asyncio
+    async def test_scan_directory_reads_each_file_once(self, security_tool, tmp_path, monkeypatch):
+        for i in range(3):
+            (tmp_path / f"module_{i}.py").write_text(f'password = "secret_{i}_value"\n')
+        reads = []
+        original_read_bytes = Path.read_bytes
+        
+        def counting_read_bytes(path):
+            reads.append(path.name)
+            return original_read_bytes(path)
+        
+        monkeypatch.setattr(Path, "read_bytes", counting_read_bytes)
+        result = await security_tool.scan_directory(str(tmp_path))
+        
+        assert result.data["summary"]["total_vulnerabilities"] == 3
+        assert sorted(reads) == ["module_0.py", "module_1.py", "module_2.py"]
+    
+    @pytest.mark.asyncio
+    async def test_file_scan_cache_is_bounded(self, security_tool, tmp_path):
+        security_tool._file_scan_cache_size = 2
+        for i in range(5):
+            (tmp_path / f"module_{i}.py").write_text(f"value = {i}\n")
+        
+        await security_tool.scan_directory(str(tmp_path))
+        assert len(security_tool._file_scan_cache) == 2
+        assert len(security_tool._file_stat_cache) == 2
+        
+        # Недавно использованные записи вытесняются последними
+        second = await security_tool.scan_directory(str(tmp_path))
+        assert second.data["files_from_cache"] == 2
+        assert len(security_tool._file_scan_cache) == 2
+    
+    @pytest.mark.asyncio
+    async def test_scan_directory_uses_cache(self, security_tool, tmp_path):
+        (tmp_path / "app.py").write_text('password = "hunter2hunter2"\n')
+        (tmp_path / "page.js").write_text('el.innerHTML = name + "<br>";\n')
+        (tmp_path / "notes.txt").write_text('password = "not scanned"\n')
+        (tmp_path / "node_modules").mkdir()
+        (tmp_path / "node_modules" / "lib.js").write_text('password = "vendored_code"\n')
+        
+        first = await security_tool.execute("scan_directory", directory=str(tmp_path))
+        second = await security_tool.scan_directory(str(tmp_path))
+        (tmp_path / "app.py").write_text('password = "hunter2hunter2"\napi_key = "0123456789abcdef"\n')
+        third = await security_tool.scan_directory(str(tmp_path))
+        
+        assert first.success is True
+        assert first.data["files_scanned"] == 2
+        assert first.data["files_from_cache"] == 0
+        assert first.data["summary"]["total_vulnerabilities"] == 2
+        assert second.data["files_from_cache"] == 2
+        assert second.data["summary"] == first.data["summary"]
+        assert third.data["files_from_cache"] == 1
+        assert third.data["summary"]["total_vulnerabilities"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_scan_directory_process_pool(self, security_tool, tmp_path):
+        for i in range(10):
+            (tmp_path / f"module_{i}.py").write_text(f"import os\n\nos.system(cmd)\npath = '../data_{i}'\n")
+        
+        result = await security_tool.scan_directory(str(tmp_path), max_workers=2)
+        
+        assert result.success is True
+        assert result.data["files_scanned"] == 10
+        assert result.data["summary"]["total_vulnerabilities"] == 10
+        assert all(v["location"].startswith("Line 4 in ") for v in result.data["vulnerabilities"])
+    
+    @pytest.mark.asyncio
+    async def test_dangling_symlink_is_skipped(self, security_tool, tmp_path):
+        (tmp_path / "a.py").write_text('password = "hunter2hunter2"\n')
+        (tmp_path / "b.py").symlink_to(tmp_path / "nonexistent.py")
+        
+        result = await security_tool.scan_directory(str(tmp_path))
+        
+        assert result.success is True
+        assert result.data["files_scanned"] == 1
+        assert result.data["summary"]["total_vulnerabilities"] == 1
+        assert [item["file_path"] for item in result.data["files_skipped"]] == [str(tmp_path / "b.py")]
+    
+    @pytest.mark.asyncio
+    async def test_scan_directory_not_found(self, security_tool):
+        result = await security_tool.scan_directory("/path/to/nonexistent/dir")
+        
+        assert result.success is False
+        assert "директория не найдена" in result.error.lower()
+
+
 class TestHashAnalysis:
     """Тесты анализа хешей"""
     
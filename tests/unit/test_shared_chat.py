@@ -0,0 +1,134 @@
+"""
+Тесты истории и рассылки SharedChat KittyCore 3.0
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from kittycore.core.shared_chat import SharedChat
+from kittycore.memory.collective_memory import CollectiveMemory
+
+
+def make_chat(**kwargs) -> SharedChat:
+    chat = SharedChat(team_id="test", **kwargs)
+    chat.register_agent("coder", "coder")
+    chat.register_agent("tester", "tester")
+    return chat
+
+
+class TestSharedChatHistory:
+    """Кольцевой буфер и индексы"""
+
+    def test_ring_buffer_is_bounded(self):
+        async def scenario():
+            chat = make_chat(max_messages=10)
+            for i in range(50):
+                await chat.send_message("coder", f"шаг {i}", message_type="info")
+            return chat
+
+        chat = asyncio.run(scenario())
+
+        assert len(chat.messages) == 10
+        assert [m.content for m in chat.get_recent_messages(3)] == ["шаг 47", "шаг 48", "шаг 49"]
+        assert len(chat.get_recent_messages(0)) == 10
+        assert all(len(bucket) <= 10 for bucket in chat._by_type.values())
+
+    def test_indexed_lookups_match_linear_scan(self):
+        async def scenario():
+            chat = make_chat(max_messages=40)
+            for i in range(100):
+                addressed_to = ("coder", "tester", None)[i % 3]
+                message_type = ("info", "result", "coordination", "request")[i % 4]
+                await chat.send_message("coder", f"m{i}", message_type=message_type, addressed_to=addressed_to)
+            return chat
+
+        chat = asyncio.run(scenario())
+        history = list(chat.messages)
+
+        for agent_id in ("coder", "tester", "unknown"):
+            expected = [m for m in history if m.addressed_to in (agent_id, None)]
+            assert chat.get_messages_for_agent(agent_id, limit=7) == expected[-7:]
+            assert chat.get_messages_for_agent(agent_id, limit=0) == expected
+
+        for message_type in ("info", "result", "coordination", "request", "missing"):
+            expected = [m for m in history if m.message_type == message_type]
+            assert chat.get_recent_messages(5, message_type=message_type) == expected[-5:]
+
+    def test_since_filter(self):
+        chat = make_chat()
+        base = datetime(2026, 1, 1)
+        for i, message in enumerate(chat.messages):
+            message.timestamp = base + timedelta(minutes=i)
+
+        recent = chat.get_recent_messages(limit=10, since=base)
+
+        assert recent == list(chat.messages)[1:]
+
+    def test_clear_history_prunes_indexes(self):
+        async def scenario():
+            chat = make_chat()
+            for i in range(20):
+                await chat.send_message("coder", f"r{i}", message_type="result")
+            chat.clear_history(keep_last=5)
+            return chat
+
+        chat = asyncio.run(scenario())
+
+        assert [m.content for m in chat.get_recent_messages(0, message_type="result")] == \
+            [f"r{i}" for i in range(15, 20)]
+        assert "info" not in chat._by_type
+
+
+class TestSharedChatDelivery:
+    """Коллективная память и подписчики"""
+
+    def test_collective_memory_writes_are_batched(self):
+        class CountingMemory(CollectiveMemory):
+            def __init__(self):
+                super().__init__("test")
+                self.batches = []
+
+            async def store_many(self, items):
+                self.batches.append(len(items))
+                return await super().store_many(items)
+
+        async def scenario():
+            memory = CountingMemory()
+            chat = make_chat(collective_memory=memory, memory_batch_size=4)
+            for i in range(10):
+                await chat.send_message("coder", f"m{i}")
+            await chat.flush()
+            return memory
+
+        memory = asyncio.run(scenario())
+
+        assert len(memory.memories) == 10
+        assert sum(memory.batches) == 10
+        assert max(memory.batches) <= 4
+
+    def test_subscribers_are_notified_concurrently(self):
+        async def scenario():
+            chat = make_chat()
+            received = []
+
+            async def slow(event_type, message):
+                await asyncio.sleep(0.1)
+                received.append(("slow", message.content))
+
+            async def failing(event_type, message):
+                raise RuntimeError("подписчик упал")
+
+            await chat.subscribe_to_events("coder", slow)
+            await chat.subscribe_to_events("tester", slow)
+            await chat.subscribe_to_events("tester", failing)
+            await chat.subscribe_to_events("tester", lambda event_type, message: received.append(("sync", message.content)))
+
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await chat.send_message("coder", "привет")
+            return received, loop.time() - started
+
+        received, elapsed = asyncio.run(scenario())
+
+        assert sorted(received) == [("slow", "привет"), ("slow", "привет"), ("sync", "привет")]
+        assert elapsed < 0.18
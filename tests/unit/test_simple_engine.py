@@ -0,0 +1,183 @@
+"""
+Тесты компиляции и кэша сценариев SimpleScenarioEngine
+"""
+
+import asyncio
+import sys
+import types
+
+import pytest
+
+# app.core.base_plugin нет в дереве - движку нужен только интерфейс плагина
+if "app.core.base_plugin" not in sys.modules:
+    _base_plugin = types.ModuleType("app.core.base_plugin")
+
+    class BasePlugin:
+        def __init__(self, name):
+            self.name = name
+            self.engine = None
+
+        def set_engine(self, engine):
+            self.engine = engine
+
+        def register_handlers(self):
+            return {}
+
+        async def healthcheck(self):
+            return True
+
+    _base_plugin.BasePlugin = BasePlugin
+    sys.modules["app.core.base_plugin"] = _base_plugin
+
+from app.core.base_plugin import BasePlugin
+from app.core.simple_engine import CompiledScenario, SimpleScenarioEngine, _compile_template
+
+
+class FakeMongoPlugin(BasePlugin):
+    """Коллекция scenarios в памяти"""
+
+    def __init__(self, documents):
+        super().__init__("fake_mongo")
+        self.documents = documents
+        self.loads = 0
+
+    def register_handlers(self):
+        return {
+            "mongo_find_one_document": self.find_one,
+            "mongo_update_document": self.update,
+        }
+
+    async def find_one(self, step, context):
+        self.loads += 1
+        scenario_id = step["params"]["filter"]["scenario_id"]
+        context["document"] = self.documents.get(scenario_id)
+        return {}
+
+    async def update(self, step, context):
+        return {}
+
+
+def make_scenario(scenario_id="greeting", version=None, last_text="bye"):
+    scenario = {
+        "scenario_id": scenario_id,
+        "steps": [
+            {"id": "hello", "type": "log_message", "next_step": "start"},
+            {"id": "start", "type": "start", "next_step": "end"},
+            {"id": "end", "type": "end", "params": {"text": last_text}},
+        ],
+    }
+    if version is not None:
+        scenario["version"] = version
+    return scenario
+
+
+def make_engine(documents, ttl=30.0):
+    engine = SimpleScenarioEngine(scenario_cache_ttl=ttl)
+    mongo = FakeMongoPlugin(documents)
+    engine.register_plugin(mongo)
+    return engine, mongo
+
+
+class TestCompile:
+    """Индекс шагов и проверка переходов"""
+
+    def test_steps_indexed_and_start_found(self):
+        scenario = make_scenario()
+        scenario["steps"].append({"id": "start", "type": "action"})
+        scenario["steps"].append({"id": "jump", "type": "branch", "params": {"true_step": "missing", "false_step": "{target}"}})
+
+        compiled = CompiledScenario.compile(scenario)
+
+        assert compiled.first_step["id"] == "start"
+        assert compiled.steps_by_id["start"]["type"] == "start"
+        assert compiled.broken_transitions == [("jump", "missing")]
+
+    def test_steps_object_and_first_step_fallback(self):
+        compiled = CompiledScenario.compile({"steps": {"a": {"id": "a", "next_step": "b"}, "b": {"id": "b"}}})
+
+        assert compiled.scenario_id == "unknown"
+        assert compiled.first_step["id"] == "a"
+        assert list(compiled.steps_by_id) == ["a", "b"]
+
+    def test_template_tokens(self):
+        assert _compile_template("Привет, {user.name}! {}") == (
+            (False, "Привет, "), (True, "user.name"), (False, "! "), (True, ""),
+        )
+        assert _compile_template("без переменных") == ((False, "без переменных"),)
+
+        engine = SimpleScenarioEngine()
+        assert engine._resolve_template("{a}-{b}", {"a": 1}) == "1-{b}"
+
+
+class TestScenarioCache:
+    """Попадания, промахи и сброс кэша"""
+
+    def test_scenario_id_loaded_once(self):
+        engine, mongo = make_engine({"greeting": make_scenario(version=1)})
+
+        first = asyncio.run(engine.get_compiled_scenario("greeting"))
+        second = asyncio.run(engine.get_compiled_scenario("greeting"))
+
+        assert first is second and mongo.loads == 1
+        assert engine.scenario_cache_stats["hits"] == 1
+        assert engine.scenario_cache_stats["misses"] == 1
+
+    def test_scenario_id_revalidated_after_ttl(self):
+        documents = {"greeting": make_scenario(version=1)}
+        engine, mongo = make_engine(documents, ttl=0.0)
+
+        first = asyncio.run(engine.get_compiled_scenario("greeting"))
+        same = asyncio.run(engine.get_compiled_scenario("greeting"))
+        assert same is first and mongo.loads == 2
+
+        # Документ изменён в БД в обход движка
+        documents["greeting"] = make_scenario(version=2, last_text="пока")
+        changed = asyncio.run(engine.get_compiled_scenario("greeting"))
+
+        assert changed is not first
+        assert changed.steps_by_id["end"]["params"]["text"] == "пока"
+        assert engine.scenario_cache_stats["invalidations"] == 1
+
+    def test_mongo_write_invalidates(self):
+        engine, mongo = make_engine({"greeting": make_scenario()})
+        asyncio.run(engine.get_compiled_scenario("greeting"))
+
+        update = {"id": "save", "type": "mongo_update_document",
+                  "params": {"collection": "scenarios", "filter": {"scenario_id": "greeting"}}}
+        asyncio.run(engine.execute_step(update, {}))
+        asyncio.run(engine.get_compiled_scenario("greeting"))
+
+        assert mongo.loads == 2
+        assert engine.scenario_cache_stats["invalidations"] == 1
+
+    def test_object_mutated_in_place_is_recompiled(self):
+        engine = SimpleScenarioEngine()
+        scenario = make_scenario()
+
+        first = asyncio.run(engine.get_compiled_scenario(scenario))
+        assert asyncio.run(engine.get_compiled_scenario(scenario)) is first
+
+        scenario["steps"].append({"id": "extra", "type": "end"})
+        updated = asyncio.run(engine.get_compiled_scenario(scenario))
+
+        assert updated is not first and "extra" in updated.steps_by_id
+
+    def test_object_with_same_version_hits_cache(self):
+        engine = SimpleScenarioEngine()
+        first = asyncio.run(engine.get_compiled_scenario(make_scenario(version="2025-01-01")))
+        again = asyncio.run(engine.get_compiled_scenario(make_scenario(version="2025-01-01")))
+        newer = asyncio.run(engine.get_compiled_scenario(make_scenario(version="2025-01-02")))
+
+        assert again is first and newer is not first
+
+    def test_lru_eviction(self):
+        engine = SimpleScenarioEngine(scenario_cache_size=2)
+        for name in ("a", "b", "c"):
+            asyncio.run(engine.get_compiled_scenario(make_scenario(name)))
+
+        assert list(engine._scenario_cache) == ["b", "c"]
+
+    def test_missing_scenario_raises(self):
+        engine, _ = make_engine({})
+        with pytest.raises(ValueError):
+            asyncio.run(engine.get_compiled_scenario("nope"))
@@ -0,0 +1,119 @@
+"""
+Тесты пакетного выполнения UnifiedOrchestrator KittyCore 3.0
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from kittycore.core.unified_orchestrator import UnifiedConfig, UnifiedOrchestrator
+
+
+@pytest.fixture
+def orchestrator(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Провайдер создаётся, но не вызывается: _solve_task подменяется в тестах
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    config = UnifiedConfig(
+        vault_path=str(tmp_path / "vault"),
+        enable_vector_memory=False,
+        enable_amem_memory=False,
+        enable_human_intervention=False,
+        enable_metrics=False,
+        batch_concurrency=3
+    )
+    return UnifiedOrchestrator(config)
+
+
+def fake_solver(orchestrator, delays):
+    """Подмена _solve_task: пишет в чат задачи и считает одновременные задачи"""
+    state = {"running": 0, "peak": 0, "chats": {}}
+
+    async def solve(task, context=None):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        try:
+            chat = orchestrator.shared_chat
+            chat.register_agent(f"agent_{task}", "worker")
+            await chat.send_message(f"agent_{task}", f"работаю над {task}")
+            await asyncio.sleep(delays.get(task, 0.01))
+            if task == "boom":
+                raise RuntimeError("агент упал")
+            state["chats"][task] = chat
+            senders = {m.sender for m in chat.get_recent_messages(0) if m.sender.startswith("agent_")}
+            return {"task": task, "task_id": task, "status": "completed", "senders": senders}
+        finally:
+            state["running"] -= 1
+
+    orchestrator._solve_task = solve
+    return state
+
+
+class TestSolveMany:
+    """solve_many и solve_iter"""
+
+    def test_results_in_input_order_with_isolated_chats(self, orchestrator):
+        tasks = [f"t{i}" for i in range(8)] + ["boom"]
+        state = fake_solver(orchestrator, {"t0": 0.05})
+
+        results = asyncio.run(orchestrator.solve_many(tasks))
+
+        assert [r["batch_index"] for r in results] == list(range(9))
+        assert [r["task"] for r in results] == tasks
+        assert results[-1]["status"] == "failed"
+        assert "агент упал" in results[-1]["error"]
+        assert state["peak"] == 3
+        # Каждая задача видит в своём чате только своего агента
+        assert all(r["senders"] == {f"agent_{r['task']}"} for r in results[:-1])
+        assert len({id(chat) for chat in state["chats"].values()}) == 8
+        assert orchestrator.shared_chat not in state["chats"].values()
+        assert len(orchestrator.collective_memory.memories) == 9
+
+    def test_iter_yields_as_completed_and_stops_early(self, orchestrator):
+        state = fake_solver(orchestrator, {"slow": 0.3})
+        started = []
+
+        def tasks():
+            for task in ["slow", "fast1", "fast2", "fast3", "fast4"]:
+                started.append(task)
+                yield task
+
+        async def scenario():
+            received = []
+            async for result in orchestrator.solve_iter(tasks(), concurrency=2):
+                received.append(result["task"])
+                if len(received) == 2:
+                    break
+            await asyncio.sleep(0.05)
+            return received
+
+        received = asyncio.run(scenario())
+
+        assert received == ["fast1", "fast2"]
+        # Задачи читаются лениво, а после break новые не запускаются
+        assert len(started) <= 4
+        assert state["running"] == 0
+
+    def test_llm_calls_overlap(self, orchestrator):
+        class SlowLLM:
+            def complete(self, prompt, **kwargs):
+                time.sleep(0.2)
+                return json.dumps({"result_type": "отчёт", "description": "отчёт по задаче",
+                                   "success_criteria": ["есть файл"], "validation_methods": ["чтение"]})
+
+        orchestrator.task_analyzer.llm = SlowLLM()
+
+        async def solve(task, context=None):
+            outcome = await orchestrator._extract_expected_outcome(task)
+            return {"task": task, "task_id": task, "status": "completed", "outcome": outcome}
+
+        orchestrator._solve_task = solve
+        started = time.perf_counter()
+        results = asyncio.run(orchestrator.solve_many([f"t{i}" for i in range(4)], concurrency=4))
+        elapsed = time.perf_counter() - started
+
+        assert all(r["outcome"]["type"] == "отчёт" for r in results)
+        # Четыре вызова по 0.2с идут одновременно, а не друг за другом
+        assert elapsed < 0.6
@@ -0,0 +1,181 @@
+"""
+Тесты проверки созданных файлов UnifiedOrchestrator KittyCore 3.0
+"""
+
+import asyncio
+import io
+import threading
+
+import pytest
+
+from kittycore.core import unified_orchestrator
+from kittycore.core.unified_orchestrator import UnifiedConfig, UnifiedOrchestrator
+
+GOOD_PYTHON = "def add(a, b):\n    return a + b\n\n\nprint(add(2, 3))\n"
+FAKE_REPORT = "# Результат выполнения задачи\nЗадача обработана интеллектуальным агентом\nВремя создания: сегодня\n"
+
+
+@pytest.fixture
+def orchestrator(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Провайдер создаётся, но не вызывается: workflow подменяется в тестах
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    return UnifiedOrchestrator(UnifiedConfig(
+        vault_path=str(tmp_path / "vault"),
+        enable_vector_memory=False,
+        enable_amem_memory=False,
+        enable_human_intervention=False,
+        enable_metrics=False,
+        validation_workers=2
+    ))
+
+
+def fake_workflow(tmp_path, gate: threading.Event):
+    """Подмена execute_workflow: два шага, второй ждёт проверки файла первого"""
+    good = tmp_path / "calc.py"
+    fake = tmp_path / "report.py"
+
+    async def execute_workflow(workflow, team, on_step_complete=None):
+        good.write_text(GOOD_PYTHON, encoding="utf-8")
+        on_step_complete("step1", {"success": True, "files_created": [str(good)]})
+        # Проверка шага 1 идёт в пуле потоков, пока "выполняется" шаг 2
+        assert await asyncio.get_running_loop().run_in_executor(None, gate.wait, 2)
+        fake.write_text(FAKE_REPORT, encoding="utf-8")
+        on_step_complete("step2", {"success": True, "files_created": [str(fake)]})
+        return {
+            "status": "completed",
+            "results": [{"success": True}, {"success": True}],
+            "files_created": [str(good), str(fake)]
+        }
+
+    return execute_workflow, str(good), str(fake)
+
+
+class TestStreamingValidation:
+    """Проверки файлов по мере завершения шагов"""
+
+    def test_steps_are_checked_during_execution(self, orchestrator, tmp_path, monkeypatch):
+        gate, checked = threading.Event(), []
+        original_check = orchestrator._check_file
+
+        def check_file(path, task):
+            result = original_check(path, task)
+            checked.append(path)
+            gate.set()
+            return result
+
+        monkeypatch.setattr(orchestrator, "_check_file", check_file)
+        execute_workflow, good, fake = fake_workflow(tmp_path, gate)
+        monkeypatch.setattr(orchestrator.execution_manager, "execute_workflow", execute_workflow)
+
+        async def scenario():
+            execution = await orchestrator._execute_with_unified_coordination(
+                {"agents": {}}, [], "Напиши калькулятор на python", "t1"
+            )
+            checks_during_run = list(checked)
+            validation = await orchestrator._validate_generic_result("Напиши калькулятор на python", execution, {})
+            return execution, checks_during_run, validation
+
+        execution, checks_during_run, validation = asyncio.run(scenario())
+
+        assert checks_during_run == [good, fake]
+        assert set(execution["file_checks"]) == {good, fake}
+        assert list(execution["early_rework"]) == ["step2"]
+        # Неизменившиеся файлы повторно не проверяются
+        assert checked == [good, fake]
+        assert any("ПОДДЕЛКА" in issue for issue in validation["issues"])
+
+    def test_precomputed_checks_match_full_validation(self, orchestrator, tmp_path):
+        good = tmp_path / "calc.py"
+        fake = tmp_path / "report.py"
+        good.write_text(GOOD_PYTHON, encoding="utf-8")
+        fake.write_text(FAKE_REPORT, encoding="utf-8")
+        files = [str(good), str(fake), str(tmp_path / "missing.py")]
+        task = "Напиши калькулятор на python"
+
+        async def scenario():
+            precomputed = {path: orchestrator._check_file(path, task) for path in files[:2]}
+            # Файл изменён после проверки - его результат устарел
+            good.write_text(GOOD_PYTHON + "\nprint(add(1, 1))\n", encoding="utf-8")
+            streamed = await orchestrator._validate_file_contents(files, task, {}, precomputed)
+            full = await orchestrator._validate_file_contents(files, task, {})
+            return streamed, full
+
+        streamed, full = asyncio.run(scenario())
+
+        assert streamed == full
+        assert full["fake_files_count"] == 1 and full["total_files_count"] == 2
+        assert any("не найден" in issue for issue in full["issues"])
+
+
+class TestFileCheck:
+    """Проверка одного файла: большие файлы и кэш по хэшу"""
+
+    def test_large_file_is_sampled_but_scanned_fully(self, orchestrator, tmp_path):
+        orchestrator.config.validation_max_bytes = 1024
+        data = tmp_path / "data.json"
+        rows = ",\n".join(f'{{"id": {i}, "name": "строка {i}"}}' for i in range(2000))
+        data.write_text(f"[\n{rows}\n]\n", encoding="utf-8")
+        report = tmp_path / "notes.txt"
+        filler = "обычный текст\n" * 500
+        report.write_text(f"{filler}Результат выполнения задачи\n{filler}Время создания: вчера\n{filler}",
+                          encoding="utf-8")
+
+        data_check = orchestrator._check_file(str(data), "Собери датасет")
+        report_check = orchestrator._check_file(str(report), "Собери датасет")
+
+        assert data_check["sampled"] and data_check["content_check"]["is_valid"]
+        assert not data_check["is_fake"]
+        # Паттерны из середины файла не попали в выборку, но найдены сканированием
+        assert report_check["sampled"] and report_check["is_fake"]
+
+    def test_unchanged_content_is_not_rechecked(self, orchestrator, tmp_path, monkeypatch):
+        path = tmp_path / "calc.py"
+        path.write_text(GOOD_PYTHON, encoding="utf-8")
+        calls = []
+        original = orchestrator._check_content_by_extension
+
+        def check_content(*args):
+            calls.append(args[0])
+            return original(*args)
+
+        monkeypatch.setattr(orchestrator, "_check_content_by_extension", check_content)
+
+        first = orchestrator._check_file(str(path), "калькулятор")
+        # Доработка перезаписала файл тем же содержимым
+        path.write_text(GOOD_PYTHON, encoding="utf-8")
+        second = orchestrator._check_file(str(path), "калькулятор")
+        path.write_text(GOOD_PYTHON + "print(add(1, 1))\n", encoding="utf-8")
+        orchestrator._check_file(str(path), "калькулятор")
+
+        assert calls == [str(path), str(path)]
+        assert second["content_check"] == first["content_check"]
+
+    def test_patterns_found_across_read_chunks(self, monkeypatch):
+        monkeypatch.setattr(unified_orchestrator, "_FILE_READ_CHUNK", 7)
+        text = ("обычный текст " * 40 + "Результат выполнения задачи" + " ещё текст " * 30
+                + "Время создания:" + " хвост")
+
+        found = unified_orchestrator._find_fake_patterns(io.BytesIO(text.encode("utf-8")))
+
+        assert found == [p for p in unified_orchestrator._FAKE_REPORT_PATTERNS if p in text]
+        assert found == ["Результат выполнения задачи", "Время создания:"]
+
+    def test_file_truncated_during_check_does_not_crash(self, orchestrator, tmp_path, monkeypatch):
+        """Следующий шаг переписал файл во время проверки: ошибки нет, процесс жив"""
+        orchestrator.config.validation_max_bytes = 1024
+        path = tmp_path / "notes.txt"
+        path.write_text("обычный текст\n" * 5000, encoding="utf-8")
+        original_sample = unified_orchestrator._sample_text
+
+        def truncating_sample(*args):
+            open(path, "w").close()
+            return original_sample(*args)
+
+        monkeypatch.setattr(unified_orchestrator, "_sample_text", truncating_sample)
+
+        check = orchestrator._check_file(str(path), "заметки")
+
+        assert check["error"] is None
+        assert not check["sampled"]
+
@@ -0,0 +1,103 @@
+"""
+Тесты классификатора задач KittyCore 3.0
+"""
+
+import random
+
+from kittycore.core.task_classifier import (
+    KeywordAutomaton, LinearTaskModel, TaskClassifier, append_history, train_from_history
+)
+
+AGENTS = {
+    "nova": ["анализ", "данные", "статистика"],
+    "sherlock": ["найди", "поиск", "исследуй"],
+    "artemis": ["создай", "дизайн", "контент"],
+    "ada": ["код", "программа", "api"],
+    "cipher": ["тест", "безопасность"],
+    "warren": ["бюджет", "финансы"],
+    "viral": ["реклама", "маркетинг"]
+}
+
+
+class TestKeywordAutomaton:
+    """Автомат Ахо-Корасик"""
+
+    def test_matches_same_keywords_as_substring_checks(self):
+        keywords = ["he", "she", "his", "hers", "анализ", "ана", "из", "код", "кодекс", "с"]
+        automaton = KeywordAutomaton(keywords)
+        rng = random.Random(7)
+        alphabet = "hesirанлизкодекс "
+
+        for _ in range(300):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            assert automaton.matched(text) == {k for k in keywords if k in text}
+
+    def test_reports_every_occurrence(self):
+        automaton = KeywordAutomaton(["he", "she", "his", "hers"])
+
+        assert sorted(automaton.iter_matches("ushers")) == [(3, "he"), (3, "she"), (5, "hers")]
+
+
+class TestTaskClassifier:
+    """Уверенность и обучение на истории"""
+
+    def test_confidence_separates_clear_and_ambiguous_tasks(self):
+        classifier = TaskClassifier(AGENTS, default_label="sherlock")
+
+        clear = classifier.classify("Посчитай бюджет и финансы отдела")
+        ambiguous = classifier.classify("Напиши код для анализа")
+        unknown = classifier.classify("Что посоветуешь на выходные?")
+
+        assert (clear.label, clear.method) == ("warren", "keywords") and clear.confidence > 0.75
+        assert ambiguous.matches == {"nova": ["анализ"], "ada": ["код"]}
+        # Равенство решает порядок таблицы, но уверенность ниже порога
+        assert ambiguous.label == "nova" and ambiguous.confidence < 0.5
+        assert (unknown.label, unknown.method) == ("sherlock", "default") and unknown.confidence < 0.5
+        assert classifier.first_match("Напиши код для анализа") == "nova"
+
+    def test_model_trained_on_llm_history_cuts_llm_routes(self, tmp_path):
+        history = tmp_path / "routing_history.jsonl"
+        model_path = tmp_path / "router_model.json"
+        labelled = [
+            ("Подготовь пост для соцсетей про новый продукт", "viral"),
+            ("Придумай слоган и пост для соцсетей", "viral"),
+            ("Сравни цены поставщиков и посчитай расходы", "warren"),
+            ("Посчитай расходы на команду за квартал", "warren"),
+            ("Проверь сервер на уязвимости", "cipher"),
+            ("Найди уязвимости в конфигурации сервера", "cipher")
+        ]
+        for text, label in labelled:
+            append_history(str(history), text, label)
+        with history.open("a", encoding="utf-8") as f:
+            f.write("не json\n")
+
+        incoming = ["Пост для соцсетей о скидках", "Посчитай расходы на офис", "Уязвимости сервера после обновления"]
+        classifier = TaskClassifier(AGENTS, default_label="sherlock")
+        llm_before = sum(classifier.classify(task).confidence < 0.5 for task in incoming)
+
+        model = train_from_history(classifier, str(history), str(model_path))
+        classifier.model = LinearTaskModel.load(str(model_path))
+        results = [classifier.classify(task) for task in incoming]
+
+        assert model.trained_samples == len(labelled)
+        assert llm_before == 3
+        assert [r.label for r in results] == ["viral", "warren", "cipher"]
+        assert sum(r.confidence < 0.5 for r in results) == 0
+        assert all(r.method == "model" for r in results)
+
+
+class TestTaskTypeCallSites:
+    """Типы задач оркестраторов сохраняют приоритет прежних цепочек if/elif"""
+
+    def test_first_matching_label_wins_over_match_count(self):
+        from kittycore.core.orchestrator import TaskDecomposer
+        from kittycore.core.unified_orchestrator import UnifiedOrchestrator
+
+        determine = UnifiedOrchestrator._determine_task_type
+        assert determine(None, "Напиши скрипт: тест, проверка и валидация качества") == "programming"
+        assert determine(None, "Тест и проверка качества") == "testing"
+        assert determine(None, "Что посоветуешь на выходные?") == "general"
+
+        response = "1. План: тест, проверка и валидация\n2. Собрать файлы"
+        subtasks = TaskDecomposer._parse_text_decomposition(None, response, "задача", "simple")
+        assert [subtask["type"] for subtask in subtasks] == ["planning", "execution"]
@@ -0,0 +1,82 @@
+"""
+Тесты TaskManager ObsidianDB KittyCore 3.0
+"""
+
+from pathlib import Path
+
+from kittycore.core.obsidian_db import ObsidianDB, ObsidianNote, TaskManager
+
+
+def task_note_path(db: ObsidianDB, task_id: str) -> Path:
+    return next((db.vault_path / "tasks").glob(f"task_{task_id}_*.md"))
+
+
+class TestTaskManager:
+    """Рабочие копии заметок задач"""
+
+    def test_updates_are_coalesced_until_flush(self, tmp_path, monkeypatch):
+        db = ObsidianDB(str(tmp_path / "vault"))
+        manager = TaskManager(db)
+        task_id = manager.create_task("собрать отчёт по продажам", user_id="u1")
+        path = task_note_path(db, task_id)
+        saved = []
+        original_save = db.save_note
+        monkeypatch.setattr(db, "save_note", lambda note, filename=None: saved.append(filename) or original_save(note, filename))
+
+        def fail(*args, **kwargs):
+            raise AssertionError("поиск по vault не нужен")
+        monkeypatch.setattr(db, "search_notes", fail)
+        monkeypatch.setattr(db, "get_note", fail)
+
+        manager.add_agent_to_task(task_id, "analyst", "analyst")
+        manager.add_agent_to_task(task_id, "writer", "writer")
+        manager.add_result_to_task(task_id, "analyst", "выручка выросла")
+        manager.add_result_to_task(task_id, "writer", "отчёт готов")
+        assert saved == []
+        assert "analyst" not in path.read_text(encoding="utf-8")
+
+        assert manager.flush() == 1
+        assert manager.flush() == 0
+        manager.update_task_status(task_id, "completed", "готово")
+
+        assert saved == [path.name, path.name]
+        note = ObsidianNote.from_markdown(str(path))
+        agents = note.content.split("## Агенты")[1].split("## Результаты")[0]
+        results = note.content.split("## Результаты")[1].split("## Связанные заметки")[0]
+        assert agents.index("**analyst**") < agents.index("**writer**")
+        assert results.index("выручка выросла") < results.index("отчёт готов")
+        assert "*Агенты будут добавлены автоматически*" not in note.content
+        assert "[[analyst|Агент analyst]]" in note.content
+        assert note.metadata["status"] == "completed"
+        assert "completed" in note.tags and "active" not in note.tags
+        assert task_id not in manager._active
+
+    def test_task_from_previous_session_is_found_by_index(self, tmp_path):
+        vault = str(tmp_path / "vault")
+        task_id = TaskManager(ObsidianDB(vault)).create_task("старая задача")
+
+        db = ObsidianDB(vault)
+        manager = TaskManager(db)
+        manager.add_result_to_task(task_id, "coder", "код написан")
+        manager.update_task_status(task_id, "failed_llm_unavailable", "LLM недоступен")
+        manager.update_task_status("missing", "completed")
+
+        summary = manager.get_task_summary(task_id)
+        content = task_note_path(db, task_id).read_text(encoding="utf-8")
+
+        assert summary["status"] == "failed_llm_unavailable"
+        assert "код написан" in content
+        assert "LLM недоступен" in content
+
+    def test_active_notes_are_bounded(self, tmp_path):
+        db = ObsidianDB(str(tmp_path / "vault"))
+        manager = TaskManager(db, max_active=2)
+        task_ids = [manager.create_task(f"задача {i}") for i in range(3)]
+        manager.add_agent_to_task(task_ids[1], "coder")
+        manager.add_agent_to_task(task_ids[2], "tester")
+        manager.add_agent_to_task(task_ids[0], "reviewer")
+
+        # Вытесненная рабочая копия сохранена на диск
+        assert task_ids[1] not in manager._active
+        assert "**coder**" in task_note_path(db, task_ids[1]).read_text(encoding="utf-8")
+        assert len(manager._active) == 2
@@ -0,0 +1,175 @@
+"""
+Тесты трассировки этапов KittyCore 3.0
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from kittycore.core.tracing import Tracer, get_tracer, traced
+from kittycore.core.unified_orchestrator import UnifiedConfig, UnifiedOrchestrator
+from kittycore.tools.base_tool import Tool, ToolResult
+
+
+class NoopTool(Tool):
+    def __init__(self):
+        super().__init__("noop_trace_tool", "Ничего не делает")
+
+    def execute(self, **kwargs) -> ToolResult:
+        return ToolResult(success=True)
+
+    def get_schema(self):
+        return {"type": "object", "properties": {}}
+
+
+@pytest.fixture
+def tracer():
+    tracer = get_tracer()
+    previous = tracer.sample_rate
+    tracer.configure(sample_rate=1.0)
+    tracer.clear()
+    yield tracer
+    tracer.configure(sample_rate=previous)
+    tracer.clear()
+
+
+class TestTracer:
+    """Тесты Tracer"""
+
+    def test_parent_child_across_gather(self):
+        tracer = Tracer()
+
+        async def child(i):
+            with tracer.span("child", {"index": i}):
+                await asyncio.sleep(0.001)
+
+        async def root():
+            with tracer.span("root") as span:
+                await asyncio.gather(*(child(i) for i in range(3)))
+            return span
+
+        root_span = asyncio.run(root())
+        children = [s for s in tracer.get_spans() if s.name == "child"]
+
+        assert len(children) == 3
+        assert {s.parent_id for s in children} == {root_span.span_id}
+        assert {s.trace_id for s in children} == {root_span.trace_id}
+        assert tracer.current_span() is None
+
+    def test_sampling_is_per_trace(self):
+        tracer = Tracer(sample_rate=0.0)
+        with tracer.span("root") as root:
+            with tracer.span("child") as child:
+                child.set_attribute("ignored", 1)
+
+        assert root.sampled is False and child.sampled is False
+        assert tracer.get_spans() == []
+
+    def test_error_status_and_buffer_limit(self):
+        tracer = Tracer(max_spans=3)
+        with pytest.raises(ValueError):
+            with tracer.span("failing"):
+                raise ValueError("boom")
+        for i in range(5):
+            with tracer.span(f"s{i}"):
+                pass
+
+        spans = tracer.get_spans()
+        assert [s.name for s in spans] == ["s2", "s3", "s4"]
+
+        failing = Tracer()
+        with pytest.raises(ValueError):
+            with failing.span("failing"):
+                raise ValueError("boom")
+        assert failing.get_spans()[0].status == "error"
+        assert "boom" in failing.get_spans()[0].error
+
+    def test_exports(self, tmp_path):
+        tracer = Tracer()
+        with tracer.span("stage.analysis", {"complexity": "simple", "agents": 2, "ratio": 0.5}):
+            with tracer.span("llm.complete"):
+                pass
+
+        chrome_path = tracer.export_chrome_trace(tmp_path / "trace.json")
+        otlp_path = tracer.export_otlp_json(tmp_path / "traces.otlp.jsonl")
+        chrome = json.loads(open(chrome_path, encoding="utf-8").read())
+        otlp = json.loads(open(otlp_path, encoding="utf-8").readline())
+
+        events = chrome["traceEvents"]
+        assert [e["name"] for e in events] == ["stage.analysis", "llm.complete"]
+        assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+        assert events[1]["args"]["parent_id"] == events[0]["args"]["span_id"]
+
+        spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        analysis = next(s for s in spans if s["name"] == "stage.analysis")
+        llm = next(s for s in spans if s["name"] == "llm.complete")
+        assert len(analysis["traceId"]) == 32 and len(analysis["spanId"]) == 16
+        assert llm["parentSpanId"] == analysis["spanId"]
+        assert {"key": "agents", "value": {"intValue": "2"}} in analysis["attributes"]
+        assert int(analysis["endTimeUnixNano"]) >= int(analysis["startTimeUnixNano"])
+
+    def test_stage_breakdown(self):
+        tracer = Tracer()
+        for _ in range(10):
+            with tracer.span("fast"):
+                pass
+        with tracer.span("slow"):
+            asyncio.run(asyncio.sleep(0.02))
+
+        breakdown = tracer.stage_breakdown()
+
+        assert list(breakdown)[0] == "slow"
+        assert breakdown["fast"]["count"] == 10
+        assert breakdown["slow"]["p99_ms"] >= 20
+
+    def test_traced_decorator_and_tool_spans(self, tracer):
+        @traced("work.async")
+        async def work():
+            return NoopTool()._execute_with_logging(action="run")
+
+        assert asyncio.run(work()).success is True
+
+        spans = {s.name: s for s in tracer.get_spans()}
+        assert spans["tool.noop_trace_tool"].parent_id == spans["work.async"].span_id
+        assert spans["tool.noop_trace_tool"].attributes == {"tool.action": "run", "tool.success": True}
+
+
+class TestOrchestratorStages:
+    """Спаны этапов UnifiedOrchestrator.solve_task"""
+
+    def test_solve_task_stage_spans(self, tracer, tmp_path):
+        orchestrator = UnifiedOrchestrator.__new__(UnifiedOrchestrator)
+        orchestrator.config = UnifiedConfig(vault_path=str(tmp_path), trace_export_path=str(tmp_path / "traces"))
+        orchestrator.task_analyzer = SimpleNamespace(llm=object())
+        orchestrator.task_manager = MagicMock(create_task=MagicMock(return_value="task_1"))
+        orchestrator.metrics_collector = None
+        orchestrator.vector_store = None
+        orchestrator.plan_cache = None
+        orchestrator.tasks_processed = 0
+        orchestrator._analyze_task_with_storage = AsyncMock(return_value={"complexity": "simple",
+                                                                          "estimated_agents": 1})
+        orchestrator._check_human_intervention_needed = AsyncMock(return_value=False)
+        orchestrator._decompose_task_with_storage = AsyncMock(return_value=[{"description": "a"}])
+        orchestrator._create_agent_team = AsyncMock(return_value={})
+        orchestrator._execute_with_unified_coordination = AsyncMock(return_value={"status": "completed"})
+        orchestrator._validate_results = AsyncMock(return_value={"quality_score": 0.9})
+        orchestrator._finalize_task_results = AsyncMock(return_value={"created_files": []})
+        orchestrator._update_learning_systems = AsyncMock()
+
+        result = asyncio.run(orchestrator.solve_task("Создать отчёт"))
+
+        assert result["status"] == "completed"
+        spans = tracer.get_spans()
+        root = next(s for s in spans if s.name == "solve_task")
+        stages = [s.name for s in spans if s.parent_id == root.span_id]
+        assert stages == [
+            "stage.create_task", "stage.analysis", "stage.intervention_check", "stage.decomposition",
+            "stage.team_creation", "stage.execution", "stage.validation", "stage.finalization",
+            "stage.learning", "stage.vector_store", "stage.metrics"
+        ]
+        assert root.attributes["task.id"] == "task_1"
+        assert (tmp_path / "traces" / "trace_task_1.json").exists()
+        assert (tmp_path / "traces" / "traces.otlp.jsonl").exists()
@@ -0,0 +1,163 @@
+"""
+Тесты для обхода сайтов (crawl) веб-инструментов KittyCore 3.0
+"""
+
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+from kittycore.tools.enhanced_web_scraping_tool import EnhancedWebScrapingTool
+from kittycore.tools.web_crawler import (
+    BloomFilter,
+    CrawlConfig,
+    CrawlFrontier,
+    create_seen_set,
+    normalize_url
+)
+
+
+SITE = {
+    "/": ["/a", "/b", "/private/secret", "mailto:me@example.com", "https://external.example/"],
+    "/a": ["/a/1", "/a/2", "/#top", "/b?utm_source=x"],
+    "/b": ["/b/1", "/a"],
+    "/a/1": ["/a/1/deep"],
+    "/a/2": [],
+    "/b/1": [],
+    "/a/1/deep": [],
+    "/private/secret": [],
+}
+
+ROBOTS = "User-agent: *\nDisallow: /private/\n"
+
+
+def render(path):
+    links = "".join(f'<a href="{href}">link</a>' for href in SITE[path])
+    return f"<html><head><title>{path}</title></head><body><nav>{links}</nav><main>Page {path}</main></body></html>"
+
+
+@asynccontextmanager
+async def local_site():
+    """Локальный сайт с robots.txt и графом ссылок"""
+    requests = []
+
+    async def handler(request):
+        requests.append((request.path, time.monotonic()))
+        if request.path == "/robots.txt":
+            return web.Response(text=ROBOTS, content_type="text/plain")
+        if request.path not in SITE:
+            return web.Response(status=404)
+        return web.Response(text=render(request.path), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}", requests
+    finally:
+        await runner.cleanup()
+
+
+class TestUrlNormalization:
+    """Тесты нормализации URL"""
+
+    def test_normalize(self):
+        assert normalize_url("HTTP://Example.COM:80/a/./b/../c?b=2&a=1#frag") == "http://example.com/a/c?a=1&b=2"
+        assert normalize_url("https://example.com") == "https://example.com/"
+        assert normalize_url("https://example.com/x?utm_source=mail&id=5") == "https://example.com/x?id=5"
+
+    def test_relative_and_non_http(self):
+        assert normalize_url("../up", "https://example.com/a/b/") == "https://example.com/a/up"
+        assert normalize_url("mailto:me@example.com") is None
+        assert normalize_url("javascript:void(0)", "https://example.com/") is None
+
+
+class TestSeenSet:
+    """Тесты множества посещённых URL"""
+
+    def test_bloom_filter_membership(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"https://example.com/{i}")
+
+        assert all(f"https://example.com/{i}" in bloom for i in range(1000))
+        false_positives = sum(f"https://other.com/{i}" in bloom for i in range(1000))
+        assert false_positives < 50
+
+    def test_seen_set_switches_to_bloom(self):
+        assert isinstance(create_seen_set(100), set)
+        assert isinstance(create_seen_set(100_000), BloomFilter)
+
+    def test_frontier_priority_and_dedup(self):
+        frontier = CrawlFrontier(set(), priority_keywords=["docs"])
+        assert frontier.push("https://e.com/blog", 1) is True
+        assert frontier.push("https://e.com/docs", 1) is True
+        assert frontier.push("https://e.com/blog", 1) is False
+
+        assert frontier.pop() == ("https://e.com/docs", 1)
+        assert len(frontier) == 1
+
+
+class TestCrawl:
+    """Тесты обхода на локальном сервере"""
+
+    @pytest.mark.asyncio
+    async def test_crawl_respects_depth_robots_and_domain(self):
+        tool = EnhancedWebScrapingTool()
+        async with local_site() as (base, requests):
+            result = await tool.execute(action="crawl", urls=[base], max_depth=2,
+                                        politeness_delay=0, parser="html.parser")
+        await tool.close()
+
+        assert result.success is True
+        crawled = {r["url"].replace(base, "") for r in result.data["results"]}
+        assert crawled == {"/", "/a", "/b", "/a/1", "/a/2", "/b/1"}
+        assert result.data["max_depth_reached"] == 2
+        # robots.txt запрошен один раз, закрытый раздел не загружался
+        paths = [path for path, _ in requests]
+        assert paths.count("/robots.txt") == 1
+        assert "/private/secret" not in paths
+        # Каждая страница загружена ровно один раз, несмотря на дубли ссылок
+        assert len(paths) == len(set(paths))
+
+    @pytest.mark.asyncio
+    async def test_page_budget(self):
+        tool = EnhancedWebScrapingTool()
+        async with local_site() as (base, _):
+            result = await tool.execute(action="crawl", urls=[base], max_depth=5, max_pages=3,
+                                        politeness_delay=0)
+        await tool.close()
+
+        assert result.data["pages_crawled"] == 3
+
+    @pytest.mark.asyncio
+    async def test_politeness_delay(self):
+        tool = EnhancedWebScrapingTool()
+        async with local_site() as (base, requests):
+            await tool.execute(action="crawl", urls=[base], max_depth=1, politeness_delay=0.1,
+                               respect_robots=False)
+        await tool.close()
+
+        times = sorted(ts for path, ts in requests)
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        assert len(times) == 4  # /, /a, /b и /private/secret (robots.txt отключён)
+        assert min(gaps) >= 0.09
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_before_crawl_finishes(self):
+        tool = EnhancedWebScrapingTool()
+        async with local_site() as (base, requests):
+            stream = tool.crawl_stream([base], crawl_config=CrawlConfig(max_depth=3, politeness_delay=0.05))
+            first = await stream.__anext__()
+            fetched_when_first_yielded = len([p for p, _ in requests if p != "/robots.txt"])
+            await stream.aclose()
+        await tool.close()
+
+        assert first.url == f"{base}/"
+        assert first.success is True
+        assert fetched_when_first_yielded < len(SITE) - 1
@@ -0,0 +1,293 @@
+"""
+Тесты для пула соединений и HTTP-кэша веб-инструментов KittyCore 3.0
+"""
+
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from aiohttp import web
+
+from kittycore.tools import enhanced_web_scraping_tool
+from kittycore.tools.enhanced_web_scraping_tool import EnhancedWebScrapingTool
+from kittycore.tools.web_fetch import (
+    FetchPool,
+    HttpCache,
+    freshness_lifetime,
+    resolve_parser,
+    LXML_AVAILABLE
+)
+
+
+PAGE = "<html><head><title>Test</title></head><body><main><p>Hello</p><a href='/next'>Next</a></main></body></html>"
+
+
+@asynccontextmanager
+async def local_server(handler):
+    """Локальный HTTP сервер с одним обработчиком на все пути"""
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        await runner.cleanup()
+
+
+class TestFreshness:
+    """Тесты разбора заголовков кэширования"""
+
+    def test_max_age(self):
+        assert freshness_lifetime({"Cache-Control": "public, max-age=60"}) == 60
+
+    def test_no_store_and_private(self):
+        assert freshness_lifetime({"Cache-Control": "no-store"}) is None
+        assert freshness_lifetime({"cache-control": "private, max-age=60"}) is None
+
+    def test_no_cache_requires_revalidation(self):
+        assert freshness_lifetime({"Cache-Control": "no-cache"}) == 0
+
+    def test_parser_resolution(self):
+        assert resolve_parser("html.parser") == "html.parser"
+        assert resolve_parser("auto") == ("lxml" if LXML_AVAILABLE else "html.parser")
+
+
+class TestFetchPool:
+    """Тесты FetchPool на локальном сервере"""
+
+    @pytest.mark.asyncio
+    async def test_fresh_response_served_from_cache(self):
+        hits = []
+
+        async def handler(request):
+            hits.append(request.path)
+            return web.Response(text=PAGE, content_type="text/html",
+                                headers={"Cache-Control": "max-age=60"})
+
+        pool = FetchPool(cache=HttpCache())
+        async with local_server(handler) as base:
+            first = await pool.fetch(f"{base}/page")
+            second = await pool.fetch(f"{base}/page")
+        await pool.close()
+
+        assert first.from_cache is False
+        assert second.from_cache is True
+        assert second.text == PAGE
+        assert len(hits) == 1
+
+    @pytest.mark.asyncio
+    async def test_etag_revalidation(self):
+        conditional = []
+
+        async def handler(request):
+            if request.headers.get("If-None-Match") == '"v1"':
+                conditional.append(True)
+                return web.Response(status=304, headers={"ETag": '"v1"'})
+            return web.Response(text=PAGE, content_type="text/html",
+                                headers={"ETag": '"v1"', "Cache-Control": "no-cache"})
+
+        pool = FetchPool(cache=HttpCache())
+        async with local_server(handler) as base:
+            await pool.fetch(f"{base}/page")
+            second = await pool.fetch(f"{base}/page")
+        await pool.close()
+
+        assert conditional == [True]
+        assert second.revalidated is True
+        assert second.status == 200
+        assert second.text == PAGE
+
+    @pytest.mark.asyncio
+    async def test_no_store_not_cached(self):
+        hits = []
+
+        async def handler(request):
+            hits.append(request.path)
+            return web.Response(text=PAGE, headers={"Cache-Control": "no-store", "ETag": '"x"'})
+
+        pool = FetchPool(cache=HttpCache())
+        async with local_server(handler) as base:
+            await pool.fetch(f"{base}/page")
+            await pool.fetch(f"{base}/page")
+        await pool.close()
+
+        assert len(hits) == 2
+
+    @pytest.mark.asyncio
+    async def test_persistent_body_cache(self, tmp_path):
+        async def handler(request):
+            return web.Response(text=PAGE, headers={"Cache-Control": "max-age=600"})
+
+        pool = FetchPool(cache=HttpCache(cache_dir=tmp_path))
+        async with local_server(handler) as base:
+            url = f"{base}/page"
+            await pool.fetch(url)
+        await pool.close()
+
+        # Новый кэш поверх той же директории - сервер уже остановлен
+        restored = FetchPool(cache=HttpCache(cache_dir=tmp_path))
+        response = await restored.fetch(url)
+        await restored.close()
+
+        assert response.from_cache is True
+        assert response.text == PAGE
+
+    @pytest.mark.asyncio
+    async def test_global_concurrency_cap(self):
+        in_flight = 0
+        peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            return web.Response(text=PAGE)
+
+        pool = FetchPool(max_concurrency=3, per_host_limit=10, cache=None)
+        async with local_server(handler) as base:
+            await asyncio.gather(*[pool.fetch(f"{base}/p{i}") for i in range(12)])
+        await pool.close()
+
+        assert peak <= 3
+
+
+class TestSessionLifetime:
+    """Сессия пула не переживает свой event loop"""
+
+    @pytest.fixture
+    def server_url(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = PAGE.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+        server.shutdown()
+        server.server_close()
+
+    def test_session_closed_when_asyncio_run_ends(self, server_url):
+        pool = FetchPool(cache=None)
+
+        async def fetch():
+            response = await pool.fetch(f"{server_url}/page")
+            assert response.text == PAGE
+            return pool._session
+
+        first = asyncio.run(fetch())
+        second = asyncio.run(fetch())
+
+        assert second is not first
+        assert first.closed and second.closed
+
+    def test_stale_session_closed_when_loop_changes(self, server_url):
+        pool = FetchPool(cache=None)
+
+        async def fetch():
+            await pool.fetch(f"{server_url}/page")
+            return pool._session
+
+        # loop закрыт вручную, без отмены задач: сессию закрывает следующий вызов
+        loop = asyncio.new_event_loop()
+        first = loop.run_until_complete(fetch())
+        loop.close()
+        assert not first.closed
+
+        async def fetch_and_close():
+            session = await fetch()
+            await pool.close()
+            return session
+
+        second = asyncio.run(fetch_and_close())
+
+        assert first.closed and second.closed
+        assert pool._session is None
+
+
+class TestScrapingToolWithPool:
+    """Тесты EnhancedWebScrapingTool поверх пула"""
+
+    @pytest.mark.asyncio
+    async def test_scrape_uses_cache_and_parser(self):
+        async def handler(request):
+            return web.Response(text=PAGE, content_type="text/html",
+                                headers={"Cache-Control": "max-age=60"})
+
+        tool = EnhancedWebScrapingTool()
+        async with local_server(handler) as base:
+            first = await tool.execute(urls=[f"{base}/a"], parser="html.parser")
+            second = await tool.execute(urls=[f"{base}/a"], parser="html.parser")
+        await tool.close()
+
+        assert first.success is True
+        assert first.data["successful_scrapes"] == 1
+        assert first.data["results"][0]["metadata"]["title"] == "Test"
+        assert second.data["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_large_page_parsed_off_loop(self, monkeypatch):
+        monkeypatch.setattr(enhanced_web_scraping_tool, "OFFLOOP_PARSE_THRESHOLD", 10)
+
+        async def handler(request):
+            return web.Response(text=PAGE, content_type="text/html")
+
+        tool = EnhancedWebScrapingTool()
+        async with local_server(handler) as base:
+            result = await tool.execute(urls=[f"{base}/big"])
+        await tool.close()
+
+        assert result.data["results"][0]["success"] is True
+        assert "Hello" in result.data["results"][0]["text_preview"]
+
+    @pytest.mark.asyncio
+    async def test_default_config_parses_huge_page_off_loop(self, monkeypatch):
+        """Порог сравнивается с телом до обрезки по max_content_length"""
+        body = PAGE.replace("<p>Hello</p>", "<p>Hello</p>" + "<p>filler</p>" * 20_000)
+        assert len(body) > enhanced_web_scraping_tool.OFFLOOP_PARSE_THRESHOLD
+
+        async def handler(request):
+            return web.Response(text=body, content_type="text/html")
+
+        tool = EnhancedWebScrapingTool()
+        parse_threads = []
+        original_parse = tool._parse_page
+        original_crawl_parse = tool._parse_crawl_page
+
+        def recording_parse(*args, **kwargs):
+            parse_threads.append(threading.current_thread())
+            return original_parse(*args, **kwargs)
+
+        def recording_crawl_parse(*args, **kwargs):
+            parse_threads.append(threading.current_thread())
+            return original_crawl_parse(*args, **kwargs)
+
+        monkeypatch.setattr(tool, "_parse_page", recording_parse)
+        monkeypatch.setattr(tool, "_parse_crawl_page", recording_crawl_parse)
+        async with local_server(handler) as base:
+            result = await tool.execute(urls=[f"{base}/big"])
+            pages = [page async for page in tool.crawl_stream([f"{base}/big"])]
+        await tool.close()
+
+        assert result.data["results"][0]["success"] is True
+        assert "Hello" in result.data["results"][0]["text_preview"]
+        assert pages
+        # Страница и скрапинга, и обхода разобрана не в потоке event loop
+        assert len(parse_threads) >= 2
+        assert all(thread is not threading.main_thread() for thread in parse_threads)
@@ -0,0 +1,153 @@
+"""
+Тесты рассылки WebSocketManager KittyCore 3.0
+"""
+
+import asyncio
+import json
+
+from kittycore.core.metrics_registry import WEBSOCKET_DROPPED_MESSAGES
+from kittycore.web.websocket_manager import SendPolicy, WebSocketManager, coalesce_key
+
+
+class FakeWebSocket:
+    """WebSocket клиента; stalled=True - отправка зависает до release()"""
+
+    def __init__(self, stalled: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.gate = asyncio.Event()
+        if not stalled:
+            self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.gate.wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+    def release(self):
+        self.gate.set()
+
+    def types(self):
+        return [m["type"] for m in self.sent]
+
+
+async def connect(manager: WebSocketManager, websocket: FakeWebSocket):
+    """Подключение; даём очереди отправки забрать приветственное сообщение"""
+    await manager.connect(websocket, "main")
+    await asyncio.sleep(0.01)
+
+
+def progress(task_id: str, stage: str):
+    return {"type": "task_progress", "task_id": task_id, "stage": stage}
+
+
+class TestWebSocketFanOut:
+    """Очереди отправки соединений"""
+
+    def test_stalled_client_does_not_delay_room(self):
+        async def scenario():
+            manager = WebSocketManager(max_queue=16)
+            fast, stalled = FakeWebSocket(), FakeWebSocket(stalled=True)
+            await manager.connect(fast, "main")
+            await manager.connect(stalled, "main")
+
+            await asyncio.wait_for(manager.broadcast_to_room("main", {"type": "task_started", "task_id": "t1"}), 0.1)
+            await asyncio.wait_for(manager.senders[fast].flush(), 0.5)
+            depth = manager.get_send_queue_depth()
+
+            stalled.release()
+            await manager.flush(timeout=1)
+            return fast, stalled, depth
+
+        fast, stalled, depth = asyncio.run(scenario())
+
+        assert fast.types() == ["connection_established", "user_joined", "task_started"]
+        assert depth >= 1
+        assert stalled.types()[-1] == "task_started"
+
+    def test_drop_oldest_policy(self):
+        async def scenario():
+            manager = WebSocketManager(max_queue=3, policy=SendPolicy.DROP_OLDEST)
+            client = FakeWebSocket(stalled=True)
+            await connect(manager, client)
+            for i in range(6):
+                await manager.broadcast({"type": "system_notification", "message": str(i)})
+            client.release()
+            await manager.flush(timeout=1)
+            return client
+
+        client = asyncio.run(scenario())
+
+        # Первое сообщение уже отправлялось, когда очередь переполнилась
+        assert [m["message"] for m in client.sent[1:]] == ["3", "4", "5"]
+
+    def test_coalesce_keeps_latest_progress_per_task(self):
+        async def scenario():
+            manager = WebSocketManager(max_queue=3, policy=SendPolicy.COALESCE)
+            client = FakeWebSocket(stalled=True)
+            await connect(manager, client)
+            dropped_before = WEBSOCKET_DROPPED_MESSAGES.labels("coalesced").get()
+            await manager.broadcast(progress("t1", "stage.analysis"))
+            await manager.broadcast(progress("t2", "stage.analysis"))
+            await manager.broadcast({"type": "task_completed", "task_id": "t3"})
+            for stage in ("stage.decomposition", "stage.execution", "stage.validation"):
+                await manager.broadcast(progress("t1", stage))
+            dropped = WEBSOCKET_DROPPED_MESSAGES.labels("coalesced").get() - dropped_before
+            client.release()
+            await manager.flush(timeout=1)
+            return client, dropped
+
+        client, dropped = asyncio.run(scenario())
+
+        queued = [(m["type"], m.get("task_id"), m.get("stage")) for m in client.sent[1:]]
+        assert queued == [
+            ("task_progress", "t1", "stage.validation"),
+            ("task_progress", "t2", "stage.analysis"),
+            ("task_completed", "t3", None)
+        ]
+        assert dropped == 3
+
+    def test_token_deltas_are_not_coalesced(self):
+        assert coalesce_key({"type": "token", "task_id": "t1", "content": "При"}) is None
+        assert coalesce_key({"type": "task_progress", "task_id": "t1"}) == ("task_progress", "t1")
+        assert coalesce_key({"type": "ping"}) == ("ping", None)
+
+    def test_disconnect_policy_drops_slow_consumer(self):
+        async def scenario():
+            manager = WebSocketManager(max_queue=2, policy=SendPolicy.DISCONNECT)
+            fast, slow = FakeWebSocket(), FakeWebSocket(stalled=True)
+            await connect(manager, fast)
+            await connect(manager, slow)
+            for i in range(5):
+                await manager.broadcast_to_room("main", {"type": "system_notification", "message": str(i)})
+                # Быстрый клиент успевает разбирать очередь между событиями
+                await asyncio.sleep(0.001)
+            await manager.flush(timeout=1)
+            return manager, fast, slow
+
+        manager, fast, slow = asyncio.run(scenario())
+
+        assert manager.get_connection_count() == 1
+        assert slow.closed_with == 1013
+        assert [m["message"] for m in fast.sent if m["type"] == "system_notification"] == list("01234")
+
+    def test_failed_send_disconnects(self):
+        class BrokenWebSocket(FakeWebSocket):
+            async def send_text(self, text: str):
+                raise RuntimeError("connection reset")
+
+        async def scenario():
+            manager = WebSocketManager()
+            await manager.connect(BrokenWebSocket(), "main")
+            await asyncio.sleep(0.01)
+            return manager
+
+        manager = asyncio.run(scenario())
+
+        assert manager.get_connection_count() == 0
+        assert manager.get_rooms_info() == {}